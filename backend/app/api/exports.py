@@ -0,0 +1,22 @@
+from datetime import date
+from typing import Optional
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from app.services.seodata_export import EXPORT_MEDIA_TYPES, create_encoder, export_batches, stream_export
+
+# Analysis export responses shared by the SEO and admin routers
+
+def export_response(format: str, user_id: Optional[int], url_prefix: Optional[str], start: Optional[date],
+                    end: Optional[date], include_results: bool, include_archived: bool) -> StreamingResponse:
+    """Chunked download of the analyses matching the filters (used by the user and admin export endpoints)"""
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    try:
+        encoder = create_encoder(format, include_results)
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    batches = export_batches(user_id, url_prefix, start, end, include_archived)
+    filename = f"analyses-{user_id if user_id is not None else 'all'}.{format}"
+    return StreamingResponse(stream_export(encoder, batches), media_type=EXPORT_MEDIA_TYPES[format],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
@@ -1,16 +1,31 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func, and_
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
-from app.database import get_db
+from datetime import date, datetime
+from typing import List, Dict, Any, Optional
+from app.api.exports import export_response
+from app.database import get_db, get_read_db, read_router
 from app.models.user import User
 from app.models.payment import Payment
 from app.models.license import License
 from app.models.seodata import SeoData
 from app.models.social import Social
+from app.services.analytics_rollups import get_revenue_rollup, get_rollup_totals, rebuild_rollups
 from app.services.auth_service import get_user_by_username
+from app.services.dashboard_snapshot import get_admin_overview as dashboard_overview
+from app.services.db_telemetry import db_telemetry
+from app.services.keyword_autocomplete import build_keyword_autocomplete
+from app.services.keyword_gap import rebuild_domain_keywords
+from app.services.keyword_index import rebuild_keyword_index
+from app.services.keyword_service import research_cache, warm_up_research_cache
+from app.services.keyword_trends import get_keyword_trend_store
+from app.services.license_cache import license_cache
+from app.services.llm_gateway import llm_gateway
+from app.services.llm_telemetry import llm_telemetry
+from app.services.pagination import estimate_count, keyset_page
+from app.services.seodata_archive import apply_retention, get_archive_status, restore_month
+from app.services.usage_counters import usage_buffer
 from app.settings import settings
 
 router = APIRouter(prefix="/admin", tags=["Admin Dashboard"])
@@ -28,121 +43,38 @@ async def get_current_admin_user(db: AsyncSession = Depends(get_db)):
 
 @router.get("/dashboard/overview")
 async def get_admin_overview(
-    db: AsyncSession = Depends(get_db),
+    refresh: bool = False,
     admin_user: User = Depends(get_current_admin_user)
 ):
-    """Get comprehensive admin dashboard overview"""
-    
-    # User statistics
-    total_users_result = await db.execute(select(func.count(User.id)))
-    total_users = total_users_result.scalar()
-    
-    verified_users_result = await db.execute(
-        select(func.count(User.id)).where(User.email_verified == True)
-    )
-    verified_users = verified_users_result.scalar()
-    
-    active_users_result = await db.execute(
-        select(func.count(User.id)).where(User.is_active == True)
-    )
-    active_users = active_users_result.scalar()
-    
-    # Recent registrations (last 7 days)
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    recent_registrations_result = await db.execute(
-        select(func.count(User.id)).where(User.created_at >= week_ago)
-    )
-    recent_registrations = recent_registrations_result.scalar()
-    
-    # Payment statistics
-    total_payments_result = await db.execute(select(func.count(Payment.id)))
-    total_payments = total_payments_result.scalar()
-    
-    successful_payments_result = await db.execute(
-        select(func.count(Payment.id)).where(Payment.status == "paid")
-    )
-    successful_payments = successful_payments_result.scalar()
-    
-    total_revenue_result = await db.execute(
-        select(func.sum(Payment.amount)).where(Payment.status == "paid")
-    )
-    total_revenue = total_revenue_result.scalar() or 0
-    
-    # License statistics
-    active_licenses_result = await db.execute(
-        select(func.count(License.id)).where(License.is_active == True)
-    )
-    active_licenses = active_licenses_result.scalar()
+    """
+    Get comprehensive admin dashboard overview
     
-    # SEO analysis statistics
-    total_analyses_result = await db.execute(select(func.count(SeoData.id)))
-    total_analyses = total_analyses_result.scalar()
-    
-    # Recent analyses (last 24 hours)
-    day_ago = datetime.utcnow() - timedelta(days=1)
-    recent_analyses_result = await db.execute(
-        select(func.count(SeoData.id)).where(SeoData.created_at >= day_ago)
-    )
-    recent_analyses = recent_analyses_result.scalar()
-    
-    # Social media connections
-    social_connections_result = await db.execute(select(func.count(Social.id)))
-    social_connections = social_connections_result.scalar()
-    
-    return {
-        "timestamp": datetime.utcnow().isoformat(),
-        "user_stats": {
-            "total_users": total_users,
-            "verified_users": verified_users,
-            "active_users": active_users,
-            "recent_registrations": recent_registrations,
-            "verification_rate": round((verified_users / total_users * 100) if total_users > 0 else 0, 2)
-        },
-        "payment_stats": {
-            "total_payments": total_payments,
-            "successful_payments": successful_payments,
-            "total_revenue": float(total_revenue),
-            "success_rate": round((successful_payments / total_payments * 100) if total_payments > 0 else 0, 2)
-        },
-        "license_stats": {
-            "active_licenses": active_licenses
-        },
-        "analysis_stats": {
-            "total_analyses": total_analyses,
-            "recent_analyses": recent_analyses,
-            "daily_avg": round(recent_analyses, 2)
-        },
-        "social_stats": {
-            "total_connections": social_connections
-        },
-        "system_health": {
-            "status": "operational",
-            "ai_engine": "active",
-            "database": "connected",
-            "email_service": "operational"
-        }
-    }
+    Served from a snapshot shared by all admins (recomputed in the background
+    once it is older than ADMIN_OVERVIEW_TTL_SECONDS); refresh=true recomputes now.
+    """
+    try:
+        return await dashboard_overview(refresh=refresh)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Overview failed: {str(e)}")
 
 @router.get("/users")
 async def get_all_users(
-    skip: int = 0,
     limit: int = 100,
-    db: AsyncSession = Depends(get_db),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    db: AsyncSession = Depends(get_read_db),
     admin_user: User = Depends(get_current_admin_user)
 ):
-    """Get all users with pagination"""
+    """
+    Get all users, newest first, one keyset page at a time
     
-    result = await db.execute(
-        select(User)
-        .order_by(User.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-    )
-    users = result.scalars().all()
-    
-    # Get total count
-    count_result = await db.execute(select(func.count(User.id)))
-    total_count = count_result.scalar()
+    Pass the returned next_cursor to get the following page. include_total=true
+    adds an estimated user count from table statistics (total_is_estimate).
+    """
+    try:
+        rows, next_cursor = await keyset_page(db, select(User), User.created_at, User.id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {
         "users": [
@@ -155,17 +87,18 @@ async def get_all_users(
                 "is_superuser": user.is_superuser,
                 "created_at": user.created_at.isoformat() if user.created_at else None
             }
-            for user in users
+            for user, *_ in rows
         ],
-        "total": total_count,
-        "skip": skip,
+        "total": await estimate_count(db, User.__table__) if include_total else None,
+        "total_is_estimate": True,
+        "next_cursor": next_cursor,
         "limit": limit
     }
 
 @router.get("/users/{user_id}")
 async def get_user_details(
     user_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     admin_user: User = Depends(get_current_admin_user)
 ):
     """Get detailed information about a specific user"""
@@ -278,29 +211,22 @@ async def toggle_user_active_status(
 
 @router.get("/payments")
 async def get_all_payments(
-    skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     status_filter: str = None,
-    db: AsyncSession = Depends(get_db),
+    include_total: bool = False,
+    db: AsyncSession = Depends(get_read_db),
     admin_user: User = Depends(get_current_admin_user)
 ):
-    """Get all payments with optional status filter"""
-    
-    query = select(Payment).order_by(Payment.created_at.desc())
-    
-    if status_filter:
-        query = query.where(Payment.status == status_filter)
-    
-    result = await db.execute(query.offset(skip).limit(limit))
-    payments = result.scalars().all()
+    """Get all payments with optional status filter, newest first, by keyset page"""
     
-    # Get total count
-    count_query = select(func.count(Payment.id))
-    if status_filter:
-        count_query = count_query.where(Payment.status == status_filter)
-    
-    count_result = await db.execute(count_query)
-    total_count = count_result.scalar()
+    filters = [Payment.status == status_filter] if status_filter else []
+    try:
+        rows, next_cursor = await keyset_page(
+            db, select(Payment).where(*filters), Payment.created_at, Payment.id, limit, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {
         "payments": [
@@ -313,10 +239,11 @@ async def get_all_payments(
                 "status": p.status,
                 "created_at": p.created_at.isoformat() if p.created_at else None
             }
-            for p in payments
+            for p, *_ in rows
         ],
-        "total": total_count,
-        "skip": skip,
+        "total": await estimate_count(db, Payment.__table__, filters) if include_total else None,
+        "total_is_estimate": True,
+        "next_cursor": next_cursor,
         "limit": limit,
         "status_filter": status_filter
     }
@@ -324,54 +251,76 @@ async def get_all_payments(
 @router.get("/analytics/revenue")
 async def get_revenue_analytics(
     days: int = 30,
+    db: AsyncSession = Depends(get_read_db),
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """Get revenue analytics for the specified period from the daily rollups"""
+    return await get_revenue_rollup(db, days)
+
+@router.post("/analytics/rollups/rebuild")
+async def rebuild_analytics_rollups(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
     db: AsyncSession = Depends(get_db),
     admin_user: User = Depends(get_current_admin_user)
 ):
-    """Get revenue analytics for the specified period"""
-    
-    start_date = datetime.utcnow() - timedelta(days=days)
-    
-    # Daily revenue
-    daily_revenue_result = await db.execute(
-        select(
-            func.date(Payment.created_at).label('date'),
-            func.sum(Payment.amount).label('revenue')
-        )
-        .where(
-            and_(
-                Payment.created_at >= start_date,
-                Payment.status == "paid"
-            )
-        )
-        .group_by(func.date(Payment.created_at))
-        .order_by(func.date(Payment.created_at))
-    )
-    daily_revenue = daily_revenue_result.fetchall()
-    
-    # Total revenue in period
-    total_revenue_result = await db.execute(
-        select(func.sum(Payment.amount))
-        .where(
-            and_(
-                Payment.created_at >= start_date,
-                Payment.status == "paid"
-            )
-        )
-    )
-    total_revenue = total_revenue_result.scalar() or 0
-    
-    return {
-        "period_days": days,
-        "total_revenue": float(total_revenue),
-        "daily_revenue": [
-            {
-                "date": str(row.date),
-                "revenue": float(row.revenue)
-            }
-            for row in daily_revenue
-        ],
-        "average_daily_revenue": float(total_revenue / days) if days > 0 else 0
-    }
+    """Recompute the daily revenue and usage rollups for start..end (all days when omitted) from raw rows"""
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    try:
+        return await rebuild_rollups(db, start, end)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Rollup rebuild failed: {str(e)}")
+
+@router.get("/seodata/archive")
+async def get_seodata_archive(
+    db: AsyncSession = Depends(get_db),
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """Get the months of SEO analyses moved to archive files"""
+    return await get_archive_status(db)
+
+@router.post("/seodata/archive/run")
+async def run_seodata_retention(
+    hot_months: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """Archive SEO analyses older than hot_months (SEODATA_HOT_MONTHS) and create upcoming partitions"""
+    if hot_months is not None and hot_months < 1:
+        raise HTTPException(status_code=400, detail="hot_months must be at least 1")
+    try:
+        return await apply_retention(db, hot_months)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"SEO data archiving failed: {str(e)}")
+
+@router.post("/seodata/archive/{month}/restore")
+async def restore_seodata_month(
+    month: str,
+    db: AsyncSession = Depends(get_db),
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """Move an archived month (YYYY-MM) of SEO analyses back into the database"""
+    try:
+        return {"month": month, "restored": await restore_month(db, month)}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"SEO data restore failed: {str(e)}")
+
+@router.get("/seodata/export")
+async def export_all_analyses(
+    format: str = "ndjson",
+    user_id: Optional[int] = None,
+    url_prefix: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    include_results: bool = True,
+    include_archived: bool = False,
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """Export every user's analyses (or one user's) as NDJSON, CSV or Parquet, streamed like /seo/export"""
+    return export_response(format, user_id, url_prefix, start, end, include_results, include_archived)
 
 @router.get("/system/health")
 async def get_system_health(
@@ -422,23 +371,143 @@ async def get_system_health(
         }
     }
 
+@router.get("/system/database")
+async def get_database_telemetry(
+    window_minutes: int = 60,
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """Get connection pool usage, query latency, slow queries, per-route query counts and read replica health"""
+    
+    telemetry = db_telemetry.summary(window_minutes=window_minutes)
+    telemetry["settings"] = {
+        "echo": settings.DATABASE_ECHO,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout_seconds": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle_seconds": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "repeated_query_threshold": settings.DB_REPEATED_QUERY_THRESHOLD
+    }
+    telemetry["read_replicas"] = read_router.stats()
+    
+    return telemetry
+
+@router.get("/llm/telemetry")
+async def get_llm_telemetry(
+    window_minutes: int = 60,
+    prompt_type: Optional[str] = None,
+    recent: int = 0,
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """Get LLM latency, token, cost and parse-failure histograms per prompt type"""
+    
+    telemetry = llm_telemetry.summary(window_minutes=window_minutes, prompt_type=prompt_type)
+    telemetry["gateway"] = llm_gateway.stats()
+    if recent > 0:
+        telemetry["recent_calls"] = llm_telemetry.recent(min(recent, 200))
+    
+    return telemetry
+
+@router.post("/keywords/index/rebuild")
+async def rebuild_keyword_index_endpoint(
+    corpus_path: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """Rebuild the local related-keyword index from stored analyses and the keyword corpus"""
+    
+    try:
+        index = await rebuild_keyword_index(db, corpus_path=corpus_path)
+        return index.stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Keyword index rebuild failed: {str(e)}")
+
+@router.post("/keywords/domains/rebuild")
+async def rebuild_domain_keywords_endpoint(
+    db: AsyncSession = Depends(get_db),
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """Reload competitor keyword sets from ranking exports and stored analyses"""
+    
+    try:
+        domain_sets = await rebuild_domain_keywords(db)
+        return domain_sets.stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Domain keyword rebuild failed: {str(e)}")
+
+@router.get("/keywords/trends")
+async def get_keyword_trend_store_stats(admin_user: User = Depends(get_current_admin_user)):
+    """Get keyword trend store size, pending log points and bytes per stored point"""
+    return get_keyword_trend_store().stats()
+
+@router.post("/keywords/trends/compact")
+async def compact_keyword_trend_store(admin_user: User = Depends(get_current_admin_user)):
+    """Fold appended trend points into the compact base columns"""
+    
+    try:
+        store = get_keyword_trend_store()
+        await asyncio.to_thread(store.compact)
+        return store.stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Trend store compaction failed: {str(e)}")
+
+@router.post("/keywords/autocomplete/rebuild")
+async def rebuild_keyword_autocomplete(admin_user: User = Depends(get_current_admin_user)):
+    """Rebuild autocomplete from imported metrics and the related-keyword index, then snapshot it"""
+    
+    try:
+        autocomplete = await asyncio.to_thread(build_keyword_autocomplete)
+        await asyncio.to_thread(autocomplete.save, settings.KEYWORD_AUTOCOMPLETE_SNAPSHOT)
+        return autocomplete.stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Autocomplete rebuild failed: {str(e)}")
+
+@router.get("/keywords/cache")
+async def get_keyword_cache_stats(admin_user: User = Depends(get_current_admin_user)):
+    """Get keyword research cache hit rates and the most requested seeds"""
+    return research_cache.stats()
+
+@router.post("/keywords/cache/warm-up")
+async def warm_up_keyword_cache(
+    seeds: Optional[List[str]] = None,
+    top_n: int = 20,
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """Pre-load research for the given seeds, or for the most requested seeds"""
+    loaded = await warm_up_research_cache(seeds, top_n=top_n)
+    return {"loaded": loaded, "cache": research_cache.stats()}
+
+@router.delete("/keywords/cache")
+async def clear_keyword_cache(admin_user: User = Depends(get_current_admin_user)):
+    """Drop every cached keyword research result"""
+    research_cache.invalidate()
+    return {"message": "Keyword research cache cleared"}
+
+@router.get("/licenses/cache")
+async def get_license_cache_stats(admin_user: User = Depends(get_current_admin_user)):
+    """Get license cache hit rates and pending usage counter writes"""
+    return {"licenses": license_cache.stats(), "usage_counters": usage_buffer.stats()}
+
+@router.delete("/licenses/cache")
+async def clear_license_cache(
+    user_id: Optional[int] = None,
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """Drop cached licenses (one user's, or all) after changing licenses outside the API"""
+    license_cache.invalidate(user_id)
+    return {"message": "License cache cleared", "user_id": user_id}
+
 # Legacy dashboard endpoint for backward compatibility
 @router.get("/dashboard/metrics")
-async def get_dashboard_metrics(db: AsyncSession = Depends(get_db)):
+async def get_dashboard_metrics(db: AsyncSession = Depends(get_read_db)):
     """Legacy dashboard metrics endpoint"""
     
     # Get basic metrics without authentication for backward compatibility
-    total_users_result = await db.execute(select(func.count(User.id)))
-    total_users = total_users_result.scalar()
-    
-    total_analyses_result = await db.execute(select(func.count(SeoData.id)))
-    total_analyses = total_analyses_result.scalar()
-    
-    avg_score_result = await db.execute(select(func.avg(SeoData.score)))
-    avg_score = avg_score_result.scalar()
+    totals = await get_rollup_totals(db)
     
     return {
-        "live_users": total_users or 0,
-        "ai_reports_generated": total_analyses or 0,
-        "avg_site_score": round(float(avg_score)) if avg_score else 85
-    }
+        "live_users": totals["users"],
+        "ai_reports_generated": totals["analyses"],
+        "avg_site_score": round(totals["avg_score"]) if totals["avg_score"] else 85
+    }
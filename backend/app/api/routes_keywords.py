@@ -1,17 +1,50 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+import heapq
+import json
+import time
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.api.usage import metered_api_call
+from app.database import get_db
 from app.schemas.keyword import (
     KeywordRequest, KeywordResearch, KeywordDifficulty, 
-    CompetitorAnalysis
+    CompetitorAnalysis, KeywordClusterRequest, KeywordClusterResponse,
+    KeywordGapRequest, KeywordGapResponse, KeywordTrendRequest, KeywordTrendResponse
 )
 from app.services.keyword_service import (
-    research_keywords, analyze_competitor_keywords, batch_analyze_keywords
+    research_keywords, analyze_competitor_keywords, score_keyword_batch, cluster_keyword_list,
+    compare_domain_keywords, keyword_trend_history, keyword_trend_summary, stream_keyword_research
 )
+from app.services.subscription_service import SubscriptionManager
+from app.services.keyword_bulk import ResultSpool, bulk_jobs, score_csv_upload
+from app.services.keyword_gap import get_domain_keywords, normalize_domain
+from app.services.keyword_index import get_keyword_index
+from app.services.keyword_trends import RESOLUTIONS
+from app.services import keyword_autocomplete
 
 router = APIRouter(prefix="/keywords", tags=["Keywords"])
 
-@router.post("/research", response_model=KeywordResearch)
-async def keyword_research(request: KeywordRequest):
+async def bulk_keyword_limit(db: AsyncSession, user_id: int):
+    """Keywords allowed per request on the user's plan (-1 for unlimited) and the plan name"""
+    plan = await SubscriptionManager.get_user_plan(db, user_id)
+    return plan.limits.get("bulk_keywords_per_request", 50), plan.plan_id
+
+async def check_bulk_keyword_limit(db: AsyncSession, user_id: int, count: int):
+    """Reject keyword batches larger than the user's plan allows"""
+    max_keywords, plan = await bulk_keyword_limit(db, user_id)
+    if max_keywords != -1 and count > max_keywords:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maximum {max_keywords} keywords allowed per request on the {plan} plan"
+        )
+
+@router.post("/research", response_model=KeywordResearch, dependencies=[Depends(metered_api_call)])
+async def keyword_research(
+    request: KeywordRequest,
+    user_id: int = 1,  # In production, get from JWT token
+    db: AsyncSession = Depends(get_db)
+):
     """
     Perform comprehensive keyword research including:
     - Search volume analysis
@@ -20,41 +53,263 @@ async def keyword_research(request: KeywordRequest):
     - Long-tail keyword suggestions
     - Content topic suggestions
     """
+    reserved = await SubscriptionManager.reserve_usage(db, user_id, {"keyword_research": 1})
     try:
         research_result = await research_keywords(request)
         return research_result
     except Exception as e:
+        SubscriptionManager.release_usage(user_id, reserved)
         raise HTTPException(status_code=500, detail=f"Keyword research failed: {str(e)}")
 
+@router.post("/research/stream", dependencies=[Depends(metered_api_call)])
+async def keyword_research_stream(
+    request: KeywordRequest,
+    format: str = "ndjson",
+    business_context: str = "",
+    user_id: int = 1,  # In production, get from JWT token
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Keyword research streamed as it is produced (NDJSON, or server-sent events with format=sse)
+    
+    Main keyword metrics arrive first, then each local section as soon as it is
+    ready; AI suggestions are merged into the related keywords as they land,
+    and a final "complete" event carries the full research result.
+    """
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be ndjson or sse")
+    reserved = await SubscriptionManager.reserve_usage(db, user_id, {"keyword_research": 1})
+    
+    async def body():
+        completed = False
+        try:
+            async for event in stream_keyword_research(request, business_context):
+                payload = json.dumps(event, default=str)
+                yield f"event: {event['type']}\ndata: {payload}\n\n" if format == "sse" else payload + "\n"
+                completed = event["type"] == "complete"
+        except Exception as e:
+            error = json.dumps({"type": "error", "message": f"Keyword research failed: {str(e)}"})
+            yield f"event: error\ndata: {error}\n\n" if format == "sse" else error + "\n"
+        finally:
+            if not completed:  # failed, or the client went away before the result
+                SubscriptionManager.release_usage(user_id, reserved)
+    
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
 @router.post("/difficulty", response_model=List[KeywordDifficulty])
-async def analyze_keyword_difficulty(keywords: List[str]):
+async def analyze_keyword_difficulty(
+    keywords: List[str],
+    user_id: int = 1,  # In production, get from JWT token
+    location: str = "United States",
+    language: str = "en",
+    stream: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
     """
     Analyze keyword difficulty and competition for multiple keywords
+    
+    The batch size is limited by the user's plan. With stream=true the results are
+    sent as newline-delimited JSON while they are being serialized.
     """
+    await check_bulk_keyword_limit(db, user_id, len(keywords))
+    
     try:
-        if len(keywords) > 50:
-            raise HTTPException(status_code=400, detail="Maximum 50 keywords allowed per request")
-        
-        difficulty_analysis = await batch_analyze_keywords(keywords)
-        return difficulty_analysis
+        scores = score_keyword_batch(keywords, location, language)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Difficulty analysis failed: {str(e)}")
+    
+    if stream:
+        def ndjson():
+            for batch in scores.iter_batches(1000):
+                yield "".join(json.dumps(row) + "\n" for row in batch)
+        
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    
+    return scores.rows()
 
-@router.get("/competitor-analysis/{domain}", response_model=CompetitorAnalysis)
-async def competitor_keyword_analysis(domain: str, user_keywords: List[str] = None):
+async def _upload_chunks(request: Request, chunk_size: int = 64 * 1024):
+    """Uploaded bytes as they arrive: a raw CSV body, or the "file" field of a multipart form"""
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()  # python-multipart spools the file to disk past 1 MB
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Multipart uploads need a \"file\" field")
+        while chunk := await upload.read(chunk_size):
+            yield chunk
+    else:
+        async for chunk in request.stream():
+            if chunk:
+                yield chunk
+
+@router.post("/bulk", dependencies=[Depends(metered_api_call)])
+async def bulk_keyword_scoring(
+    request: Request,
+    format: str = "csv",
+    location: str = "United States",
+    language: str = "en",
+    job_id: Optional[str] = None,
+    user_id: int = 1,  # In production, get from JWT token
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Score a CSV of keywords uploaded as the request body (or a multipart "file")
+    
+    The upload is parsed and scored batch by batch while it arrives, so neither
+    the file nor the results are held in memory; rows that cannot be scored are
+    returned with an error instead of failing the upload. Results come back as
+    CSV or, with format=ndjson, as typed result/error/progress/summary lines.
+    Progress can be polled at GET /keywords/bulk/{job_id} while the upload runs.
+    """
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    running = bulk_jobs.get(job_id) if job_id else None
+    if running and running.status == "running":
+        raise HTTPException(status_code=409, detail="A bulk job with this id is already running")
+    
+    max_keywords, _ = await bulk_keyword_limit(db, user_id)
+    job = bulk_jobs.start(job_id, max_keywords)
+    spool = ResultSpool(format)
+    try:
+        score = lambda keywords: score_keyword_batch(keywords, location, language)
+        async for results in score_csv_upload(_upload_chunks(request), score, job):
+            spool.write(results)
+            spool.write_progress(job)
+    except HTTPException as e:
+        spool.close()
+        job.finish(e.detail)
+        raise
+    except Exception as e:
+        spool.close()
+        job.finish(str(e))
+        raise HTTPException(status_code=500, detail=f"Bulk keyword scoring failed: {str(e)}")
+    
+    job.finish()
+    spool.write_summary(job)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    headers = {"X-Job-Id": job.id}
+    if format == "csv":
+        headers["Content-Disposition"] = f'attachment; filename="keywords-{job.id}.csv"'
+    return StreamingResponse(spool.iter_chunks(), media_type=media_type, headers=headers)
+
+@router.get("/bulk/{job_id}")
+async def bulk_keyword_progress(job_id: str):
+    """Progress of a bulk keyword upload (rows read, scored and failed so far)"""
+    job = bulk_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Bulk job not found")
+    return job.progress()
+
+@router.post("/clusters", response_model=KeywordClusterResponse)
+async def cluster_keywords(
+    request: KeywordClusterRequest,
+    user_id: int = 1,  # In production, get from JWT token
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Group keywords into content topics by lexical and semantic similarity
+    
+    Each cluster has a head term (its highest-volume keyword) and the aggregate
+    search volume of its members.
+    """
+    await check_bulk_keyword_limit(db, user_id, len(request.keywords))
+    if not 0 < request.similarity_threshold <= 1:
+        raise HTTPException(status_code=400, detail="similarity_threshold must be between 0 and 1")
+    
+    try:
+        started = time.perf_counter()
+        clusters = await cluster_keyword_list(
+            request.keywords, request.location, request.language, request.similarity_threshold
+        )
+        clusters = [c for c in clusters if c["size"] >= request.min_cluster_size]
+        return {
+            "clusters": clusters,
+            "total_keywords": sum(c["size"] for c in clusters),
+            "cluster_count": len(clusters),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Keyword clustering failed: {str(e)}")
+
+@router.get("/competitor-analysis/{domain}", response_model=CompetitorAnalysis, dependencies=[Depends(metered_api_call)])
+async def competitor_keyword_analysis(
+    domain: str,
+    user_keywords: List[str] = None,
+    user_id: int = 1,  # In production, get from JWT token
+    db: AsyncSession = Depends(get_db)
+):
     """
     Analyze competitor's keyword strategy and find keyword gaps
     """
+    # Basic domain validation
+    if not domain or '.' not in domain:
+        raise HTTPException(status_code=400, detail="Invalid domain format")
+    reserved = await SubscriptionManager.reserve_usage(db, user_id, {"competitor_analyses": 1})
+    
     try:
-        # Basic domain validation
-        if not domain or '.' not in domain:
-            raise HTTPException(status_code=400, detail="Invalid domain format")
-        
         competitor_analysis = await analyze_competitor_keywords(domain, user_keywords)
         return competitor_analysis
     except Exception as e:
+        SubscriptionManager.release_usage(user_id, reserved)
         raise HTTPException(status_code=500, detail=f"Competitor analysis failed: {str(e)}")
 
+@router.post("/gap", response_model=KeywordGapResponse)
+async def keyword_gap(request: KeywordGapRequest):
+    """
+    Compare a domain's ranking keywords with up to 10 competitors
+    
+    Returns keyword gaps, keywords every competitor has but the domain lacks, the
+    overlap and each competitor's unique keywords, all ranked by search volume.
+    """
+    domain = normalize_domain(request.domain)
+    competitors = list(dict.fromkeys(normalize_domain(c) for c in request.competitors if c.strip()))
+    competitors = [c for c in competitors if c != domain]
+    if not competitors or len(competitors) > 10:
+        raise HTTPException(status_code=400, detail="Provide between 1 and 10 competitor domains")
+    domain_sets = get_domain_keywords()
+    unknown = [d for d in [domain] + competitors if not domain_sets.has_domain(d)]
+    if len(unknown) == len(competitors) + 1:
+        raise HTTPException(status_code=404, detail="No keyword data stored for these domains")
+    
+    try:
+        started = time.perf_counter()
+        comparison = compare_domain_keywords(domain, competitors, limit=max(1, min(request.limit, 1000)))
+        return {
+            "domain": domain,
+            "competitors": competitors,
+            **comparison,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Keyword gap analysis failed: {str(e)}")
+
+@router.post("/trends", response_model=KeywordTrendResponse)
+async def get_keyword_trends_batch(
+    request: KeywordTrendRequest,
+    user_id: int = 1,  # In production, get from JWT token
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Volume (or domain rank) history of many keywords at once, by day, week or month
+    """
+    await check_bulk_keyword_limit(db, user_id, len(request.keywords))
+    if request.resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {', '.join(RESOLUTIONS)}")
+    
+    try:
+        started = time.perf_counter()
+        series = keyword_trend_history(
+            request.keywords, request.location, request.language, request.domain,
+            request.resolution, request.start, request.end
+        )
+        return {
+            "resolution": request.resolution,
+            "series": series,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Trend history lookup failed: {str(e)}")
+
 @router.get("/suggestions/{seed_keyword}")
 async def get_keyword_suggestions(seed_keyword: str, limit: int = 20):
     """
@@ -67,33 +322,63 @@ async def get_keyword_suggestions(seed_keyword: str, limit: int = 20):
         # Combine related and long-tail keywords
         all_suggestions = research_result.related_keywords + research_result.long_tail_keywords
         
-        # Sort by relevance score and limit results
-        sorted_suggestions = sorted(all_suggestions, key=lambda x: x.relevance_score, reverse=True)
+        # Top results by relevance score, without sorting the rest
+        top_suggestions = heapq.nlargest(limit, all_suggestions, key=lambda x: x.relevance_score)
         
         return {
             "seed_keyword": seed_keyword,
-            "suggestions": sorted_suggestions[:limit],
+            "suggestions": top_suggestions,
             "questions": research_result.questions[:10],
             "content_topics": research_result.suggested_content_topics[:5]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Suggestion generation failed: {str(e)}")
 
-@router.get("/trends/{keyword}")
-async def get_keyword_trends(keyword: str):
+@router.get("/autocomplete")
+async def autocomplete_keywords(q: str, limit: int = 10):
     """
-    Get keyword trend data and seasonal patterns
+    Type-ahead completions for a keyword prefix, ranked by precomputed score
+    """
+    completions = keyword_autocomplete.keyword_autocomplete.complete(q, k=min(max(limit, 1), 50))
+    return {"query": q, "completions": completions}
+
+@router.get("/related/{keyword}")
+async def get_related_keywords(keyword: str, limit: int = 10):
+    """
+    Get semantically related keywords from the local index (no external API calls)
     """
     try:
-        request = KeywordRequest(keyword=keyword)
-        research_result = await research_keywords(request)
+        index = get_keyword_index()
+        related = index.nearest(keyword, k=min(max(limit, 1), 100))
         
         return {
             "keyword": keyword,
-            "search_volume": research_result.search_volume,
-            "difficulty_score": research_result.difficulty_score,
-            "seasonal_trends": research_result.seasonal_trends,
-            "competition_level": research_result.competition_level
+            "related": [
+                {"keyword": phrase, "similarity": round(similarity, 4)}
+                for phrase, similarity in related
+            ],
+            "index_size": len(index)
         }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Related keyword lookup failed: {str(e)}")
+
+@router.get("/trends/{keyword}")
+async def get_keyword_trends(
+    keyword: str,
+    location: str = "United States",
+    language: str = "en",
+    resolution: str = "month",
+    domain: Optional[str] = None
+):
+    """
+    Get keyword trend data and seasonal patterns
+    
+    History comes from the keyword trend store (imported monthly searches and rank
+    tracking); pass a domain to get that domain's ranking history instead.
+    """
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {', '.join(RESOLUTIONS)}")
+    try:
+        return keyword_trend_summary(keyword, location, language, resolution, domain)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Trend analysis failed: {str(e)}")
\ No newline at end of file
@@ -1,44 +1,62 @@
+from datetime import date
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
+from app.api.exports import export_response
+from app.api.usage import metered_api_call
+from app.database import get_db, get_read_db
 from app.schemas.seo import SEOAnalysisRequest, SEOAnalysisResult
-from app.services.seo_service import perform_seo_analysis, get_recent_seo_results, get_seo_analytics
-from typing import List
+from app.services.seo_service import perform_seo_analysis, get_recent_seo_results, get_seo_analytics, has_analyzed_site
+from app.services.subscription_service import SubscriptionManager
+from typing import List, Optional
 
 router = APIRouter(prefix="/seo", tags=["SEO"])
 
-@router.post("/analyze", response_model=SEOAnalysisResult)
+@router.post("/analyze", response_model=SEOAnalysisResult, dependencies=[Depends(metered_api_call)])
 async def analyze_website(
     request: SEOAnalysisRequest,
     user_id: int = 1,  # In a real app, this would come from authentication
     db: AsyncSession = Depends(get_db)
 ):
-    """Perform comprehensive SEO analysis of a website"""
+    """Perform comprehensive SEO analysis of a website (counted against the plan's analysis, website and competitor limits)"""
+    usage = {"seo_analyses": 1}
+    if request.analyze_competitors:
+        usage["competitor_analyses"] = 1
+    if not await has_analyzed_site(db, user_id, str(request.url)):
+        usage["websites"] = 1
+    reserved = await SubscriptionManager.reserve_usage(db, user_id, usage)
+    
     try:
         analysis_result = await perform_seo_analysis(db, user_id, request)
         return analysis_result
     except ValueError as e:
+        SubscriptionManager.release_usage(user_id, reserved)
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
+        SubscriptionManager.release_usage(user_id, reserved)
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 @router.get("/history")
 async def get_analysis_history(
     user_id: int = 1,
     limit: int = 10,
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = None,
+    include_results: bool = False,
+    include_archived: bool = False,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get recent SEO analysis history for a user"""
+    """Get recent SEO analysis history for a user, newest first; pass next_cursor for older pages (include_archived=true continues into archived months)"""
     try:
-        results = await get_recent_seo_results(db, user_id, limit)
-        return {"analyses": results}
+        results, next_cursor = await get_recent_seo_results(db, user_id, limit, cursor, include_results, include_archived)
+        return {"analyses": results, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch history: {str(e)}")
 
 @router.get("/analytics")
 async def get_analytics(
     user_id: int = 1,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get SEO analytics and trends for a user"""
     try:
@@ -47,8 +65,27 @@ async def get_analytics(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch analytics: {str(e)}")
 
+@router.get("/export")
+async def export_analyses(
+    format: str = "ndjson",
+    user_id: int = 1,
+    url_prefix: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    include_results: bool = True,
+    include_archived: bool = False
+):
+    """
+    Export all of a user's analyses, oldest first, as NDJSON, CSV (summary columns) or Parquet
+    
+    Rows are streamed from the database in batches and encoded as they are
+    read, so exports of any size use constant memory. Filter by URL prefix
+    and by start/end day (inclusive); include_archived adds archived months.
+    """
+    return export_response(format, user_id, url_prefix, start, end, include_results, include_archived)
+
 # Legacy endpoint for backwards compatibility
-@router.get("/analyze")
+@router.get("/analyze", deprecated=True)
 async def analyze_site_legacy(url: str):
     """Legacy analyze endpoint (deprecated)"""
     return {
@@ -56,4 +93,4 @@ async def analyze_site_legacy(url: str):
         "score": 90, 
         "recommendations": ["Fix heading tags", "Add alt text"],
         "message": "This endpoint is deprecated. Please use POST /seo/analyze instead."
-    }
+    }
@@ -0,0 +1,31 @@
+from fastapi import Depends, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db
+from app.services.subscription_service import SubscriptionManager, UnknownUser, UsageLimitExceeded
+
+# Plan usage enforcement for endpoints that use quota (lookups and progress polls are not metered)
+
+async def metered_api_call(
+    user_id: int = 1,  # In production, get from JWT token
+    db: AsyncSession = Depends(get_db)
+):
+    """Count the request against the user's daily API call limit"""
+    await SubscriptionManager.reserve_usage(db, user_id, {"api_calls": 1})
+
+async def usage_limit_exceeded_handler(request: Request, exc: UsageLimitExceeded):
+    """429 with the limit that was hit"""
+    return JSONResponse(
+        status_code=429,
+        content={
+            "detail": str(exc),
+            "resource": exc.resource,
+            "limit": exc.limit,
+            "period": exc.period,
+            "plan": exc.plan
+        }
+    )
+
+async def unknown_user_handler(request: Request, exc: UnknownUser):
+    """404 for usage counted against a user id with no account"""
+    return JSONResponse(status_code=404, content={"detail": str(exc)})
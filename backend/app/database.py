@@ -1,13 +1,64 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+import asyncio
+import os
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.engine import URL, Connection, make_url
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.settings import settings
 
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that tracks callers waiting for a connection and how long they wait"""
+    
+    waiting = 0
+    max_waiting = 0
+    wait_observer: Optional[Callable[[float], None]] = None  # receives each wait in ms
+    
+    def connect(self):
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            self.waiting -= 1
+            if self.wait_observer is not None:
+                self.wait_observer((time.perf_counter() - started) * 1000)
+    
+    def recreate(self) -> "InstrumentedQueuePool":
+        pool = super().recreate()
+        pool.wait_observer = self.wait_observer
+        return pool
+
+def engine_options(database_url: str) -> Tuple[URL, Dict]:
+    """Engine URL and keyword arguments for the configured pool settings"""
+    url = make_url(database_url)
+    options = {
+        "echo": settings.DATABASE_ECHO,
+        "future": True,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS
+    }
+    # SQLite keeps its default pool (a connection per checkout, or one shared in-memory connection)
+    if url.get_backend_name() != "sqlite":
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS
+        )
+    if url.get_driver_name() == "asyncpg" and "prepared_statement_cache_size" not in url.query:
+        url = url.update_query_dict({"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)})
+    return url, options
+
 # Create async engine
-engine = create_async_engine(
-    settings.SQLALCHEMY_DATABASE_URL,
-    echo=True,  # Set to False in production
-    future=True
-)
+database_url, database_options = engine_options(settings.SQLALCHEMY_DATABASE_URL)
+engine = create_async_engine(database_url, **database_options)
 
 # Create async session factory
 async_session = sessionmaker(
@@ -19,15 +70,239 @@ async_session = sessionmaker(
 # Create base class for models
 Base = declarative_base()
 
-# Dependency to get database session
-async def get_db() -> AsyncSession:
+class ReplicaState:
+    """A read replica's engine and the result of its last health check"""
+    
+    def __init__(self, name: str, engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False,
+                                            info={"read_only": True})
+        self.healthy = False
+        self.lag_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self.reads = 0
+
+async def replication_lag(connection: AsyncConnection) -> float:
+    """Seconds the replica is behind its primary (0 where the database reports no replication, e.g. SQLite)"""
+    if connection.dialect.name == "postgresql":
+        lag = (await connection.execute(text(
+            "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+            "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+        ))).scalar()
+        return float(lag or 0)
+    await connection.execute(text("SELECT 1"))
+    return 0.0
+
+class ReplicaRouter:
+    """
+    Picks the database for read-only sessions
+    
+    Replicas are probed at most every check_interval seconds and used in turn
+    while they answer and lag no more than max_lag_seconds behind the primary;
+    when none qualifies, reads fall back to the primary. A caller whose
+    request committed on the primary reads from the primary for
+    sticky_seconds afterwards, so they see their own writes.
+    """
+    
+    def __init__(self, primary_factory, replicas: Sequence[ReplicaState] = (), max_lag_seconds: float = 10,
+                 check_interval: float = 5, sticky_seconds: float = 10, probe_timeout: float = 2,
+                 lag_probe=replication_lag, clock: Callable[[], float] = time.monotonic):
+        self.primary_factory = primary_factory
+        self.replicas = list(replicas)
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self.sticky_seconds = sticky_seconds
+        self.probe_timeout = probe_timeout
+        self.lag_probe = lag_probe
+        self.clock = clock
+        self._checked_at: Optional[float] = None
+        self._check_lock = asyncio.Lock()
+        self._writes: Dict[str, float] = {}  # caller -> last commit on the primary
+        self._turn = 0
+        self.counters = Counter()
+    
+    async def _probe(self, replica: ReplicaState):
+        try:
+            async def measure():
+                async with replica.engine.connect() as connection:
+                    return await self.lag_probe(connection)
+            replica.lag_seconds = await asyncio.wait_for(measure(), self.probe_timeout)
+            replica.healthy = replica.lag_seconds <= self.max_lag_seconds
+            replica.error = None if replica.healthy else f"lagging {replica.lag_seconds:.1f}s"
+        except Exception as e:
+            replica.healthy, replica.lag_seconds, replica.error = False, None, str(e) or type(e).__name__
+    
+    async def check(self):
+        """Probe every replica now"""
+        await asyncio.gather(*(self._probe(replica) for replica in self.replicas))
+        self._checked_at = self.clock()
+        self.counters["checks"] += 1
+    
+    def note_write(self, caller: Optional[str]):
+        if caller is None:
+            return
+        now = self.clock()
+        if len(self._writes) >= 10000:
+            self._writes = {key: at for key, at in self._writes.items() if now - at < self.sticky_seconds}
+        self._writes[caller] = now
+    
+    async def session_factory(self, caller: Optional[str] = None) -> Tuple[Callable[[], AsyncSession], Optional[ReplicaState]]:
+        """(session factory, replica or None for the primary) for a read by caller"""
+        if not self.replicas:
+            return self.primary_factory, None
+        written = self._writes.get(caller) if caller is not None else None
+        if written is not None and self.clock() - written < self.sticky_seconds:
+            self.counters["read_your_writes"] += 1
+            return self.primary_factory, None
+        
+        if self._checked_at is None or self.clock() - self._checked_at >= self.check_interval:
+            async with self._check_lock:
+                if self._checked_at is None or self.clock() - self._checked_at >= self.check_interval:
+                    await self.check()
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            self.counters["primary_fallbacks"] += 1
+            return self.primary_factory, None
+        replica = healthy[self._turn % len(healthy)]
+        self._turn += 1
+        replica.reads += 1
+        self.counters["replica_reads"] += 1
+        return replica.session_factory, replica
+    
+    def stats(self) -> Dict:
+        return {
+            "replicas": [
+                {"name": replica.name, "healthy": replica.healthy, "lag_seconds": replica.lag_seconds,
+                 "error": replica.error, "reads": replica.reads}
+                for replica in self.replicas
+            ],
+            "max_lag_seconds": self.max_lag_seconds,
+            "sticky_seconds": self.sticky_seconds,
+            **{name: self.counters[name] for name in ("replica_reads", "read_your_writes", "primary_fallbacks", "checks")}
+        }
+
+@event.listens_for(Session, "before_flush", insert=True)
+def _refuse_replica_writes(session: Session, flush_context, instances):
+    if session.info.get("read_only") and (session.new or session.dirty or session.deleted):
+        raise RuntimeError("Read replica sessions are read-only: write through get_db()")
+
+@event.listens_for(Session, "after_commit")
+def _note_primary_write(session: Session):
+    if not session.info.get("read_only"):
+        read_router.note_write(session.info.get("caller"))
+
+def _replica_engines() -> List[ReplicaState]:
+    replicas = []
+    for replica_url in settings.DATABASE_REPLICA_URLS:
+        url, options = engine_options(replica_url)
+        replicas.append(ReplicaState(url.render_as_string(hide_password=True), create_async_engine(url, **options)))
+    return replicas
+
+# Read-only sessions: replicas from DATABASE_REPLICA_URLS, else the primary
+read_router = ReplicaRouter(
+    async_session,
+    _replica_engines(),
+    max_lag_seconds=settings.DB_REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.DB_REPLICA_CHECK_INTERVAL_SECONDS,
+    sticky_seconds=settings.DB_READ_YOUR_WRITES_SECONDS
+)
+
+def caller_key(request: Request) -> Optional[str]:
+    """Who a request is for: the user_id parameter the routes identify users by, else the client address"""
+    user_id = request.query_params.get("user_id")
+    if user_id:
+        return f"user:{user_id}"
+    return f"ip:{request.client.host}" if request.client else None
+
+@asynccontextmanager
+async def read_session(caller: Optional[str] = None):
+    """Session for read-only work, on a healthy replica when there is one"""
+    factory, _ = await read_router.session_factory(caller)
+    async with factory() as session:
+        yield session
+
+# Dependency to get database session (primary; its commits keep the caller's reads on the primary)
+async def get_db(request: Request) -> AsyncSession:
     async with async_session() as session:
+        session.info["caller"] = caller_key(request)
         try:
             yield session
         finally:
             await session.close()
 
-# Function to create tables
+# Dependency for read-only endpoints (replica when healthy, see ReplicaRouter)
+async def get_read_db(request: Request) -> AsyncSession:
+    async with read_session(caller_key(request)) as session:
+        yield session
+
+# Add each row's values to the counter row with the same keys, creating missing rows
+def upsert_increments(connection: Connection, table, keys: Sequence[str], rows: List[Dict]):
+    counters = [name for name in rows[0] if name not in keys]
+    if connection.dialect.name in ("sqlite", "postgresql"):
+        if connection.dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(table).values(rows)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={name: table.c[name] + statement.excluded[name] for name in counters}
+        ))
+        return
+    
+    for row in rows:
+        updated = connection.execute(
+            table.update()
+            .where(*(table.c[name] == row[name] for name in keys))
+            .values({name: table.c[name] + row[name] for name in counters})
+        )
+        if updated.rowcount == 0:
+            connection.execute(table.insert().values(row))
+
+MIGRATIONS_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+BASELINE_REVISION = "0001"  # the schema create_tables() built before migrations existed
+
+# Newest first: a table (and index) each revision adds, telling which revision a
+# schema built by create_tables() (Base.metadata as of some release) matches
+SCHEMA_MARKERS = (
+    ("0006", "seodata_archives", None),
+    ("0005", "usage_counters", None),
+    ("0004", "daily_usage_stats", None),
+    ("0003", "users", "ix_users_created_at_id"),
+    ("0002", "licenses", "ix_licenses_user_id_is_active"),
+)
+
+def unversioned_revision(connection) -> str:
+    """The migration revision an unversioned schema (no alembic_version table) already has"""
+    from sqlalchemy import inspect
+    
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    for revision, table, index in SCHEMA_MARKERS:
+        if table in tables and (index is None or index in {i["name"] for i in inspector.get_indexes(table)}):
+            return revision
+    return BASELINE_REVISION
+
+def _upgrade(connection, revision: str):
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import inspect
+    
+    config = Config(MIGRATIONS_CONFIG)
+    config.attributes["connection"] = connection
+    tables = set(inspect(connection).get_table_names())
+    if "users" in tables and "alembic_version" not in tables:
+        # Created by create_tables(): record the revision its schema already matches
+        command.stamp(config, unversioned_revision(connection))
+    command.upgrade(config, revision)
+
+# Bring the schema up to date with the Alembic migrations in migrations/
+async def migrate_database(revision: str = "head", bind=None):
+    async with (bind or engine).begin() as conn:
+        await conn.run_sync(_upgrade, revision)
+
+# Function to create tables (tests; deployed databases use migrate_database)
 async def create_tables():
     # Import all models to ensure they're registered with Base
     from app.models import User, Payment, License, SeoData, Social
@@ -5,7 +5,7 @@ Creates all tables and sets up initial admin user
 import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from app.database import async_session, create_tables
+from app.database import async_session, migrate_database
 from app.models.user import User
 from app.services.auth_service import get_password_hash
 from app.settings import settings
@@ -42,9 +42,9 @@ async def initialize_database():
     """Initialize database with all tables and admin user"""
     print("🚀 Initializing AstraPilot database...")
     
-    # Create all tables
-    await create_tables()
-    print("✅ Database tables created successfully")
+    # Create or upgrade all tables
+    await migrate_database()
+    print("✅ Database schema migrated successfully")
     
     # Create admin user
     await create_admin_user()
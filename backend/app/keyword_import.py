@@ -0,0 +1,43 @@
+"""
+Keyword metrics import script for AstraPilot
+Loads Keyword Planner / SEMrush CSV exports into the local keyword metrics store
+
+    python -m app.keyword_import exports/planner.csv exports/semrush.csv --location "United States" --language en
+
+With --domain, one organic positions export is stored as that domain's rankings
+for competitor keyword gap analysis instead:
+
+    python -m app.keyword_import exports/competitor-positions.csv --domain competitor.com
+"""
+import argparse
+import time
+from app.services.keyword_gap import import_ranking_export
+from app.services.keyword_metrics import import_keyword_exports
+from app.services.keyword_trends import import_trend_history
+from app.settings import settings
+
+def main():
+    parser = argparse.ArgumentParser(description="Import keyword metric exports")
+    parser.add_argument("paths", nargs="+", help="CSV exports (Keyword Planner or SEMrush)")
+    parser.add_argument("--location", default="United States")
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--store-dir", default=settings.KEYWORD_METRICS_DIR)
+    parser.add_argument("--domain", help="Store the export as this domain's ranking keywords")
+    args = parser.parse_args()
+
+    if args.domain:
+        if len(args.paths) != 1:
+            parser.error("--domain takes exactly one export")
+        rows = import_ranking_export(args.paths[0], args.domain, location=args.location, language=args.language)
+        print(f"✅ {rows} ranking keywords stored for {args.domain}")
+        return
+
+    print(f"📥 Importing {len(args.paths)} export(s) into {args.store_dir}...")
+    started = time.perf_counter()
+    meta = import_keyword_exports(args.paths, args.location, args.language, store_dir=args.store_dir)
+    history = import_trend_history(args.paths, args.location, args.language)
+    print(f"✅ {meta['rows']} keywords across {len(meta['locales'])} locale(s), "
+          f"{history} monthly history points in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
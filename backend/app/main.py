@@ -2,10 +2,28 @@ from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 import json
 import asyncio
+import logging
+import time
 from datetime import datetime
 from app.api import routes_auth, routes_dashboard, routes_license, routes_payment, routes_seo, routes_social, routes_keywords
+from app.api.usage import unknown_user_handler, usage_limit_exceeded_handler
 from app.services.ai_service import realtime_handler, ai_analyzer, keyword_analyzer
-from app.database import create_tables
+from app.services.seo_service import SEOAnalyzer
+from app.schemas.seo import SEOAnalysisRequest
+from app.database import migrate_database, async_session, engine, read_router
+from app.services.db_telemetry import QueryCountMiddleware, db_telemetry
+from app.services.keyword_autocomplete import build_keyword_autocomplete, add_suggestions
+from app.services import keyword_autocomplete
+from app.services.keyword_gap import rebuild_domain_keywords
+from app.services.keyword_index import rebuild_keyword_index
+from app.services.keyword_service import warm_up_research_cache
+from app.services.rate_limit import RateLimitMiddleware
+from app.services.seodata_archive import ensure_partitions
+from app.services.subscription_service import UnknownUser, UsageLimitExceeded
+from app.services.usage_counters import usage_buffer
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="AstraPilot API - Ultra AI-Powered SEO Platform",
@@ -15,6 +33,18 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Query latency, pool usage and per-request query counts (GET /admin/system/database)
+db_telemetry.instrument(engine)
+for replica in read_router.replicas:
+    db_telemetry.instrument(replica.engine)
+app.add_middleware(QueryCountMiddleware)
+
+# Per-plan request rates (RateLimit-* headers, 429 + Retry-After); inside CORS so rejections carry CORS headers
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware, exempt_paths=settings.RATE_LIMIT_EXEMPT_PATHS,
+                       max_user_ids_per_address=settings.RATE_LIMIT_MAX_USER_IDS_PER_ADDRESS,
+                       trusted_proxies=settings.RATE_LIMIT_TRUSTED_PROXIES)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -29,6 +59,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Plan limits: analyses, research and bulk uploads count as API calls; over-limit usage gets a 429
+app.add_exception_handler(UsageLimitExceeded, usage_limit_exceeded_handler)
+app.add_exception_handler(UnknownUser, unknown_user_handler)
+
 # Include API routes with versioning
 app.include_router(routes_auth.router, prefix="/api/v1", tags=["Authentication"])
 app.include_router(routes_dashboard.router, prefix="/api/v1", tags=["Admin Dashboard"])
@@ -126,7 +160,7 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
         await realtime_handler.disconnect(user_id)
 
 async def handle_realtime_analysis(websocket: WebSocket, user_id: str, data: dict):
-    """Handle real-time SEO analysis requests"""
+    """Handle real-time SEO analysis requests, streaming AI recommendations as they are generated"""
     try:
         url = data.get("url")
         if not url:
@@ -145,23 +179,36 @@ async def handle_realtime_analysis(websocket: WebSocket, user_id: str, data: dic
             "timestamp": datetime.utcnow().isoformat()
         })
         
-        # Simulate real-time progress updates
-        progress_steps = [
-            (20, "Fetching website content..."),
-            (40, "Analyzing technical SEO..."),
-            (60, "Processing content quality..."),
-            (80, "Generating AI recommendations..."),
-            (100, "Analysis complete!")
-        ]
+        await send_analysis_progress(websocket, 20, "Fetching website content...")
+        analyzer = SEOAnalyzer()
+        request = SEOAnalysisRequest(url=url, keywords=data.get("keywords"))
+        analysis = await analyzer.analyze_website(request)
         
-        for progress, message in progress_steps:
-            await asyncio.sleep(1)  # Simulate processing time
-            await websocket.send_json({
-                "type": "analysis_progress",
-                "progress": progress,
-                "message": message,
-                "timestamp": datetime.utcnow().isoformat()
-            })
+        await send_analysis_progress(websocket, 60, "Technical SEO and content quality analyzed")
+        try:
+            response = analyzer.session.get(url, timeout=10)
+            content = response.text
+        except Exception:
+            content = ""
+        
+        # Push each AI recommendation to the client as soon as the model has produced it
+        await send_analysis_progress(websocket, 80, "Generating AI recommendations...")
+        started_at = time.perf_counter()
+        first_recommendation_ms = None
+        ai_recommendations = 0
+        if content:
+            async for recommendation in ai_analyzer.stream_ai_recommendations(analysis, content):
+                if first_recommendation_ms is None:
+                    first_recommendation_ms = round((time.perf_counter() - started_at) * 1000, 1)
+                analysis.recommendations.append(recommendation)
+                ai_recommendations += 1
+                await websocket.send_json({
+                    "type": "recommendation",
+                    "data": recommendation.model_dump(),
+                    "timestamp": datetime.utcnow().isoformat()
+                })
+        
+        await send_analysis_progress(websocket, 100, "Analysis complete!")
         
         # Send final analysis result
         await websocket.send_json({
@@ -169,9 +216,11 @@ async def handle_realtime_analysis(websocket: WebSocket, user_id: str, data: dic
             "message": "AI-powered SEO analysis completed successfully",
             "data": {
                 "url": url,
-                "score": 85,
-                "recommendations_count": 7,
-                "ai_insights_generated": True
+                "score": analysis.overall_score,
+                "recommendations_count": len(analysis.recommendations),
+                "ai_insights_generated": ai_recommendations > 0,
+                "time_to_first_recommendation_ms": first_recommendation_ms,
+                "ai_generation_ms": round((time.perf_counter() - started_at) * 1000, 1)
             },
             "timestamp": datetime.utcnow().isoformat()
         })
@@ -183,8 +232,17 @@ async def handle_realtime_analysis(websocket: WebSocket, user_id: str, data: dic
             "timestamp": datetime.utcnow().isoformat()
         })
 
+async def send_analysis_progress(websocket: WebSocket, progress: int, message: str):
+    """Send an analysis progress update"""
+    await websocket.send_json({
+        "type": "analysis_progress",
+        "progress": progress,
+        "message": message,
+        "timestamp": datetime.utcnow().isoformat()
+    })
+
 async def handle_realtime_keywords(websocket: WebSocket, user_id: str, data: dict):
-    """Handle real-time keyword research requests"""
+    """Handle real-time keyword research requests, pushing each keyword as soon as it is generated"""
     try:
         seed_keyword = data.get("keyword")
         if not seed_keyword:
@@ -202,9 +260,26 @@ async def handle_realtime_keywords(websocket: WebSocket, user_id: str, data: dic
             "timestamp": datetime.utcnow().isoformat()
         })
         
-        # Generate AI-powered keywords
+        # Stream AI-powered keywords
         business_context = data.get("business_context", "")
-        keywords = await keyword_analyzer.generate_smart_keywords(seed_keyword, business_context)
+        started_at = time.perf_counter()
+        first_keyword_ms = None
+        keywords = []
+        async for keyword in keyword_analyzer.stream_smart_keywords(seed_keyword, business_context):
+            if first_keyword_ms is None:
+                first_keyword_ms = round((time.perf_counter() - started_at) * 1000, 1)
+            await websocket.send_json({
+                "type": "keyword_suggestion",
+                "index": len(keywords),
+                "data": keyword.model_dump(),
+                "timestamp": datetime.utcnow().isoformat()
+            })
+            keywords.append(keyword)
+        add_suggestions(keywords, "ai")
+        
+        # Buffered delivery would have shown the first keyword only after total_ms
+        total_ms = round((time.perf_counter() - started_at) * 1000, 1)
+        logger.info(f"Keyword stream for '{seed_keyword}': first keyword {first_keyword_ms} ms, total {total_ms} ms")
         
         # Send results
         await websocket.send_json({
@@ -212,7 +287,9 @@ async def handle_realtime_keywords(websocket: WebSocket, user_id: str, data: dic
             "message": f"Found {len(keywords)} AI-generated keyword suggestions",
             "data": {
                 "seed_keyword": seed_keyword,
-                "keywords": [kw.model_dump() for kw in keywords]
+                "keywords": [kw.model_dump() for kw in keywords],
+                "time_to_first_keyword_ms": first_keyword_ms,
+                "total_ms": total_ms
             },
             "timestamp": datetime.utcnow().isoformat()
         })
@@ -229,13 +306,51 @@ async def handle_realtime_keywords(websocket: WebSocket, user_id: str, data: dic
 async def startup_event():
     """Initialize services on startup"""
     print("🚀 AstraPilot API starting up...")
-    print("📊 Creating database tables...")
+    print("📊 Migrating database schema...")
     
     try:
-        await create_tables()
-        print("✅ Database tables created successfully")
+        await migrate_database()
+        print("✅ Database schema up to date")
     except Exception as e:
         print(f"⚠️  Database setup error: {e}")
+
+    try:
+        async with async_session() as db:
+            partitions = await ensure_partitions(db, settings.SEODATA_PARTITION_MONTHS_AHEAD)
+        if partitions:
+            print(f"🗂️  SEO data partitions created: {', '.join(partitions)}")
+    except Exception as e:
+        print(f"⚠️  SEO data partition error: {e}")
+
+    try:
+        async with async_session() as db:
+            index = await rebuild_keyword_index(db)
+        print(f"🔎 Keyword index: {len(index)} phrases")
+    except Exception as e:
+        print(f"⚠️  Keyword index build error: {e}")
+
+    try:
+        async with async_session() as db:
+            domain_sets = await rebuild_domain_keywords(db)
+        print(f"🆚 Competitor keywords: {len(domain_sets)} domains")
+    except Exception as e:
+        print(f"⚠️  Competitor keyword load error: {e}")
+
+    try:
+        autocomplete = build_keyword_autocomplete(settings.KEYWORD_AUTOCOMPLETE_SNAPSHOT)
+        print(f"⌨️  Keyword autocomplete: {len(autocomplete)} keywords")
+    except Exception as e:
+        print(f"⚠️  Keyword autocomplete load error: {e}")
+
+    usage_buffer.start()
+    print(f"🧮 Usage counters: flushed every {usage_buffer.flush_interval:g}s")
+
+    if settings.KEYWORD_CACHE_WARMUP_SEEDS:
+        # Warm the research cache in the background so startup is not delayed
+        app.state.keyword_warmup = asyncio.create_task(
+            warm_up_research_cache(settings.KEYWORD_CACHE_WARMUP_SEEDS)
+        )
+        print(f"🔥 Keyword cache warm-up: {len(settings.KEYWORD_CACHE_WARMUP_SEEDS)} seeds")
     
     print("🤖 AI Engine: Operational")
     print("🔄 Real-time WebSocket: Ready")
@@ -252,4 +367,12 @@ async def shutdown_event():
     """Cleanup on shutdown"""
     print("🛑 AstraPilot API shutting down...")
     print("💾 Saving any pending analysis...")
-    print("✅ Shutdown complete")
+    try:
+        await usage_buffer.stop()
+    except Exception as e:
+        print(f"⚠️  Usage counter flush error: {e}")
+    try:
+        keyword_autocomplete.keyword_autocomplete.save(settings.KEYWORD_AUTOCOMPLETE_SNAPSHOT)
+    except Exception as e:
+        print(f"⚠️  Keyword autocomplete snapshot error: {e}")
+    print("✅ Shutdown complete")
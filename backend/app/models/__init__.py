@@ -1,5 +1,7 @@
 from .user import User
 from .payment import Payment
 from .license import License
-from .seodata import SeoData        # Only if you created seodata.py
+from .seodata import SeoData, SeoDataArchive        # Only if you created seodata.py
 from .social import Social         # Only if you created social.py
+from .rollup import DailyPaymentStats, DailyUsageStats
+from .usage import UsageCounter
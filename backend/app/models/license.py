@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Index, func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -12,3 +12,14 @@ class License(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     # Relationships
     user = relationship("User", back_populates="licenses")
+    
+    __table_args__ = (
+        # A user's (active) licenses, newest first
+        Index("ix_licenses_user_id_is_active", "user_id", "is_active", "created_at"),
+    )
+
+# Expiry sweeps only look at active licenses
+Index(
+    "ix_licenses_active_valid_until", License.valid_until,
+    postgresql_where=License.is_active == True, sqlite_where=License.is_active == True
+)
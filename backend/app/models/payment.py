@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Index, func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -13,3 +13,9 @@ class Payment(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     # Relationships
     user = relationship("User", back_populates="payments")
+    
+    __table_args__ = (
+        Index("ix_payments_status_created_at_id", "status", "created_at", "id"),  # revenue reports, status filters
+        Index("ix_payments_user_id_created_at", "user_id", "created_at"),
+        Index("ix_payments_created_at_id", "created_at", "id"),  # admin payment list (keyset pages)
+    )
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, Float, Date
+from app.database import Base
+
+# Daily aggregates kept up to date by app.services.analytics_rollups as rows are written
+
+class DailyPaymentStats(Base):
+    __tablename__ = "daily_payment_stats"
+    day = Column(Date, primary_key=True)
+    status = Column(String(32), primary_key=True)
+    payments = Column(Integer, nullable=False, default=0)
+    amount = Column(Float, nullable=False, default=0)
+
+class DailyUsageStats(Base):
+    __tablename__ = "daily_usage_stats"
+    day = Column(Date, primary_key=True)
+    new_users = Column(Integer, nullable=False, default=0)
+    analyses = Column(Integer, nullable=False, default=0)
+    scored_analyses = Column(Integer, nullable=False, default=0)  # analyses with a score, for averages
+    score_total = Column(Float, nullable=False, default=0)
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, func
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, JSON, func
 from app.database import Base
 
+# On PostgreSQL seodata is partitioned by month of created_at, with primary key (id, created_at): see migration 0006
 class SeoData(Base):
     __tablename__ = "seodata"
     id = Column(Integer, primary_key=True, index=True)
@@ -8,4 +9,17 @@ class SeoData(Base):
     url = Column(String(255), nullable=False)
     analysis_result = Column(JSON)    # Save AI/analytics output as JSON
     score = Column(Float)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)  # partition key
+    
+    __table_args__ = (
+        Index("ix_seodata_user_id_created_at_id", "user_id", "created_at", "id"),  # history pages and monthly usage
+        Index("ix_seodata_created_at", "created_at"),
+    )
+
+# A month of analyses moved out of seodata into a compressed file by app.services.seodata_archive
+class SeoDataArchive(Base):
+    __tablename__ = "seodata_archives"
+    month = Column(String(7), primary_key=True)  # "2026-01"
+    path = Column(String(512), nullable=False)
+    rows = Column(Integer, nullable=False)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -4,7 +4,7 @@ from app.database import Base
 class Social(Base):
     __tablename__ = "social"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     platform = Column(String(64), nullable=False)           # e.g. "facebook", "twitter"
     profile_url = Column(String(256), nullable=True)
     social_data = Column(JSON)                              # Store fetched API data
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+from app.database import Base
+
+class UsageCounter(Base):
+    __tablename__ = "usage_counters"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    resource = Column(String(64), primary_key=True)  # e.g., 'seo_analyses', 'api_calls'
+    period = Column(String(16), primary_key=True)  # '2026-10' (monthly), '2026-10-19' (daily) or 'all'
+    count = Column(Integer, nullable=False, default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, func
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Index, func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -18,3 +18,7 @@ class User(Base):
     # Relationships — ready for pro use
     payments = relationship("Payment", back_populates="user")
     licenses = relationship("License", back_populates="user")
+    
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),  # admin user list (keyset pages)
+    )
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, ConfigDict
 from typing import List, Optional, Dict, Any
-from datetime import datetime
+from datetime import date, datetime
 
 class KeywordRequest(BaseModel):
     keyword: str
@@ -51,4 +51,75 @@ class CompetitorAnalysis(BaseModel):
     keyword_gaps: List[KeywordSuggestion]  # Keywords competitors rank for but user doesn't
     content_gaps: List[str]
     
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class KeywordClusterRequest(BaseModel):
+    keywords: List[str]
+    location: Optional[str] = "United States"
+    language: Optional[str] = "en"
+    similarity_threshold: float = 0.5  # estimated Jaccard similarity, 0-1
+    min_cluster_size: int = 1
+
+class KeywordCluster(BaseModel):
+    head: str  # highest-volume keyword in the cluster
+    keywords: List[str]
+    size: int
+    total_volume: int
+    head_volume: int
+
+class KeywordClusterResponse(BaseModel):
+    clusters: List[KeywordCluster]
+    total_keywords: int
+    cluster_count: int
+    elapsed_ms: float
+
+class KeywordGapRequest(BaseModel):
+    domain: str
+    competitors: List[str]
+    limit: int = 100  # rows per result set, highest volume first
+
+class KeywordGapRow(BaseModel):
+    keyword: str
+    search_volume: int
+    positions: Dict[str, Optional[int]]  # domain -> ranking position (None when unknown)
+
+class KeywordGapCounts(BaseModel):
+    gaps: int
+    missing: int
+    overlap: int
+    unique: Dict[str, int]
+    keywords: Dict[str, int]
+
+class KeywordGapResponse(BaseModel):
+    domain: str
+    competitors: List[str]
+    gaps: List[KeywordGapRow]  # Keywords at least one competitor ranks for but the domain doesn't
+    missing: List[KeywordGapRow]  # Keywords every competitor ranks for but the domain doesn't
+    overlap: List[KeywordGapRow]
+    unique: Dict[str, List[KeywordGapRow]]  # Keywords only that competitor ranks for
+    counts: KeywordGapCounts
+    elapsed_ms: float
+
+class KeywordTrendPoint(BaseModel):
+    date: date  # start of the day, week (Monday) or month bucket
+    search_volume: Optional[int] = None
+    rank: Optional[float] = None  # average position of the domain in the bucket
+
+class KeywordTrendHistory(BaseModel):
+    keyword: str
+    domain: Optional[str] = None
+    points: List[KeywordTrendPoint]
+
+class KeywordTrendRequest(BaseModel):
+    keywords: List[str]
+    location: Optional[str] = "United States"
+    language: Optional[str] = "en"
+    domain: Optional[str] = None  # rank history of this domain instead of search volume
+    resolution: str = "month"  # "day", "week" or "month"
+    start: Optional[date] = None
+    end: Optional[date] = None
+
+class KeywordTrendResponse(BaseModel):
+    resolution: str
+    series: List[KeywordTrendHistory]
+    elapsed_ms: float
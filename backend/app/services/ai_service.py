@@ -1,11 +1,12 @@
 # Enhanced AI Service for Ultra AI-Powered SEO Analysis
 
-import os
 import asyncio
 import json
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Callable, Dict, List, Optional, Any
 from datetime import datetime
-import openai
+from app.services.llm_gateway import llm_gateway, LLMGatewayError, LLMResponse
+from app.services.llm_telemetry import LLMTelemetry
+from app.utils.json_stream import IncrementalJSONArrayParser
 from app.schemas.seo import SEOAnalysisResult, SEORecommendation
 from app.schemas.keyword import KeywordSuggestion
 import logging
@@ -18,12 +19,10 @@ class UltraAIAnalyzer:
     Uses advanced GPT models for intelligent SEO insights
     """
     
-    def __init__(self):
-        # Initialize OpenAI client
-        self.client = openai.AsyncOpenAI(
-            api_key=os.getenv("OPENAI_API_KEY", "your-openai-api-key")
-        )
-        self.model = "gpt-4o-mini"  # Use the latest efficient model
+    def __init__(self, gateway=None):
+        # All model calls go through the shared, rate-limited LLM gateway
+        self.gateway = gateway or llm_gateway
+        self.model = self.gateway.model
         
     async def enhance_seo_analysis(self, basic_analysis: SEOAnalysisResult, content: str) -> SEOAnalysisResult:
         """
@@ -65,8 +64,8 @@ class UltraAIAnalyzer:
             # Return original analysis if AI fails
             return basic_analysis
     
-    async def _generate_ai_recommendations(self, analysis: SEOAnalysisResult, content: str) -> List[SEORecommendation]:
-        """Generate intelligent SEO recommendations using AI"""
+    def _recommendation_messages(self, analysis: SEOAnalysisResult, content: str) -> List[Dict[str, str]]:
+        """Build the chat messages for the recommendations prompt"""
         
         prompt = f"""
         You are an expert SEO consultant analyzing a website. Based on the following SEO analysis data and content, 
@@ -105,30 +104,27 @@ class UltraAIAnalyzer:
         Focus on recommendations that will have the highest impact on search rankings.
         """
         
+        return [
+            {"role": "system", "content": "You are an expert SEO consultant with 10+ years of experience."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    async def _generate_ai_recommendations(self, analysis: SEOAnalysisResult, content: str) -> List[SEORecommendation]:
+        """Generate intelligent SEO recommendations using AI"""
         try:
-            response = await self.client.chat.completions.create(
+            response = await self.gateway.chat(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert SEO consultant with 10+ years of experience."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self._recommendation_messages(analysis, content),
                 temperature=0.3,
-                max_tokens=1000
+                max_tokens=1000,
+                prompt_type="seo_recommendations"
             )
             
-            ai_response = response.choices[0].message.content
-            recommendations_data = json.loads(ai_response)
+            recommendations_data = _parse_completion(self.gateway.telemetry, response, "seo_recommendations")
             
             ai_recommendations = []
             for rec_data in recommendations_data.get("recommendations", []):
-                ai_recommendations.append(SEORecommendation(
-                    category=rec_data["category"],
-                    priority=rec_data["priority"],
-                    issue=rec_data["issue"],
-                    recommendation=rec_data["recommendation"],
-                    impact=rec_data["impact"],
-                    effort=rec_data["effort"]
-                ))
+                ai_recommendations.append(_to_recommendation(rec_data))
             
             return ai_recommendations
             
@@ -136,6 +132,30 @@ class UltraAIAnalyzer:
             logger.error(f"Failed to generate AI recommendations: {str(e)}")
             return []
     
+    async def stream_ai_recommendations(self, analysis: SEOAnalysisResult, content: str) -> AsyncIterator[SEORecommendation]:
+        """Yield AI recommendations one by one as soon as each is complete in the model output"""
+        parser = IncrementalJSONArrayParser("recommendations")
+        produced = 0
+        try:
+            async for chunk in self.gateway.stream_chat(
+                model=self.model,
+                messages=self._recommendation_messages(analysis, content),
+                temperature=0.3,
+                max_tokens=1000,
+                priority="high",
+                prompt_type="seo_recommendations"
+            ):
+                for rec_data in parser.feed(chunk):
+                    try:
+                        yield _to_recommendation(rec_data)
+                        produced += 1
+                    except (KeyError, ValueError) as e:
+                        parser.skipped += 1
+                        logger.warning(f"Skipping malformed AI recommendation: {str(e)}")
+            self.gateway.telemetry.record_parse("seo_recommendations", produced > 0 and not parser.skipped)
+        except LLMGatewayError as e:
+            logger.error(f"Failed to stream AI recommendations: {str(e)}")
+    
     async def _generate_competitor_insights(self, analysis: SEOAnalysisResult) -> Dict[str, Any]:
         """Generate AI-powered competitor insights"""
         
@@ -158,17 +178,19 @@ class UltraAIAnalyzer:
         """
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await self.gateway.chat(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are a competitive intelligence expert specializing in SEO."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.4,
-                max_tokens=800
+                max_tokens=800,
+                priority="low",
+                prompt_type="competitor_insights"
             )
             
-            return json.loads(response.choices[0].message.content)
+            return _parse_completion(self.gateway.telemetry, response, "competitor_insights")
             
         except Exception as e:
             logger.error(f"Failed to generate competitor insights: {str(e)}")
@@ -198,17 +220,18 @@ class UltraAIAnalyzer:
         """
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await self.gateway.chat(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are a content strategist and SEO expert."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.3,
-                max_tokens=600
+                max_tokens=600,
+                prompt_type="content_suggestions"
             )
             
-            return json.loads(response.choices[0].message.content)
+            return _parse_completion(self.gateway.telemetry, response, "content_suggestions")
             
         except Exception as e:
             logger.error(f"Failed to generate content suggestions: {str(e)}")
@@ -241,17 +264,19 @@ class UltraAIAnalyzer:
         """
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await self.gateway.chat(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are an SEO trend analyst and future-focused consultant."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.5,
-                max_tokens=700
+                max_tokens=700,
+                priority="low",
+                prompt_type="trend_predictions"
             )
             
-            return json.loads(response.choices[0].message.content)
+            return _parse_completion(self.gateway.telemetry, response, "trend_predictions")
             
         except Exception as e:
             logger.error(f"Failed to predict SEO trends: {str(e)}")
@@ -277,17 +302,18 @@ class UltraAIAnalyzer:
         """
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await self.gateway.chat(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are an SEO scoring expert."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.2,
-                max_tokens=50
+                max_tokens=50,
+                prompt_type="score_adjustment"
             )
             
-            adjustment = float(response.choices[0].message.content.strip())
+            adjustment = _parse_completion(self.gateway.telemetry, response, "score_adjustment", parse=lambda text: float(text.strip()))
             return max(-10, min(10, adjustment))
             
         except Exception as e:
@@ -299,14 +325,12 @@ class RealTimeKeywordAnalyzer:
     Real-time keyword analysis with AI enhancement
     """
     
-    def __init__(self):
-        self.client = openai.AsyncOpenAI(
-            api_key=os.getenv("OPENAI_API_KEY", "your-openai-api-key")
-        )
-        self.model = "gpt-4o-mini"
+    def __init__(self, gateway=None):
+        self.gateway = gateway or llm_gateway
+        self.model = self.gateway.model
     
-    async def generate_smart_keywords(self, seed_keyword: str, business_context: str = "") -> List[KeywordSuggestion]:
-        """Generate intelligent keyword suggestions using AI"""
+    def _keyword_messages(self, seed_keyword: str, business_context: str = "") -> List[Dict[str, str]]:
+        """Build the chat messages for the keyword suggestions prompt"""
         
         prompt = f"""
         Generate 10 high-value SEO keyword suggestions for the seed keyword: "{seed_keyword}"
@@ -334,34 +358,90 @@ class RealTimeKeywordAnalyzer:
         }}
         """
         
+        return [
+            {"role": "system", "content": "You are an expert keyword researcher with deep understanding of search intent."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    async def generate_smart_keywords(self, seed_keyword: str, business_context: str = "") -> List[KeywordSuggestion]:
+        """Generate intelligent keyword suggestions using AI"""
         try:
-            response = await self.client.chat.completions.create(
+            response = await self.gateway.chat(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert keyword researcher with deep understanding of search intent."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self._keyword_messages(seed_keyword, business_context),
                 temperature=0.4,
-                max_tokens=1200
+                max_tokens=1200,
+                priority="high",
+                prompt_type="keyword_suggestions"
             )
             
-            keywords_data = json.loads(response.choices[0].message.content)
+            keywords_data = _parse_completion(self.gateway.telemetry, response, "keyword_suggestions")
             
             suggestions = []
             for kw_data in keywords_data.get("keywords", []):
-                suggestions.append(KeywordSuggestion(
-                    keyword=kw_data["keyword"],
-                    search_volume=kw_data["search_volume"],
-                    difficulty=kw_data["difficulty"],
-                    relevance_score=kw_data["relevance_score"],
-                    cpc=kw_data["cpc"]
-                ))
+                suggestions.append(_to_keyword_suggestion(kw_data))
             
             return suggestions
             
         except Exception as e:
             logger.error(f"Failed to generate smart keywords: {str(e)}")
             return []
+    
+    async def stream_smart_keywords(self, seed_keyword: str, business_context: str = "") -> AsyncIterator[KeywordSuggestion]:
+        """Yield keyword suggestions one by one while the model is still generating"""
+        parser = IncrementalJSONArrayParser("keywords")
+        produced = 0
+        try:
+            async for chunk in self.gateway.stream_chat(
+                model=self.model,
+                messages=self._keyword_messages(seed_keyword, business_context),
+                temperature=0.4,
+                max_tokens=1200,
+                priority="high",
+                prompt_type="keyword_suggestions"
+            ):
+                for kw_data in parser.feed(chunk):
+                    try:
+                        yield _to_keyword_suggestion(kw_data)
+                        produced += 1
+                    except (KeyError, ValueError) as e:
+                        parser.skipped += 1
+                        logger.warning(f"Skipping malformed keyword suggestion: {str(e)}")
+            self.gateway.telemetry.record_parse("keyword_suggestions", produced > 0 and not parser.skipped)
+        except LLMGatewayError as e:
+            logger.error(f"Failed to stream smart keywords: {str(e)}")
+
+def _parse_completion(telemetry: LLMTelemetry, response: LLMResponse, prompt_type: str,
+                      parse: Callable[[str], Any] = json.loads) -> Any:
+    """Parse a completion and record in telemetry whether the output was usable"""
+    try:
+        result = parse(response.content)
+    except ValueError:
+        telemetry.record_parse(prompt_type, False, response.telemetry)
+        raise
+    telemetry.record_parse(prompt_type, True, response.telemetry)
+    return result
+
+def _to_keyword_suggestion(kw_data: Dict[str, Any]) -> KeywordSuggestion:
+    """Convert one model-generated keyword object into a KeywordSuggestion"""
+    return KeywordSuggestion(
+        keyword=kw_data["keyword"],
+        search_volume=kw_data["search_volume"],
+        difficulty=kw_data["difficulty"],
+        relevance_score=kw_data["relevance_score"],
+        cpc=kw_data["cpc"]
+    )
+
+def _to_recommendation(rec_data: Dict[str, Any]) -> SEORecommendation:
+    """Convert one model-generated recommendation object into an SEORecommendation"""
+    return SEORecommendation(
+        category=rec_data["category"],
+        priority=rec_data["priority"],
+        issue=rec_data["issue"],
+        recommendation=rec_data["recommendation"],
+        impact=rec_data["impact"],
+        effort=rec_data["effort"]
+    )
 
 # WebSocket handler for real-time analysis
 class RealTimeAnalysisHandler:
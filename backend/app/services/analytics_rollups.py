@@ -0,0 +1,225 @@
+# Analytics Rollups - daily revenue and usage aggregates maintained as rows are written
+
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import delete, event, func, insert, inspect, literal, select, union_all
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.database import upsert_increments
+from app.models.user import User
+from app.models.payment import Payment
+from app.models.seodata import SeoData, SeoDataArchive
+from app.models.rollup import DailyPaymentStats, DailyUsageStats
+
+REVENUE_STATUS = "paid"
+USAGE_FIELDS = ("new_users", "analyses", "scored_analyses", "score_total")
+
+def _day(created_at: Optional[datetime]) -> date:
+    # Unflushed rows get created_at from the database clock (UTC) during this flush
+    if created_at is None:
+        return datetime.utcnow().date()
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date()
+
+class RollupDeltas:
+    """
+    Increments to the daily rollup rows, collected from one flush
+
+    Payments count under (day, status); users and analyses under day. A
+    changed row is counted out with its previous values and back in with its
+    new ones, so status changes move a payment between status buckets.
+    """
+
+    def __init__(self):
+        self.payments = defaultdict(lambda: [0, 0.0])  # (day, status) -> [payments, amount]
+        self.usage = defaultdict(lambda: dict.fromkeys(USAGE_FIELDS, 0))
+
+    def add(self, model, values: Dict, sign: int):
+        day = _day(values["created_at"])
+        if model is Payment:
+            bucket = self.payments[(day, values["status"] or Payment.__table__.c.status.default.arg)]
+            bucket[0] += sign
+            bucket[1] += sign * (values["amount"] or 0.0)
+        elif model is SeoData:
+            usage = self.usage[day]
+            usage["analyses"] += sign
+            if values["score"] is not None:
+                usage["scored_analyses"] += sign
+                usage["score_total"] += sign * values["score"]
+        elif model is User:
+            self.usage[day]["new_users"] += sign
+
+    def apply(self, connection: Connection):
+        """Upsert the non-zero increments, in key order so concurrent flushes lock rows alike"""
+        for (day, status), (payments, amount) in sorted(self.payments.items()):
+            if payments or amount:
+                upsert_increments(connection, DailyPaymentStats.__table__, ("day", "status"),
+                                  [{"day": day, "status": status, "payments": payments, "amount": amount}])
+        for day, usage in sorted(self.usage.items()):
+            if any(usage.values()):
+                upsert_increments(connection, DailyUsageStats.__table__, ("day",), [{"day": day, **usage}])
+
+# Columns each rolled-up model contributes
+TRACKED_COLUMNS = {
+    Payment: ("created_at", "status", "amount"),
+    SeoData: ("created_at", "score"),
+    User: ("created_at",),
+}
+
+def _previous_values(session: Session, obj, columns: Iterable[str]) -> Optional[Dict]:
+    """Column values as last flushed, or None when none of the columns changed"""
+    state = inspect(obj)
+    values, unknown, changed = {}, [], False
+    for name in columns:
+        history = state.attrs[name].history
+        if history.deleted:
+            values[name], changed = history.deleted[0], True
+        elif history.added:
+            unknown.append(name)  # set while expired: the old value is only in the database
+        else:
+            values[name] = getattr(obj, name)
+    if unknown:
+        table = type(obj).__table__
+        row = session.connection().execute(
+            select(*(table.c[name] for name in unknown)).where(table.c.id == obj.id)
+        ).one()
+        for name in unknown:
+            values[name] = row._mapping[name]
+            changed = changed or values[name] != getattr(obj, name)
+    return values if changed else None
+
+def collect_rollup_deltas(session: Session) -> RollupDeltas:
+    """Rollup increments for the inserts, updates and deletes pending in session"""
+    deltas = RollupDeltas()
+    for obj in session.new:
+        columns = TRACKED_COLUMNS.get(type(obj))
+        if columns:
+            deltas.add(type(obj), {name: getattr(obj, name) for name in columns}, 1)
+    for obj in session.dirty:
+        columns = TRACKED_COLUMNS.get(type(obj))
+        if columns and session.is_modified(obj):
+            previous = _previous_values(session, obj, columns)
+            if previous is not None:
+                deltas.add(type(obj), previous, -1)
+                deltas.add(type(obj), {name: getattr(obj, name) for name in columns}, 1)
+    for obj in session.deleted:
+        columns = TRACKED_COLUMNS.get(type(obj))
+        if columns:
+            deltas.add(type(obj), _previous_values(session, obj, columns) or
+                       {name: getattr(obj, name) for name in columns}, -1)
+    return deltas
+
+@event.listens_for(Session, "before_flush")
+def _update_rollups(session: Session, flush_context, instances):
+    # Runs on the flush's own connection, so rollups commit or roll back with the rows.
+    # Core statements (bulk inserts, UPDATE ... WHERE) bypass this: rebuild_rollups() reconciles them.
+    if not any(type(obj) in TRACKED_COLUMNS for obj in (*session.new, *session.dirty, *session.deleted)):
+        return
+    collect_rollup_deltas(session).apply(session.connection())
+
+def _created_between(column, start: Optional[date], end: Optional[date]) -> List:
+    # The widened bounds use the created_at index; the date() filter makes them exact
+    conditions = [column.isnot(None)]
+    if start is not None:
+        conditions += [column >= datetime.combine(start - timedelta(days=1), time()), func.date(column) >= start]
+    if end is not None:
+        conditions += [column < datetime.combine(end + timedelta(days=2), time()), func.date(column) <= end]
+    return conditions
+
+async def rebuild_rollups(db: AsyncSession, start: Optional[date] = None, end: Optional[date] = None) -> Dict:
+    """
+    Recompute the rollup rows for start..end (inclusive; open ends mean all) from the raw tables
+
+    Reconciles writes that bypassed the ORM. Rows are replaced in one
+    transaction; payments or analyses written while it runs may need another
+    pass over their day. Usage rows of archived months are kept: their
+    analyses are no longer in seodata.
+    """
+    payment_day, seodata_day, user_day = (func.date(Payment.created_at), func.date(SeoData.created_at),
+                                          func.date(User.created_at))
+    usage_start = start
+    archived_through = (await db.execute(select(func.max(SeoDataArchive.month)))).scalar()
+    if archived_through is not None:
+        year, month = map(int, archived_through.split("-"))
+        first_hot_day = date(year + month // 12, month % 12 + 1, 1)
+        usage_start = max(start or first_hot_day, first_hot_day)
+    
+    for table, table_start in ((DailyPaymentStats, start), (DailyUsageStats, usage_start)):
+        statement = delete(table)
+        if table_start is not None:
+            statement = statement.where(table.day >= table_start)
+        if end is not None:
+            statement = statement.where(table.day <= end)
+        await db.execute(statement)
+
+    status = func.coalesce(Payment.status, Payment.__table__.c.status.default.arg)
+    payments = await db.execute(insert(DailyPaymentStats).from_select(
+        ["day", "status", "payments", "amount"],
+        select(payment_day, status, func.count(), func.coalesce(func.sum(Payment.amount), 0.0))
+        .where(*_created_between(Payment.created_at, start, end))
+        .group_by(payment_day, status)
+    ))
+
+    daily = union_all(
+        select(user_day.label("day"), func.count().label("new_users"), literal(0).label("analyses"),
+               literal(0).label("scored_analyses"), literal(0.0).label("score_total"))
+        .where(*_created_between(User.created_at, usage_start, end)).group_by(user_day),
+        select(seodata_day, literal(0), func.count(), func.count(SeoData.score),
+               func.coalesce(func.sum(SeoData.score), 0.0))
+        .where(*_created_between(SeoData.created_at, usage_start, end)).group_by(seodata_day)
+    ).subquery()
+    usage = await db.execute(insert(DailyUsageStats).from_select(
+        ["day", *USAGE_FIELDS],
+        select(daily.c.day, *(func.sum(daily.c[name]) for name in USAGE_FIELDS)).group_by(daily.c.day)
+    ))
+    await db.commit()
+
+    return {
+        "start": start.isoformat() if start else None,
+        "end": end.isoformat() if end else None,
+        "payment_rows": payments.rowcount,
+        "usage_rows": usage.rowcount
+    }
+
+async def get_revenue_rollup(db: AsyncSession, days: int = 30) -> Dict:
+    """Daily revenue and payment counts by status for the last days, from the rollup tables"""
+    start = datetime.utcnow().date() - timedelta(days=days)
+    rows = (await db.execute(
+        select(DailyPaymentStats.day, DailyPaymentStats.status, DailyPaymentStats.payments, DailyPaymentStats.amount)
+        .where(DailyPaymentStats.day >= start)
+        .order_by(DailyPaymentStats.day)
+    )).all()
+
+    daily_revenue, by_status = [], defaultdict(int)
+    for row in rows:
+        by_status[row.status] += row.payments
+        if row.status == REVENUE_STATUS and row.payments:
+            daily_revenue.append({"date": str(row.day), "revenue": float(row.amount)})
+    total_revenue = sum(day["revenue"] for day in daily_revenue)
+
+    return {
+        "period_days": days,
+        "total_revenue": float(total_revenue),
+        "daily_revenue": daily_revenue,
+        "average_daily_revenue": float(total_revenue / days) if days > 0 else 0,
+        "payments_by_status": dict(by_status)
+    }
+
+async def get_rollup_totals(db: AsyncSession) -> Dict:
+    """All-time totals summed from the daily rollups"""
+    usage = (await db.execute(
+        select(*(func.coalesce(func.sum(DailyUsageStats.__table__.c[name]), 0).label(name) for name in USAGE_FIELDS))
+    )).one()
+    payments = (await db.execute(
+        select(func.coalesce(func.sum(DailyPaymentStats.payments), 0), func.coalesce(func.sum(DailyPaymentStats.amount), 0.0))
+    )).one()
+    return {
+        "users": usage.new_users,
+        "analyses": usage.analyses,
+        "avg_score": usage.score_total / usage.scored_analyses if usage.scored_analyses else None,
+        "payments": payments[0],
+        "payment_amount": float(payments[1])
+    }
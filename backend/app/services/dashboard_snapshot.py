@@ -0,0 +1,181 @@
+# Admin Dashboard Snapshot - overview aggregates in one round trip, cached and refreshed in the background
+
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from sqlalchemy import case, func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import read_session
+from app.models.user import User
+from app.models.payment import Payment
+from app.models.license import License
+from app.models.seodata import SeoData
+from app.models.social import Social
+from app.services.single_flight import SingleFlight
+from app.settings import settings
+
+class SnapshotCache:
+    """
+    Computed values served from memory, recomputed by one shared task
+
+    Values younger than ttl are served as they are. Older ones (up to
+    max_stale_seconds) are still served immediately while a single background
+    task recomputes them, so callers never wait on a refresh. Callers that find
+    nothing usable all await the same computation instead of each running it.
+    """
+
+    def __init__(self, ttl_seconds: float = 30, max_stale_seconds: float = 300,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self.clock = clock
+        self._values: Dict[Hashable, Tuple[float, float, Any]] = {}  # key -> (computed at, compute ms, value)
+        self._flight = SingleFlight()
+        self.counters = Counter()
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Tuple[Any, Dict]:
+        """The value for key and snapshot metadata (age, whether it was stale)"""
+        entry = self._values.get(key)
+        if entry is not None:
+            age = self.clock() - entry[0]
+            if age < self.ttl_seconds:
+                self.counters["hits"] += 1
+                return entry[2], self._meta(entry, age, stale=False)
+            if age < self.ttl_seconds + self.max_stale_seconds:
+                self.counters["stale_hits"] += 1
+                self._flight.refresh(key, lambda: self._load(key, loader))
+                return entry[2], self._meta(entry, age, stale=True)
+
+        self.counters["misses"] += 1
+        await self._flight.run(key, lambda: self._load(key, loader))
+        entry = self._values[key]
+        return entry[2], self._meta(entry, self.clock() - entry[0], stale=False)
+
+    async def refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Tuple[Any, Dict]:
+        """Recompute now (joining a computation already running for key)"""
+        await self._flight.run(key, lambda: self._load(key, loader))
+        entry = self._values[key]
+        return entry[2], self._meta(entry, self.clock() - entry[0], stale=False)
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        if key is None:
+            self._values.clear()
+        else:
+            self._values.pop(key, None)
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._values),
+            "ttl_seconds": self.ttl_seconds,
+            "max_stale_seconds": self.max_stale_seconds,
+            **{name: self.counters[name] for name in ("hits", "stale_hits", "misses", "computations", "errors")}
+        }
+
+    def _meta(self, entry: Tuple[float, float, Any], age: float, stale: bool) -> Dict:
+        return {"age_seconds": round(age, 2), "compute_ms": entry[1], "stale": stale}
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        # Run through self._flight, so at most once per key at a time
+        started = time.perf_counter()
+        try:
+            value = await loader()
+        except Exception:
+            self.counters["errors"] += 1
+            raise
+
+        self.counters["computations"] += 1
+        self._values[key] = (self.clock(), round((time.perf_counter() - started) * 1000, 2), value)
+
+def _count_if(condition):
+    return func.count(case((condition, 1)))
+
+async def compute_admin_overview(db: AsyncSession) -> Dict:
+    """
+    Every overview counter from one SELECT
+
+    Each table is read once by a subquery of conditional aggregates; the
+    one-row subqueries are joined so the database answers in a single round trip.
+    """
+    now = datetime.utcnow()
+    week_ago = now - timedelta(days=7)
+    day_ago = now - timedelta(days=1)
+
+    users = select(
+        func.count(User.id).label("total_users"),
+        _count_if(User.email_verified == True).label("verified_users"),
+        _count_if(User.is_active == True).label("active_users"),
+        _count_if(User.created_at >= week_ago).label("recent_registrations")
+    ).subquery()
+    payments = select(
+        func.count(Payment.id).label("total_payments"),
+        _count_if(Payment.status == "paid").label("successful_payments"),
+        func.sum(case((Payment.status == "paid", Payment.amount))).label("total_revenue")
+    ).subquery()
+    licenses = select(_count_if(License.is_active == True).label("active_licenses")).subquery()
+    analyses = select(
+        func.count(SeoData.id).label("total_analyses"),
+        _count_if(SeoData.created_at >= day_ago).label("recent_analyses")
+    ).subquery()
+    social = select(func.count(Social.id).label("social_connections")).subquery()
+
+    statement = select(users, payments, licenses, analyses, social).select_from(
+        users.join(payments, true()).join(licenses, true()).join(analyses, true()).join(social, true())
+    )
+    row = (await db.execute(statement)).mappings().one()
+    counts = {name: (value or 0) for name, value in row.items()}
+    total_users, verified_users = counts["total_users"], counts["verified_users"]
+    total_payments, successful_payments = counts["total_payments"], counts["successful_payments"]
+
+    return {
+        "timestamp": now.isoformat(),
+        "user_stats": {
+            "total_users": total_users,
+            "verified_users": verified_users,
+            "active_users": counts["active_users"],
+            "recent_registrations": counts["recent_registrations"],
+            "verification_rate": round((verified_users / total_users * 100) if total_users > 0 else 0, 2)
+        },
+        "payment_stats": {
+            "total_payments": total_payments,
+            "successful_payments": successful_payments,
+            "total_revenue": float(counts["total_revenue"]),
+            "success_rate": round((successful_payments / total_payments * 100) if total_payments > 0 else 0, 2)
+        },
+        "license_stats": {
+            "active_licenses": counts["active_licenses"]
+        },
+        "analysis_stats": {
+            "total_analyses": counts["total_analyses"],
+            "recent_analyses": counts["recent_analyses"],
+            "daily_avg": round(counts["recent_analyses"], 2)
+        },
+        "social_stats": {
+            "total_connections": counts["social_connections"]
+        },
+        "system_health": {
+            "status": "operational",
+            "ai_engine": "active",
+            "database": "connected",
+            "email_service": "operational"
+        }
+    }
+
+async def _load_admin_overview() -> Dict:
+    # Own session (a background refresh outlives the request that triggered it), on a replica when healthy
+    async with read_session() as db:
+        return await compute_admin_overview(db)
+
+# Global instance
+dashboard_snapshots = SnapshotCache(
+    ttl_seconds=settings.ADMIN_OVERVIEW_TTL_SECONDS,
+    max_stale_seconds=settings.ADMIN_OVERVIEW_MAX_STALE_SECONDS
+)
+
+async def get_admin_overview(refresh: bool = False) -> Dict:
+    """Admin overview from the shared snapshot, with its age"""
+    if refresh:
+        overview, meta = await dashboard_snapshots.refresh("overview", _load_admin_overview)
+    else:
+        overview, meta = await dashboard_snapshots.get("overview", _load_admin_overview)
+    return {**overview, "snapshot": meta}
@@ -0,0 +1,225 @@
+# Database Telemetry - pool usage, query latency, slow queries and per-request query counts
+
+import contextvars
+import logging
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+from sqlalchemy import event
+from app.services.llm_telemetry import RollingCounters, RollingHistogram
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+WAIT_BUCKETS_MS = [0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000, 30000]
+MAX_STATEMENT_CHARS = 500
+
+class RequestQueries:
+    """Queries run while serving one HTTP request"""
+    __slots__ = ("count", "total_ms", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements: Counter = Counter()
+
+_request_queries: contextvars.ContextVar[Optional[RequestQueries]] = contextvars.ContextVar(
+    "db_request_queries", default=None
+)
+
+class DatabaseTelemetry:
+    """
+    Live database metrics gathered from SQLAlchemy engine and pool events
+
+    Query latency and pool wait time go into rolling histograms; statements
+    slower than slow_query_ms are kept (with the route that ran them) in a
+    bounded log. QueryCountMiddleware counts queries per request, so routes
+    that run the same statement over and over (N+1 patterns) are listed.
+    """
+
+    def __init__(self, slow_query_ms: float = 200, n_plus_one_threshold: int = 10, log_size: int = 100):
+        self.slow_query_ms = slow_query_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.query_latency = RollingHistogram(QUERY_BUCKETS_MS)
+        self.pool_wait = RollingHistogram(WAIT_BUCKETS_MS)
+        self.counters = RollingCounters()
+        self.slow_queries: Deque[Dict] = deque(maxlen=log_size)
+        self.repeated_queries: Deque[Dict] = deque(maxlen=log_size)
+        self.routes: Dict[str, List[float]] = {}  # route -> [requests, queries, max queries, query ms]
+        self.checked_out = 0
+        self._engines = []
+
+    def instrument(self, engine):
+        """Attach the event listeners to an (async) engine and its pool"""
+        sync_engine = getattr(engine, "sync_engine", engine)
+        event.listen(sync_engine, "before_cursor_execute", self._before_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_execute)
+        event.listen(sync_engine, "handle_error", self._on_error)
+        event.listen(sync_engine.pool, "checkout", self._on_checkout)
+        event.listen(sync_engine.pool, "checkin", self._on_checkin)
+        event.listen(sync_engine.pool, "connect", lambda *args: self.counters.add("connections_opened"))
+        if hasattr(sync_engine.pool, "wait_observer"):
+            sync_engine.pool.wait_observer = self.pool_wait.observe
+        self._engines.append(sync_engine)
+        return engine
+
+    def record_query(self, statement: str, duration_ms: float):
+        self.query_latency.observe(duration_ms)
+        self.counters.add("queries")
+        current = _request_queries.get()
+        if current is not None:
+            current.count += 1
+            current.total_ms += duration_ms
+            current.statements[statement] += 1
+        if duration_ms >= self.slow_query_ms:
+            self.counters.add("slow_queries")
+            entry = {
+                "statement": statement[:MAX_STATEMENT_CHARS],
+                "duration_ms": round(duration_ms, 2),
+                "timestamp": datetime.utcnow().isoformat()
+            }
+            self.slow_queries.append(entry)
+            logger.warning(f"Slow query ({entry['duration_ms']} ms): {entry['statement']}")
+
+    def start_request(self) -> contextvars.Token:
+        return _request_queries.set(RequestQueries())
+
+    def finish_request(self, route: str, token: contextvars.Token) -> RequestQueries:
+        """Fold one request's query counts into the per-route totals"""
+        current = _request_queries.get()
+        _request_queries.reset(token)
+        stats = self.routes.setdefault(route, [0, 0, 0, 0.0])
+        stats[0] += 1
+        stats[1] += current.count
+        stats[2] = max(stats[2], current.count)
+        stats[3] += current.total_ms
+        if current.statements:
+            statement, repeats = current.statements.most_common(1)[0]
+            if repeats >= self.n_plus_one_threshold:
+                self.counters.add("repeated_query_requests")
+                self.repeated_queries.append({
+                    "route": route,
+                    "statement": statement[:MAX_STATEMENT_CHARS],
+                    "executions": repeats,
+                    "request_queries": current.count,
+                    "timestamp": datetime.utcnow().isoformat()
+                })
+        return current
+
+    def pool_status(self) -> List[Dict]:
+        """Pool sizing and live usage for every instrumented engine"""
+        pools = []
+        for sync_engine in self._engines:
+            pool = sync_engine.pool
+            status = {
+                "url": sync_engine.url.render_as_string(hide_password=True),
+                "pool_class": type(pool).__name__,
+                "checked_out": self.checked_out
+            }
+            if hasattr(pool, "size") and hasattr(pool, "checkedin"):
+                status.update({
+                    "size": pool.size(),
+                    "checked_in": pool.checkedin(),
+                    "overflow": pool.overflow(),
+                    "max_overflow": pool._max_overflow,
+                    "timeout_seconds": pool.timeout(),
+                    "waiting": getattr(pool, "waiting", None),
+                    "max_waiting": getattr(pool, "max_waiting", None)
+                })
+            pools.append(status)
+        return pools
+
+    def summary(self, window_minutes: int = 60, top_routes: int = 20) -> Dict:
+        window = window_minutes * 60
+        counters = self.counters.totals(window)
+        routes = sorted(
+            (
+                {
+                    "route": route,
+                    "requests": requests,
+                    "queries": queries,
+                    "queries_per_request": round(queries / requests, 2),
+                    "max_queries": max_queries,
+                    "query_ms_per_request": round(query_ms / requests, 2)
+                }
+                for route, (requests, queries, max_queries, query_ms) in self.routes.items() if requests
+            ),
+            key=lambda r: -r["queries_per_request"]
+        )
+        return {
+            "window_minutes": window_minutes,
+            "pools": self.pool_status(),
+            "queries": int(counters.get("queries", 0)),
+            "errors": int(counters.get("errors", 0)),
+            "connections_opened": int(counters.get("connections_opened", 0)),
+            "query_latency_ms": self.query_latency.snapshot(window),
+            "pool_wait_ms": self.pool_wait.snapshot(window),
+            "slow_query_ms": self.slow_query_ms,
+            "slow_queries": list(self.slow_queries)[-20:],
+            "repeated_queries": list(self.repeated_queries)[-20:],
+            "routes": routes[:top_routes]
+        }
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        self.record_query(statement, (time.perf_counter() - started) * 1000)
+
+    def _on_error(self, context):
+        self.counters.add("errors")
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checked_out += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.checked_out = max(0, self.checked_out - 1)
+
+class QueryCountMiddleware:
+    """
+    ASGI middleware counting the queries each request runs
+
+    Adds X-DB-Queries and X-DB-Time-Ms response headers (queries made before
+    the response starts) and feeds the per-route totals of DatabaseTelemetry.
+    """
+
+    def __init__(self, app, telemetry: Optional[DatabaseTelemetry] = None):
+        self.app = app
+        self.telemetry = telemetry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        telemetry = self.telemetry or db_telemetry
+        token = telemetry.start_request()
+        current = _request_queries.get()
+
+        async def send_with_counts(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(current.count).encode()))
+                headers.append((b"x-db-time-ms", f"{current.total_ms:.1f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_counts)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            telemetry.finish_request(f"{scope['method']} {route}", token)
+
+# Global instance
+db_telemetry = DatabaseTelemetry(
+    slow_query_ms=settings.DB_SLOW_QUERY_MS,
+    n_plus_one_threshold=settings.DB_REPEATED_QUERY_THRESHOLD
+)
+
+def get_db_telemetry() -> DatabaseTelemetry:
+    return db_telemetry
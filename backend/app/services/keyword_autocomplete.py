@@ -0,0 +1,244 @@
+# Keyword Autocomplete - sorted-array prefix index with precomputed scores
+
+import asyncio
+import math
+import os
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from app.services.keyword_metrics import normalize_keyword
+
+# Score boosts by where a keyword was seen; volume dominates, boosts break ties
+SOURCE_BOOSTS = {"imported": 0.0, "index": 0.0, "research": 0.5, "ai": 0.3}
+
+def keyword_score(search_volume: int, source: str = "imported") -> float:
+    return math.log10(1 + max(0, search_volume)) + SOURCE_BOOSTS.get(source, 0.0)
+
+def normalize_prefix(prefix: str) -> str:
+    """Normalize like stored keywords, but keep a trailing space ("seo " should not match "seoul")"""
+    normalized = normalize_keyword(prefix)
+    return normalized + " " if normalized and prefix[-1:].isspace() else normalized
+
+class PrefixIndex:
+    """
+    Prefix autocomplete over every known keyword
+
+    The base index is a sorted keyword list with parallel score/volume arrays, so
+    a prefix maps to one contiguous range found by binary search. Prefixes whose
+    range is large get their best rows precomputed at build time; others are
+    ranked on the fly with argpartition over at most `precompute_above` rows.
+    New keywords go to a small sorted delta that is merged into the base by
+    compact(). Once the delta reaches `delta_limit` entries the merge runs in a
+    worker thread (when called from the event loop); the new base is swapped in
+    afterwards, and keywords added meanwhile stay in the delta.
+    """
+
+    def __init__(self, top_k: int = 20, precompute_depth: int = 6, precompute_above: int = 1024,
+                 delta_limit: int = 5000):
+        self.top_k = top_k
+        self.precompute_depth = precompute_depth
+        self.precompute_above = precompute_above
+        self.delta_limit = delta_limit
+        self._keys: List[str] = []
+        self._scores = np.zeros(0, dtype=np.float32)
+        self._volumes = np.zeros(0, dtype=np.int64)
+        self._top: Dict[str, np.ndarray] = {}
+        self._delta: Dict[str, Tuple[float, int]] = {}
+        self._delta_keys: List[str] = []
+        self._generation = 0  # bumped whenever the base is replaced
+        self._compaction: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._keys) + sum(1 for k in self._delta_keys if not self._in_base(k))
+
+    def build(self, entries: Iterable[Tuple[str, float, int]]) -> "PrefixIndex":
+        """Replace the index with (keyword, score, search_volume) entries; duplicates keep the best score"""
+        best: Dict[str, Tuple[float, int]] = {}
+        for keyword, score, volume in entries:
+            keyword = normalize_keyword(keyword)
+            if keyword and (keyword not in best or score > best[keyword][0]):
+                best[keyword] = (score, volume)
+        self._install(self._base_from(best))
+        return self
+
+    def add(self, keyword: str, search_volume: int, source: str = "research"):
+        """Insert or upgrade one keyword; visible to complete() immediately"""
+        keyword = normalize_keyword(keyword)
+        if not keyword:
+            return
+        score = keyword_score(search_volume, source)
+        current = self._lookup(keyword)
+        if current is not None and current[0] >= score:
+            return
+        if keyword not in self._delta:
+            insort(self._delta_keys, keyword)
+        self._delta[keyword] = (score, search_volume)
+        if len(self._delta) >= self.delta_limit and (self._compaction is None or self._compaction.done()):
+            try:
+                self._compaction = asyncio.get_running_loop().create_task(self._compact_in_thread())
+            except RuntimeError:
+                self.compact()  # no event loop: nothing to block
+
+    def complete(self, prefix: str, k: int = 10) -> List[Dict]:
+        """Top-k keywords starting with prefix, best score first"""
+        prefix = normalize_prefix(prefix)
+        if not prefix or k <= 0:
+            return []
+
+        # Delta matches are few; base rows they shadow are skipped
+        lo = bisect_left(self._delta_keys, prefix)
+        hi = bisect_left(self._delta_keys, prefix + "\uffff")
+        delta = [(self._delta[key][0], key, self._delta[key][1]) for key in self._delta_keys[lo:hi]]
+
+        candidates = delta[:]
+        for row in self._base_top(prefix, k + len(delta)):
+            key = self._keys[row]
+            if key not in self._delta:
+                candidates.append((float(self._scores[row]), key, int(self._volumes[row])))
+
+        candidates.sort(key=lambda c: (-c[0], c[1]))
+        return [
+            {"keyword": key, "score": round(score, 4), "search_volume": volume}
+            for score, key, volume in candidates[:k]
+        ]
+
+    def compact(self):
+        """Merge the delta into the base arrays and recompute the precomputed ranges"""
+        if self._delta:
+            delta = dict(self._delta)
+            self._install(self._merged_base(self._keys, self._scores, self._volumes, delta), delta)
+
+    async def _compact_in_thread(self):
+        # The rebuild takes seconds for millions of keys; only the swap runs on the event loop
+        delta, generation = dict(self._delta), self._generation
+        base = await asyncio.to_thread(self._merged_base, self._keys, self._scores, self._volumes, delta)
+        if generation == self._generation:  # not rebuilt or compacted meanwhile
+            self._install(base, delta)
+
+    def _merged_base(self, keys: List[str], scores: np.ndarray, volumes: np.ndarray,
+                     delta: Dict[str, Tuple[float, int]]):
+        merged = {key: (float(score), int(volume))
+                  for key, score, volume in zip(keys, scores.tolist(), volumes.tolist())}
+        merged.update(delta)
+        return self._base_from(merged)
+
+    def save(self, path: str):
+        """Write a compact snapshot: one newline-joined UTF-8 blob plus score/volume arrays"""
+        self.compact()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        blob = np.frombuffer("\n".join(self._keys).encode("utf-8"), dtype=np.uint8)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, keys=blob, scores=self._scores, volumes=self._volumes)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "PrefixIndex":
+        index = cls(**kwargs)
+        with np.load(path) as snapshot:
+            text = snapshot["keys"].tobytes().decode("utf-8")
+            index._keys = text.split("\n") if text else []
+            index._scores = snapshot["scores"]
+            index._volumes = snapshot["volumes"]
+        index._top = index._precompute(index._keys, index._scores)
+        return index
+
+    def stats(self) -> Dict:
+        return {
+            "keywords": len(self),
+            "base": len(self._keys),
+            "delta": len(self._delta),
+            "precomputed_prefixes": len(self._top)
+        }
+
+    def _base_from(self, entries: Dict[str, Tuple[float, int]]):
+        """(keys, scores, volumes, precomputed tops) of a new base; touches no index state"""
+        keys = sorted(entries)
+        scores = np.array([entries[k][0] for k in keys], dtype=np.float32)
+        volumes = np.array([entries[k][1] for k in keys], dtype=np.int64)
+        return keys, scores, volumes, self._precompute(keys, scores)
+
+    def _install(self, base, folded: Optional[Dict[str, Tuple[float, int]]] = None):
+        """Swap in a new base; delta entries not folded into it (None: drop the whole delta) are kept"""
+        self._keys, self._scores, self._volumes, self._top = base
+        if folded is None:
+            self._delta = {}
+        else:
+            self._delta = {key: value for key, value in self._delta.items() if folded.get(key) != value}
+        self._delta_keys = sorted(self._delta)
+        self._generation += 1
+
+    def _precompute(self, keys: List[str], scores: np.ndarray) -> Dict[str, np.ndarray]:
+        """Best rows for every short prefix whose range exceeds precompute_above"""
+        top = {}
+        if not keys:
+            return top
+        for depth in range(1, self.precompute_depth + 1):
+            prefixes = np.array(keys, dtype=f"<U{depth}")  # truncates each key
+            starts = np.concatenate(([0], np.flatnonzero(prefixes[1:] != prefixes[:-1]) + 1))
+            ends = np.append(starts[1:], len(prefixes))
+            large = np.flatnonzero(ends - starts > self.precompute_above)
+            for start, end in zip(starts[large].tolist(), ends[large].tolist()):
+                top[str(prefixes[start])] = start + self._rank(scores[start:end], self.top_k)
+            if not len(large):
+                break
+        return top
+
+    def _base_top(self, prefix: str, k: int) -> np.ndarray:
+        top = self._top.get(prefix)
+        if top is not None and k <= len(top):
+            return top[:k]
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + "\uffff", lo)
+        return lo + self._rank(self._scores[lo:hi], k)
+
+    @staticmethod
+    def _rank(scores: np.ndarray, k: int) -> np.ndarray:
+        if len(scores) > k:
+            best = np.argpartition(-scores, k - 1)[:k]
+        else:
+            best = np.arange(len(scores))
+        return best[np.argsort(-scores[best], kind="stable")]
+
+    def _in_base(self, keyword: str) -> bool:
+        i = bisect_left(self._keys, keyword)
+        return i < len(self._keys) and self._keys[i] == keyword
+
+    def _lookup(self, keyword: str) -> Optional[Tuple[float, int]]:
+        if keyword in self._delta:
+            return self._delta[keyword]
+        i = bisect_left(self._keys, keyword)
+        if i < len(self._keys) and self._keys[i] == keyword:
+            return float(self._scores[i]), int(self._volumes[i])
+        return None
+
+# Global instance, loaded at startup by load_keyword_autocomplete()
+keyword_autocomplete = PrefixIndex()
+
+def build_keyword_autocomplete(snapshot_path: Optional[str] = None) -> PrefixIndex:
+    """Load the snapshot if present, otherwise build from imported metrics and the related-keyword index"""
+    from app.services.keyword_index import get_keyword_index
+    from app.services.keyword_metrics import get_keyword_metrics_store
+
+    global keyword_autocomplete
+    if snapshot_path and os.path.exists(snapshot_path):
+        keyword_autocomplete = PrefixIndex.load(snapshot_path)
+        return keyword_autocomplete
+
+    def entries():
+        for keyword, volume in get_keyword_metrics_store().keyword_volumes():
+            yield keyword, keyword_score(volume, "imported"), volume
+        for phrase in get_keyword_index().phrases:
+            yield phrase, keyword_score(0, "index"), 0
+
+    keyword_autocomplete = PrefixIndex().build(entries())
+    return keyword_autocomplete
+
+def add_suggestions(suggestions: Iterable, source: str) -> None:
+    """Feed KeywordSuggestion-like items into the global index"""
+    for suggestion in suggestions:
+        keyword_autocomplete.add(suggestion.keyword, suggestion.search_volume, source)
+
+def add_research_keywords(research) -> None:
+    """Feed a KeywordResearch result (main, related, long-tail and AI keywords) into the global index"""
+    keyword_autocomplete.add(research.main_keyword, research.search_volume, "research")
+    add_suggestions(research.related_keywords + research.long_tail_keywords, "research")
@@ -0,0 +1,258 @@
+# Bulk Keyword Scoring - CSV uploads scored in batches, results streamed back
+
+import asyncio
+import codecs
+import csv
+import io
+import json
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from app.services.keyword_metrics import COLUMN_ALIASES
+
+BATCH_ROWS = 2000
+MAX_KEYWORD_LENGTH = 200
+OUTPUT_COLUMNS = ["row", "keyword", "difficulty_score", "search_volume", "cpc", "competition", "error"]
+SPOOL_BYTES = 1024 * 1024  # results beyond this go to a temporary file
+
+class BulkJob:
+    """
+    Progress of one bulk upload, readable while the upload is still being scored
+    """
+
+    def __init__(self, job_id: Optional[str] = None, max_rows: int = -1):
+        self.id = job_id or uuid.uuid4().hex
+        self.max_rows = max_rows
+        self.status = "running"
+        self.bytes_received = 0
+        self.rows_read = 0
+        self.rows_scored = 0
+        self.rows_failed = 0
+        self.truncated = False
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def finish(self, error: Optional[str] = None):
+        self.status = "failed" if error else "completed"
+        self.error = error
+        self.finished_at = time.time()
+
+    def progress(self) -> Dict:
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "bytes_received": self.bytes_received,
+            "rows_read": self.rows_read,
+            "rows_scored": self.rows_scored,
+            "rows_failed": self.rows_failed,
+            "truncated": self.truncated,
+            "max_rows": self.max_rows,
+            "error": self.error,
+            "elapsed_seconds": round(elapsed, 2),
+            "rows_per_second": round(self.rows_read / elapsed) if elapsed > 0 else None
+        }
+
+class BulkJobRegistry:
+    """Most recent bulk jobs by id, so clients can poll progress"""
+
+    def __init__(self, max_jobs: int = 200):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, BulkJob]" = OrderedDict()
+
+    def start(self, job_id: Optional[str] = None, max_rows: int = -1) -> BulkJob:
+        job = BulkJob(job_id, max_rows)
+        self._jobs[job.id] = job
+        self._jobs.move_to_end(job.id)
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+        return job
+
+    def get(self, job_id: str) -> Optional[BulkJob]:
+        return self._jobs.get(job_id)
+
+async def iter_csv_records(chunks: AsyncIterator[bytes], job: Optional[BulkJob] = None) -> AsyncIterator[List[str]]:
+    """
+    Parse CSV rows from byte chunks as they arrive
+
+    Only the current partial line is buffered; quoted fields may span lines and
+    chunk boundaries. Tab- and semicolon-separated files are detected from the
+    first line. Undecodable bytes are replaced rather than failing the upload.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    record: List[str] = []
+    quotes = 0
+    delimiter = None
+
+    def complete_records(text: str, final: bool = False) -> Tuple[List[str], str]:
+        nonlocal quotes, record
+        lines = text.split("\n")
+        tail = "" if final else lines.pop()
+        done = []
+        for line in lines:
+            record.append(line)
+            quotes += line.count('"')
+            if quotes % 2 == 0:
+                done.append("\n".join(record))
+                record, quotes = [], 0
+        if final and record:
+            done.append("\n".join(record))
+            record, quotes = [], 0
+        return done, tail
+
+    async for chunk in chunks:
+        if job:
+            job.bytes_received += len(chunk)
+        done, pending = complete_records(pending + decoder.decode(chunk))
+        if done and delimiter is None:
+            delimiter = max("\t,;", key=done[0].count)
+        for row in csv.reader((line.rstrip("\r") for line in done), delimiter=delimiter or ","):
+            yield row
+
+    done, _ = complete_records(pending + decoder.decode(b"", final=True), final=True)
+    if done and delimiter is None:
+        delimiter = max("\t,;", key=done[0].count)
+    for row in csv.reader((line.rstrip("\r") for line in done), delimiter=delimiter or ","):
+        yield row
+
+def keyword_column(header: List[str]) -> Optional[int]:
+    """Index of the keyword column in a header row, None if the row is not a header"""
+    lowered = [cell.strip().lower() for cell in header]
+    return next((lowered.index(alias) for alias in COLUMN_ALIASES["keyword"] if alias in lowered), None)
+
+async def score_csv_upload(chunks: AsyncIterator[bytes], score_batch, job: BulkJob,
+                           batch_rows: int = BATCH_ROWS) -> AsyncIterator[List[Dict]]:
+    """
+    Score uploaded keywords in batches, yielding one list of result rows per batch
+
+    Rows that cannot be scored (empty or overlong keywords, a batch the scorer
+    rejects) come back with an "error" instead of stopping the upload. Scoring
+    stops at the job's max_rows, marking the job truncated.
+    """
+    column = None
+    batch: List[Tuple[int, str]] = []
+    errors: List[Dict] = []
+    row_number = 0
+
+    async for row in iter_csv_records(chunks, job):
+        row_number += 1
+        if row_number == 1:
+            column = keyword_column(row)
+            if column is not None:
+                continue  # header
+            column = 0
+        if not any(cell.strip() for cell in row):
+            continue
+        if job.max_rows != -1 and job.rows_read >= job.max_rows:
+            job.truncated = True
+            break
+
+        job.rows_read += 1
+        keyword = " ".join(row[column].split()) if column < len(row) else ""
+        if not keyword:
+            errors.append(_error_row(row_number, keyword, "missing keyword"))
+        elif len(keyword) > MAX_KEYWORD_LENGTH:
+            errors.append(_error_row(row_number, keyword[:MAX_KEYWORD_LENGTH], "keyword too long"))
+        else:
+            batch.append((row_number, keyword))
+
+        if len(batch) + len(errors) >= batch_rows:
+            yield await _score(batch, errors, score_batch, job)
+            batch, errors = [], []
+
+    if batch or errors:
+        yield await _score(batch, errors, score_batch, job)
+
+async def _score(batch: List[Tuple[int, str]], errors: List[Dict], score_batch, job: BulkJob) -> List[Dict]:
+    """Score a batch off the event loop; if the batch fails, retry row by row (still off the loop) to isolate bad rows"""
+    results = list(errors) + await asyncio.to_thread(_score_isolating_failures, batch, score_batch)
+    results.sort(key=lambda r: r["row"])
+    failed = sum(1 for r in results if r["error"])
+    job.rows_failed += failed
+    job.rows_scored += len(results) - failed
+    return results
+
+def _score_isolating_failures(batch: List[Tuple[int, str]], score_batch) -> List[Dict]:
+    try:
+        return _score_rows(batch, score_batch)
+    except Exception:
+        results = []
+        for item in batch:
+            try:
+                results.extend(_score_rows([item], score_batch))
+            except Exception as e:
+                results.append(_error_row(item[0], item[1], f"scoring failed: {str(e)}"))
+        return results
+
+def _score_rows(batch: List[Tuple[int, str]], score_batch) -> List[Dict]:
+    if not batch:
+        return []
+    scores = score_batch([keyword for _, keyword in batch])
+    return [
+        {"row": number, **score, "error": None}
+        for (number, _), score in zip(batch, scores.rows())
+    ]
+
+def _error_row(row: int, keyword: str, error: str) -> Dict:
+    return {"row": row, "keyword": keyword, "difficulty_score": None, "search_volume": None, "cpc": None,
+            "competition": None, "trend": None, "error": error}
+
+class ResultSpool:
+    """
+    Serialized results held in a spooled temporary file (memory, then disk)
+
+    Keeps memory constant however many rows an upload has; read back in chunks.
+    """
+
+    def __init__(self, output_format: str = "csv"):
+        self.format = output_format
+        self._file = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES, mode="w+b")
+        if output_format == "csv":
+            self._write_csv([dict(zip(OUTPUT_COLUMNS, OUTPUT_COLUMNS))])
+
+    def write(self, rows: List[Dict]):
+        if self.format == "csv":
+            self._write_csv(rows)
+        else:
+            self._file.write("".join(
+                json.dumps({"type": "error" if r["error"] else "result", **r}) + "\n" for r in rows
+            ).encode("utf-8"))
+
+    def write_progress(self, job: BulkJob):
+        """Progress line between NDJSON batches (CSV output has no place for it)"""
+        if self.format == "ndjson":
+            self._file.write((json.dumps({"type": "progress", **job.progress()}) + "\n").encode("utf-8"))
+
+    def write_summary(self, job: BulkJob):
+        """NDJSON ends with the job summary; CSV gets an error row when the upload was truncated"""
+        if self.format == "ndjson":
+            self._file.write((json.dumps({"type": "summary", **job.progress()}) + "\n").encode("utf-8"))
+        elif job.truncated:
+            self._write_csv([{"row": "", "error": f"stopped after {job.max_rows} keywords (plan limit)"}])
+
+    def iter_chunks(self, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        try:
+            self._file.seek(0)
+            while True:
+                chunk = self._file.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            self._file.close()
+
+    def close(self):
+        self._file.close()
+
+    def _write_csv(self, rows: List[Dict]):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=OUTPUT_COLUMNS, extrasaction="ignore")
+        writer.writerows(rows)
+        self._file.write(buffer.getvalue().encode("utf-8"))
+
+# Global registry
+bulk_jobs = BulkJobRegistry()
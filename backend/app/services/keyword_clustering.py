@@ -0,0 +1,188 @@
+# Keyword Clustering - MinHash signatures with LSH banding
+
+import zlib
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.services.keyword_index import get_keyword_index, tokenize, STOPWORDS
+
+NUM_PERMUTATIONS = 64
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer, applied element-wise"""
+    with np.errstate(over="ignore"):
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def _stem(word: str) -> str:
+    """Very light plural folding ("tools" -> "tool", "services" -> "service")"""
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def band_layout(threshold: float, num_permutations: int = NUM_PERMUTATIONS) -> Tuple[int, int]:
+    """(bands, rows) whose LSH threshold (1/b)^(1/r) is closest to the requested Jaccard threshold"""
+    layouts = [(num_permutations // r, r) for r in (1, 2, 4, 8, 16) if num_permutations % r == 0]
+    return min(layouts, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - threshold))
+
+class KeywordClusterer:
+    """
+    Groups keywords by estimated Jaccard similarity of their token sets
+
+    Each keyword becomes a set of word stems, character trigrams and "concept"
+    tokens (the related-keyword index bucket of each word, so words used in
+    similar contexts overlap). MinHash signatures are banded for LSH; only
+    keywords sharing a band bucket are compared, against the bucket head, and
+    pairs above the threshold are merged into connected components.
+    Every step is a NumPy pass over all keywords, so cost grows ~linearly.
+    """
+
+    def __init__(self, threshold: float = 0.5, num_permutations: int = NUM_PERMUTATIONS,
+                 use_concepts: bool = True, max_df: float = 0.05, seed: int = 11):
+        self.threshold = threshold
+        self.max_df = max_df
+        self.num_permutations = num_permutations
+        self.use_concepts = use_concepts
+        self.bands, self.rows = band_layout(threshold, num_permutations)
+        rng = np.random.default_rng(seed)
+        self._seeds = rng.integers(1, 2 ** 63, size=num_permutations, dtype=np.uint64)
+        self._band_weights = rng.integers(1, 2 ** 63, size=self.rows, dtype=np.uint64) | np.uint64(1)
+
+    def cluster(self, keywords: List[str], volumes: Optional[np.ndarray] = None) -> List[Dict]:
+        """Clusters (largest aggregate volume first) with head term, members and total volume"""
+        if not keywords:
+            return []
+        volumes = np.zeros(len(keywords), dtype=np.int64) if volumes is None else np.asarray(volumes, dtype=np.int64)
+        signatures = self.signatures(keywords)
+        labels = self._components(len(keywords), self._candidate_pairs(signatures))
+        return self._summarize(keywords, volumes, labels)
+
+    def signatures(self, keywords: List[str]) -> np.ndarray:
+        """MinHash signature matrix of shape (n, num_permutations)"""
+        tokens, lengths = self._drop_common(*self._token_arrays(keywords))
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+        signatures = np.empty((len(keywords), self.num_permutations), dtype=np.uint32)
+        for i, seed in enumerate(self._seeds):
+            permuted = _mix(tokens ^ seed) >> np.uint64(32)
+            signatures[:, i] = np.minimum.reduceat(permuted, starts)
+        return signatures
+
+    def _token_arrays(self, keywords: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """All keywords' hashed tokens as one flat array plus a token count per keyword"""
+        word_tokens: Dict[str, Tuple[int, ...]] = {}
+        keyword_words = []
+        for keyword in keywords:
+            words = [_stem(w) for w in tokenize(keyword) if w not in STOPWORDS] or tokenize(keyword) or [""]
+            for word in words:
+                if word not in word_tokens:
+                    word_tokens[word] = self._word_tokens(word)
+            keyword_words.append(words)
+
+        if self.use_concepts:
+            index = get_keyword_index()
+            if len(index):
+                for word, concept in index.concept_ids(word_tokens).items():
+                    word_tokens[word] += (zlib.crc32(f"k:{concept}".encode("utf-8")),)
+
+        lengths = np.fromiter((sum(len(word_tokens[w]) for w in words) for words in keyword_words),
+                              dtype=np.int64, count=len(keyword_words))
+        tokens = np.fromiter((t for words in keyword_words for w in words for t in word_tokens[w]),
+                             dtype=np.uint64, count=int(lengths.sum()))
+        return tokens, lengths
+
+    @staticmethod
+    def _word_tokens(word: str) -> Tuple[int, ...]:
+        """The word itself plus character trigrams of longer words (catches "research"/"researching")"""
+        tokens = [f"w:{word}"]
+        if len(word) >= 5:
+            padded = f"^{word}$"
+            tokens.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        return tuple(zlib.crc32(token.encode("utf-8")) for token in tokens)
+
+    def _drop_common(self, tokens: np.ndarray, lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Remove tokens found in more than max_df of the batch ("best", "free", "2024"...)
+        They would otherwise chain unrelated topics together; keywords made only of
+        common tokens keep theirs.
+        """
+        _, inverse, counts = np.unique(tokens, return_inverse=True, return_counts=True)
+        limit = max(5, self.max_df * len(lengths))
+        keep = counts[inverse] <= limit
+        if keep.all():
+            return tokens, lengths
+
+        owner = np.repeat(np.arange(len(lengths)), lengths)
+        kept = np.bincount(owner, weights=keep, minlength=len(lengths))
+        keep |= (kept == 0)[owner]
+        return tokens[keep], np.bincount(owner[keep], minlength=len(lengths))
+
+    def _candidate_pairs(self, signatures: np.ndarray) -> np.ndarray:
+        """Verified (head, member) pairs from keywords that share at least one LSH band"""
+        n = len(signatures)
+        pairs = []
+        for band in range(self.bands):
+            block = signatures[:, band * self.rows:(band + 1) * self.rows].astype(np.uint64)
+            with np.errstate(over="ignore"):
+                keys = _mix((block * self._band_weights).sum(axis=1, dtype=np.uint64))
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            run_start = np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))
+            heads = order[np.maximum.accumulate(np.where(run_start, np.arange(n), 0))]
+            members = ~run_start
+            if members.any():
+                pairs.append(np.stack([heads[members], order[members]], axis=1))
+        if not pairs:
+            return np.zeros((0, 2), dtype=np.int64)
+
+        # Deduplicate pairs found in several bands (encoded as one int64 each)
+        encoded = np.unique(np.concatenate(pairs) @ np.array([n, 1], dtype=np.int64))
+        candidates = np.stack([encoded // n, encoded % n], axis=1)
+        # Verify with the full signature: estimated Jaccard = share of equal minhashes
+        keep = np.zeros(len(candidates), dtype=bool)
+        for start in range(0, len(candidates), 200000):
+            chunk = candidates[start:start + 200000]
+            similarity = (signatures[chunk[:, 0]] == signatures[chunk[:, 1]]).mean(axis=1)
+            keep[start:start + len(chunk)] = similarity >= self.threshold
+        return candidates[keep]
+
+    def _components(self, n: int, pairs: np.ndarray) -> np.ndarray:
+        """Connected component label per keyword (min-label propagation with pointer jumping)"""
+        labels = np.arange(n)
+        if not len(pairs):
+            return labels
+        left, right = pairs[:, 0], pairs[:, 1]
+        while True:
+            previous = labels.copy()
+            low = np.minimum(labels[left], labels[right])
+            np.minimum.at(labels, left, low)
+            np.minimum.at(labels, right, low)
+            labels = labels[labels]
+            if np.array_equal(labels, previous):
+                return labels
+
+    def _summarize(self, keywords: List[str], volumes: np.ndarray, labels: np.ndarray) -> List[Dict]:
+        lengths = np.fromiter((len(k) for k in keywords), dtype=np.int64, count=len(keywords))
+        order = np.lexsort((lengths, -volumes, labels))
+        sorted_labels = labels[order]
+        starts = np.flatnonzero(np.concatenate(([True], sorted_labels[1:] != sorted_labels[:-1])))
+        ends = np.append(starts[1:], len(order))
+        totals = np.add.reduceat(volumes[order], starts)
+
+        clusters = []
+        for start, end, total in zip(starts.tolist(), ends.tolist(), totals.tolist()):
+            members = order[start:end]
+            head = members[0]  # highest volume (then shortest) first within a cluster
+            clusters.append({
+                "head": keywords[head],
+                "keywords": [keywords[i] for i in members],
+                "size": end - start,
+                "total_volume": total,
+                "head_volume": int(volumes[head])
+            })
+        clusters.sort(key=lambda c: (-c["total_volume"], -c["size"], c["head"]))
+        return clusters
+
+def cluster_keywords(keywords: List[str], volumes: Optional[np.ndarray] = None, threshold: float = 0.5) -> List[Dict]:
+    """Cluster keywords with a fresh MinHash/LSH clusterer"""
+    return KeywordClusterer(threshold=threshold).cluster(keywords, volumes)
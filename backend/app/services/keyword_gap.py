@@ -0,0 +1,279 @@
+# Keyword Gap Engine - set algebra over interned keyword ids per domain
+
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from app.services.keyword_metrics import normalize_keyword, read_keyword_export
+from app.settings import settings
+
+def normalize_domain(value: str) -> str:
+    """'https://www.Example.com:443/page' -> 'example.com'"""
+    domain = re.sub(r"^[a-z][a-z0-9+.-]*://", "", value.strip().lower())
+    domain = domain.split("/", 1)[0].split("?", 1)[0].split(":", 1)[0]
+    return domain[4:] if domain.startswith("www.") else domain
+
+class DomainKeywordSets:
+    """
+    Ranking keywords of many domains as sorted arrays of interned keyword ids
+
+    Every keyword string is interned once; a domain is a sorted, unique int32 id
+    array with a parallel array of its best position. A comparison scatters the
+    competitors' ids into one byte-per-keyword membership count, so gap, overlap
+    and unique-to-competitor sets are single vectorized passes, and ranking by
+    volume is one gather into the shared volume column.
+    """
+
+    def __init__(self):
+        self.keywords: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._volumes = np.zeros(0, dtype=np.float64)  # best known volume per keyword id, NaN if unknown
+        self._domains: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._urls: Dict[str, Dict[int, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._domains)
+
+    @property
+    def domains(self) -> List[str]:
+        return sorted(self._domains)
+
+    def set_domain(self, domain: str, rows: Iterable[Tuple[str, float, float, Optional[str]]]):
+        """Replace a domain's keywords with (keyword, position, search_volume, url) rows; NaN = unknown"""
+        ids, positions, volumes, urls = [], [], [], {}
+        for keyword, position, volume, url in rows:
+            keyword = normalize_keyword(keyword)
+            if not keyword:
+                continue
+            keyword_id = self._intern(keyword)
+            ids.append(keyword_id)
+            positions.append(position)
+            volumes.append(volume)
+            if url:
+                urls[keyword_id] = url
+
+        ids = np.array(ids, dtype=np.int32)
+        positions = np.array(positions, dtype=np.float32)
+        self._grow_volumes()
+        if len(ids):
+            np.fmax.at(self._volumes, ids, np.array(volumes, dtype=np.float64))
+
+        # Sort by id, best (lowest) position first, then keep one row per keyword
+        order = np.lexsort((np.where(np.isnan(positions), np.inf, positions), ids))
+        ids, positions = ids[order], positions[order]
+        first = np.concatenate(([True], ids[1:] != ids[:-1])) if len(ids) else np.zeros(0, dtype=bool)
+        self._domains[normalize_domain(domain)] = (ids[first], positions[first])
+        self._urls[normalize_domain(domain)] = urls
+
+    def has_domain(self, domain: str) -> bool:
+        return normalize_domain(domain) in self._domains
+
+    def keyword_ids(self, domain: str) -> np.ndarray:
+        ids, _ = self._domains.get(normalize_domain(domain), (np.zeros(0, dtype=np.int32), None))
+        return ids
+
+    def ids_of(self, keywords: Iterable[str]) -> np.ndarray:
+        """Sorted ids of the given keywords that are known (unknown ones cannot be in any domain)"""
+        ids = {self._ids.get(normalize_keyword(k), -1) for k in keywords}
+        ids.discard(-1)
+        return np.array(sorted(ids), dtype=np.int32)
+
+    def fill_volumes(self, estimate):
+        """Fill unknown volumes with estimate(keywords) -> volumes (stored metrics or estimates)"""
+        missing = np.flatnonzero(np.isnan(self._volumes))
+        if len(missing):
+            self._volumes[missing] = estimate([self.keywords[i] for i in missing])
+
+    def compare(self, target: str, competitors: List[str], limit: int = 100,
+                target_ids: Optional[np.ndarray] = None) -> Dict:
+        """
+        Keyword sets of `target` against `competitors`, each ranked by search volume
+
+        gaps: ranked for by at least one competitor but not the target
+        missing: ranked for by every competitor but not the target
+        overlap: ranked for by the target and at least one competitor
+        unique: per competitor, keywords no other compared domain ranks for
+        `target_ids` replaces the target's stored keywords (e.g. a user's own list).
+        """
+        competitors = [normalize_domain(c) for c in competitors]
+        mine_ids = self.keyword_ids(target) if target_ids is None else target_ids
+        theirs = [self.keyword_ids(c) for c in competitors]
+
+        # Membership over the whole id space: one byte per keyword instead of pairwise merges
+        mine = np.zeros(len(self.keywords), dtype=bool)
+        mine[mine_ids] = True
+        ranked_by = np.zeros(len(self.keywords), dtype=np.uint8)
+        for ids in theirs:
+            ranked_by[ids] += 1  # ids are unique within a domain
+        unique = {c: ids[(ranked_by[ids] == 1) & ~mine[ids]] for c, ids in zip(competitors, theirs)}
+
+        domains = [normalize_domain(target)] + competitors
+        sets = {
+            "gaps": np.flatnonzero((ranked_by > 0) & ~mine),
+            "missing": np.flatnonzero((ranked_by == len(theirs)) & ~mine) if theirs else np.zeros(0, dtype=np.int64),
+            "overlap": np.flatnonzero((ranked_by > 0) & mine)
+        }
+        result = {name: self._rows(ids, domains, limit) for name, ids in sets.items()}
+        result["unique"] = {c: self._rows(ids, domains, limit) for c, ids in unique.items()}
+        result["counts"] = {name: int(len(ids)) for name, ids in sets.items()}
+        result["counts"]["unique"] = {c: int(len(ids)) for c, ids in unique.items()}
+        result["counts"]["keywords"] = {d: int(len(self.keyword_ids(d))) for d in domains}
+        return result
+
+    def top_keywords(self, domain: str, limit: int = 10) -> List[Dict]:
+        """Best-positioned keywords of a domain (highest volume breaks ties)"""
+        domain = normalize_domain(domain)
+        ids, positions = self._domains.get(domain, (np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)))
+        order = np.lexsort((-np.nan_to_num(self._volumes[ids]), np.where(np.isnan(positions), np.inf, positions)))
+        urls = self._urls.get(domain, {})
+        return [
+            {
+                "keyword": self.keywords[keyword_id],
+                "position": None if np.isnan(positions[row]) else int(positions[row]),
+                "search_volume": int(np.nan_to_num(self._volumes[keyword_id])),
+                "url": urls.get(keyword_id)
+            }
+            for row, keyword_id in zip(order[:limit].tolist(), ids[order[:limit]].tolist())
+        ]
+
+    def stats(self) -> Dict:
+        return {
+            "domains": len(self._domains),
+            "keywords": len(self.keywords),
+            "memory_bytes": int(self._volumes.nbytes + sum(i.nbytes + p.nbytes for i, p in self._domains.values()))
+        }
+
+    def _rows(self, ids: np.ndarray, domains: List[str], limit: int) -> List[Dict]:
+        """Top `limit` ids by volume with each compared domain's position"""
+        volumes = np.nan_to_num(self._volumes[ids])
+        if len(ids) > limit:
+            best = np.argpartition(-volumes, limit - 1)[:limit] if limit > 0 else np.zeros(0, dtype=np.int64)
+        else:
+            best = np.arange(len(ids))
+        best = best[np.argsort(-volumes[best], kind="stable")]
+        top = ids[best]
+
+        positions = {}
+        for domain in domains:
+            if domain not in self._domains:
+                continue
+            domain_ids, domain_positions = self._domains[domain]
+            at = np.searchsorted(domain_ids, top)
+            found = at < len(domain_ids)
+            found[found] = domain_ids[at[found]] == top[found]
+            column = np.full(len(top), np.nan)
+            column[found] = domain_positions[at[found]]
+            positions[domain] = column
+
+        return [
+            {
+                "keyword": self.keywords[keyword_id],
+                "search_volume": int(volumes[row]),
+                "positions": {
+                    d: (None if np.isnan(positions[d][i]) else int(positions[d][i]))
+                    for d in positions
+                }
+            }
+            for i, (row, keyword_id) in enumerate(zip(best.tolist(), top.tolist()))
+        ]
+
+    def _intern(self, keyword: str) -> int:
+        keyword_id = self._ids.get(keyword)
+        if keyword_id is None:
+            keyword_id = self._ids[keyword] = len(self.keywords)
+            self.keywords.append(keyword)
+        return keyword_id
+
+    def _grow_volumes(self):
+        if len(self._volumes) < len(self.keywords):
+            grown = np.full(max(len(self.keywords), 2 * len(self._volumes)), np.nan)
+            grown[:len(self._volumes)] = self._volumes
+            self._volumes = grown
+
+def ranking_export_path(domain: str, rankings_dir: Optional[str] = None) -> str:
+    return os.path.join(rankings_dir or settings.KEYWORD_RANKINGS_DIR, f"{normalize_domain(domain)}.npz")
+
+def import_ranking_export(path: str, domain: str, rankings_dir: Optional[str] = None,
+                          location: str = "United States", language: str = "en") -> int:
+    """
+    Store a domain's organic positions export (SEMrush/Ahrefs CSV); replaces earlier
+    imports. Positions are also appended to the domain's rank history.
+    """
+    from app.services.keyword_trends import record_rankings
+
+    keywords, positions, volumes, urls = [], [], [], []
+    for record in read_keyword_export(path):
+        keywords.append(record["keyword"])
+        positions.append(record["position"])
+        volumes.append(record["search_volume"])
+        urls.append(record["url"] or "")
+
+    target = ranking_export_path(domain, rankings_dir)
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    tmp = target + ".tmp.npz"
+    np.savez(
+        tmp,
+        keywords=np.frombuffer("\n".join(keywords).encode("utf-8"), dtype=np.uint8),
+        urls=np.frombuffer("\n".join(urls).encode("utf-8"), dtype=np.uint8),
+        positions=np.array(positions, dtype=np.float32),
+        volumes=np.array(volumes, dtype=np.float64)
+    )
+    os.replace(tmp, target)
+    record_rankings(domain, zip(keywords, positions, volumes), location, language)
+    return len(keywords)
+
+def read_ranking_exports(rankings_dir: Optional[str] = None) -> Iterable[Tuple[str, List[Tuple]]]:
+    """(domain, rows) for every stored ranking export"""
+    rankings_dir = rankings_dir or settings.KEYWORD_RANKINGS_DIR
+    if not os.path.isdir(rankings_dir):
+        return
+    for name in sorted(os.listdir(rankings_dir)):
+        if not name.endswith(".npz") or name.endswith(".tmp.npz"):
+            continue
+        with np.load(os.path.join(rankings_dir, name)) as export:
+            text = export["keywords"].tobytes().decode("utf-8")
+            keywords = text.split("\n") if text else []
+            urls = export["urls"].tobytes().decode("utf-8").split("\n") if keywords else []
+            rows = list(zip(keywords, export["positions"].tolist(), export["volumes"].tolist(), urls))
+        yield name[:-len(".npz")], rows
+
+def analysis_keywords(analysis_result: Dict) -> List[str]:
+    """Target keywords recorded in a stored SEO analysis"""
+    content = (analysis_result or {}).get("content_analysis") or {}
+    return [k["keyword"] for k in content.get("keyword_analysis") or [] if k.get("keyword")]
+
+# Global instance, rebuilt from ranking exports and stored analyses by rebuild_domain_keywords()
+domain_keywords = DomainKeywordSets()
+
+async def rebuild_domain_keywords(db, rankings_dir: Optional[str] = None, location: str = "United States",
+                                  language: str = "en", batch_size: int = 500) -> DomainKeywordSets:
+    """Rebuild the global domain keyword sets from ranking exports plus keywords seen in analyses"""
+    from collections import defaultdict
+    from sqlalchemy import select
+    from app.models.seodata import SeoData
+    from app.services.keyword_service import score_keyword_batch
+
+    sets = DomainKeywordSets()
+    analysed: Dict[str, set] = defaultdict(set)
+    result = await db.stream(
+        select(SeoData.url, SeoData.analysis_result).execution_options(yield_per=batch_size)
+    )
+    async for url, analysis_result in result:
+        analysed[normalize_domain(url)].update(analysis_keywords(analysis_result))
+    rows: Dict[str, List[Tuple]] = defaultdict(list)
+    for domain, exported in read_ranking_exports(rankings_dir):
+        rows[normalize_domain(domain)].extend(exported)
+    for domain, keywords in analysed.items():
+        rows[domain].extend((k, np.nan, np.nan, None) for k in keywords)
+    for domain, domain_rows in rows.items():
+        sets.set_domain(domain, domain_rows)
+
+    # Imported metrics where known, estimates otherwise
+    sets.fill_volumes(lambda keywords: score_keyword_batch(keywords, location, language).search_volume)
+
+    global domain_keywords
+    domain_keywords = sets
+    return sets
+
+def get_domain_keywords() -> DomainKeywordSets:
+    return domain_keywords
@@ -0,0 +1,284 @@
+# Local Related-Keyword Engine - hashed vectors with an LSH nearest-neighbour index
+
+import csv
+import math
+import re
+import time
+import zlib
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+DIMENSIONS = 256
+CONTEXT_WINDOW = 5
+LEXICAL_WEIGHT = 0.4  # share of lexical (spelling) vs. distributional (context) similarity
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is",
+    "it", "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "will", "with",
+    "your", "you", "can", "more", "than", "not", "into", "use", "using", "all", "any"
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.-]*[a-z0-9+#]|[a-z0-9]")
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+def _feature(name: str) -> Tuple[int, float]:
+    """Hash a feature name to a (column, sign) pair; crc32 keeps it stable across processes"""
+    h = zlib.crc32(name.encode("utf-8"))
+    return h % DIMENSIONS, (1.0 if h & 0x80000000 else -1.0)
+
+def lexical_vector(phrase: str) -> np.ndarray:
+    """Hashed bag of words and character trigrams"""
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    for word in tokenize(phrase):
+        column, sign = _feature("w:" + word)
+        vector[column] += sign
+        padded = f"^{word}$"
+        for i in range(len(padded) - 2):
+            column, sign = _feature("c:" + padded[i:i + 3])
+            vector[column] += 0.5 * sign
+    return _normalize(vector)
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def extract_texts(value) -> Iterable[str]:
+    """Yield every string inside a stored analysis result (recommendations, keywords, AI insights...)"""
+    if isinstance(value, str):
+        if not value.startswith(("http://", "https://")):
+            yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from extract_texts(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from extract_texts(item)
+
+def load_keyword_corpus(path: str) -> List[str]:
+    """Read keywords from a plain text file (one per line) or the first/'keyword' column of a CSV"""
+    keywords = []
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            reader = csv.reader(f)
+            header = next(reader, [])
+            lowered = [h.strip().lower() for h in header]
+            column = lowered.index("keyword") if "keyword" in lowered else 0
+            if column == 0 and "keyword" not in lowered and header:
+                keywords.append(header[0])
+            for row in reader:
+                if len(row) > column:
+                    keywords.append(row[column])
+        else:
+            keywords.extend(line for line in f)
+    return [k.strip().lower() for k in keywords if k.strip()]
+
+class KeywordIndex:
+    """
+    Related-keyword index that works without any network access
+
+    Every known phrase gets a vector mixing hashed lexical features with hashed TF-IDF
+    context features (the words it co-occurs with in stored page analyses). Vectors are
+    bucketed by random-hyperplane LSH, so a query only re-ranks a few hundred candidates.
+    """
+
+    def __init__(self, n_tables: int = 8, n_bits: int = 12, seed: int = 7):
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self._planes = np.random.default_rng(seed).standard_normal(
+            (n_tables, DIMENSIONS, n_bits)
+        ).astype(np.float32)
+        self._bit_weights = (1 << np.arange(n_bits)).astype(np.int64)
+        self.phrases: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self.vectors = np.zeros((0, DIMENSIONS), dtype=np.float32)
+        self._tables: List[Dict[int, np.ndarray]] = []
+        self.built_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.phrases)
+
+    def build(self, documents: Iterable[str], corpus_keywords: Iterable[str] = (),
+              min_df: int = 2, max_ngram: int = 3, max_phrases: int = 200000) -> "KeywordIndex":
+        """Build vectors and LSH tables from free text plus an explicit keyword corpus"""
+        doc_tokens = [tokens for tokens in (tokenize(d) for d in documents) if tokens]
+        corpus = {" ".join(tokenize(k)) for k in corpus_keywords}
+        corpus.discard("")
+
+        # Phrase candidates: n-grams that recur across documents, plus the whole corpus
+        phrase_df = Counter()
+        word_df = Counter()
+        for tokens in doc_tokens:
+            word_df.update(set(tokens))
+            phrase_df.update(set(self._ngrams(tokens, max_ngram)))
+        frequent = [p for p, df in phrase_df.most_common() if df >= min_df and p not in corpus]
+        phrases = list(corpus) + frequent[:max(0, max_phrases - len(corpus))]
+
+        # Distributional features: TF-IDF weighted context words around each occurrence
+        n_docs = max(1, len(doc_tokens))
+        idf = {w: math.log(1 + n_docs / df) for w, df in word_df.items()}
+        wanted = set(phrases)
+        contexts: Dict[str, Counter] = defaultdict(Counter)
+        for tokens in doc_tokens:
+            for start, end, phrase in self._ngram_spans(tokens, max_ngram):
+                if phrase not in wanted:
+                    continue
+                window = tokens[max(0, start - CONTEXT_WINDOW):start] + tokens[end:end + CONTEXT_WINDOW]
+                contexts[phrase].update(w for w in window if w not in STOPWORDS)
+
+        vectors = np.zeros((len(phrases), DIMENSIONS), dtype=np.float32)
+        for row, phrase in enumerate(phrases):
+            context = np.zeros(DIMENSIONS, dtype=np.float32)
+            for word, count in contexts.get(phrase, {}).items():
+                column, sign = _feature("w:" + word)
+                context[column] += sign * count * idf.get(word, 1.0)
+            # Words of a corpus keyword also describe its context when it never occurs in text
+            for word in phrase.split():
+                column, sign = _feature("w:" + word)
+                context[column] += sign * idf.get(word, math.log(1 + n_docs))
+            vectors[row] = _normalize(
+                LEXICAL_WEIGHT * lexical_vector(phrase) + (1 - LEXICAL_WEIGHT) * _normalize(context)
+            )
+
+        self.phrases = phrases
+        self._ids = {p: i for i, p in enumerate(phrases)}
+        self.vectors = vectors
+        self._build_tables()
+        self.built_at = time.time()
+        return self
+
+    def nearest(self, query: str, k: int = 10, exclude_self: bool = True) -> List[Tuple[str, float]]:
+        """Approximate k nearest phrases to `query` by cosine similarity"""
+        if not self.phrases:
+            return []
+        normalized = " ".join(tokenize(query))
+        vector = self._query_vector(normalized)
+        if not vector.any():
+            return []
+
+        candidates = self._candidates(vector)
+        if len(candidates) < k * 4:
+            candidates = np.arange(len(self.phrases))
+        scores = self.vectors[candidates] @ vector
+
+        top = min(len(candidates), k + 1)
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best])]
+
+        results = []
+        for position in best:
+            phrase = self.phrases[candidates[position]]
+            if exclude_self and phrase == normalized:
+                continue
+            results.append((phrase, float(scores[position])))
+        return results[:k]
+
+    def concept_ids(self, words: Iterable[str]) -> Dict[str, int]:
+        """LSH bucket (first table) of each known word; words used in similar contexts share buckets"""
+        known = [w for w in set(words) if w in self._ids]
+        if not known or not self._tables:
+            return {}
+        signatures = self._signatures(self.vectors[[self._ids[w] for w in known]])[0]
+        return dict(zip(known, signatures.tolist()))
+
+    def stats(self) -> Dict:
+        return {
+            "phrases": len(self.phrases),
+            "dimensions": DIMENSIONS,
+            "lsh_tables": self.n_tables,
+            "lsh_bits": self.n_bits,
+            "memory_bytes": int(self.vectors.nbytes),
+            "built_at": self.built_at
+        }
+
+    def _query_vector(self, phrase: str) -> np.ndarray:
+        known = self._ids.get(phrase)
+        if known is not None:
+            return self.vectors[known]
+        # Unknown phrase: spelling features plus the vectors of its known words
+        vector = LEXICAL_WEIGHT * lexical_vector(phrase)
+        word_rows = [self._ids[w] for w in phrase.split() if w in self._ids]
+        if word_rows:
+            vector = vector + (1 - LEXICAL_WEIGHT) * _normalize(self.vectors[word_rows].sum(axis=0))
+        return _normalize(vector.astype(np.float32))
+
+    def _signatures(self, vectors: np.ndarray) -> np.ndarray:
+        """LSH bucket id per table: shape (n_tables, n_vectors)"""
+        bits = np.einsum("nd,tdb->tnb", vectors, self._planes) > 0
+        return bits.astype(np.int64) @ self._bit_weights
+
+    def _build_tables(self):
+        self._tables = []
+        if not len(self.phrases):
+            return
+        for signatures in self._signatures(self.vectors):
+            order = np.argsort(signatures, kind="stable")
+            buckets, starts = np.unique(signatures[order], return_index=True)
+            groups = np.split(order, starts[1:])
+            self._tables.append(dict(zip(buckets.tolist(), groups)))
+
+    def _candidates(self, vector: np.ndarray) -> np.ndarray:
+        """Union of the query's buckets and their one-bit neighbours across all tables"""
+        signatures = self._signatures(vector[None, :])[:, 0]
+        found = []
+        for table, signature in zip(self._tables, signatures.tolist()):
+            for probe in [signature] + [signature ^ (1 << b) for b in range(self.n_bits)]:
+                ids = table.get(probe)
+                if ids is not None:
+                    found.append(ids)
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+    def _ngrams(self, tokens: List[str], max_ngram: int) -> Iterable[str]:
+        for _, _, phrase in self._ngram_spans(tokens, max_ngram):
+            yield phrase
+
+    def _ngram_spans(self, tokens: List[str], max_ngram: int) -> Iterable[Tuple[int, int, str]]:
+        for start in range(len(tokens)):
+            if tokens[start] in STOPWORDS:
+                continue
+            for end in range(start + 1, min(len(tokens), start + max_ngram) + 1):
+                if tokens[end - 1] in STOPWORDS:
+                    continue
+                phrase = " ".join(tokens[start:end])
+                if len(phrase) >= 3 and not phrase.isdigit():
+                    yield start, end, phrase
+
+# Global instance, rebuilt from stored analyses by rebuild_keyword_index()
+keyword_index = KeywordIndex()
+
+async def rebuild_keyword_index(db, corpus_path: Optional[str] = None, batch_size: int = 500) -> KeywordIndex:
+    """Rebuild the global index from stored analysis results and the keyword corpus file"""
+    import asyncio
+    from sqlalchemy import select
+    from app.models.seodata import SeoData
+    from app.settings import settings
+
+    documents: List[str] = []
+    result = await db.stream(
+        select(SeoData.analysis_result).execution_options(yield_per=batch_size)
+    )
+    async for (analysis_result,) in result:
+        documents.extend(extract_texts(analysis_result or {}))
+
+    corpus: List[str] = []
+    corpus_path = corpus_path or settings.KEYWORD_CORPUS_PATH
+    if corpus_path:
+        try:
+            corpus = load_keyword_corpus(corpus_path)
+        except OSError as e:
+            print(f"Keyword corpus not loaded: {e}")
+
+    # Building is CPU bound; keep the event loop responsive
+    index = await asyncio.to_thread(KeywordIndex().build, documents, corpus)
+
+    global keyword_index
+    keyword_index = index
+    return index
+
+def get_keyword_index() -> KeywordIndex:
+    """Current global index (rebuilt indexes replace it atomically)"""
+    return keyword_index
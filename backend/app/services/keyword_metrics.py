@@ -0,0 +1,448 @@
+# Keyword Metrics Store - imported search volume, CPC, difficulty and trends
+
+import csv
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from app.settings import settings
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+CHUNK_ROWS = 100000
+
+# Export header names (lower-cased) mapped to store columns, first match wins
+COLUMN_ALIASES = {
+    "keyword": ["keyword", "keywords", "search term"],
+    "search_volume": ["avg. monthly searches", "search volume", "volume", "avg. search volume"],
+    "cpc": ["cpc", "cpc (usd)", "cpc usd"],
+    "cpc_low": ["top of page bid (low range)"],
+    "cpc_high": ["top of page bid (high range)"],
+    "difficulty": ["keyword difficulty", "keyword difficulty index", "kd %", "kd", "difficulty",
+                   "competition (indexed value)"],
+    "trend": ["trend", "trends"],
+    "position": ["position", "pos.", "rank", "current position"],
+    "url": ["url", "landing page", "ranking url"]
+}
+
+def normalize_keyword(keyword: str) -> str:
+    return " ".join(keyword.lower().split())
+
+def locale_key(location: Optional[str], language: Optional[str]) -> str:
+    return f"{(location or '').strip().lower()}|{(language or '').strip().lower()}"
+
+def keyword_hash(keyword: str, locale: str) -> int:
+    """Stable 64-bit hash of a normalized keyword within a locale"""
+    digest = hashlib.blake2b(f"{locale}\x00{keyword}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+def _parse_number(value: Optional[str]) -> float:
+    """Parse export numbers like '1,300', '$2.40', '45%', '1K – 10K' (ranges use the midpoint)"""
+    if value is None:
+        return float("nan")
+    text = value.strip().replace(",", "").replace("$", "").replace("%", "")
+    if not text or text in ("-", "n/a"):
+        return float("nan")
+    parts = re.split(r"\s*[–-]\s*", text) if re.search(r"[0-9kKmM]\s*[–-]\s*\d", text) else [text]
+    numbers = []
+    for part in parts:
+        match = re.fullmatch(r"([0-9]*\.?[0-9]+)\s*([kKmM]?)", part.strip())
+        if not match:
+            return float("nan")
+        multiplier = {"k": 1e3, "m": 1e6}.get(match.group(2).lower(), 1)
+        numbers.append(float(match.group(1)) * multiplier)
+    return sum(numbers) / len(numbers)
+
+def read_keyword_export(path: str) -> Iterator[Dict]:
+    """
+    Stream rows of a Keyword Planner or SEMrush export as store records
+
+    Keyword Planner files are UTF-16 and tab separated with a title preamble and
+    "Searches: Mon YYYY" columns; SEMrush files are plain CSV with a relative "Trend".
+    """
+    with open(path, "rb") as f:
+        encoding = "utf-16" if f.read(2) in (b"\xff\xfe", b"\xfe\xff") else "utf-8-sig"
+
+    with open(path, encoding=encoding, newline="") as f:
+        # Skip report titles until the row that names a keyword column
+        header = None
+        for _ in range(20):
+            line = f.readline()
+            if not line:
+                break
+            delimiter = max("\t,;", key=line.count)
+            cells = [h.strip().lower() for h in next(csv.reader([line], delimiter=delimiter), [])]
+            if any(cell in COLUMN_ALIASES["keyword"] for cell in cells):
+                header = cells
+                break
+        if header is None:
+            raise ValueError(f"No keyword column found in {path}")
+
+        columns = {
+            name: next((header.index(alias) for alias in aliases if alias in header), None)
+            for name, aliases in COLUMN_ALIASES.items()
+        }
+        month_columns = {}
+        month_dates = {}
+        now = datetime.utcnow()
+        current_month = now.month - 1
+        for i, name in enumerate(header):
+            match = re.match(r"searches:\s*([a-z]{3})\s*(\d{4})?", name)
+            if match and match.group(1).title() in MONTHS:
+                month = MONTHS.index(match.group(1).title())
+                month_columns[month] = i
+                if match.group(2):
+                    month_dates[i] = (int(match.group(2)), month + 1)
+
+        def cell(row, name):
+            index = columns[name]
+            return row[index] if index is not None and index < len(row) else None
+
+        for row in csv.reader(f, delimiter=delimiter):
+            keyword = cell(row, "keyword")
+            if not keyword or not keyword.strip():
+                continue
+            volume = _parse_number(cell(row, "search_volume"))
+
+            cpc = _parse_number(cell(row, "cpc"))
+            if np.isnan(cpc):
+                bids = [b for b in (_parse_number(cell(row, "cpc_low")), _parse_number(cell(row, "cpc_high")))
+                        if not np.isnan(b)]
+                cpc = sum(bids) / len(bids) if bids else float("nan")
+
+            trend = [float("nan")] * 12
+            history = []  # dated (year, month, volume) points for the trend store
+            if month_columns:
+                for month, index in month_columns.items():
+                    if index < len(row):
+                        trend[month] = _parse_number(row[index])
+                        if index in month_dates and not np.isnan(trend[month]):
+                            history.append(month_dates[index] + (trend[month],))
+            elif cell(row, "trend") and not np.isnan(volume):
+                # SEMrush: 12 values relative to the peak month, ending with the current month
+                relative = [_parse_number(v) for v in cell(row, "trend").split(",")][-12:]
+                peak_volume = volume / max(np.nanmean(relative), 1e-9) if relative else 0
+                for offset, value in enumerate(relative):
+                    back = len(relative) - 1 - offset
+                    trend[(current_month - back) % 12] = value * peak_volume
+                    if not np.isnan(value):
+                        year, month = divmod(now.year * 12 + current_month - back, 12)
+                        history.append((year, month + 1, value * peak_volume))
+
+            yield {
+                "keyword": normalize_keyword(keyword),
+                "search_volume": volume,
+                "cpc": cpc,
+                "difficulty": _parse_number(cell(row, "difficulty")),
+                "trend": trend,
+                "history": history,
+                "position": _parse_number(cell(row, "position")),
+                "url": (cell(row, "url") or "").strip() or None
+            }
+
+class KeywordMetricsStore:
+    """
+    Read-only columnar keyword metrics, memory-mapped from disk
+
+    Each column is a .npy file (keywords as one UTF-8 blob plus offsets), so opening
+    a store with millions of keywords costs almost nothing until rows are read.
+    Exact-match lookups go through an open-addressing hash table keyed by
+    (keyword, location, language); batch lookups probe it with NumPy arrays.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.meta: Dict = {"rows": 0, "locales": [], "max_probe": 0}
+        self.locales: List[str] = []
+        self._locale_ids: Dict[str, int] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+        if path and os.path.exists(os.path.join(path, "meta.json")):
+            self._load(path)
+
+    def __len__(self) -> int:
+        return int(self.meta["rows"])
+
+    def _load(self, path: str):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.locales = self.meta["locales"]
+        self._locale_ids = {locale: i for i, locale in enumerate(self.locales)}
+        for name in ("hash", "search_volume", "cpc", "difficulty", "trend", "locale",
+                     "keyword_offsets", "keyword_bytes", "table"):
+            self._columns[name] = np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+    def keyword(self, row: int) -> str:
+        offsets = self._columns["keyword_offsets"]
+        return bytes(self._columns["keyword_bytes"][offsets[row]:offsets[row + 1]]).decode("utf-8")
+
+    def find_rows(self, keywords: List[str], location: Optional[str] = None,
+                  language: Optional[str] = None) -> np.ndarray:
+        """Row number per keyword, -1 where the keyword is not in the store"""
+        rows = np.full(len(keywords), -1, dtype=np.int64)
+        locale = locale_key(location, language)
+        if not len(self) or locale not in self._locale_ids or not len(keywords):
+            return rows
+
+        table = self._columns["table"]
+        hashes = self._columns["hash"]
+        mask = np.uint64(len(table) - 1)
+        wanted = np.fromiter((keyword_hash(normalize_keyword(k), locale) for k in keywords),
+                             dtype=np.uint64, count=len(keywords))
+        slots = (wanted & mask).astype(np.int64)
+        active = np.arange(len(keywords))
+        for _ in range(int(self.meta["max_probe"]) + 1):
+            if not len(active):
+                break
+            found = np.asarray(table[slots[active]])
+            occupied = found >= 0
+            hit = occupied.copy()
+            hit[occupied] = np.asarray(hashes[found[occupied]]) == wanted[active[occupied]]
+            rows[active[hit]] = found[hit]
+            active = active[occupied & ~hit]
+            slots[active] = (slots[active] + 1) & int(mask)
+        return rows
+
+    def lookup_many(self, keywords: List[str], location: Optional[str] = None,
+                    language: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """Metric columns for a batch of keywords, NaN where unknown"""
+        rows = self.find_rows(keywords, location, language)
+        found = rows >= 0
+        result = {
+            "found": found,
+            "search_volume": np.full(len(keywords), np.nan),
+            "cpc": np.full(len(keywords), np.nan),
+            "difficulty": np.full(len(keywords), np.nan),
+            "trend": np.full((len(keywords), 12), np.nan)
+        }
+        if found.any():
+            present = rows[found]
+            for name in ("search_volume", "cpc", "difficulty", "trend"):
+                result[name][found] = self._columns[name][present]
+        return result
+
+    def lookup(self, keyword: str, location: Optional[str] = None,
+               language: Optional[str] = None) -> Optional[Dict]:
+        """Metrics of a single keyword, or None"""
+        metrics = self.lookup_many([keyword], location, language)
+        if not metrics["found"][0]:
+            return None
+        return {
+            "keyword": normalize_keyword(keyword),
+            "search_volume": float(metrics["search_volume"][0]),
+            "cpc": float(metrics["cpc"][0]),
+            "difficulty": float(metrics["difficulty"][0]),
+            "trend": metrics["trend"][0].tolist()
+        }
+
+    def stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "rows": len(self),
+            "locales": self.locales,
+            "max_probe": self.meta.get("max_probe", 0),
+            "imported_at": self.meta.get("imported_at"),
+            "disk_bytes": sum(int(column.nbytes) for column in self._columns.values())
+        }
+
+    def keyword_volumes(self) -> Iterator[Tuple[str, int]]:
+        """(keyword, search volume) for every row, 0 where the volume is unknown"""
+        offsets = self._columns.get("keyword_offsets")
+        for start in range(0, len(self), CHUNK_ROWS):
+            stop = min(start + CHUNK_ROWS, len(self))
+            blob = bytes(self._columns["keyword_bytes"][offsets[start]:offsets[stop]])
+            bounds = (offsets[start:stop + 1] - offsets[start]).tolist()
+            volumes = np.nan_to_num(self._columns["search_volume"][start:stop]).astype(np.int64).tolist()
+            for i, volume in enumerate(volumes):
+                yield blob[bounds[i]:bounds[i + 1]].decode("utf-8"), volume
+
+    def iter_records(self) -> Iterator[Dict]:
+        """Every stored row as an import record (used when merging a new import)"""
+        offsets = self._columns.get("keyword_offsets")
+        for start in range(0, len(self), CHUNK_ROWS):
+            stop = min(start + CHUNK_ROWS, len(self))
+            blob = bytes(self._columns["keyword_bytes"][offsets[start]:offsets[stop]])
+            bounds = (offsets[start:stop + 1] - offsets[start]).tolist()
+            columns = zip(
+                self._columns["locale"][start:stop].tolist(),
+                self._columns["search_volume"][start:stop].tolist(),
+                self._columns["cpc"][start:stop].tolist(),
+                self._columns["difficulty"][start:stop].tolist(),
+                self._columns["trend"][start:stop].tolist()
+            )
+            for i, (locale, volume, cpc, difficulty, trend) in enumerate(columns):
+                yield {
+                    "keyword": blob[bounds[i]:bounds[i + 1]].decode("utf-8"),
+                    "locale": self.locales[locale],
+                    "search_volume": volume,
+                    "cpc": cpc,
+                    "difficulty": difficulty,
+                    "trend": trend
+                }
+
+def write_store(path: str, records: Iterable[Dict]) -> Dict:
+    """
+    Write records (each with a "locale") as a new store version and make it current
+
+    Later records replace earlier ones with the same keyword and locale. Versions are
+    written side by side and switched by atomically replacing the CURRENT pointer.
+    """
+    os.makedirs(path, exist_ok=True)
+    version = f"v{int(time.time() * 1000)}"
+    target = os.path.join(path, version)
+    os.makedirs(target)
+
+    locales: Dict[str, int] = {}
+    chunks: Dict[str, List[np.ndarray]] = {name: [] for name in
+                                           ("hash", "search_volume", "cpc", "difficulty", "trend", "locale", "length")}
+    blob = bytearray()
+
+    def flush(buffer: Dict[str, list]):
+        if buffer["hash"]:
+            chunks["hash"].append(np.array(buffer["hash"], dtype=np.uint64))
+            chunks["search_volume"].append(np.array(buffer["search_volume"], dtype=np.float64))
+            chunks["cpc"].append(np.array(buffer["cpc"], dtype=np.float32))
+            chunks["difficulty"].append(np.array(buffer["difficulty"], dtype=np.float32))
+            chunks["trend"].append(np.array(buffer["trend"], dtype=np.float32).reshape(-1, 12))
+            chunks["locale"].append(np.array(buffer["locale"], dtype=np.uint16))
+            chunks["length"].append(np.array(buffer["length"], dtype=np.int64))
+        for values in buffer.values():
+            values.clear()
+
+    buffer: Dict[str, list] = {name: [] for name in chunks}
+    for record in records:
+        locale = record["locale"]
+        encoded = record["keyword"].encode("utf-8")
+        buffer["hash"].append(keyword_hash(record["keyword"], locale))
+        buffer["search_volume"].append(record["search_volume"])
+        buffer["cpc"].append(record["cpc"])
+        buffer["difficulty"].append(record["difficulty"])
+        buffer["trend"].append(record["trend"])
+        buffer["locale"].append(locales.setdefault(locale, len(locales)))
+        buffer["length"].append(len(encoded))
+        blob.extend(encoded)
+        if len(buffer["hash"]) >= CHUNK_ROWS:
+            flush(buffer)
+    flush(buffer)
+
+    dtypes = {"hash": np.uint64, "search_volume": np.float64, "cpc": np.float32, "difficulty": np.float32,
+              "trend": np.float32, "locale": np.uint16, "length": np.int64}
+    columns = {
+        name: (np.concatenate(parts) if parts else np.zeros((0, 12) if name == "trend" else 0, dtype=dtypes[name]))
+        for name, parts in chunks.items()
+    }
+    lengths = columns.pop("length").astype(np.int64)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    # Keep the last occurrence of every (keyword, locale)
+    hashes = columns["hash"]
+    _, last_reversed = np.unique(hashes[::-1], return_index=True)
+    keep = np.sort(len(hashes) - 1 - last_reversed)
+    if len(keep) < len(hashes):
+        blob = bytearray(b"".join(bytes(blob[offsets[i]:offsets[i + 1]]) for i in keep))
+        lengths = lengths[keep]
+        offsets = np.zeros(len(keep) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        columns = {name: values[keep] for name, values in columns.items()}
+
+    table, max_probe = _build_hash_table(columns["hash"])
+    columns["keyword_offsets"] = offsets
+    columns["keyword_bytes"] = np.frombuffer(bytes(blob), dtype=np.uint8)
+    columns["table"] = table
+    for name, values in columns.items():
+        np.save(os.path.join(target, f"{name}.npy"), values)
+
+    meta = {
+        "rows": int(len(columns["hash"])),
+        "locales": sorted(locales, key=locales.get),
+        "max_probe": max_probe,
+        "imported_at": datetime.utcnow().isoformat()
+    }
+    with open(os.path.join(target, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    pointer = os.path.join(path, "CURRENT")
+    with open(pointer + ".tmp", "w") as f:
+        f.write(version)
+    os.replace(pointer + ".tmp", pointer)
+
+    # Older versions are no longer referenced (open mmaps keep their files alive on POSIX)
+    for name in os.listdir(path):
+        if name.startswith("v") and name != version:
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+    return meta
+
+def _build_hash_table(hashes: np.ndarray):
+    """Open-addressing table (linear probing, load factor <= 0.5) of row numbers"""
+    size = 1 << max(4, int(2 * len(hashes)).bit_length())
+    mask = np.uint64(size - 1)
+    table = np.full(size, -1, dtype=np.int64)
+    slots = (hashes & mask).astype(np.int64)
+    pending = np.arange(len(hashes))
+    probes = 0
+    while len(pending):
+        wanted = slots[pending]
+        free = np.flatnonzero(table[wanted] == -1)
+        free_slots, first = np.unique(wanted[free], return_index=True)
+        placed = free[first]
+        table[free_slots] = pending[placed]
+        remaining = np.ones(len(pending), dtype=bool)
+        remaining[placed] = False
+        pending = pending[remaining]
+        if len(pending):
+            probes += 1
+            slots[pending] = (slots[pending] + 1) & int(mask)
+    return table, probes
+
+def open_store(path: str) -> KeywordMetricsStore:
+    """Open the current version of the store at `path` (empty if nothing was imported)"""
+    pointer = os.path.join(path, "CURRENT")
+    if not os.path.exists(pointer):
+        return KeywordMetricsStore()
+    with open(pointer) as f:
+        return KeywordMetricsStore(os.path.join(path, f.read().strip()))
+
+def import_keyword_exports(paths: List[str], location: str, language: str,
+                           store_dir: Optional[str] = None) -> Dict:
+    """Merge one or more exports into the store; rows in the exports win over stored ones"""
+    store_dir = store_dir or settings.KEYWORD_METRICS_DIR
+    existing = open_store(store_dir)
+    locale = locale_key(location, language)
+
+    def records():
+        yield from existing.iter_records()
+        for path in paths:
+            for record in read_keyword_export(path):
+                record["locale"] = locale
+                yield record
+
+    meta = write_store(store_dir, records())
+    reload_keyword_metrics_store()
+    return meta
+
+def pointer_stamp(path: str) -> Optional[Tuple[int, int]]:
+    """Identity of the CURRENT pointer under path (changes whenever a new version is published), None if absent"""
+    try:
+        pointer = os.stat(os.path.join(path, "CURRENT"))
+    except FileNotFoundError:
+        return None
+    return pointer.st_ino, pointer.st_mtime_ns  # os.replace() installs a new inode every time
+
+# Global instance, opened lazily and reopened when another process publishes a version
+_store: Optional[KeywordMetricsStore] = None
+_store_stamp: Optional[Tuple[int, int]] = None
+
+def get_keyword_metrics_store() -> KeywordMetricsStore:
+    if _store is None or pointer_stamp(settings.KEYWORD_METRICS_DIR) != _store_stamp:
+        return reload_keyword_metrics_store()
+    return _store
+
+def reload_keyword_metrics_store() -> KeywordMetricsStore:
+    global _store, _store_stamp
+    _store_stamp = pointer_stamp(settings.KEYWORD_METRICS_DIR)  # read first: a newer publish triggers another reload
+    _store = open_store(settings.KEYWORD_METRICS_DIR)
+    return _store
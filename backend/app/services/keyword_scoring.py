@@ -0,0 +1,135 @@
+# Bulk Keyword Scoring - vectorized difficulty, volume and CPC estimates
+
+import zlib
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+
+COMMERCIAL_TERMS = ['buy', 'price', 'cost', 'service', 'software', 'tool']
+HIGH_VOLUME_TERMS = ['seo', 'marketing', 'business']
+COMPETITION_LEVELS = np.array(["low", "medium", "high"])
+TREND_MONTHS = 12
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer, applied element-wise"""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def keyword_noise(keywords: np.ndarray, columns: int) -> np.ndarray:
+    """
+    Uniform [0, 1) values of shape (n, columns) derived from each keyword's hash
+
+    The same keyword always gets the same values, so estimates are stable across
+    requests and processes instead of changing on every call.
+    """
+    seeds = np.fromiter((zlib.crc32(k.encode("utf-8")) for k in keywords), dtype=np.uint64, count=len(keywords))
+    offsets = np.arange(1, columns + 1, dtype=np.uint64) * _GOLDEN
+    with np.errstate(over="ignore"):
+        mixed = _mix(seeds[:, None] + offsets[None, :])
+    return (mixed >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+def _contains_any(keywords: np.ndarray, terms: List[str]) -> np.ndarray:
+    hits = np.zeros(len(keywords), dtype=bool)
+    for term in terms:
+        hits |= np.char.find(keywords, term) >= 0
+    return hits
+
+class KeywordScores:
+    """
+    Column-oriented scoring results for a batch of keywords
+
+    Rows are only turned into dicts when they are read, in slices, so a large batch
+    can be streamed to the client without materialising one object per keyword.
+    """
+
+    def __init__(self, keywords: np.ndarray, difficulty: np.ndarray, search_volume: np.ndarray,
+                 cpc: np.ndarray, trend: np.ndarray):
+        self.keywords = keywords
+        self.difficulty = difficulty
+        self.search_volume = search_volume
+        self.cpc = cpc
+        self.trend = trend
+        self.competition = COMPETITION_LEVELS[np.searchsorted([30, 70], difficulty, side="right")]
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def rows(self, start: int = 0, stop: Optional[int] = None) -> List[Dict]:
+        """Rows [start, stop) as KeywordDifficulty-shaped dicts"""
+        window = slice(start, stop)
+        return [
+            {
+                "keyword": keyword,
+                "difficulty_score": difficulty,
+                "search_volume": volume,
+                "cpc": cpc,
+                "competition": competition,
+                "trend": trend
+            }
+            for keyword, difficulty, volume, cpc, competition, trend in zip(
+                self.keywords[window].tolist(),
+                self.difficulty[window].tolist(),
+                self.search_volume[window].tolist(),
+                self.cpc[window].tolist(),
+                self.competition[window].tolist(),
+                self.trend[window].tolist()
+            )
+        ]
+
+    def iter_batches(self, batch_size: int = 1000) -> Iterator[List[Dict]]:
+        for start in range(0, len(self), batch_size):
+            yield self.rows(start, start + batch_size)
+
+def score_keywords(keywords: List[str], search_volume: Optional[np.ndarray] = None,
+                   cpc: Optional[np.ndarray] = None, difficulty: Optional[np.ndarray] = None,
+                   trend: Optional[np.ndarray] = None) -> KeywordScores:
+    """
+    Score a batch of keywords in one pass over NumPy feature arrays
+
+    `search_volume`, `cpc`, `difficulty` and `trend` (n x 12) may carry known values
+    (NaN where unknown); only the missing entries are estimated from the features.
+    """
+    raw = np.array(keywords, dtype=str)
+    normalized = np.char.lower(np.char.strip(raw))
+    n = len(normalized)
+    if n == 0:
+        empty = np.zeros(0)
+        return KeywordScores(raw, empty, empty.astype(np.int64), empty, np.zeros((0, TREND_MONTHS), dtype=np.int64))
+
+    # Features
+    word_count = np.char.count(np.char.strip(normalized), " ") + 1
+    commercial = _contains_any(normalized, COMMERCIAL_TERMS)
+    high_volume = _contains_any(normalized, HIGH_VOLUME_TERMS)
+    noise = keyword_noise(normalized, 3 + TREND_MONTHS)
+
+    # Shorter keywords are generally more difficult
+    base_difficulty = np.maximum(20, 100 - word_count * 15)
+    estimated_difficulty = np.clip(base_difficulty + (noise[:, 0] * 40 - 20), 1, 100)
+
+    base_volume = np.maximum(100, 10000 // (word_count * 2)) * np.where(high_volume, 2, 1)
+    low, high = base_volume // 2, base_volume * 2
+    estimated_volume = low + np.floor(noise[:, 1] * (high - low + 1))
+
+    base_cpc = np.where(commercial, 3.0, 1.0)
+    estimated_cpc = np.round(base_cpc * (0.3 + noise[:, 2] * 1.7), 2)
+
+    if search_volume is not None:
+        estimated_volume = np.where(np.isnan(search_volume), estimated_volume, search_volume)
+    if cpc is not None:
+        estimated_cpc = np.where(np.isnan(cpc), estimated_cpc, np.round(cpc, 2))
+    if difficulty is not None:
+        estimated_difficulty = np.where(np.isnan(difficulty), estimated_difficulty, difficulty)
+
+    estimated_trend = 50 + np.floor(noise[:, 3:] * 101)
+    if trend is not None:
+        estimated_trend = np.where(np.isnan(trend), estimated_trend, trend)
+
+    return KeywordScores(
+        raw,
+        np.round(estimated_difficulty, 2),
+        estimated_volume.astype(np.int64),
+        estimated_cpc,
+        np.round(estimated_trend).astype(np.int64)
+    )
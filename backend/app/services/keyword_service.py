@@ -1,14 +1,35 @@
 # Keyword Analysis and Research Service
 
+import asyncio
+import math
 import re
+import numpy as np
 import requests
-from typing import List, Dict, Optional
+import time
+from collections import Counter, OrderedDict
+from bisect import bisect_right
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Optional, Tuple
 from app.schemas.keyword import (
     KeywordRequest, KeywordResearch, KeywordSuggestion, 
     KeywordDifficulty, CompetitorAnalysis, CompetitorKeyword
 )
+from app.services.keyword_autocomplete import add_research_keywords, add_suggestions
+from app.services.keyword_clustering import cluster_keywords
+from app.services.keyword_gap import DomainKeywordSets, get_domain_keywords, normalize_domain
+from app.services.keyword_index import get_keyword_index
+from app.services.keyword_metrics import get_keyword_metrics_store, KeywordMetricsStore, MONTHS, normalize_keyword
+from app.services.keyword_scoring import score_keywords, KeywordScores
+from app.services.keyword_trends import get_keyword_trend_store, KeywordTrendStore, series_key, to_day
+from app.services.llm_gateway import llm_gateway
+from app.services.llm_telemetry import llm_telemetry
+from app.services.single_flight import SingleFlight
+from app.settings import settings
 import random
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+
+RESEARCH_SECTIONS = ("related_keywords", "long_tail_keywords", "questions", "suggested_content_topics")
+RELATED_KEYWORD_LIMIT = 15
+AI_KEYWORD_LIMIT = 5  # AI suggestions merged into related keywords
 
 class KeywordAnalyzer:
     """
@@ -23,47 +44,75 @@ class KeywordAnalyzer:
     that can be easily extended with real API integrations.
     """
     
-    def __init__(self):
+    def __init__(self, metrics_store: Optional[KeywordMetricsStore] = None,
+                 trend_store: Optional[KeywordTrendStore] = None):
         # In production, store these in environment variables
         self.api_keys = {
             'google': None,  # Google Ads API key
             'semrush': None,  # SEMrush API key
             'ahrefs': None,   # Ahrefs API key
         }
+        # Imported Keyword Planner / SEMrush metrics; estimates fill the gaps
+        self.metrics_store = metrics_store if metrics_store is not None else get_keyword_metrics_store()
+        # Dated volume history (monthly searches, rank tracking) takes precedence over both
+        self.trend_store = trend_store if trend_store is not None else get_keyword_trend_store()
     
     async def research_keyword(self, request: KeywordRequest) -> KeywordResearch:
         """Perform comprehensive keyword research"""
         keyword = request.keyword.lower().strip()
-        
-        # Simulate keyword data (replace with real API calls)
-        search_volume = self._estimate_search_volume(keyword)
-        difficulty_score = self._calculate_difficulty(keyword)
-        cpc = self._estimate_cpc(keyword)
-        
-        # Generate related keywords
-        related_keywords = await self._find_related_keywords(keyword)
-        long_tail_keywords = await self._find_long_tail_keywords(keyword)
-        questions = await self._find_keyword_questions(keyword)
-        content_topics = await self._suggest_content_topics(keyword)
-        
-        # Generate seasonal trends (simulated)
-        seasonal_trends = self._generate_seasonal_trends()
-        
-        return KeywordResearch(
-            main_keyword=keyword,
-            search_volume=search_volume,
-            difficulty_score=difficulty_score,
-            cpc=cpc,
-            competition_level=self._get_competition_level(difficulty_score),
-            seasonal_trends=seasonal_trends,
-            related_keywords=related_keywords,
-            long_tail_keywords=long_tail_keywords,
-            questions=questions,
-            suggested_content_topics=content_topics
-        )
+        summary = self._research_summary(keyword, request.location, request.language)
+        
+        # The sources are independent; run them concurrently
+        sections = self._research_sources(keyword)
+        results = dict(zip(sections, await asyncio.gather(*sections.values())))
+        
+        # Candidates are plain records; only the kept ones become KeywordSuggestion models
+        related = RankedSuggestions(RELATED_KEYWORD_LIMIT, exclude=(keyword,))
+        for candidate in results["related_keywords"]:
+            related.add(candidate)
+        kept = related.items() + results["long_tail_keywords"]
+        self._apply_stored_metrics(kept, request.location, request.language)
+        results["related_keywords"] = related.suggestions()
+        results["long_tail_keywords"] = [c.to_suggestion() for c in results["long_tail_keywords"]]
+        
+        return KeywordResearch(**summary, **results)
+    
+    def _research_summary(self, keyword: str, location: Optional[str], language: Optional[str]) -> Dict:
+        """Metrics of the main keyword: stored when it was imported, estimated otherwise"""
+        scores = self._score_keywords([keyword], location, language)
+        difficulty_score = float(scores.difficulty[0])
+        return {
+            "main_keyword": keyword,
+            "search_volume": int(scores.search_volume[0]),
+            "difficulty_score": difficulty_score,
+            "cpc": float(scores.cpc[0]),
+            "competition_level": self._get_competition_level(difficulty_score),
+            "seasonal_trends": self._seasonal_trends(keyword, location, language)
+        }
+    
+    def _research_sources(self, keyword: str) -> Dict[str, Awaitable]:
+        """One coroutine per KeywordResearch section"""
+        return {
+            "related_keywords": self._find_related_keywords(keyword),
+            "long_tail_keywords": self._find_long_tail_keywords(keyword),
+            "questions": self._find_keyword_questions(keyword),
+            "suggested_content_topics": self._suggest_content_topics(keyword)
+        }
+    
+    def _seasonal_trends(self, keyword: str, location: Optional[str], language: Optional[str]) -> List[Dict]:
+        """Seasonal trends from stored volume history (simulated when unknown)"""
+        monthly = self._monthly_searches([keyword], location, language)[0]
+        if not np.isnan(monthly).any():
+            return self._seasonal_trends_from(monthly.tolist())
+        return self._generate_seasonal_trends()
     
     async def analyze_competitor_keywords(self, domain: str, user_keywords: List[str] = None) -> CompetitorAnalysis:
         """Analyze competitor's keyword strategy"""
+        # Imported ranking exports and stored analyses for this domain, when there are any
+        domain_sets = get_domain_keywords()
+        if domain_sets.has_domain(domain):
+            return self._stored_competitor_analysis(domain_sets, domain, user_keywords)
+        
         # In production, this would use real APIs like SEMrush or Ahrefs
         
         # Simulate competitor data
@@ -90,8 +139,9 @@ class KeywordAnalyzer:
         # Find keyword gaps (keywords competitor ranks for but user doesn't)
         keyword_gaps = []
         if user_keywords:
+            known = {normalize_keyword(kw) for kw in user_keywords}
             for kw in sample_keywords:
-                if kw not in user_keywords:
+                if kw not in known:
                     keyword_gaps.append(KeywordSuggestion(
                         keyword=kw,
                         search_volume=random.randint(500, 5000),
@@ -100,56 +150,136 @@ class KeywordAnalyzer:
                         cpc=random.uniform(0.5, 5.0)
                     ))
         
-        content_gaps = [
-            f"Complete guide to {domain.split('.')[0]}",
-            f"Best practices for {domain.split('.')[0]}",
-            f"How to improve {domain.split('.')[0]} results",
-            f"{domain.split('.')[0]} vs competitors comparison"
-        ]
-        
         return CompetitorAnalysis(
             domain=domain,
             organic_keywords=organic_keywords,
             paid_keywords=paid_keywords,
             top_organic_keywords=top_keywords,
             keyword_gaps=keyword_gaps[:10],
-            content_gaps=content_gaps
+            content_gaps=self._content_gaps(domain)
         )
     
-    async def batch_keyword_difficulty(self, keywords: List[str]) -> List[KeywordDifficulty]:
-        """Analyze difficulty for multiple keywords"""
-        results = []
-        
-        for keyword in keywords:
-            difficulty = KeywordDifficulty(
-                keyword=keyword,
-                difficulty_score=self._calculate_difficulty(keyword),
-                search_volume=self._estimate_search_volume(keyword),
-                cpc=self._estimate_cpc(keyword),
-                competition=self._get_competition_level(self._calculate_difficulty(keyword)),
-                trend=self._generate_trend_data()
+    def _stored_competitor_analysis(self, domain_sets: DomainKeywordSets, domain: str,
+                                    user_keywords: Optional[List[str]]) -> CompetitorAnalysis:
+        """Competitor analysis from stored rankings; gaps are a sorted-id set difference"""
+        top_keywords = [
+            CompetitorKeyword(
+                keyword=row["keyword"],
+                position=row["position"] or 0,
+                search_volume=row["search_volume"],
+                traffic_estimate=int(row["search_volume"] * self._click_through_rate(row["position"])),
+                url=row["url"] or f"https://{normalize_domain(domain)}/"
             )
-            results.append(difficulty)
+            for row in domain_sets.top_keywords(domain, 5)
+        ]
         
-        return results
-    
-    async def _find_related_keywords(self, keyword: str) -> List[KeywordSuggestion]:
-        """Find related keywords (simulate Google Keyword Planner)"""
-        # In production, use Google Keyword Planner API or other services
+        keyword_gaps = []
+        if user_keywords:
+            comparison = domain_sets.compare("", [domain], limit=10, target_ids=domain_sets.ids_of(user_keywords))
+            rows = comparison["gaps"]
+            scores = self._score_keywords([row["keyword"] for row in rows], None, None)
+            for i, row in enumerate(rows):
+                position = row["positions"].get(normalize_domain(domain))
+                keyword_gaps.append(KeywordSuggestion(
+                    keyword=row["keyword"],
+                    search_volume=row["search_volume"],
+                    difficulty=float(scores.difficulty[i]),
+                    relevance_score=round(max(0.1, 1 - (position or 50) / 100), 2),
+                    cpc=float(scores.cpc[i])
+                ))
         
-        # Simple keyword expansion logic
-        base_words = keyword.split()
+        return CompetitorAnalysis(
+            domain=domain,
+            organic_keywords=len(domain_sets.keyword_ids(domain)),
+            paid_keywords=0,  # ranking exports only cover organic positions
+            top_organic_keywords=top_keywords,
+            keyword_gaps=keyword_gaps,
+            content_gaps=self._content_gaps(domain)
+        )
+    
+    def _click_through_rate(self, position: Optional[int]) -> float:
+        """Rough organic CTR by position"""
+        if not position:
+            return 0.0
+        return {1: 0.28, 2: 0.15, 3: 0.11, 4: 0.08, 5: 0.07}.get(position, 0.05 if position <= 10 else 0.01)
+    
+    def _content_gaps(self, domain: str) -> List[str]:
+        name = domain.split('.')[0]
+        return [
+            f"Complete guide to {name}",
+            f"Best practices for {name}",
+            f"How to improve {name} results",
+            f"{name} vs competitors comparison"
+        ]
+    
+    async def batch_keyword_difficulty(self, keywords: List[str], location: Optional[str] = None,
+                                       language: Optional[str] = None) -> List[KeywordDifficulty]:
+        """Analyze difficulty for multiple keywords"""
+        scores = self._score_keywords(keywords, location, language)
+        return [KeywordDifficulty(**row) for row in scores.rows()]
+    
+    def _score_keywords(self, keywords: List[str], location: Optional[str] = None,
+                        language: Optional[str] = None) -> KeywordScores:
+        """Vectorized scores using stored metrics where the store has them"""
+        stored = self.metrics_store.lookup_many(keywords, location, language)
+        return score_keywords(
+            keywords,
+            search_volume=stored["search_volume"],
+            cpc=stored["cpc"],
+            difficulty=stored["difficulty"],
+            trend=self._monthly_searches(keywords, location, language, stored["trend"])
+        )
+    
+    def _monthly_searches(self, keywords: List[str], location: Optional[str], language: Optional[str],
+                          imported: Optional[np.ndarray] = None) -> np.ndarray:
+        """Searches per calendar month (n x 12): trailing-year history, then imported trends; NaN if unknown"""
+        if imported is None:
+            imported = self.metrics_store.lookup_many(keywords, location, language)["trend"]
+        if not len(self.trend_store):
+            return imported
+        series = [series_key(k, location, language) for k in keywords]
+        history = self.trend_store.monthly_volumes(series)
+        return np.where(np.isnan(history), imported, history)
+    
+    def _apply_stored_metrics(self, suggestions: List["KeywordCandidate"], location: Optional[str],
+                              language: Optional[str]):
+        """Replace estimated suggestion metrics with imported ones, in one batch lookup"""
+        if not suggestions or not len(self.metrics_store):
+            return
+        stored = self.metrics_store.lookup_many([s.keyword for s in suggestions], location, language)
+        for i in stored["found"].nonzero()[0]:
+            suggestion = suggestions[i]
+            if not math.isnan(stored["search_volume"][i]):
+                suggestion.search_volume = int(stored["search_volume"][i])
+            if not math.isnan(stored["difficulty"][i]):
+                suggestion.difficulty = float(stored["difficulty"][i])
+            if not math.isnan(stored["cpc"][i]):
+                suggestion.cpc = round(float(stored["cpc"][i]), 2)
+    
+    async def _find_related_keywords(self, keyword: str) -> List["KeywordCandidate"]:
+        """Find related keywords from the local index, padded with template variations"""
+        related_keywords = []
+        for phrase, similarity in get_keyword_index().nearest(keyword, k=10):
+            related_keywords.append(KeywordCandidate(
+                keyword=phrase,
+                search_volume=self._estimate_search_volume(phrase),
+                difficulty=self._calculate_difficulty(phrase),
+                relevance_score=round(max(0.0, min(1.0, similarity)), 3),
+                cpc=self._estimate_cpc(phrase)
+            ))
+        if len(related_keywords) >= 10:
+            return related_keywords
+
+        # Simple keyword expansion logic when the index knows too little about the seed
         related_terms = [
             "best", "top", "how to", "guide", "tips", "tools", 
             "services", "software", "platform", "free", "online"
         ]
         
-        related_keywords = []
-        
         # Generate variations
         for term in related_terms[:8]:
             new_keyword = f"{term} {keyword}"
-            related_keywords.append(KeywordSuggestion(
+            related_keywords.append(KeywordCandidate(
                 keyword=new_keyword,
                 search_volume=random.randint(100, 2000),
                 difficulty=random.uniform(10, 70),
@@ -161,7 +291,7 @@ class KeywordAnalyzer:
         suffixes = ["2024", "review", "comparison", "alternative", "pricing"]
         for suffix in suffixes[:3]:
             new_keyword = f"{keyword} {suffix}"
-            related_keywords.append(KeywordSuggestion(
+            related_keywords.append(KeywordCandidate(
                 keyword=new_keyword,
                 search_volume=random.randint(50, 1000),
                 difficulty=random.uniform(15, 60),
@@ -171,7 +301,7 @@ class KeywordAnalyzer:
         
         return related_keywords
     
-    async def _find_long_tail_keywords(self, keyword: str) -> List[KeywordSuggestion]:
+    async def _find_long_tail_keywords(self, keyword: str) -> List["KeywordCandidate"]:
         """Find long-tail keyword variations"""
         long_tail_patterns = [
             f"how to use {keyword}",
@@ -186,7 +316,7 @@ class KeywordAnalyzer:
         
         long_tail_keywords = []
         for pattern in long_tail_patterns:
-            long_tail_keywords.append(KeywordSuggestion(
+            long_tail_keywords.append(KeywordCandidate(
                 keyword=pattern,
                 search_volume=random.randint(10, 500),
                 difficulty=random.uniform(5, 40),
@@ -283,12 +413,275 @@ class KeywordAnalyzer:
         
         return trends
     
+    def _seasonal_trends_from(self, monthly_searches: List[float]) -> List[Dict]:
+        """Seasonal trend data from imported monthly search volumes (Jan..Dec)"""
+        trends = []
+        for i, month in enumerate(MONTHS):
+            volume = monthly_searches[i]
+            previous = monthly_searches[i - 1]
+            if previous and volume > previous * 1.05:
+                direction = "up"
+            elif previous and volume < previous * 0.95:
+                direction = "down"
+            else:
+                direction = "stable"
+            trends.append({
+                "month": month,
+                "search_volume": int(volume),
+                "trend_direction": direction
+            })
+        
+        return trends
+    
     def _generate_trend_data(self) -> List[int]:
         """Generate 12-month trend data"""
         return [random.randint(50, 150) for _ in range(12)]
 
+class KeywordCandidate:
+    """
+    Keyword suggestion while research is still ranking and trimming candidates
+    
+    A slotted record with the KeywordSuggestion fields: far cheaper to create
+    than a validated model, and most candidates are dropped before the
+    response is built. to_suggestion() makes the model for the ones returned.
+    """
+    __slots__ = ("keyword", "search_volume", "difficulty", "relevance_score", "cpc")
+    
+    def __init__(self, keyword: str, search_volume: int, difficulty: float, relevance_score: float,
+                 cpc: Optional[float] = None):
+        self.keyword = keyword
+        self.search_volume = search_volume
+        self.difficulty = difficulty
+        self.relevance_score = relevance_score
+        self.cpc = cpc
+    
+    def to_suggestion(self) -> KeywordSuggestion:
+        return KeywordSuggestion(
+            keyword=self.keyword,
+            search_volume=self.search_volume,
+            difficulty=self.difficulty,
+            relevance_score=self.relevance_score,
+            cpc=self.cpc
+        )
+
+class RankedSuggestions:
+    """
+    Suggestions kept in relevance order as they arrive
+    
+    Each add is a binary search plus one list insert, so merging streamed (AI)
+    suggestions never re-sorts the list. Ties keep arrival order, duplicates of
+    a keyword already listed (or excluded, like the seed) are ignored and only
+    the best `limit` are kept. Items may be KeywordCandidate records or
+    KeywordSuggestion models; suggestions() returns them all as models.
+    """
+    
+    def __init__(self, limit: int = 15, exclude: Tuple[str, ...] = ()):
+        self.limit = limit
+        self._keys: List[float] = []  # negated relevance, ascending
+        self._items: List = []
+        self._exclude = {normalize_keyword(k) for k in exclude}
+        self._seen = set(self._exclude)
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def add(self, suggestion) -> Optional[int]:
+        """Insert a suggestion; returns its position, or None if it was not kept"""
+        if len(self._keys) >= self.limit and -suggestion.relevance_score >= self._keys[-1]:
+            return None  # would land past the limit; skip the keyword normalization
+        keyword = normalize_keyword(suggestion.keyword)
+        if keyword in self._seen:
+            return None
+        position = bisect_right(self._keys, -suggestion.relevance_score)
+        if position >= self.limit:
+            return None
+        self._keys.insert(position, -suggestion.relevance_score)
+        self._items.insert(position, suggestion)
+        self._seen.add(keyword)
+        if len(self._items) > self.limit:
+            self._keys.pop()
+            dropped = normalize_keyword(self._items.pop().keyword)
+            if dropped not in self._exclude:
+                self._seen.discard(dropped)
+        return position
+    
+    def items(self) -> List:
+        return list(self._items)
+    
+    def suggestions(self) -> List[KeywordSuggestion]:
+        return [item.to_suggestion() if isinstance(item, KeywordCandidate) else item for item in self._items]
+
+class ResearchCache:
+    """
+    Cache of complete KeywordResearch results keyed by (keyword, location, language)
+    
+    Fresh entries (younger than ttl) are served directly. Stale entries (up to
+    stale_seconds past the ttl) are still served, while one background task
+    refreshes them. Concurrent misses for the same key share a single research
+    run. Least recently used entries are evicted beyond max_entries.
+    Cached results are shared between callers and must be treated as read-only.
+    """
+    
+    def __init__(self, ttl_seconds: float = 900, stale_seconds: float = 3600, max_entries: int = 2000,
+                 clock: Callable[[], float] = time.monotonic, on_hit: Optional[Callable[[], None]] = None):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self.on_hit = on_hit
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[float, KeywordResearch]]" = OrderedDict()
+        self._flight = SingleFlight()
+        self._requests = Counter()
+        self.counters = Counter()
+    
+    @staticmethod
+    def key(request: KeywordRequest) -> Tuple[str, str, str]:
+        return (
+            normalize_keyword(request.keyword),
+            (request.location or "").strip().lower(),
+            (request.language or "").strip().lower()
+        )
+    
+    async def get(self, request: KeywordRequest,
+                  loader: Callable[[KeywordRequest], Awaitable[KeywordResearch]]) -> KeywordResearch:
+        """Cached research for the request, calling loader on a miss"""
+        key = self.key(request)
+        self._requests[key] += 1
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = self.clock() - entry[0]
+            if age < self.ttl_seconds:
+                self.counters["hits"] += 1
+                self._entries.move_to_end(key)
+                if self.on_hit:
+                    self.on_hit()
+                return entry[1]
+            if age < self.ttl_seconds + self.stale_seconds:
+                self.counters["stale_hits"] += 1
+                self._entries.move_to_end(key)
+                if self.on_hit:
+                    self.on_hit()
+                self._flight.refresh(key, lambda: self._load(key, request, loader))
+                return entry[1]
+        
+        self.counters["misses"] += 1
+        return await self._flight.run(key, lambda: self._load(key, request, loader))
+    
+    async def warm_up(self, loader: Callable[[KeywordRequest], Awaitable[KeywordResearch]],
+                      seeds: Optional[List[KeywordRequest]] = None, top_n: int = 20,
+                      concurrency: int = 4) -> int:
+        """Load seeds (default: the most requested keys) that are missing or stale; returns loads done"""
+        if seeds is None:
+            seeds = [
+                KeywordRequest(keyword=keyword, location=location or None, language=language or None)
+                for (keyword, location, language), _ in self._requests.most_common(top_n)
+            ]
+        now = self.clock()
+        todo = [
+            seed for seed in seeds
+            if now - self._entries.get(self.key(seed), (float("-inf"), None))[0] >= self.ttl_seconds
+        ]
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def load(seed: KeywordRequest):
+            async with semaphore:
+                key = self.key(seed)
+                await self._flight.run(key, lambda: self._load(key, seed, loader))
+        
+        results = await asyncio.gather(*(load(seed) for seed in todo), return_exceptions=True)
+        return sum(1 for result in results if not isinstance(result, Exception))
+    
+    def peek(self, request: KeywordRequest) -> Optional[KeywordResearch]:
+        """Cached research that get() would serve (fresh or stale), without loading or counting"""
+        entry = self._entries.get(self.key(request))
+        if entry is not None and self.clock() - entry[0] < self.ttl_seconds + self.stale_seconds:
+            return entry[1]
+        return None
+    
+    def put(self, request: KeywordRequest, result: KeywordResearch):
+        """Store research produced outside get() (e.g. by the streaming pipeline)"""
+        self._store(self.key(request), result)
+    
+    def invalidate(self, request: Optional[KeywordRequest] = None):
+        """Drop one entry, or everything when no request is given"""
+        if request is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(self.key(request), None)
+    
+    def stats(self) -> Dict:
+        lookups = self.counters["hits"] + self.counters["stale_hits"] + self.counters["misses"]
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "stale_seconds": self.stale_seconds,
+            "hits": self.counters["hits"],
+            "stale_hits": self.counters["stale_hits"],
+            "misses": self.counters["misses"],
+            "refreshes": self.counters["refreshes"],
+            "evictions": self.counters["evictions"],
+            "errors": self.counters["errors"],
+            "hit_rate": round((lookups - self.counters["misses"]) / lookups, 4) if lookups else None,
+            "top_requested": [
+                {"keyword": k[0], "location": k[1], "language": k[2], "requests": n}
+                for k, n in self._requests.most_common(10)
+            ]
+        }
+    
+    async def _load(self, key, request: KeywordRequest, loader) -> KeywordResearch:
+        # Run through self._flight, so at most once per key at a time
+        refresh = key in self._entries
+        try:
+            result = await loader(request)
+        except Exception:
+            self.counters["errors"] += 1
+            raise
+        
+        if refresh:
+            self.counters["refreshes"] += 1
+        self._store(key, result)
+        return result
+    
+    def _store(self, key, result: KeywordResearch):
+        self._entries[key] = (self.clock(), result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+        if len(self._requests) > self.max_entries * 4:
+            self._requests = Counter(dict(self._requests.most_common(self.max_entries)))
+
+def _record_ai_cache_hit():
+    """A cache hit also saves the AI keyword call that research would have made"""
+    if settings.KEYWORD_AI_ENRICHMENT:
+        llm_telemetry.record_cache_hit("keyword_suggestions", llm_gateway.model)
+
+# Global instance
+research_cache = ResearchCache(
+    ttl_seconds=settings.KEYWORD_CACHE_TTL_SECONDS,
+    stale_seconds=settings.KEYWORD_CACHE_STALE_SECONDS,
+    max_entries=settings.KEYWORD_CACHE_MAX_ENTRIES,
+    on_hit=_record_ai_cache_hit
+)
+
 # Service functions
 async def research_keywords(keyword_request: KeywordRequest) -> KeywordResearch:
+    """Keyword research served from the shared research cache"""
+    return await research_cache.get(keyword_request, _research_and_index)
+
+async def warm_up_research_cache(seeds: Optional[List[str]] = None, top_n: int = 20) -> int:
+    """Pre-load research for the given seeds, or for the most requested ones"""
+    seed_requests = [KeywordRequest(keyword=seed) for seed in seeds] if seeds else None
+    return await research_cache.warm_up(_research_and_index, seed_requests, top_n=top_n)
+
+async def _research_and_index(keyword_request: KeywordRequest) -> KeywordResearch:
+    """Fresh research; every keyword it finds becomes available to autocomplete"""
+    research = await _research_keywords_uncached(keyword_request)
+    add_research_keywords(research)
+    return research
+
+async def _research_keywords_uncached(keyword_request: KeywordRequest) -> KeywordResearch:
     """Main keyword research function with AI enhancement"""
     try:
         # Import AI service
@@ -298,7 +691,9 @@ async def research_keywords(keyword_request: KeywordRequest) -> KeywordResearch:
         analyzer = KeywordAnalyzer()
         basic_research = await analyzer.research_keyword(keyword_request)
         
-        # Enhance with AI-generated keywords
+        # Enhance with AI-generated keywords (optional, the local index covers related terms)
+        if not settings.KEYWORD_AI_ENRICHMENT:
+            return basic_research
         try:
             ai_keywords = await generate_ai_keywords(
                 keyword_request.keyword, 
@@ -307,12 +702,11 @@ async def research_keywords(keyword_request: KeywordRequest) -> KeywordResearch:
             
             # Merge AI keywords with related keywords
             if ai_keywords:
-                # Add AI keywords as high-quality suggestions
-                basic_research.related_keywords.extend(ai_keywords[:5])
-                # Sort by relevance score
-                basic_research.related_keywords.sort(key=lambda x: x.relevance_score, reverse=True)
-                # Keep top 15 to avoid overwhelming
-                basic_research.related_keywords = basic_research.related_keywords[:15]
+                # Add AI keywords as high-quality suggestions, keeping the top 15 by relevance
+                ranked = RankedSuggestions(RELATED_KEYWORD_LIMIT, exclude=(basic_research.main_keyword,))
+                for suggestion in basic_research.related_keywords + ai_keywords[:AI_KEYWORD_LIMIT]:
+                    ranked.add(suggestion)
+                basic_research.related_keywords = ranked.suggestions()
                 
         except Exception as e:
             print(f"AI keyword enhancement failed: {str(e)}")
@@ -325,6 +719,109 @@ async def research_keywords(keyword_request: KeywordRequest) -> KeywordResearch:
         analyzer = KeywordAnalyzer()
         return await analyzer.research_keyword(keyword_request)
 
+async def stream_keyword_research(keyword_request: KeywordRequest,
+                                  business_context: str = "") -> AsyncIterator[Dict]:
+    """
+    Keyword research as a stream of events, each sent as soon as it is ready
+
+    "summary" (main keyword metrics) comes first, then one "section" per local
+    source as it finishes, then "related_keyword" for every AI suggestion that
+    enters the top related keywords (with its position), and finally "complete"
+    with the full KeywordResearch, which is also cached for /research.
+    """
+    started = time.perf_counter()
+    
+    def event(kind: str, data, **extra) -> Dict:
+        return {"type": kind, **extra, "data": data, "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+    
+    if research_cache.peek(keyword_request) is not None:
+        research = await research_cache.get(keyword_request, _research_and_index)
+        summary = research.model_dump(exclude=set(RESEARCH_SECTIONS))
+        yield event("summary", summary)
+        for name in RESEARCH_SECTIONS:
+            yield event("section", _jsonable(getattr(research, name)), section=name)
+        yield event("complete", research.model_dump(), cached=True)
+        return
+    
+    analyzer = KeywordAnalyzer()
+    location, language = keyword_request.location, keyword_request.language
+    keyword = keyword_request.keyword.lower().strip()
+    summary = analyzer._research_summary(keyword, location, language)
+    yield event("summary", summary)
+    
+    # Every source reports to one queue; None marks a finished source
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    async def run_section(name: str, source: Awaitable):
+        try:
+            await queue.put(("section", name, await source))
+        except Exception as e:
+            print(f"Keyword research source {name} failed: {str(e)}")
+            await queue.put(("section", name, []))
+        finally:
+            await queue.put(None)
+    
+    async def run_ai():
+        from app.services.ai_service import keyword_analyzer
+        try:
+            async for suggestion in keyword_analyzer.stream_smart_keywords(keyword, business_context):
+                await queue.put(("ai", None, suggestion))
+        except Exception as e:
+            print(f"AI keyword enhancement failed: {str(e)}")
+        finally:
+            await queue.put(None)
+    
+    tasks = [asyncio.create_task(run_section(name, source))
+             for name, source in analyzer._research_sources(keyword).items()]
+    if settings.KEYWORD_AI_ENRICHMENT:
+        tasks.append(asyncio.create_task(run_ai()))
+    
+    sections: Dict[str, list] = {}
+    related = RankedSuggestions(RELATED_KEYWORD_LIMIT, exclude=(keyword,))
+    ai_keywords: List[KeywordSuggestion] = []
+    try:
+        pending = len(tasks)
+        while pending:
+            item = await queue.get()
+            if item is None:
+                pending -= 1
+                continue
+            kind, name, payload = item
+            if kind == "section":
+                if name == "related_keywords":
+                    for candidate in payload:
+                        related.add(candidate)
+                    analyzer._apply_stored_metrics(related.items(), location, language)
+                    payload = related.suggestions()
+                elif name == "long_tail_keywords":
+                    analyzer._apply_stored_metrics(payload, location, language)
+                    payload = [c.to_suggestion() for c in payload]
+                sections[name] = payload
+                yield event("section", _jsonable(payload), section=name)
+            else:
+                ai_keywords.append(payload)
+                if len(ai_keywords) > AI_KEYWORD_LIMIT:
+                    continue
+                analyzer._apply_stored_metrics([payload], location, language)
+                position = related.add(payload)
+                if position is not None:
+                    yield event("related_keyword", payload.model_dump(), position=position)
+    finally:
+        # The client may disconnect mid-stream
+        for task in tasks:
+            task.cancel()
+    
+    sections["related_keywords"] = related.suggestions()
+    research = KeywordResearch(**summary, **sections)
+    research_cache.put(keyword_request, research)
+    add_research_keywords(research)
+    add_suggestions(ai_keywords, "ai")
+    yield event("complete", research.model_dump(), cached=False)
+
+def _jsonable(items: list) -> list:
+    """Section items (models or strings) as plain JSON values"""
+    return [item.model_dump() if hasattr(item, "model_dump") else item for item in items]
+
 async def analyze_competitor_keywords(domain: str, user_keywords: List[str] = None) -> CompetitorAnalysis:
     """Analyze competitor keywords"""
     analyzer = KeywordAnalyzer()
@@ -333,4 +830,66 @@ async def analyze_competitor_keywords(domain: str, user_keywords: List[str] = No
 async def batch_analyze_keywords(keywords: List[str]) -> List[KeywordDifficulty]:
     """Analyze multiple keywords for difficulty"""
     analyzer = KeywordAnalyzer()
-    return await analyzer.batch_keyword_difficulty(keywords)
\ No newline at end of file
+    return await analyzer.batch_keyword_difficulty(keywords)
+
+def score_keyword_batch(keywords: List[str], location: Optional[str] = None,
+                        language: Optional[str] = None) -> KeywordScores:
+    """Score a large keyword list without building one model per keyword"""
+    return KeywordAnalyzer()._score_keywords(keywords, location, language)
+
+def compare_domain_keywords(domain: str, competitors: List[str], limit: int = 100) -> Dict:
+    """Keyword gap, overlap and unique-to-competitor sets across stored domains"""
+    return get_domain_keywords().compare(domain, competitors, limit=limit)
+
+def keyword_trend_history(keywords: List[str], location: Optional[str] = None, language: Optional[str] = None,
+                          domain: Optional[str] = None, resolution: str = "month",
+                          start: Optional[date] = None, end: Optional[date] = None) -> List[Dict]:
+    """Stored volume (or a domain's rank) history of many keywords in one range query"""
+    series = [series_key(k, location, language, domain) for k in keywords]
+    history = get_keyword_trend_store().query(
+        series,
+        start=to_day(start) if start else None,
+        end=to_day(end) if end else None,
+        resolution=resolution
+    )
+    return [
+        {
+            "keyword": normalize_keyword(keyword),
+            "domain": domain,
+            "points": [
+                {
+                    "date": day,
+                    "search_volume": None if math.isnan(volume) else int(round(volume)),
+                    "rank": None if math.isnan(rank) else round(rank, 1)
+                }
+                for day, volume, rank in zip(points["dates"].tolist(), points["volume"].tolist(), points["rank"].tolist())
+            ]
+        }
+        for keyword, points in zip(keywords, history)
+    ]
+
+def keyword_trend_summary(keyword: str, location: Optional[str] = None, language: Optional[str] = None,
+                          resolution: str = "month", domain: Optional[str] = None) -> Dict:
+    """Current metrics, seasonality and stored history of one keyword, without a full research run"""
+    keyword = normalize_keyword(keyword)
+    summary = KeywordAnalyzer()._research_summary(keyword, location, language)
+    history = keyword_trend_history([keyword], location, language, domain, resolution)[0]
+    return {
+        "keyword": keyword,
+        "search_volume": summary["search_volume"],
+        "difficulty_score": summary["difficulty_score"],
+        "competition_level": summary["competition_level"],
+        "seasonal_trends": summary["seasonal_trends"],
+        "resolution": resolution,
+        "history": history["points"]
+    }
+
+async def cluster_keyword_list(keywords: List[str], location: Optional[str] = None,
+                               language: Optional[str] = None, threshold: float = 0.5) -> List[Dict]:
+    """Cluster a keyword list (deduplicated) using stored or estimated search volumes"""
+    unique = list(dict.fromkeys(normalize_keyword(k) for k in keywords if k.strip()))
+    if not unique:
+        return []
+    scores = score_keyword_batch(unique, location, language)
+    # MinHash over large lists is CPU bound; keep the event loop responsive
+    return await asyncio.to_thread(cluster_keywords, unique, scores.search_volume, threshold)
@@ -0,0 +1,423 @@
+# Keyword Trend Store - append-only volume and rank history in fixed-width columns
+
+import fcntl
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from app.services.keyword_gap import normalize_domain
+from app.services.keyword_metrics import keyword_hash, locale_key, normalize_keyword, pointer_stamp, read_keyword_export
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+EPOCH = np.datetime64("2000-01-01", "D")  # a Saturday; days are stored as uint16 offsets from it
+NO_VOLUME = np.uint32(0xFFFFFFFF)
+NO_RANK = np.uint8(0)
+RESOLUTIONS = ("day", "week", "month")
+
+# Log segments keep the series hash on every point; compacted data stores it once per series
+LOG_DTYPE = np.dtype([("series", "<u8"), ("day", "<u2"), ("volume", "<u4"), ("rank", "u1")])
+
+def series_key(keyword: str, location: Optional[str] = None, language: Optional[str] = None,
+               domain: Optional[str] = None) -> int:
+    """Series id of a keyword's search volume, or of one domain's ranking for it"""
+    locale = locale_key(location, language)
+    if domain:
+        locale = f"{locale}@{normalize_domain(domain)}"
+    return keyword_hash(normalize_keyword(keyword), locale)
+
+def to_day(value) -> int:
+    """Day number (since 2000-01-01) of a date, datetime or ISO string"""
+    if isinstance(value, datetime):
+        value = value.date()
+    return int((np.datetime64(value, "D") - EPOCH).astype(np.int64))
+
+def _expand_ranges(starts: np.ndarray, stops: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Row indices covered by [start, stop) ranges plus the range number of each row"""
+    lengths = stops - starts
+    owner = np.repeat(np.arange(len(starts)), lengths)
+    first = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+    return first + np.arange(len(owner)), owner
+
+class KeywordTrendStore:
+    """
+    Per-series (keyword, locale and optionally domain) volume and rank history
+
+    Appends are written as small immutable log segments of packed 15-byte points.
+    compact() folds them into the base: series ids stored once with offsets, plus
+    uint16 day, uint32 volume and uint8 rank columns (7 bytes per point), all
+    memory-mapped. Range queries for many series at once are binary searches over
+    the sorted series column followed by vectorized gathers; later appends for
+    the same series and day replace earlier ones.
+
+    Several processes (API workers, the import CLI) can share one directory:
+    refresh() picks up versions and segments the others wrote, compaction
+    holds a file lock and folds everything on disk, and it removes only the
+    version it replaced. Appends past the thresholds compact in a background thread.
+    """
+
+    def __init__(self, path: Optional[str] = None, compact_after: int = 1000000, max_segments: int = 64):
+        self.path = path
+        self.compact_after = compact_after
+        self.max_segments = max_segments
+        self._base: Dict[str, np.ndarray] = {}
+        self._version: Optional[str] = None
+        self._segments: List[str] = []
+        self._logs: List[np.ndarray] = []  # one per append, each sorted by (series, day)
+        self._stamp = None  # what refresh() last saw on disk
+        self._lock = threading.Lock()  # guards the fields above
+        self._compact_lock = threading.Lock()
+        self._compaction: Optional[threading.Thread] = None
+        if path:
+            self.refresh()
+
+    def __len__(self) -> int:
+        """Stored points, counting replaced log points until compaction"""
+        return len(self._base.get("day", ())) + self._log_points()
+
+    def append(self, series: np.ndarray, days: np.ndarray, volumes: Optional[np.ndarray] = None,
+               ranks: Optional[np.ndarray] = None) -> int:
+        """Append points; NaN/None volume or rank means unknown. Returns the number appended"""
+        points = np.zeros(len(series), dtype=LOG_DTYPE)
+        if not len(points):
+            return 0
+        points["series"] = series
+        points["day"] = days
+        points["volume"] = self._encode(volumes, NO_VOLUME, 0, 0xFFFFFFFE)
+        points["rank"] = self._encode(ranks, NO_RANK, 1, 255)
+
+        with self._lock:
+            if self.path:
+                name = f"log-{time.time_ns()}.npy"
+                segment = os.path.join(self.path, "log", name)
+                os.makedirs(os.path.dirname(segment), exist_ok=True)
+                with open(segment + ".tmp", "wb") as f:  # other processes only ever see whole segments
+                    np.save(f, points)
+                os.replace(segment + ".tmp", segment)
+                self._segments.append(name)
+            self._add_log(points)
+            due = self._log_points() >= self.compact_after or len(self._logs) > self.max_segments
+        if due and (self._compaction is None or not self._compaction.is_alive()):
+            self._compaction = threading.Thread(target=self._compact_logged, name="trend-compaction", daemon=True)
+            self._compaction.start()
+        return len(points)
+
+    def wait_for_compaction(self):
+        """Block until a background compaction started by append() has finished"""
+        if self._compaction is not None:
+            self._compaction.join()
+
+    def query(self, series: List[int], start: Optional[int] = None, end: Optional[int] = None,
+              resolution: str = "day") -> List[Dict[str, np.ndarray]]:
+        """
+        History of each series between day numbers start and end (inclusive)
+
+        Returns one dict per series with "dates" (datetime64[D] bucket starts),
+        "volume" and "rank" float arrays (NaN where unknown). Week and month
+        resolutions average the known points of each bucket.
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"resolution must be one of {', '.join(RESOLUTIONS)}")
+        owner, days, volumes, ranks = self._gather(np.asarray(series, dtype=np.uint64), start, end)
+        buckets = self._bucket(days, resolution)
+
+        results = [{"dates": np.zeros(0, dtype="datetime64[D]"), "volume": np.zeros(0), "rank": np.zeros(0)}
+                   for _ in series]
+        if not len(owner):
+            return results
+
+        # Points are sorted by (series, day), so each (series, bucket) is one run
+        run_start = np.concatenate(([True], (owner[1:] != owner[:-1]) | (buckets[1:] != buckets[:-1])))
+        starts = np.flatnonzero(run_start)
+        known_volume = volumes != NO_VOLUME
+        known_rank = ranks != NO_RANK
+        volume_sum = np.add.reduceat(np.where(known_volume, volumes, 0).astype(np.float64), starts)
+        volume_count = np.add.reduceat(known_volume.astype(np.int64), starts)
+        rank_sum = np.add.reduceat(np.where(known_rank, ranks, 0).astype(np.float64), starts)
+        rank_count = np.add.reduceat(known_rank.astype(np.int64), starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_volume = np.where(volume_count > 0, volume_sum / volume_count, np.nan)
+            mean_rank = np.where(rank_count > 0, rank_sum / rank_count, np.nan)
+        dates = self._bucket_dates(buckets[starts], resolution)
+
+        run_owner = owner[starts]
+        bounds = np.searchsorted(run_owner, np.arange(len(series) + 1))
+        for i in np.unique(run_owner).tolist():
+            window = slice(bounds[i], bounds[i + 1])
+            results[i] = {"dates": dates[window], "volume": mean_volume[window], "rank": mean_rank[window]}
+        return results
+
+    def monthly_volumes(self, series: List[int], months: int = 12, today: Optional[date] = None) -> np.ndarray:
+        """
+        Average volume per calendar month (Jan..Dec columns) over the trailing
+        `months` months, shape (n, 12), NaN where there is no history
+        """
+        today = today or datetime.utcnow().date()
+        this_month = np.datetime64(today, "M")
+        first = (this_month - (months - 1)).astype("datetime64[D]")
+        owner, days, volumes, _ = self._gather(np.asarray(series, dtype=np.uint64), to_day(first), to_day(today))
+        known = volumes != NO_VOLUME
+        owner, calendar_month = owner[known], self._bucket(days[known], "month") % 12
+
+        totals = np.zeros((len(series), 12))
+        counts = np.zeros((len(series), 12))
+        np.add.at(totals, (owner, calendar_month), volumes[known])
+        np.add.at(counts, (owner, calendar_month), 1)
+        with np.errstate(invalid="ignore"):
+            return np.where(counts > 0, totals / counts, np.nan)
+
+    def compact(self):
+        """Fold the log into a new base version and drop the folded segments"""
+        with self._compact_lock, self._directory_lock():
+            self.refresh()  # fold what other processes wrote as well
+            with self._lock:
+                base, logs, segments, replaced = self._base, list(self._logs), list(self._segments), self._version
+            if not logs:
+                return
+            owner_series, days, volumes, ranks = self._all_points(base, logs)
+            first = np.flatnonzero(np.concatenate(([True], owner_series[1:] != owner_series[:-1])))
+            series = owner_series[first]
+            offsets = np.append(first, len(owner_series)).astype(np.int64)
+            columns = {"series": series, "offsets": offsets, "day": days, "volume": volumes, "rank": ranks}
+
+            version = None
+            if self.path:
+                version = f"v{time.time_ns()}"
+                target = os.path.join(self.path, version)
+                os.makedirs(target)
+                for name, values in columns.items():
+                    np.save(os.path.join(target, f"{name}.npy"), values)
+                columns = self._read_base(target)
+            with self._lock:  # a refresh() in another thread must not see the switch half done
+                if self.path:
+                    pointer = os.path.join(self.path, "CURRENT")
+                    with open(pointer + ".tmp", "w") as f:
+                        f.write(version)
+                    os.replace(pointer + ".tmp", pointer)
+                    for name in segments:
+                        os.remove(os.path.join(self.path, "log", name))
+                    if replaced:  # other processes reopen on the CURRENT change; open mmaps keep files alive on POSIX
+                        shutil.rmtree(os.path.join(self.path, replaced), ignore_errors=True)
+                # Appends that landed while folding stay in the log
+                self._base, self._version = columns, version
+                self._logs, self._segments = self._logs[len(logs):], self._segments[len(segments):]
+                self._stamp = None  # segments other processes added meanwhile are loaded by the next refresh()
+
+    def refresh(self):
+        """Reload when another process published a version (CURRENT) or appended log segments"""
+        if not self.path:
+            return
+        stamp = self._disk_stamp()
+        if stamp == self._stamp:
+            return
+        for attempt in range(3):
+            try:
+                self._reload(stamp)
+                return
+            except FileNotFoundError:
+                if attempt == 2:  # a compaction elsewhere removed what we were reading; it has a new CURRENT
+                    raise
+                stamp = self._disk_stamp()
+
+    def _reload(self, stamp):
+        pointer = os.path.join(self.path, "CURRENT")
+        version = None
+        if os.path.exists(pointer):
+            with open(pointer) as f:
+                version = f.read().strip()
+        log_dir = os.path.join(self.path, "log")
+        names = sorted(n for n in os.listdir(log_dir) if n.endswith(".npy")) if os.path.isdir(log_dir) else []
+        with self._lock:
+            loaded = set(self._segments)
+            if version == self._version and loaded <= set(names):
+                names = [name for name in names if name not in loaded]  # same base: only the new segments
+            else:
+                base = self._read_base(os.path.join(self.path, version)) if version else {}
+                self._base, self._version, self._segments, self._logs = base, version, [], []
+            for name in names:
+                self._add_log(np.load(os.path.join(log_dir, name)))
+                self._segments.append(name)
+            self._stamp = stamp
+
+    def stats(self) -> Dict:
+        base_points = len(self._base.get("day", ()))
+        base_bytes = sum(int(column.nbytes) for column in self._base.values())
+        return {
+            "path": self.path,
+            "series": len(self._base.get("series", ())),
+            "points": base_points,
+            "log_points": self._log_points(),
+            "log_segments": len(self._segments),
+            "bytes_per_point": round(base_bytes / base_points, 2) if base_points else None,
+            "disk_bytes": base_bytes + sum(int(log.nbytes) for log in self._logs)
+        }
+
+    @staticmethod
+    def _encode(values: Optional[np.ndarray], missing, low: int, high: int) -> np.ndarray:
+        """Round into the column's range; NaN becomes the column's "unknown" value"""
+        if values is None:
+            return missing
+        values = np.asarray(values, dtype=np.float64)
+        return np.where(np.isnan(values), missing, np.clip(np.round(values), low, high))
+
+    def _disk_stamp(self):
+        # Read before the files themselves, so a change made while reading triggers another refresh
+        try:
+            log_dir = os.stat(os.path.join(self.path, "log")).st_mtime_ns
+        except FileNotFoundError:
+            log_dir = None
+        return pointer_stamp(self.path), log_dir
+
+    @contextmanager
+    def _directory_lock(self):
+        # One compaction at a time across processes sharing the directory
+        if not self.path:
+            yield
+            return
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, "LOCK"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _compact_logged(self):
+        try:
+            self.compact()
+        except Exception as e:
+            logger.warning("Keyword trend compaction failed: %s", e)
+
+    @staticmethod
+    def _read_base(path: str) -> Dict[str, np.ndarray]:
+        return {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in ("series", "offsets", "day", "volume", "rank")
+        }
+
+    def _add_log(self, points: np.ndarray):
+        self._logs.append(points[np.lexsort((points["day"], points["series"]))])  # stable: append order kept
+
+    def _log_points(self) -> int:
+        return sum(len(log) for log in self._logs)
+
+    def _gather(self, wanted: np.ndarray, start: Optional[int], end: Optional[int]):
+        """(owner, day, volume, rank) of wanted series, sorted by (owner, day), last write per day"""
+        with self._lock:
+            base, logs = self._base, list(self._logs)  # a consistent view while a compaction swaps them
+        parts = []
+        if base:
+            base_series = base["series"]
+            at = np.searchsorted(base_series, wanted)
+            hit = at < len(base_series)
+            hit[hit] = np.asarray(base_series[at[hit]]) == wanted[hit]
+            offsets = base["offsets"]
+            rows, owner = _expand_ranges(np.asarray(offsets[at[hit]]), np.asarray(offsets[at[hit] + 1]))
+            owner = np.flatnonzero(hit)[owner]
+            parts.append((owner, np.asarray(base["day"][rows]), np.asarray(base["volume"][rows]),
+                          np.asarray(base["rank"][rows]), np.zeros(len(rows), dtype=np.int64)))
+        for segment, log in enumerate(logs, start=1):
+            rows, owner = _expand_ranges(np.searchsorted(log["series"], wanted, "left"),
+                                         np.searchsorted(log["series"], wanted, "right"))
+            points = log[rows]
+            # Later segments win; within a segment, the later row of a duplicate
+            parts.append((owner, points["day"], points["volume"], points["rank"], (segment << 32) + rows))
+        if not parts:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty.astype(np.uint16), empty.astype(np.uint32), empty.astype(np.uint8)
+
+        owner, days, volumes, ranks, sequence = (np.concatenate(column) for column in zip(*parts))
+        keep = np.ones(len(days), dtype=bool)
+        if start is not None:
+            keep &= days >= start
+        if end is not None:
+            keep &= days <= end
+        owner, days, volumes, ranks, sequence = owner[keep], days[keep], volumes[keep], ranks[keep], sequence[keep]
+        return self._latest(owner, days, volumes, ranks, sequence)
+
+    def _all_points(self, base: Dict[str, np.ndarray], logs: List[np.ndarray]):
+        """Every (series, day, volume, rank), deduplicated, for compaction"""
+        parts = [(np.repeat(np.asarray(base["series"]), np.diff(base["offsets"])),
+                  np.asarray(base["day"]), np.asarray(base["volume"]), np.asarray(base["rank"]))] if base else []
+        parts += [(log["series"], log["day"], log["volume"], log["rank"]) for log in logs]
+        series, days, volumes, ranks = (np.concatenate(column) for column in zip(*parts))
+        return self._latest(series, days, volumes, ranks, np.arange(len(series)))
+
+    @staticmethod
+    def _latest(owner, days, volumes, ranks, sequence):
+        order = np.lexsort((sequence, days, owner))
+        owner, days, volumes, ranks = owner[order], days[order], volumes[order], ranks[order]
+        last = np.append((owner[1:] != owner[:-1]) | (days[1:] != days[:-1]), True) if len(owner) else \
+            np.zeros(0, dtype=bool)
+        return owner[last], days[last], volumes[last], ranks[last]
+
+    @staticmethod
+    def _bucket(days: np.ndarray, resolution: str) -> np.ndarray:
+        days = days.astype(np.int64)
+        if resolution == "week":
+            return (days + 5) // 7  # weeks start on Monday (2000-01-03 is day 2)
+        if resolution == "month":
+            return (EPOCH + days).astype("datetime64[M]").astype(np.int64)
+        return days
+
+    @staticmethod
+    def _bucket_dates(buckets: np.ndarray, resolution: str) -> np.ndarray:
+        if resolution == "week":
+            return EPOCH + (buckets * 7 - 5)
+        if resolution == "month":
+            return buckets.astype("datetime64[M]").astype("datetime64[D]")
+        return EPOCH + buckets
+
+def history_points(records: Iterable[Dict], location: str, language: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(series, day, volume) arrays from import records carrying dated monthly "history" """
+    series, days, volumes = [], [], []
+    for record in records:
+        if not record.get("history"):
+            continue
+        key = series_key(record["keyword"], location, language)
+        for year, month, volume in record["history"]:
+            series.append(key)
+            days.append(to_day(date(year, month, 1)))
+            volumes.append(volume)
+    return np.array(series, dtype=np.uint64), np.array(days, dtype=np.uint16), np.array(volumes, dtype=np.float64)
+
+def import_trend_history(paths: List[str], location: str, language: str) -> int:
+    """Append the dated monthly searches of Keyword Planner / SEMrush exports"""
+    store = get_keyword_trend_store()
+    appended = 0
+    for path in paths:
+        appended += store.append(*history_points(read_keyword_export(path), location, language))
+    store.wait_for_compaction()  # the CLI exits right after
+    return appended
+
+def record_rankings(domain: str, rows: Iterable[Tuple[str, float, float]], location: str = "United States",
+                    language: str = "en", day: Optional[int] = None) -> int:
+    """Append today's (keyword, position, search_volume) observations for a domain"""
+    rows = list(rows)
+    if not rows:
+        return 0
+    day = to_day(datetime.utcnow()) if day is None else day
+    series = np.array([series_key(k, location, language, domain) for k, _, _ in rows], dtype=np.uint64)
+    return get_keyword_trend_store().append(
+        series,
+        np.full(len(rows), day, dtype=np.uint16),
+        volumes=np.array([v for _, _, v in rows], dtype=np.float64),
+        ranks=np.array([p for _, p, _ in rows], dtype=np.float64)
+    )
+
+# Global instance, opened lazily
+_trend_store: Optional[KeywordTrendStore] = None
+
+def get_keyword_trend_store() -> KeywordTrendStore:
+    global _trend_store
+    if _trend_store is None:
+        _trend_store = KeywordTrendStore(settings.KEYWORD_TRENDS_DIR)
+    else:
+        _trend_store.refresh()  # two stat calls unless another process wrote to it
+    return _trend_store
@@ -0,0 +1,93 @@
+# License Cache - each user's active license kept in memory between license changes
+
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+from app.settings import settings
+
+class CachedLicense:
+    """The fields of an active license that entitlement checks read"""
+
+    __slots__ = ("plan", "is_active", "valid_until")
+
+    def __init__(self, plan: str, is_active: bool, valid_until: Optional[datetime]):
+        self.plan = plan
+        self.is_active = is_active
+        self.valid_until = valid_until
+
+class LicenseCache:
+    """
+    Per-user active license (or the lack of one), served from memory
+
+    Entries live for ttl_seconds but never past the license's valid_until, so
+    an expiring license is re-read (and marked expired) on time. Code that
+    changes licenses writes the new state through with put() or drops it with
+    invalidate(); each of those bumps the user's version, and a load that
+    started before the change is not cached (load_version/put(version=...)).
+    Other processes see a change once their entry's TTL runs out.
+    """
+
+    def __init__(self, ttl_seconds: float = 60, max_entries: int = 10000,
+                 clock: Callable[[], float] = time.monotonic, utcnow: Callable[[], datetime] = datetime.utcnow):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self.utcnow = utcnow
+        self._entries: Dict[int, Tuple[float, Optional[CachedLicense]]] = {}  # user_id -> (expires at, license)
+        self._versions: Dict[int, int] = {}
+        self._epoch = 0  # bumped when every entry is invalidated
+        self.counters = Counter()
+
+    def get(self, user_id: int) -> Tuple[bool, Optional[CachedLicense]]:
+        """(found, license); found is False when the user's license has to be loaded"""
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > self.clock():
+            self.counters["hits"] += 1
+            return True, entry[1]
+        self.counters["misses"] += 1
+        return False, None
+
+    def load_version(self, user_id: int) -> Tuple[int, int]:
+        """Version to pass to put() after loading the user's license from the database"""
+        return self._epoch, self._versions.get(user_id, 0)
+
+    def put(self, user_id: int, license, version: Optional[Tuple[int, int]] = None) -> Optional[CachedLicense]:
+        """Cache the user's active license (a License row or None for no license) and return the cached form"""
+        cached = None if license is None else CachedLicense(license.plan, license.is_active, license.valid_until)
+        if version is None:
+            self._bump(user_id)  # a write: loads already in flight must not overwrite it
+        elif version != self.load_version(user_id):
+            return cached
+
+        ttl = self.ttl_seconds
+        if cached is not None and cached.valid_until is not None:
+            ttl = min(ttl, (cached.valid_until - self.utcnow()).total_seconds())
+        if len(self._entries) >= self.max_entries and user_id not in self._entries:
+            self._entries.pop(next(iter(self._entries)))  # oldest entry
+        self._entries[user_id] = (self.clock() + ttl, cached)
+        return cached
+
+    def invalidate(self, user_id: Optional[int] = None):
+        if user_id is None:
+            self._entries.clear()
+            self._epoch += 1
+        else:
+            self._entries.pop(user_id, None)
+            self._bump(user_id)
+
+    def _bump(self, user_id: int):
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "ttl_seconds": self.ttl_seconds,
+            **{name: self.counters[name] for name in ("hits", "misses")}
+        }
+
+# Global instance
+license_cache = LicenseCache(
+    ttl_seconds=settings.LICENSE_CACHE_TTL_SECONDS,
+    max_entries=settings.LICENSE_CACHE_MAX_ENTRIES
+)
@@ -2,6 +2,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from datetime import datetime, timedelta
 from app.models.license import License
+from app.services.license_cache import license_cache
 
 async def create_license(db: AsyncSession, user_id: int, plan: str, valid_days: int = 30):
     valid_until = datetime.utcnow() + timedelta(days=valid_days)
@@ -14,6 +15,7 @@ async def create_license(db: AsyncSession, user_id: int, plan: str, valid_days:
     db.add(license)
     await db.commit()
     await db.refresh(license)
+    license_cache.invalidate(user_id)
     return license
 
 async def get_license_for_user(db: AsyncSession, user_id: int):
@@ -23,6 +25,9 @@ async def get_license_for_user(db: AsyncSession, user_id: int):
 async def deactivate_expired_licenses(db: AsyncSession):
     now = datetime.utcnow()
     q = await db.execute(select(License).where(License.valid_until < now, License.is_active == True))
-    for license in q.scalars():
+    expired = q.scalars().all()
+    for license in expired:
         license.is_active = False
     await db.commit()
+    for license in expired:
+        license_cache.invalidate(license.user_id)
@@ -0,0 +1,578 @@
+# Shared LLM Gateway - rate limiting, retries and circuit breaking for model calls
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, List, Optional, Union
+import openai
+from app.settings import settings
+from app.services.llm_telemetry import LLMCallRecord, LLMTelemetry, llm_telemetry
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes: lower value is served first when the gateway is saturated
+PRIORITIES = {
+    "high": 0,      # interactive requests (WebSocket, type-ahead)
+    "normal": 1,    # regular API requests
+    "low": 2        # background enrichment
+}
+
+class LLMGatewayError(Exception):
+    """Base error raised by the LLM gateway"""
+
+class LLMBackendError(LLMGatewayError):
+    """Error returned by an LLM backend"""
+
+    def __init__(self, message: str, retryable: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+class CircuitOpenError(LLMGatewayError):
+    """Raised without calling the provider while the circuit breaker is open"""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"LLM provider circuit is open, retry in {retry_in:.1f}s")
+        self.retry_in = retry_in
+
+@dataclass
+class LLMResponse:
+    content: str
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    retries: int = 0
+    telemetry: Optional[LLMCallRecord] = None
+
+class LLMBackend:
+    """
+    Interface for chat completion providers
+    Implementations translate provider failures into LLMBackendError
+    """
+
+    async def complete(self, model: str, messages: List[Dict[str, str]],
+                       temperature: float, max_tokens: int) -> LLMResponse:
+        raise NotImplementedError
+
+    async def stream(self, model: str, messages: List[Dict[str, str]],
+                     temperature: float, max_tokens: int) -> AsyncIterator[str]:
+        """Yield completion text incrementally (default: one chunk with the full reply)"""
+        response = await self.complete(model, messages, temperature, max_tokens)
+        yield response.content
+
+class OpenAIBackend(LLMBackend):
+    """
+    OpenAI chat completions backend
+    Set base_url to use any OpenAI-compatible server (e.g. the local stub server)
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+        # Retries are handled by the gateway, not the SDK
+        self.client = openai.AsyncOpenAI(
+            api_key=api_key or "your-openai-api-key",
+            base_url=base_url,
+            max_retries=0
+        )
+
+    async def complete(self, model: str, messages: List[Dict[str, str]],
+                       temperature: float, max_tokens: int) -> LLMResponse:
+        try:
+            response = await self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+        except openai.OpenAIError as e:
+            raise _backend_error(e) from e
+
+        usage = response.usage
+        return LLMResponse(
+            content=response.choices[0].message.content or "",
+            model=response.model or model,
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0
+        )
+
+    async def stream(self, model: str, messages: List[Dict[str, str]],
+                     temperature: float, max_tokens: int) -> AsyncIterator[str]:
+        try:
+            stream = await self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except openai.OpenAIError as e:
+            raise _backend_error(e) from e
+
+class StaticBackend(LLMBackend):
+    """
+    In-process backend returning canned completions
+    Used by tests and benchmarks; the first `failures` calls fail with a retryable 429
+    """
+
+    def __init__(self, reply: Union[str, Callable[[List[Dict[str, str]]], str]] = "{}",
+                 latency: float = 0.0, failures: int = 0,
+                 chunk_size: int = 16, chunk_latency: float = 0.0):
+        self.reply = reply
+        self.latency = latency
+        self.failures = failures
+        self.chunk_size = chunk_size
+        self.chunk_latency = chunk_latency
+        self.calls = 0
+
+    async def complete(self, model: str, messages: List[Dict[str, str]],
+                       temperature: float, max_tokens: int) -> LLMResponse:
+        content = await self._start(messages)
+        # Generating the whole reply takes as long as streaming every chunk
+        if self.chunk_latency:
+            await asyncio.sleep(self.chunk_latency * len(self._chunks(content)))
+        return LLMResponse(
+            content=content,
+            model=model,
+            prompt_tokens=_estimate_prompt_tokens(messages),
+            completion_tokens=max(1, len(content) // 4)
+        )
+
+    async def stream(self, model: str, messages: List[Dict[str, str]],
+                     temperature: float, max_tokens: int) -> AsyncIterator[str]:
+        """Replay the canned reply in small chunks, `chunk_latency` seconds apart"""
+        content = await self._start(messages)
+        for chunk in self._chunks(content):
+            if self.chunk_latency:
+                await asyncio.sleep(self.chunk_latency)
+            yield chunk
+
+    async def _start(self, messages: List[Dict[str, str]]) -> str:
+        self.calls += 1
+        call_number = self.calls
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if call_number <= self.failures:
+            raise LLMBackendError("429 Too Many Requests (simulated)", retryable=True)
+        return self.reply(messages) if callable(self.reply) else self.reply
+
+    def _chunks(self, content: str) -> List[str]:
+        return [content[i:i + self.chunk_size] for i in range(0, len(content), self.chunk_size)]
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `rate_per_minute`
+    Amounts larger than the capacity are clamped so a single call can never block forever
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = max(1.0, float(rate_per_minute))
+        self.refill_per_second = self.capacity / 60.0
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    def try_acquire(self, amount: float) -> float:
+        """Take `amount` tokens if available; otherwise return the seconds to wait"""
+        amount = min(amount, self.capacity)
+        self._refill()
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+
+    async def acquire(self, amount: float):
+        """Wait until `amount` tokens are available and take them"""
+        while True:
+            wait = self.try_acquire(amount)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def adjust(self, amount: float):
+        """Give back (positive) or charge (negative) tokens after the real cost is known"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+    closed -> open after `failure_threshold` failures; open -> half_open after
+    `reset_timeout` seconds, where a single probe call decides whether to close again
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call must not reach the provider"""
+        if self.state == "open":
+            elapsed = time.monotonic() - self._opened_at
+            if elapsed < self.reset_timeout:
+                raise CircuitOpenError(self.reset_timeout - elapsed)
+            self.state = "half_open"
+            self._probe_in_flight = False
+
+        if self.state == "half_open":
+            if self._probe_in_flight:
+                raise CircuitOpenError(0.0)
+            self._probe_in_flight = True
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+    def release_probe(self):
+        """Forget an abandoned half-open probe (e.g. the caller was cancelled)"""
+        self._probe_in_flight = False
+
+class _PriorityGate:
+    """Concurrency limiter that hands free slots to the highest-priority waiter first"""
+
+    def __init__(self, slots: int):
+        self.slots = max(1, slots)
+        self._free = self.slots
+        self._waiters = []
+        self._seq = itertools.count()
+
+    @property
+    def in_flight(self) -> int:
+        return self.slots - self._free
+
+    def waiting(self) -> Dict[str, int]:
+        counts = {name: 0 for name in PRIORITIES}
+        names = {lane: name for name, lane in PRIORITIES.items()}
+        for lane, _, future in self._waiters:
+            if not future.done():
+                counts[names.get(lane, "low")] += 1
+        return counts
+
+    async def acquire(self, lane: int):
+        if self._free > 0 and not self._waiters:
+            self._free -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (lane, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before cancellation
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._free += 1
+
+class LLMGateway:
+    """
+    Single entry point for all LLM calls in the application
+    Applies a concurrency cap with priority lanes, RPM/TPM token buckets,
+    retry with jittered exponential backoff and a circuit breaker
+    """
+
+    def __init__(
+        self,
+        backend: LLMBackend,
+        model: str = "gpt-4o-mini",
+        requests_per_minute: int = 500,
+        tokens_per_minute: int = 200000,
+        max_concurrency: int = 8,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 20.0,
+        breaker: Optional[CircuitBreaker] = None,
+        telemetry: Optional[LLMTelemetry] = None
+    ):
+        self.backend = backend
+        self.model = model
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.telemetry = telemetry or llm_telemetry
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self._gate = _PriorityGate(max_concurrency)
+        self.counters = {"calls": 0, "retries": 0, "failures": 0, "rejected": 0}
+
+    @classmethod
+    def from_settings(cls) -> "LLMGateway":
+        """Build the gateway from application settings"""
+        return cls(
+            backend=create_backend(),
+            model=settings.LLM_MODEL,
+            requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+            tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            max_retries=settings.LLM_MAX_RETRIES,
+            backoff_base=settings.LLM_BACKOFF_BASE_SECONDS,
+            backoff_max=settings.LLM_BACKOFF_MAX_SECONDS,
+            breaker=CircuitBreaker(
+                settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+                settings.LLM_CIRCUIT_RESET_SECONDS
+            )
+        )
+
+    def use_backend(self, backend: LLMBackend):
+        """Swap the provider backend (e.g. a stub in tests and benchmarks)"""
+        self.backend = backend
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.3,
+        max_tokens: int = 500,
+        priority: str = "normal",
+        prompt_type: str = "unspecified"
+    ) -> LLMResponse:
+        """Run a chat completion through the limiter, retry policy and circuit breaker"""
+        model = model or self.model
+        lane = PRIORITIES.get(priority, PRIORITIES["normal"])
+        estimated_tokens = _estimate_prompt_tokens(messages) + max_tokens
+        started = time.perf_counter()
+        attempt = 0
+
+        try:
+            while True:
+                try:
+                    self.breaker.before_call()
+                except CircuitOpenError:
+                    self.counters["rejected"] += 1
+                    raise
+
+                self.counters["calls"] += 1
+                await self._acquire_slot(lane)
+                try:
+                    await self.request_bucket.acquire(1)
+                    await self.token_bucket.acquire(estimated_tokens)
+                    response = await self.backend.complete(model, messages, temperature, max_tokens)
+                except LLMBackendError as e:
+                    if not e.retryable:
+                        # The provider answered; the request itself was bad
+                        self.breaker.record_success()
+                        raise
+                    self.breaker.record_failure()
+                    self.counters["failures"] += 1
+                    if attempt >= self.max_retries:
+                        raise
+                    delay = self._backoff_delay(attempt, e.retry_after)
+                    logger.warning(f"LLM call failed ({e}), retry {attempt + 1} in {delay:.2f}s")
+                except asyncio.CancelledError:
+                    self.breaker.release_probe()
+                    raise
+                except Exception:
+                    self.breaker.record_failure()
+                    self.counters["failures"] += 1
+                    raise
+                else:
+                    self.breaker.record_success()
+                    used = response.prompt_tokens + response.completion_tokens
+                    if used:
+                        self.token_bucket.adjust(estimated_tokens - used)
+                    response.retries = attempt
+                    response.telemetry = self.telemetry.record(LLMCallRecord(
+                        prompt_type=prompt_type,
+                        model=response.model,
+                        prompt_tokens=response.prompt_tokens,
+                        completion_tokens=response.completion_tokens,
+                        latency_ms=_elapsed_ms(started),
+                        retries=attempt
+                    ))
+                    return response
+                finally:
+                    self._gate.release()
+
+                attempt += 1
+                self.counters["retries"] += 1
+                await asyncio.sleep(delay)
+        except Exception as e:
+            self.telemetry.record(LLMCallRecord(
+                prompt_type=prompt_type,
+                model=model,
+                latency_ms=_elapsed_ms(started),
+                retries=attempt,
+                error=type(e).__name__
+            ))
+            raise
+
+    async def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.3,
+        max_tokens: int = 500,
+        priority: str = "normal",
+        prompt_type: str = "unspecified"
+    ) -> AsyncIterator[str]:
+        """
+        Stream completion text through the same limiter and breaker as chat()
+        Failures are only retried before the first chunk has been yielded
+        """
+        model = model or self.model
+        lane = PRIORITIES.get(priority, PRIORITIES["normal"])
+        prompt_tokens = _estimate_prompt_tokens(messages)
+        estimated_tokens = prompt_tokens + max_tokens
+        started = time.perf_counter()
+        attempt = 0
+        received_chars = 0
+
+        def finished(error: Optional[str] = None) -> LLMCallRecord:
+            return self.telemetry.record(LLMCallRecord(
+                prompt_type=prompt_type,
+                model=model,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=received_chars // 4,
+                latency_ms=_elapsed_ms(started),
+                retries=attempt,
+                streamed=True,
+                error=error
+            ))
+
+        try:
+            while True:
+                try:
+                    self.breaker.before_call()
+                except CircuitOpenError:
+                    self.counters["rejected"] += 1
+                    raise
+
+                self.counters["calls"] += 1
+                await self._acquire_slot(lane)
+                try:
+                    await self.request_bucket.acquire(1)
+                    await self.token_bucket.acquire(estimated_tokens)
+                    async for delta in self.backend.stream(model, messages, temperature, max_tokens):
+                        received_chars += len(delta)
+                        yield delta
+                except LLMBackendError as e:
+                    if not e.retryable:
+                        self.breaker.record_success()
+                        raise
+                    self.breaker.record_failure()
+                    self.counters["failures"] += 1
+                    if received_chars or attempt >= self.max_retries:
+                        raise
+                    delay = self._backoff_delay(attempt, e.retry_after)
+                    logger.warning(f"LLM stream failed ({e}), retry {attempt + 1} in {delay:.2f}s")
+                except (asyncio.CancelledError, GeneratorExit):
+                    # Consumer stopped early; a partially received stream still proves the provider is up
+                    if received_chars:
+                        self.breaker.record_success()
+                        finished()
+                    else:
+                        self.breaker.release_probe()
+                    raise
+                except Exception:
+                    self.breaker.record_failure()
+                    self.counters["failures"] += 1
+                    raise
+                else:
+                    self.breaker.record_success()
+                    self.token_bucket.adjust(estimated_tokens - prompt_tokens - received_chars // 4)
+                    finished()
+                    return
+                finally:
+                    self._gate.release()
+
+                attempt += 1
+                self.counters["retries"] += 1
+                await asyncio.sleep(delay)
+        except Exception as e:
+            finished(error=type(e).__name__)
+            raise
+
+    async def _acquire_slot(self, lane: int):
+        try:
+            await self._gate.acquire(lane)
+        except asyncio.CancelledError:
+            self.breaker.release_probe()
+            raise
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff, never shorter than the provider's Retry-After"""
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        delay = random.uniform(0, ceiling)
+        if retry_after:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    def stats(self) -> Dict:
+        """Current limiter and breaker state"""
+        return {
+            "model": self.model,
+            "backend": type(self.backend).__name__,
+            "circuit_state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "in_flight": self._gate.in_flight,
+            "max_concurrency": self._gate.slots,
+            "waiting": self._gate.waiting(),
+            "request_tokens_available": round(self.request_bucket.tokens, 2),
+            "llm_tokens_available": round(self.token_bucket.tokens, 2),
+            **self.counters
+        }
+
+def _estimate_prompt_tokens(messages: List[Dict[str, str]]) -> int:
+    """Rough token estimate (~4 characters per token)"""
+    return sum(len(m.get("content") or "") for m in messages) // 4 + 4 * len(messages)
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+def _backend_error(error: Exception) -> LLMBackendError:
+    """Translate an OpenAI SDK exception into an LLMBackendError"""
+    if isinstance(error, openai.RateLimitError):
+        return LLMBackendError(str(error), retryable=True, retry_after=_retry_after(error))
+    if isinstance(error, openai.APIConnectionError):
+        return LLMBackendError(str(error), retryable=True)
+    if isinstance(error, openai.APIStatusError):
+        retryable = error.status_code >= 500 or error.status_code in (408, 409)
+        return LLMBackendError(str(error), retryable=retryable, retry_after=_retry_after(error))
+    return LLMBackendError(str(error))
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def create_backend() -> LLMBackend:
+    """Create the backend selected by LLM_BACKEND"""
+    if settings.LLM_BACKEND == "static":
+        return StaticBackend()
+    return OpenAIBackend(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
+
+# Global instance shared by all analyzers
+llm_gateway = LLMGateway.from_settings()
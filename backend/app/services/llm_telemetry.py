@@ -0,0 +1,267 @@
+# LLM Telemetry - per prompt type cost, token and latency tracking
+
+import contextvars
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+# USD per 1M tokens (input, output)
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-3.5-turbo": (0.50, 1.50)
+}
+
+LATENCY_BUCKETS_MS = [50, 100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 7500, 10000, 15000, 30000, 60000]
+TOKEN_BUCKETS = [16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768]
+
+@dataclass
+class LLMCallRecord:
+    prompt_type: str
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_ms: float = 0.0
+    retries: int = 0
+    cache_status: str = "none"       # "none", "hit" or "miss"
+    parse_ok: Optional[bool] = None  # unknown until the caller parses the output
+    streamed: bool = False
+    error: Optional[str] = None
+    cost_usd: float = 0.0
+    timestamp: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Cost in USD using the closest known model price"""
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        # Versioned names like "gpt-4o-mini-2024-07-18" use the longest matching prefix
+        matches = [name for name in MODEL_PRICES if model.startswith(name)]
+        prices = MODEL_PRICES[max(matches, key=len)] if matches else (0.0, 0.0)
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+class RollingHistogram:
+    """
+    Fixed-bucket histogram over a sliding time window
+    Observations are kept in per-slot bucket counts, so memory does not grow with traffic
+    """
+
+    def __init__(self, bounds: List[float], window_seconds: int = 3600, slot_seconds: int = 60):
+        self.bounds = bounds
+        self.window_seconds = window_seconds
+        self.slot_seconds = slot_seconds
+        self._slots: Deque[Tuple[int, List[int], List[float]]] = deque()
+
+    def observe(self, value: float, now: Optional[float] = None):
+        slot = self._slot_for(now)
+        slot[1][bisect_left(self.bounds, value)] += 1
+        slot[2][0] += value
+
+    def snapshot(self, window_seconds: Optional[int] = None, now: Optional[float] = None) -> Dict:
+        now = now if now is not None else time.time()
+        self._prune(now)
+        since = now - (window_seconds or self.window_seconds)
+        counts = [0] * (len(self.bounds) + 1)
+        total = 0.0
+        for start, slot_counts, slot_sum in self._slots:
+            if start + self.slot_seconds <= since:
+                continue
+            for i, count in enumerate(slot_counts):
+                counts[i] += count
+            total += slot_sum[0]
+
+        n = sum(counts)
+        return {
+            "count": n,
+            "sum": round(total, 2),
+            "mean": round(total / n, 2) if n else None,
+            "p50": self._quantile(counts, n, 0.50),
+            "p90": self._quantile(counts, n, 0.90),
+            "p99": self._quantile(counts, n, 0.99),
+            "buckets": {
+                (str(bound) if i < len(self.bounds) else "+Inf"): count
+                for i, (bound, count) in enumerate(zip(self.bounds + [None], counts))
+                if count
+            }
+        }
+
+    def _quantile(self, counts: List[int], n: int, q: float) -> Optional[float]:
+        """Linear interpolation inside the bucket holding the q-th observation"""
+        if not n:
+            return None
+        rank = q * n
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                lower = self.bounds[i - 1] if i > 0 else 0
+                upper = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+                return round(lower + (upper - lower) * (rank - cumulative) / count, 2)
+            cumulative += count
+        return float(self.bounds[-1])
+
+    def _slot_for(self, now: Optional[float]):
+        now = now if now is not None else time.time()
+        start = int(now // self.slot_seconds) * self.slot_seconds
+        if not self._slots or self._slots[-1][0] != start:
+            self._slots.append((start, [0] * (len(self.bounds) + 1), [0.0]))
+            self._prune(now)
+        return self._slots[-1]
+
+    def _prune(self, now: float):
+        while self._slots and self._slots[0][0] + self.slot_seconds <= now - self.window_seconds:
+            self._slots.popleft()
+
+class RollingCounters:
+    """Named counters over a sliding time window"""
+
+    def __init__(self, window_seconds: int = 3600, slot_seconds: int = 60):
+        self.window_seconds = window_seconds
+        self.slot_seconds = slot_seconds
+        self._slots: Deque[Tuple[int, Counter]] = deque()
+
+    def add(self, name: str, amount: float = 1, now: Optional[float] = None):
+        now = now if now is not None else time.time()
+        start = int(now // self.slot_seconds) * self.slot_seconds
+        if not self._slots or self._slots[-1][0] != start:
+            self._slots.append((start, Counter()))
+            while self._slots[0][0] + self.slot_seconds <= now - self.window_seconds:
+                self._slots.popleft()
+        self._slots[-1][1][name] += amount
+
+    def totals(self, window_seconds: Optional[int] = None, now: Optional[float] = None) -> Counter:
+        now = now if now is not None else time.time()
+        since = now - (window_seconds or self.window_seconds)
+        merged = Counter()
+        for start, counts in self._slots:
+            if start + self.slot_seconds > since:
+                merged.update(counts)
+        return merged
+
+class _PromptTypeStats:
+    def __init__(self, window_seconds: int):
+        self.latency_ms = RollingHistogram(LATENCY_BUCKETS_MS, window_seconds)
+        self.prompt_tokens = RollingHistogram(TOKEN_BUCKETS, window_seconds)
+        self.completion_tokens = RollingHistogram(TOKEN_BUCKETS, window_seconds)
+        self.counters = RollingCounters(window_seconds)
+
+_current_trace: contextvars.ContextVar[Optional[List[LLMCallRecord]]] = contextvars.ContextVar(
+    "llm_call_trace", default=None
+)
+
+class LLMTelemetry:
+    """
+    Collects one LLMCallRecord per model call and aggregates them per prompt type
+    Aggregates cover a rolling window (one hour by default) and are served by the admin API
+    """
+
+    def __init__(self, window_seconds: int = 3600, recent_size: int = 200):
+        self.window_seconds = window_seconds
+        self._stats: Dict[str, _PromptTypeStats] = {}
+        self._recent: Deque[LLMCallRecord] = deque(maxlen=recent_size)
+
+    def record(self, record: LLMCallRecord) -> LLMCallRecord:
+        """Store a finished call in the aggregates and in the active trace, if any"""
+        if not record.cost_usd:
+            record.cost_usd = estimate_cost(record.model, record.prompt_tokens, record.completion_tokens)
+
+        stats = self._stats_for(record.prompt_type)
+        stats.latency_ms.observe(record.latency_ms)
+        counters = stats.counters
+        counters.add("calls")
+        counters.add("retries", record.retries)
+        counters.add("cost_usd", record.cost_usd)
+        if record.error:
+            counters.add("errors")
+        else:
+            stats.prompt_tokens.observe(record.prompt_tokens)
+            stats.completion_tokens.observe(record.completion_tokens)
+        if record.cache_status == "hit":
+            counters.add("cache_hits")
+        if record.parse_ok is not None:
+            counters.add("parse_ok" if record.parse_ok else "parse_failures")
+
+        self._recent.append(record)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.append(record)
+        return record
+
+    def record_cache_hit(self, prompt_type: str, model: str) -> LLMCallRecord:
+        """Account for a response served from a cache without calling the model"""
+        return self.record(LLMCallRecord(prompt_type=prompt_type, model=model, cache_status="hit", parse_ok=True))
+
+    def record_parse(self, prompt_type: str, ok: bool, record: Optional[LLMCallRecord] = None):
+        """Record whether the model output of a call could be parsed"""
+        if record is not None:
+            record.parse_ok = ok
+        self._stats_for(prompt_type).counters.add("parse_ok" if ok else "parse_failures")
+
+    @contextmanager
+    def trace(self):
+        """Collect the records of every call made inside the block (including child tasks)"""
+        calls: List[LLMCallRecord] = []
+        token = _current_trace.set(calls)
+        try:
+            yield calls
+        finally:
+            _current_trace.reset(token)
+
+    def summary(self, window_minutes: Optional[int] = None, prompt_type: Optional[str] = None) -> Dict:
+        """Aggregated telemetry per prompt type over the requested window"""
+        window_seconds = min(self.window_seconds, (window_minutes or 0) * 60 or self.window_seconds)
+        prompt_types = [prompt_type] if prompt_type else sorted(self._stats)
+        result = {}
+        for name in prompt_types:
+            stats = self._stats.get(name)
+            if stats is None:
+                continue
+            totals = stats.counters.totals(window_seconds)
+            calls = int(totals["calls"])
+            parsed = totals["parse_ok"] + totals["parse_failures"]
+            result[name] = {
+                "calls": calls,
+                "errors": int(totals["errors"]),
+                "retries": int(totals["retries"]),
+                "cache_hits": int(totals["cache_hits"]),
+                "parse_failures": int(totals["parse_failures"]),
+                "parse_failure_rate": round(totals["parse_failures"] / parsed, 4) if parsed else None,
+                "cost_usd": round(totals["cost_usd"], 6),
+                "avg_cost_usd": round(totals["cost_usd"] / calls, 6) if calls else None,
+                "latency_ms": stats.latency_ms.snapshot(window_seconds),
+                "prompt_tokens": stats.prompt_tokens.snapshot(window_seconds),
+                "completion_tokens": stats.completion_tokens.snapshot(window_seconds)
+            }
+        return {
+            "window_minutes": window_seconds // 60,
+            "total_cost_usd": round(sum(p["cost_usd"] for p in result.values()), 6),
+            "prompt_types": result
+        }
+
+    def recent(self, limit: int = 20) -> List[Dict]:
+        """Most recent call records, newest first"""
+        return [asdict(r) for r in list(self._recent)[-limit:][::-1]]
+
+    def _stats_for(self, prompt_type: str) -> _PromptTypeStats:
+        stats = self._stats.get(prompt_type)
+        if stats is None:
+            stats = self._stats[prompt_type] = _PromptTypeStats(self.window_seconds)
+        return stats
+
+def summarize_calls(calls: List[LLMCallRecord]) -> Dict:
+    """Compact per-analysis telemetry, suitable for storing with an analysis result"""
+    return {
+        "calls": [asdict(c) for c in calls],
+        "total_prompt_tokens": sum(c.prompt_tokens for c in calls),
+        "total_completion_tokens": sum(c.completion_tokens for c in calls),
+        "total_latency_ms": round(sum(c.latency_ms for c in calls), 1),
+        "total_cost_usd": round(sum(c.cost_usd for c in calls), 6),
+        "parse_failures": sum(1 for c in calls if c.parse_ok is False),
+        "errors": sum(1 for c in calls if c.error)
+    }
+
+# Global instance
+llm_telemetry = LLMTelemetry()
@@ -0,0 +1,107 @@
+# Keyset Pagination - opaque (created_at, id) cursors and cheap row-count estimates
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+from sqlalchemy import String, literal, select, text, tuple_, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+MAX_PAGE_SIZE = 500
+
+def _uses_raw_timestamps(db: AsyncSession) -> bool:
+    # SQLite keeps timestamps as text: server defaults ("2026-01-02 03:04:05") and
+    # values bound by SQLAlchemy ("... 03:04:05.000000") only compare reliably as
+    # the stored strings, so cursors carry those instead of parsed datetimes
+    return db.bind.dialect.name == "sqlite"
+
+def encode_cursor(created_at: Any, row_id: int) -> str:
+    """Opaque cursor for the row (created_at, id) a page ended on"""
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    payload = json.dumps([created_at, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """(created_at, id) from a cursor; ValueError if it was not made by encode_cursor"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(payload)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(created_at, str) or not isinstance(row_id, int):
+        raise ValueError("Invalid cursor")
+    return created_at, row_id
+
+async def keyset_page(
+    db: AsyncSession,
+    statement: Select,
+    created_column,
+    id_column,
+    limit: int,
+    cursor: Optional[str] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    One page of statement, newest first, and the cursor of the next page
+
+    Rows are ordered by (created_at, id) descending and a page starts strictly
+    after the cursor's row, so with an index ending in (created_at, id) every
+    page is an index seek plus limit rows, however deep it is. One extra row is
+    fetched to tell whether a next page exists; next_cursor is None on the last.
+    created_at is expected to be set on every row (it has a server default).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    raw = _uses_raw_timestamps(db)
+    sort_key = type_coerce(created_column, String) if raw else created_column
+
+    statement = statement.add_columns(sort_key.label("_cursor_created_at"), id_column.label("_cursor_id"))
+    if cursor is not None:
+        created_at, row_id = decode_cursor(cursor)
+        if raw:
+            after = literal(created_at, String)
+        else:
+            try:
+                after = literal(datetime.fromisoformat(created_at), created_column.type)
+            except ValueError:
+                raise ValueError("Invalid cursor")
+        statement = statement.where(tuple_(sort_key, id_column) < tuple_(after, literal(row_id)))
+    statement = statement.order_by(created_column.desc(), id_column.desc()).limit(limit + 1)
+
+    rows = (await db.execute(statement)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]._cursor_created_at, rows[-1]._cursor_id)
+    return rows, next_cursor
+
+async def estimate_count(db: AsyncSession, table, where: Sequence = ()) -> Optional[int]:
+    """
+    Approximate number of rows in table matching where, from planner statistics
+
+    PostgreSQL answers from the planner's row estimate (pg_class/pg_statistic),
+    SQLite from sqlite_stat1 (kept by ANALYZE) or, before that, the highest
+    rowid. Neither touches the rows themselves. None when no estimate is
+    available (filtered queries on SQLite, other databases).
+    """
+    dialect = db.bind.dialect
+    if dialect.name == "postgresql":
+        statement = select(literal(1)).select_from(table).where(*where)
+        compiled = statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+        plan = (await db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    if dialect.name == "sqlite" and not where:
+        try:
+            stat = (await db.execute(
+                text("SELECT stat FROM sqlite_stat1 WHERE tbl = :table LIMIT 1"), {"table": table.name}
+            )).scalar()
+        except Exception:
+            stat = None  # never analyzed: no sqlite_stat1 table yet
+        if stat:
+            return int(stat.split()[0])
+        return (await db.execute(text(f'SELECT max(rowid) FROM "{table.name}"'))).scalar() or 0
+
+    return None
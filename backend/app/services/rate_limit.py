@@ -0,0 +1,354 @@
+# Rate Limiting - plan-aware sliding-window and token-bucket limits enforced by ASGI middleware
+
+import ipaddress
+import logging
+import math
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl
+from app.database import async_session
+from app.services.license_cache import license_cache
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class RateLimitRule:
+    """
+    Request rate allowed to one caller
+
+    requests_per_window is a sliding window (window_seconds long) and caps
+    sustained traffic; burst and refill_per_second form a token bucket that
+    caps how fast that allowance can be spent. A request must pass both.
+    """
+
+    __slots__ = ("requests_per_window", "window_seconds", "burst", "refill_per_second")
+
+    def __init__(self, requests_per_window: int, window_seconds: float = 60, burst: int = 10,
+                 refill_per_second: float = 1.0):
+        self.requests_per_window = requests_per_window
+        self.window_seconds = window_seconds
+        self.burst = burst
+        self.refill_per_second = refill_per_second
+
+# Per plan (see SubscriptionManager.PLANS); callers without a user id are limited by address as "anonymous",
+# and "address" caps everything one client address sends, whichever user ids it claims
+PLAN_RATE_LIMITS = {
+    "address": RateLimitRule(600, burst=100, refill_per_second=10),
+    "anonymous": RateLimitRule(30, burst=10, refill_per_second=0.5),
+    "free": RateLimitRule(30, burst=10, refill_per_second=0.5),
+    "basic": RateLimitRule(120, burst=30, refill_per_second=2),
+    "pro": RateLimitRule(600, burst=60, refill_per_second=10),
+    "enterprise": RateLimitRule(3000, burst=200, refill_per_second=50),
+    # Type-ahead: a few requests a second while someone types, whatever their plan
+    "autocomplete": RateLimitRule(600, burst=30, refill_per_second=5),
+}
+
+# Paths limited by their own rule (a separate bucket per caller) instead of the caller's plan
+ROUTE_RATE_LIMITS = {
+    "/api/v1/keywords/autocomplete": "autocomplete",
+    "/keywords/autocomplete": "autocomplete",
+}
+
+class RateLimitDecision:
+    """Outcome of one request against a rule, and the values for the RateLimit-* headers"""
+
+    __slots__ = ("allowed", "limit", "remaining", "reset_seconds", "retry_after", "policy")
+
+    def __init__(self, allowed: bool, limit: int, remaining: int, reset_seconds: int, retry_after: int, policy: str):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset_seconds = reset_seconds
+        self.retry_after = retry_after
+        self.policy = policy
+
+    def headers(self) -> List[Tuple[bytes, bytes]]:
+        headers = [
+            (b"ratelimit-limit", str(self.limit).encode()),
+            (b"ratelimit-remaining", str(self.remaining).encode()),
+            (b"ratelimit-reset", str(self.reset_seconds).encode()),
+            (b"ratelimit-policy", self.policy.encode()),
+        ]
+        if not self.allowed:
+            headers.append((b"retry-after", str(self.retry_after).encode()))
+        return headers
+
+def decide(rule: RateLimitRule, allowed: bool, elapsed: float, previous: float, current: float,
+           tokens: float) -> RateLimitDecision:
+    """
+    Decision from the limiter state after the request was (or was not) counted
+
+    elapsed is the time into the current window; previous and current are the
+    counts of the previous and current windows; tokens is what is left in the bucket.
+    """
+    window, limit = rule.window_seconds, rule.requests_per_window
+    estimated = previous * (1 - elapsed / window) + current
+    retry_after = 0.0
+    if not allowed:
+        if tokens < 1:
+            retry_after = (1 - tokens) / rule.refill_per_second
+        if estimated + 1 > limit:
+            if current + 1 > limit or previous == 0:
+                wait = window - elapsed  # the current window has to roll over
+            else:
+                wait = window * (1 - (limit - current - 1) / previous) - elapsed
+            retry_after = max(retry_after, wait)
+    return RateLimitDecision(
+        allowed=allowed,
+        limit=limit,
+        remaining=max(0, min(int(limit - estimated), int(tokens))),
+        reset_seconds=max(1, math.ceil(window - elapsed)),
+        retry_after=max(1, math.ceil(retry_after)),
+        policy=f"{limit};w={window:g}, {rule.burst};burst"
+    )
+
+class LocalRateLimitBackend:
+    """
+    Limiter state held in this process
+
+    The stand-in for a shared backend: exact for one worker, per-worker with
+    several. Idle callers are dropped once max_keys are tracked.
+    """
+
+    def __init__(self, max_keys: int = 100000, clock: Callable[[], float] = time.time):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._state: Dict[str, List[float]] = {}  # key -> [window index, current, previous, tokens, bucket updated at]
+
+    async def hit(self, key: str, rule: RateLimitRule) -> RateLimitDecision:
+        now = self.clock()
+        window_index = math.floor(now / rule.window_seconds)
+        state = self._state.get(key)
+        if state is None:
+            if len(self._state) >= self.max_keys:
+                self._prune(now)
+            state = self._state[key] = [window_index, 0, 0, rule.burst, now]
+        elif state[0] != window_index:
+            state[2] = state[1] if state[0] == window_index - 1 else 0
+            state[1] = 0
+            state[0] = window_index
+
+        elapsed = now - window_index * rule.window_seconds
+        state[3] = min(rule.burst, state[3] + (now - state[4]) * rule.refill_per_second)
+        state[4] = now
+        estimated = state[2] * (1 - elapsed / rule.window_seconds) + state[1]
+        allowed = estimated + 1 <= rule.requests_per_window and state[3] >= 1
+        if allowed:
+            state[1] += 1
+            state[3] -= 1
+        return decide(rule, allowed, elapsed, state[2], state[1], state[3])
+
+    def _prune(self, now: float):
+        # Forget callers whose windows and buckets have both recovered
+        horizon = max(rule.window_seconds * 2 for rule in PLAN_RATE_LIMITS.values())
+        for key in [key for key, state in self._state.items() if now - state[4] > horizon]:
+            del self._state[key]
+        while len(self._state) >= self.max_keys:
+            self._state.pop(next(iter(self._state)))
+
+# Sliding window and token bucket in one atomic step, on the Redis server's clock
+_REDIS_HIT = """
+local window, limit = tonumber(ARGV[1]), tonumber(ARGV[2])
+local burst, refill = tonumber(ARGV[3]), tonumber(ARGV[4])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local index = math.floor(now / window)
+local s = redis.call('HMGET', KEYS[1], 'w', 'cur', 'prev', 'tokens', 'ts')
+local w, cur, prev = tonumber(s[1]), tonumber(s[2]) or 0, tonumber(s[3]) or 0
+local tokens, ts = tonumber(s[4]) or burst, tonumber(s[5]) or now
+if w ~= index then
+  if w == index - 1 then prev = cur else prev = 0 end
+  cur = 0
+end
+local elapsed = now - index * window
+tokens = math.min(burst, tokens + math.max(0, now - ts) * refill)
+local allowed = 0
+if prev * (1 - elapsed / window) + cur + 1 <= limit and tokens >= 1 then
+  allowed = 1
+  cur = cur + 1
+  tokens = tokens - 1
+end
+redis.call('HSET', KEYS[1], 'w', index, 'cur', cur, 'prev', prev, 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(window * 2 + burst / refill))
+return {allowed, tostring(elapsed), prev, cur, tostring(tokens)}
+"""
+
+class RedisRateLimitBackend:
+    """
+    Limiter state shared by every worker through Redis (RATE_LIMIT_BACKEND_URL=redis://...)
+
+    Each request is one script call that updates the caller's window and
+    bucket atomically. Needs the optional redis package (pip install redis).
+    """
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        try:
+            from redis import asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_BACKEND_URL needs the redis package (pip install redis)") from e
+        self.prefix = prefix
+        self.client = redis.from_url(url)
+        self._script = self.client.register_script(_REDIS_HIT)
+
+    async def hit(self, key: str, rule: RateLimitRule) -> RateLimitDecision:
+        allowed, elapsed, previous, current, tokens = await self._script(
+            keys=[self.prefix + key],
+            args=[rule.window_seconds, rule.requests_per_window, rule.burst, rule.refill_per_second]
+        )
+        return decide(rule, bool(allowed), float(elapsed), float(previous), float(current), float(tokens))
+
+def create_backend(url: str = ""):
+    """Backend for RATE_LIMIT_BACKEND_URL: shared Redis state, or this process's memory when unset"""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisRateLimitBackend(url)
+    if url:
+        raise ValueError(f"Unsupported rate limit backend: {url}")
+    return LocalRateLimitBackend()
+
+async def _plan_for_user(user_id: int) -> str:
+    found, cached = license_cache.get(user_id)
+    if found:
+        return cached.plan if cached else "free"
+    # Imported here: subscription_service pulls in the models, which need app.database first
+    from app.services.subscription_service import SubscriptionManager
+    try:
+        async with async_session() as db:
+            return (await SubscriptionManager.get_user_plan(db, user_id)).plan_id
+    except Exception as e:
+        logger.warning("Rate limit plan lookup failed for user %s: %s", user_id, e)
+        return "free"
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware applying the caller's plan rate limit to every HTTP request
+
+    The caller is the user_id query parameter the routes identify users by
+    (falling back to the client address); their plan comes from the license
+    cache. That parameter is not verified, so every request also counts
+    against its client address ("address" rule), and one address gets its
+    own buckets for at most max_user_ids_per_address user ids per window;
+    further ids are limited as that address's anonymous traffic, without a
+    plan lookup. Behind a reverse proxy listed in trusted_proxies (addresses
+    or networks), the client address is taken from X-Forwarded-For. Paths in
+    route_rules use their own rule instead of the plan's. Responses carry
+    RateLimit-Limit/Remaining/Reset/Policy headers; rejected requests get a
+    429 with Retry-After without reaching the app.
+    """
+
+    def __init__(self, app, backend=None, rules: Optional[Dict[str, RateLimitRule]] = None,
+                 plan_for_user: Optional[Callable[[int], Awaitable[str]]] = None,
+                 exempt_paths: Iterable[str] = (), max_user_ids_per_address: int = 5,
+                 max_addresses: int = 100000, trusted_proxies: Iterable[str] = (),
+                 route_rules: Optional[Dict[str, str]] = None, clock: Callable[[], float] = time.time):
+        self.app = app
+        self.backend = backend
+        self.rules = {**PLAN_RATE_LIMITS, **(rules or {})}
+        self.plan_for_user = plan_for_user or _plan_for_user
+        self.exempt_paths = frozenset(exempt_paths)
+        self.max_user_ids_per_address = max_user_ids_per_address
+        self.max_addresses = max_addresses
+        self.trusted_proxies = [ipaddress.ip_network(proxy, strict=False) for proxy in trusted_proxies]
+        self.route_rules = ROUTE_RATE_LIMITS if route_rules is None else route_rules
+        self.clock = clock
+        self._user_ids: Dict[str, Tuple[int, set]] = {}  # address -> (window index, user ids seen in it)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        backend = self.backend or rate_limit_backend()
+        address, key, user_id = self._caller(scope)
+        plan = self.route_rules.get(scope["path"])
+        if plan is not None:
+            key = f"{plan}:{key}"
+        elif user_id is not None:
+            plan = await self.plan_for_user(user_id)
+        else:
+            plan = "anonymous"
+        decision = await backend.hit(key, self.rules.get(plan) or self.rules["free"])
+        if decision.allowed:
+            total = await backend.hit(f"address:{address}", self.rules["address"])
+            if not total.allowed:
+                decision, plan = total, "address"
+        if not decision.allowed:
+            if plan == "address":
+                limited = "this address"
+            elif plan in self.route_rules.values():
+                limited = f"{plan} requests"
+            else:
+                limited = f"the {plan} plan"
+            body = (f'{{"detail":"Rate limit exceeded for {limited}, '
+                    f'retry in {decision.retry_after} s"}}').encode()
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                            *decision.headers()]
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), *decision.headers()]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    def _caller(self, scope) -> Tuple[str, str, Optional[int]]:
+        """(client address, limiter key, user id, None for anonymous callers)"""
+        address = self._client_address(scope)
+        query = scope.get("query_string", b"")
+        if b"user_id=" in query:
+            user_id = dict(parse_qsl(query.decode("latin-1"))).get("user_id", "")
+            if user_id.isdigit() and self._admit_user_id(address, int(user_id)):
+                return address, f"user:{user_id}", int(user_id)
+        return address, f"ip:{address}", None
+
+    def _client_address(self, scope) -> str:
+        # The peer, or behind trusted proxies the last X-Forwarded-For hop they did not add themselves
+        client = scope.get("client")
+        address = client[0] if client else "unknown"
+        if not self._trusted(address):
+            return address
+        forwarded = ",".join(value.decode("latin-1") for name, value in scope.get("headers", [])
+                             if name == b"x-forwarded-for")
+        for hop in reversed([hop.strip() for hop in forwarded.split(",") if hop.strip()]):
+            address = hop
+            if not self._trusted(hop):
+                break
+        return address
+
+    def _trusted(self, address: str) -> bool:
+        if not self.trusted_proxies:
+            return False
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    def _admit_user_id(self, address: str, user_id: int) -> bool:
+        # Whether this unverified user id gets its own bucket: rotating ids from one address must not mint new ones
+        window_index = math.floor(self.clock() / self.rules["address"].window_seconds)
+        seen = self._user_ids.get(address)
+        if seen is None or seen[0] != window_index:
+            if seen is None and len(self._user_ids) >= self.max_addresses:
+                self._user_ids.pop(next(iter(self._user_ids)))
+            seen = self._user_ids[address] = (window_index, set())
+        if user_id in seen[1]:
+            return True
+        if len(seen[1]) >= self.max_user_ids_per_address:
+            return False
+        seen[1].add(user_id)
+        return True
+
+_backend = None
+
+def rate_limit_backend():
+    """The process-wide backend, created on first use from RATE_LIMIT_BACKEND_URL"""
+    global _backend
+    if _backend is None:
+        _backend = create_backend(settings.RATE_LIMIT_BACKEND_URL)
+    return _backend
@@ -5,10 +5,14 @@ from bs4 import BeautifulSoup
 import textstat
 import re
 from urllib.parse import urljoin, urlparse
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, or_
 from app.models.seodata import SeoData
+from app.services.llm_telemetry import llm_telemetry, summarize_calls
+from app.services.pagination import encode_cursor, keyset_page
+from app.services.seodata_archive import created_between, cutoff_month, get_archived_history
+from app.settings import settings
 from app.schemas.seo import (
     SEOAnalysisRequest, SEOAnalysisResult, TechnicalSEO, 
     ContentAnalysis, KeywordAnalysis, SEORecommendation,
@@ -418,15 +422,16 @@ async def perform_seo_analysis(db: AsyncSession, user_id: int, request: SEOAnaly
         except Exception:
             content = ""
         
-        # Enhance with AI if content is available
-        if content and len(content) > 100:
-            try:
-                enhanced_analysis = await enhance_seo_with_ai(basic_analysis, content)
-            except Exception as e:
-                print(f"AI enhancement failed, using basic analysis: {str(e)}")
+        # Enhance with AI if content is available, tracing every model call it makes
+        with llm_telemetry.trace() as llm_calls:
+            if content and len(content) > 100:
+                try:
+                    enhanced_analysis = await enhance_seo_with_ai(basic_analysis, content)
+                except Exception as e:
+                    print(f"AI enhancement failed, using basic analysis: {str(e)}")
+                    enhanced_analysis = basic_analysis
+            else:
                 enhanced_analysis = basic_analysis
-        else:
-            enhanced_analysis = basic_analysis
         
         # Convert the result to a dict with JSON serializable values
         result_dict = enhanced_analysis.model_dump()
@@ -435,6 +440,10 @@ async def perform_seo_analysis(db: AsyncSession, user_id: int, request: SEOAnaly
         if 'analysis_date' in result_dict:
             result_dict['analysis_date'] = result_dict['analysis_date'].isoformat()
         
+        # Keep the cost and latency of this analysis alongside its result
+        if llm_calls:
+            result_dict['llm_telemetry'] = summarize_calls(llm_calls)
+        
         # Save to database
         seodata = SeoData(
             user_id=user_id,
@@ -474,21 +483,66 @@ async def perform_seo_analysis(db: AsyncSession, user_id: int, request: SEOAnaly
         
         return analysis_result
 
-async def get_recent_seo_results(db: AsyncSession, user_id: int, limit: int = 10) -> List[SeoData]:
-    """Get recent SEO analyses for a user"""
+async def get_recent_seo_results(
+    db: AsyncSession,
+    user_id: int,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    include_results: bool = False,
+    include_archived: bool = False
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Get a page of a user's recent SEO analyses (summary columns unless include_results) and the next page's cursor
+    
+    With include_archived, pages continue past the hot table into the archived months.
+    """
+    columns = [SeoData.id, SeoData.url, SeoData.score, SeoData.created_at]
+    if include_results:
+        columns.append(SeoData.analysis_result)
+    rows, next_cursor = await keyset_page(
+        db, select(*columns).where(SeoData.user_id == user_id), SeoData.created_at, SeoData.id, limit, cursor
+    )
+    analyses = []
+    for row in rows:
+        analysis = {
+            "id": row.id,
+            "url": row.url,
+            "score": row.score,
+            "created_at": row.created_at.isoformat() if row.created_at else None
+        }
+        if include_results:
+            analysis["analysis_result"] = row.analysis_result
+        analyses.append(analysis)
+    
+    if include_archived and next_cursor is None:
+        after = encode_cursor(rows[-1].created_at, rows[-1].id) if rows else cursor
+        if len(analyses) < limit:
+            archived, next_cursor = await get_archived_history(db, user_id, limit - len(analyses), after, include_results)
+            analyses.extend(archived)
+        else:
+            next_cursor = after  # the archive continues on the next page
+    return analyses, next_cursor
+
+async def has_analyzed_site(db: AsyncSession, user_id: int, url: str) -> bool:
+    """Whether the user already has an analysis of a page on url's host"""
+    host = urlparse(url).netloc
     result = await db.execute(
-        select(SeoData)
-        .where(SeoData.user_id == user_id)
-        .order_by(desc(SeoData.created_at))
-        .limit(limit)
+        select(SeoData.id)
+        .where(
+            SeoData.user_id == user_id,
+            or_(SeoData.url.like(f"http://{host}/%"), SeoData.url.like(f"https://{host}/%"),
+                SeoData.url.in_([f"http://{host}", f"https://{host}"]))
+        )
+        .limit(1)
     )
-    return result.scalars().all()
+    return result.first() is not None
 
 async def get_seo_analytics(db: AsyncSession, user_id: int) -> Dict:
-    """Get SEO analytics and trends for a user"""
+    """Get SEO analytics and trends for a user over the hot months (SEODATA_HOT_MONTHS)"""
+    since = cutoff_month(settings.SEODATA_HOT_MONTHS)
     result = await db.execute(
         select(SeoData)
-        .where(SeoData.user_id == user_id)
+        .where(SeoData.user_id == user_id, *created_between(db.bind.dialect.name, since, None))
         .order_by(desc(SeoData.created_at))
     )
     analyses = result.scalars().all()
@@ -532,4 +586,4 @@ async def get_seo_analytics(db: AsyncSession, user_id: int) -> Dict:
         "avg_score": round(avg_score, 2),
         "trend": trend,
         "top_issues": top_issues[:5]
-    }
+    }
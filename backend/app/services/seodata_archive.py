@@ -0,0 +1,344 @@
+# SEO Data Archive - monthly seodata partitions, and months past retention moved to compressed files
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from typing import IO, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import String, delete, func, insert, select, text, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.seodata import SeoData, SeoDataArchive
+from app.services.pagination import decode_cursor, encode_cursor
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLUMNS = ("id", "user_id", "url", "analysis_result", "score", "created_at")
+
+def month_key(day: date) -> str:
+    return f"{day.year:04d}-{day.month:02d}"
+
+def _month_start(month: str) -> date:
+    year, month_number = month.split("-")
+    return date(int(year), int(month_number), 1)
+
+def _add_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def _naive_utc(value) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def cutoff_month(hot_months: int, today: Optional[date] = None) -> date:
+    """First day of the oldest month kept in seodata: hot_months=12 in 2026-10 keeps 2025-11 onwards"""
+    return _add_months((today or datetime.utcnow().date()).replace(day=1), 1 - hot_months)
+
+def created_between(dialect: str, start: Optional[date], end: Optional[date]) -> List:
+    """Conditions for seodata.created_at in [start, end) (None: unbounded) that PostgreSQL prunes partitions by"""
+    # SQLite stores timestamps as text in more than one format; date strings bound both, on the index
+    if dialect == "sqlite":
+        created, bounds = type_coerce(SeoData.created_at, String), [day and day.isoformat() for day in (start, end)]
+    else:
+        created, bounds = SeoData.created_at, [
+            day and datetime(day.year, day.month, day.day, tzinfo=timezone.utc) for day in (start, end)
+        ]
+    return ([created >= bounds[0]] if start else []) + ([created < bounds[1]] if end else [])
+
+def _partition_name(month: date) -> str:
+    return f"seodata_p{month.year:04d}_{month.month:02d}"
+
+async def ensure_partitions(db: AsyncSession, months_ahead: int = 3, today: Optional[date] = None) -> List[str]:
+    """Create the monthly seodata partitions up to months_ahead from now (PostgreSQL; a no-op elsewhere)"""
+    if db.bind.dialect.name != "postgresql":
+        return []
+    current = (today or datetime.utcnow().date()).replace(day=1)
+    existing = set((await db.execute(text(
+        "SELECT child.relname FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent WHERE parent.relname = 'seodata'"
+    ))).scalars())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = _add_months(current, offset)
+        name = _partition_name(month)
+        if name not in existing:
+            await _create_partition(db, month)
+            created.append(name)
+    await db.commit()
+    return created
+
+async def _create_partition(db: AsyncSession, month: date):
+    # DDL takes no bind parameters; the bounds are dates we formatted ourselves
+    await db.run_sync(lambda session: session.connection().exec_driver_sql(
+        f"CREATE TABLE IF NOT EXISTS {_partition_name(month)} PARTITION OF seodata "
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{_add_months(month, 1).isoformat()} 00:00:00+00')"
+    ))
+
+def _archive_path(month: str) -> str:
+    return os.path.join(settings.SEODATA_ARCHIVE_DIR, f"seodata-{month}.jsonl.gz")
+
+def _read_archive_file(path: str) -> List[Dict]:
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        return [json.loads(line) for line in archive]
+
+def _read_archive_batches(path: str, batch_size: int) -> Iterator[List[Dict]]:
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        batch = []
+        for line in archive:
+            batch.append(json.loads(line))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+def _open_archive(path: str, previous: Optional[str]) -> Tuple[IO, int]:
+    """Write handle for a new version of an archive file, starting with the rows of previous; and their count"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    archive = gzip.open(f"{path}.partial", "wt", encoding="utf-8", compresslevel=6)
+    rows = 0
+    if previous is not None:
+        with gzip.open(previous, "rt", encoding="utf-8") as old:
+            for line in old:
+                archive.write(line)
+                rows += 1
+    return archive, rows
+
+def _append_rows(archive: IO, rows: List[Dict]):
+    archive.write("".join(json.dumps(row, separators=(",", ":"), default=str) + "\n" for row in rows))
+
+def _close_archive(archive: IO, path: str, keep: bool):
+    archive.close()
+    if keep:
+        os.replace(f"{path}.partial", path)  # readers never see a half-written file
+    else:
+        os.remove(f"{path}.partial")
+
+class ArchiveReader:
+    """
+    Lazily loaded archive months
+
+    A month's file is read the first time it is queried and kept, indexed by
+    user newest first, for the max_months most recently used months. Files
+    are replaced whole, so a cached month is dropped when its file changes.
+    """
+
+    def __init__(self, max_months: int = 3):
+        self.max_months = max_months
+        self._months: "OrderedDict[str, Tuple[float, Dict[int, List[Dict]]]]" = OrderedDict()
+        self._lock = threading.Lock()  # user_rows() runs in worker threads
+        self.loads = 0
+
+    def user_rows(self, path: str, user_id: int) -> List[Dict]:
+        modified = os.path.getmtime(path)
+        with self._lock:
+            cached = self._months.get(path)
+            if cached is not None and cached[0] == modified:
+                self._months.move_to_end(path)
+                return cached[1].get(user_id, [])
+
+        # Read without the lock, so other months stay servable meanwhile
+        by_user: Dict[int, List[Dict]] = {}
+        for row in _read_archive_file(path):
+            row["_key"] = (_naive_utc(row["created_at"]), row["id"])
+            by_user.setdefault(row["user_id"], []).append(row)
+        for rows in by_user.values():
+            rows.sort(key=lambda row: row["_key"], reverse=True)
+        with self._lock:
+            self._months[path] = (modified, by_user)
+            self._months.move_to_end(path)
+            self.loads += 1
+            while len(self._months) > self.max_months:
+                self._months.popitem(last=False)
+        return by_user.get(user_id, [])
+
+    def invalidate(self, path: Optional[str] = None):
+        with self._lock:
+            if path is None:
+                self._months.clear()
+            else:
+                self._months.pop(path, None)
+
+    def stats(self) -> Dict:
+        return {"loaded_months": len(self._months), "max_months": self.max_months, "loads": self.loads}
+
+async def archive_month(db: AsyncSession, month: str, batch_size: int = 1000) -> int:
+    """
+    Move one month of seodata into its archive file and return the rows moved
+
+    Rows are streamed out in batches into a new version of the month's file
+    (after any rows archived earlier for the month), which replaces the old
+    one before any row is deleted. On PostgreSQL the month's
+    partition is then detached and dropped; elsewhere the month is deleted
+    with one range delete. Daily rollups keep counting the archived rows.
+    """
+    start = _month_start(month)
+    end = _add_months(start, 1)
+    path = _archive_path(month)
+    dialect = db.bind.dialect.name
+
+    existing = await db.get(SeoDataArchive, month)
+    previous = path if existing is not None and os.path.exists(path) else None
+    archive, rows = await asyncio.to_thread(_open_archive, path, previous)
+    moved = 0
+    try:
+        stream = await db.stream(
+            select(*(SeoData.__table__.c[name] for name in ARCHIVE_COLUMNS))
+            .where(*created_between(dialect, start, end))
+            .order_by(SeoData.created_at, SeoData.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for batch in stream.mappings().partitions():
+            await asyncio.to_thread(_append_rows, archive, [
+                {**row, "created_at": row["created_at"].isoformat()} for row in batch
+            ])
+            moved += len(batch)
+    finally:
+        await asyncio.to_thread(_close_archive, archive, path, moved > 0)
+    if not moved:
+        return 0
+
+    partition_name = _partition_name(start)
+    if dialect == "postgresql" and (await db.execute(text("SELECT to_regclass(:name)"), {"name": partition_name})).scalar():
+        await db.execute(text(f"ALTER TABLE seodata DETACH PARTITION {partition_name}"))
+        await db.execute(text(f"DROP TABLE {partition_name}"))
+    await db.execute(delete(SeoData).where(*created_between(dialect, start, end)))  # any left, e.g. in the default partition
+    if existing:
+        existing.rows, existing.path, existing.archived_at = rows + moved, path, func.now()
+    else:
+        db.add(SeoDataArchive(month=month, path=path, rows=moved))
+    await db.commit()
+    archive_reader.invalidate(path)
+    return moved
+
+async def restore_month(db: AsyncSession, month: str, batch_size: int = 1000) -> int:
+    """Copy an archived month back into seodata in bulk, then drop its archive file; returns the rows restored"""
+    archive = await db.get(SeoDataArchive, month)
+    if archive is None:
+        raise ValueError(f"Month {month} is not archived")
+    if db.bind.dialect.name == "postgresql":
+        await _create_partition(db, _month_start(month))
+    batches, restored = _read_archive_batches(archive.path, batch_size), 0
+    try:
+        while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+            await db.execute(insert(SeoData.__table__), [
+                {**row, "created_at": datetime.fromisoformat(row["created_at"])} for row in batch
+            ])
+            restored += len(batch)
+    finally:
+        batches.close()
+    await db.delete(archive)
+    await db.commit()
+    archive_reader.invalidate(archive.path)
+    os.remove(archive.path)
+    return restored
+
+async def apply_retention(db: AsyncSession, hot_months: Optional[int] = None, batch_size: int = 1000,
+                          today: Optional[date] = None) -> Dict:
+    """Archive every month older than the newest hot_months (SEODATA_HOT_MONTHS) that still has rows"""
+    hot_months = settings.SEODATA_HOT_MONTHS if hot_months is None else hot_months
+    cutoff = cutoff_month(hot_months, today)
+    oldest = (await db.execute(
+        select(func.min(SeoData.created_at)).where(*created_between(db.bind.dialect.name, None, cutoff))
+    )).scalar()
+    archived = {}
+    if oldest is not None:
+        month = _naive_utc(oldest).date().replace(day=1)
+        while month < cutoff:
+            moved = await archive_month(db, month_key(month), batch_size)
+            if moved:
+                archived[month_key(month)] = moved
+            month = _add_months(month, 1)
+    return {"hot_months": hot_months, "archived_before": cutoff.isoformat(), "archived": archived,
+            "partitions_created": await ensure_partitions(db, settings.SEODATA_PARTITION_MONTHS_AHEAD, today)}
+
+async def get_archived_history(db: AsyncSession, user_id: int, limit: int, cursor: Optional[str] = None,
+                               include_results: bool = False) -> Tuple[List[Dict], Optional[str]]:
+    """A page of a user's archived analyses older than cursor, newest first, in the form of the hot history"""
+    before = None
+    if cursor is not None:
+        created_at, row_id = decode_cursor(cursor)
+        before = (_naive_utc(created_at), row_id)
+    archives = (await db.execute(select(SeoDataArchive.month, SeoDataArchive.path).order_by(SeoDataArchive.month.desc()))).all()
+
+    page: List[Dict] = []
+    for month, path in archives:
+        if before is not None and _month_start(month) > before[0].date():
+            continue
+        if not os.path.exists(path):
+            logger.warning("Archive file for %s is missing: %s", month, path)
+            continue
+        user_rows = await asyncio.to_thread(archive_reader.user_rows, path, user_id)
+        for row in user_rows:
+            if before is None or row["_key"] < before:
+                page.append(row)
+                if len(page) > limit:
+                    break
+        if len(page) > limit:
+            break
+
+    analyses = []
+    for row in page[:limit]:
+        analysis = {"id": row["id"], "url": row["url"], "score": row["score"], "created_at": row["created_at"],
+                    "archived": True}
+        if include_results:
+            analysis["analysis_result"] = row["analysis_result"]
+        analyses.append(analysis)
+    next_cursor = encode_cursor(page[limit - 1]["created_at"], page[limit - 1]["id"]) if len(page) > limit else None
+    return analyses, next_cursor
+
+async def archived_months(db: AsyncSession, start: Optional[date] = None, end: Optional[date] = None) -> List[Tuple[str, str]]:
+    """(month, path) of the archived months overlapping start..end (inclusive), oldest first"""
+    archives = (await db.execute(select(SeoDataArchive.month, SeoDataArchive.path).order_by(SeoDataArchive.month))).all()
+    return [
+        (month, path) for month, path in archives
+        if (end is None or _month_start(month) <= end) and (start is None or _add_months(_month_start(month), 1) > start)
+    ]
+
+async def archived_batches(archives: List[Tuple[str, str]], user_id: Optional[int] = None, url_prefix: Optional[str] = None,
+                           start: Optional[date] = None, end: Optional[date] = None,
+                           batch_size: int = 1000) -> AsyncIterator[List[Dict]]:
+    """Archived rows matching the filters (end inclusive), read from the files a batch at a time"""
+    for month, path in archives:
+        if not os.path.exists(path):
+            logger.warning("Archive file for %s is missing: %s", month, path)
+            continue
+        batches = _read_archive_batches(path, batch_size)
+        try:
+            while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+                rows = [
+                    row for row in batch
+                    if (user_id is None or row["user_id"] == user_id)
+                    and (url_prefix is None or row["url"].startswith(url_prefix))
+                    and (start is None or _naive_utc(row["created_at"]).date() >= start)
+                    and (end is None or _naive_utc(row["created_at"]).date() <= end)
+                ]
+                if rows:
+                    yield rows
+        finally:
+            batches.close()
+
+async def get_archive_status(db: AsyncSession) -> Dict:
+    """Archived months with their row counts and file sizes"""
+    archives = (await db.execute(select(SeoDataArchive).order_by(SeoDataArchive.month))).scalars().all()
+    return {
+        "hot_months": settings.SEODATA_HOT_MONTHS,
+        "archive_dir": settings.SEODATA_ARCHIVE_DIR,
+        "months": [
+            {"month": archive.month, "rows": archive.rows,
+             "bytes": os.path.getsize(archive.path) if os.path.exists(archive.path) else None,
+             "archived_at": archive.archived_at.isoformat() if archive.archived_at else None}
+            for archive in archives
+        ],
+        "reader": archive_reader.stats()
+    }
+
+# Global instance
+archive_reader = ArchiveReader(max_months=settings.SEODATA_ARCHIVE_CACHE_MONTHS)
@@ -0,0 +1,246 @@
+# SEO Data Export - analyses streamed from a server-side cursor and encoded batch by batch to NDJSON, CSV or Parquet
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import sys
+from datetime import date, timedelta
+from typing import AsyncIterator, Dict, List, Optional
+from sqlalchemy import select
+from app.database import read_session
+from app.models.seodata import SeoData
+from app.services.seodata_archive import ARCHIVE_COLUMNS, archived_batches, archived_months, created_between
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def _path(result: Optional[Dict], *keys):
+    for key in keys:
+        if not isinstance(result, dict):
+            return None
+        result = result.get(key)
+    return result
+
+def _count(value) -> Optional[int]:
+    return len(value) if isinstance(value, list) else None
+
+# Flattened summary columns (CSV and Parquet): name -> (Parquet type, value from an exported row)
+SUMMARY_COLUMNS = {
+    "id": ("int64", lambda row: row["id"]),
+    "user_id": ("int64", lambda row: row["user_id"]),
+    "url": ("string", lambda row: row["url"]),
+    "score": ("float64", lambda row: row["score"]),
+    "created_at": ("string", lambda row: row["created_at"]),
+    "ssl_enabled": ("bool", lambda row: _path(row["analysis_result"], "technical_seo", "ssl_enabled")),
+    "mobile_friendly": ("bool", lambda row: _path(row["analysis_result"], "technical_seo", "mobile_friendly")),
+    "page_speed_score": ("float64", lambda row: _path(row["analysis_result"], "technical_seo", "page_speed_score")),
+    "images_without_alt": ("int64", lambda row: _path(row["analysis_result"], "technical_seo", "images_without_alt")),
+    "internal_links": ("int64", lambda row: _path(row["analysis_result"], "technical_seo", "internal_links")),
+    "external_links": ("int64", lambda row: _path(row["analysis_result"], "technical_seo", "external_links")),
+    "broken_links": ("int64", lambda row: _count(_path(row["analysis_result"], "technical_seo", "broken_links"))),
+    "word_count": ("int64", lambda row: _path(row["analysis_result"], "content_analysis", "word_count")),
+    "readability_score": ("float64", lambda row: _path(row["analysis_result"], "content_analysis", "readability_score")),
+    "content_quality_score": ("float64",
+                              lambda row: _path(row["analysis_result"], "content_analysis", "content_quality_score")),
+    "recommendations": ("int64", lambda row: _count(_path(row["analysis_result"], "recommendations"))),
+    "high_priority_recommendations": ("int64", lambda row: sum(
+        1 for r in _path(row["analysis_result"], "recommendations") or [] if isinstance(r, dict) and r.get("priority") == "high"
+    )),
+}
+
+def summarize(row: Dict) -> Dict:
+    return {name: value(row) for name, (_, value) in SUMMARY_COLUMNS.items()}
+
+class NdjsonEncoder:
+    """One JSON object per analysis, with the full analysis_result unless include_results is off"""
+
+    def __init__(self, include_results: bool = True):
+        self.include_results = include_results
+
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, rows: List[Dict]) -> bytes:
+        if not self.include_results:
+            rows = [{name: value for name, value in row.items() if name != "analysis_result"} for row in rows]
+        return "".join(json.dumps(row, separators=(",", ":"), default=str) + "\n" for row in rows).encode("utf-8")
+
+    def footer(self) -> bytes:
+        return b""
+
+class CsvEncoder:
+    """The flattened summary columns, with a header row (analysis_result itself is left out)"""
+
+    def header(self) -> bytes:
+        return self._write(lambda writer: writer.writeheader())
+
+    def encode(self, rows: List[Dict]) -> bytes:
+        return self._write(lambda writer: writer.writerows(map(summarize, rows)))
+
+    def _write(self, write) -> bytes:
+        buffer = io.StringIO()
+        write(csv.DictWriter(buffer, fieldnames=list(SUMMARY_COLUMNS)))
+        return buffer.getvalue().encode("utf-8")
+
+    def footer(self) -> bytes:
+        return b""
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain (Parquet needs tell())"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+class ParquetEncoder:
+    """
+    The summary columns (plus analysis_result as JSON text) as a Parquet file, one row group per batch
+
+    Needs the optional pyarrow package (pip install pyarrow). Parquet keeps
+    its index in a footer, so the file is only readable once fully received.
+    """
+
+    def __init__(self, include_results: bool = True):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise RuntimeError("Parquet export needs the pyarrow package (pip install pyarrow)") from e
+        self.pa = pyarrow
+        self.include_results = include_results
+        fields = [(name, getattr(pyarrow, kind)()) for name, (kind, _) in SUMMARY_COLUMNS.items()]
+        if include_results:
+            fields.append(("analysis_result", pyarrow.string()))
+        self.schema = pyarrow.schema(fields)
+        self._sink = _ChunkSink()
+        self._writer = pyarrow.parquet.ParquetWriter(self._sink, self.schema, compression="zstd")
+
+    def header(self) -> bytes:
+        return self._sink.drain()
+
+    def encode(self, rows: List[Dict]) -> bytes:
+        columns = {name: [value(row) for row in rows] for name, (_, value) in SUMMARY_COLUMNS.items()}
+        if self.include_results:
+            columns["analysis_result"] = [json.dumps(row["analysis_result"], default=str) for row in rows]
+        self._writer.write_table(self.pa.table(columns, schema=self.schema))
+        return self._sink.drain()
+
+    def footer(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+ENCODERS = {"ndjson": NdjsonEncoder, "csv": CsvEncoder, "parquet": ParquetEncoder}
+
+def create_encoder(output_format: str, include_results: bool = True):
+    """Encoder for output_format; ValueError for unknown formats, RuntimeError when a dependency is missing"""
+    if output_format not in ENCODERS:
+        raise ValueError(f"format must be one of {', '.join(ENCODERS)}")
+    if output_format == "csv":
+        return CsvEncoder()
+    return ENCODERS[output_format](include_results)
+
+def _export_row(row) -> Dict:
+    # Same fields, in the same form, as the rows of the archive files
+    return {**row, "created_at": row["created_at"].isoformat()}
+
+async def export_batches(user_id: Optional[int] = None, url_prefix: Optional[str] = None, start: Optional[date] = None,
+                         end: Optional[date] = None, include_archived: bool = False,
+                         batch_size: int = 1000) -> AsyncIterator[List[Dict]]:
+    """
+    Analyses matching the filters (end inclusive), oldest first, batch_size rows at a time
+
+    Rows come from a server-side cursor on a read session, so memory stays
+    at one batch however many rows match.
+    """
+    if include_archived:
+        async with read_session() as db:
+            archives = await archived_months(db, start, end)
+        async for batch in archived_batches(archives, user_id, url_prefix, start, end, batch_size):
+            yield batch
+
+    async with read_session() as db:
+        conditions = created_between(db.bind.dialect.name, start, end and end + timedelta(days=1))
+        if user_id is not None:
+            conditions.append(SeoData.user_id == user_id)
+        if url_prefix:
+            conditions.append(SeoData.url.startswith(url_prefix, autoescape=True))
+        stream = await db.stream(
+            select(*(SeoData.__table__.c[name] for name in ARCHIVE_COLUMNS))
+            .where(*conditions)
+            .order_by(SeoData.created_at, SeoData.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for partition in stream.mappings().partitions():
+            yield [_export_row(row) for row in partition]
+
+async def stream_export(encoder, batches: AsyncIterator[List[Dict]]) -> AsyncIterator[bytes]:
+    """Encoded export, one chunk per batch"""
+    chunk = encoder.header()
+    if chunk:
+        yield chunk
+    async for batch in batches:
+        chunk = await asyncio.to_thread(encoder.encode, batch)
+        if chunk:
+            yield chunk
+    chunk = encoder.footer()
+    if chunk:
+        yield chunk
+
+async def _export_to_file(args):
+    encoder = create_encoder(args.format, not args.summary_only)
+    batches = export_batches(args.user_id, args.url_prefix, args.start, args.end, args.include_archived, args.batch_size)
+    output = open(args.output, "wb") if args.output != "-" else sys.stdout.buffer
+    rows = 0
+    try:
+        async def counted():
+            nonlocal rows
+            async for batch in batches:
+                rows += len(batch)
+                yield batch
+        async for chunk in stream_export(encoder, counted()):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+    print(f"Exported {rows} analyses to {args.output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="""Export SEO analyses to NDJSON, CSV or Parquet
+
+    python -m app.services.seodata_export --format csv --user-id 7 --output analyses.csv
+    python -m app.services.seodata_export --format parquet --start 2026-01-01 --include-archived --output all.parquet
+
+Reads the database configured by DATABASE_URL (a healthy replica from DATABASE_REPLICA_URLS when set).""",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--format", choices=list(ENCODERS), default="ndjson")
+    parser.add_argument("--output", default="-", help="file to write (default: stdout)")
+    parser.add_argument("--user-id", type=int)
+    parser.add_argument("--url-prefix")
+    parser.add_argument("--start", type=date.fromisoformat, help="first day (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="last day, inclusive (YYYY-MM-DD)")
+    parser.add_argument("--include-archived", action="store_true", help="also export months moved to archive files")
+    parser.add_argument("--summary-only", action="store_true", help="leave out analysis_result (NDJSON and Parquet)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    asyncio.run(_export_to_file(parser.parse_args()))
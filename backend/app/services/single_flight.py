@@ -0,0 +1,59 @@
+# Single Flight - one computation per key at a time, shared by every caller that asks for it meanwhile
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class SingleFlight:
+    """
+    Concurrent callers of run() for the same key share one computation
+
+    The first caller runs compute(); the others await its result, or its
+    exception. When that caller is cancelled (a client going away), waiters are
+    not left hanging: the next one in line runs compute() itself. Caches build
+    stale-while-revalidate on top with refresh(), which recomputes a key in a
+    background task unless a computation for it is already running.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._tasks = set()
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """compute()'s result, joining the computation already running for key"""
+        while True:
+            pending = self._inflight.get(key)
+            if pending is None:
+                return await self._lead(key, compute)
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # this caller was cancelled, not the one computing
+
+    def refresh(self, key: Hashable, compute: Callable[[], Awaitable[Any]]):
+        """Recompute key in the background, unless it is already being computed"""
+        if key not in self._inflight:
+            self._track(asyncio.create_task(self._lead(key, compute)))
+
+    async def _lead(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await compute()
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # retrieved here so unawaited failures are not logged
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+            if not future.done():
+                future.cancel()  # cancelled (or a BaseException): waiters take over
+
+    def _track(self, task: asyncio.Task):
+        # Keep a reference so background refreshes are not garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
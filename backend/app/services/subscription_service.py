@@ -5,9 +5,39 @@ from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.models.license import License
+from app.models.user import User
 from app.schemas.subscription import SubscriptionPlan, LicenseStatus, UsageTracker
+from app.services.license_cache import CachedLicense, license_cache
+from app.services.usage_counters import get_usage_counts, limit_period, record_usage
+from app.settings import settings
 import asyncio
 
+class UsageLimitExceeded(Exception):
+    """
+    Raised when usage would go over the user's plan limit
+    
+    Surfaced to API clients as 429 responses by the handler in app.api.usage.
+    """
+    
+    def __init__(self, resource: str, limit: int, plan: str, period: str):
+        self.resource = resource
+        self.limit = limit
+        self.plan = plan
+        self.period = period
+        per = {"month": " per month", "day": " per day"}.get(period, "")
+        super().__init__(f"{resource.replace('_', ' ').capitalize()} limit reached: {limit}{per} on the {plan} plan")
+
+class UnknownUser(LookupError):
+    """
+    Raised when usage would be counted for a user id with no account
+    
+    Surfaced to API clients as 404 responses by the handler in app.api.usage.
+    """
+    
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        super().__init__(f"User {user_id} not found")
+
 class SubscriptionManager:
     """
     Manages subscription plans, license validation, and usage tracking
@@ -32,7 +62,8 @@ class SubscriptionManager:
                 "seo_analyses_per_month": 10,
                 "keyword_research_per_day": 5,
                 "competitor_analyses_per_month": 0,
-                "api_calls_per_day": 50
+                "api_calls_per_day": 50,
+                "bulk_keywords_per_request": 50
             }
         ),
         "basic": SubscriptionPlan(
@@ -54,7 +85,8 @@ class SubscriptionManager:
                 "seo_analyses_per_month": 100,
                 "keyword_research_per_day": -1,  # unlimited
                 "competitor_analyses_per_month": 5,
-                "api_calls_per_day": 500
+                "api_calls_per_day": 500,
+                "bulk_keywords_per_request": 1000
             }
         ),
         "pro": SubscriptionPlan(
@@ -78,7 +110,8 @@ class SubscriptionManager:
                 "seo_analyses_per_month": 500,
                 "keyword_research_per_day": -1,
                 "competitor_analyses_per_month": 25,
-                "api_calls_per_day": 2000
+                "api_calls_per_day": 2000,
+                "bulk_keywords_per_request": 10000
             },
             is_popular=True
         ),
@@ -103,7 +136,8 @@ class SubscriptionManager:
                 "seo_analyses_per_month": -1,
                 "keyword_research_per_day": -1,
                 "competitor_analyses_per_month": -1,
-                "api_calls_per_day": -1
+                "api_calls_per_day": -1,
+                "bulk_keywords_per_request": 100000
             }
         )
     }
@@ -146,13 +180,18 @@ class SubscriptionManager:
         db.add(license)
         await db.commit()
         await db.refresh(license)
+        license_cache.put(user_id, license)  # write-through
         
         return license
     
     @classmethod
-    async def get_user_license_status(cls, db: AsyncSession, user_id: int) -> LicenseStatus:
-        """Get comprehensive license status for a user"""
-        # Get active license
+    async def _get_active_license(cls, db: AsyncSession, user_id: int) -> Optional[CachedLicense]:
+        """The user's current license (from the license cache), deactivating it if it has expired"""
+        found, cached = license_cache.get(user_id)
+        if found:
+            return cached
+        
+        version = license_cache.load_version(user_id)
         q = await db.execute(
             select(License).where(
                 License.user_id == user_id, 
@@ -161,33 +200,33 @@ class SubscriptionManager:
         )
         license = q.scalars().first()
         
-        if not license:
-            # Return free plan as default
-            plan = cls.get_plan("free")
-            return LicenseStatus(
-                user_id=user_id,
-                plan="free",
-                is_active=True,
-                valid_until=None,
-                usage_stats=await cls._get_usage_stats(db, user_id),
-                limits=plan.limits,
-                features_available=plan.features
-            )
-        
         # Check if license is expired
-        is_expired = license.valid_until and license.valid_until < datetime.utcnow()
-        if is_expired:
+        if license and license.valid_until and license.valid_until < datetime.utcnow():
             license.is_active = False
             await db.commit()
-            
-            # Return free plan for expired licenses
+            license = None
+        return license_cache.put(user_id, license, version=version)
+    
+    @classmethod
+    async def get_user_plan(cls, db: AsyncSession, user_id: int) -> SubscriptionPlan:
+        """The plan whose limits apply to the user (free without an active license)"""
+        license = await cls._get_active_license(db, user_id)
+        return (license and cls.get_plan(license.plan)) or cls.get_plan("free")
+    
+    @classmethod
+    async def get_user_license_status(cls, db: AsyncSession, user_id: int) -> LicenseStatus:
+        """Get comprehensive license status for a user"""
+        license = await cls._get_active_license(db, user_id)
+        
+        if not license:
+            # Return free plan as default (also for expired licenses)
             plan = cls.get_plan("free")
             return LicenseStatus(
                 user_id=user_id,
                 plan="free",
                 is_active=True,
                 valid_until=None,
-                usage_stats=await cls._get_usage_stats(db, user_id),
+                usage_stats=await cls._get_usage_stats(db, user_id, plan.limits),
                 limits=plan.limits,
                 features_available=plan.features
             )
@@ -201,31 +240,36 @@ class SubscriptionManager:
             plan=license.plan,
             is_active=license.is_active,
             valid_until=license.valid_until,
-            usage_stats=await cls._get_usage_stats(db, user_id),
+            usage_stats=await cls._get_usage_stats(db, user_id, plan.limits),
             limits=plan.limits,
             features_available=plan.features
         )
     
+    @classmethod
+    def usage_limit_key(cls, limits: Dict[str, int], resource_type: str) -> Optional[str]:
+        """The plan limit key that meters resource_type (e.g. 'seo_analyses' -> 'seo_analyses_per_month')"""
+        for limit_key in limits:
+            resource, period = limit_period(limit_key)
+            if resource == resource_type and period != "request":
+                return limit_key
+        return None
+    
     @classmethod
     async def check_usage_limit(cls, db: AsyncSession, user_id: int, resource_type: str) -> Dict[str, any]:
         """Check if user has exceeded usage limits for a resource"""
-        license_status = await cls.get_user_license_status(db, user_id)
-        
-        # Get current usage
-        usage_stats = license_status.usage_stats
-        current_usage = usage_stats.get(resource_type, 0)
-        
-        # Get limit for this resource
-        limit_key = f"{resource_type}_per_month"
-        if resource_type in ["keyword_research"]:
-            limit_key = f"{resource_type}_per_day"
-        
-        limit = license_status.limits.get(limit_key, 0)
+        plan = await cls.get_user_plan(db, user_id)
+        limit_key = cls.usage_limit_key(plan.limits, resource_type)
+        limit = plan.limits.get(limit_key, 0) if limit_key else 0
         
         # -1 means unlimited
         if limit == -1:
             return {"allowed": True, "remaining": -1, "limit": -1}
         
+        # Get current usage (one primary-key lookup)
+        period = limit_period(limit_key)[1] if limit_key else "total"
+        usage = await get_usage_counts(db, user_id, [(resource_type, period)])
+        current_usage = usage[resource_type]
+        
         remaining = max(0, limit - current_usage)
         allowed = current_usage < limit
         
@@ -233,15 +277,69 @@ class SubscriptionManager:
             "allowed": allowed,
             "remaining": remaining,
             "limit": limit,
-            "current_usage": current_usage
+            "current_usage": current_usage,
+            "period": period
         }
     
     @classmethod
-    async def increment_usage(cls, db: AsyncSession, user_id: int, resource_type: str):
-        """Increment usage counter for a resource"""
-        # In a production system, you'd store usage in a separate table
-        # For now, we'll simulate this
-        pass
+    async def reserve_usage(cls, db: AsyncSession, user_id: int, usage: Dict[str, int]) -> Dict[str, int]:
+        """
+        Count usage against the user's plan, or raise UsageLimitExceeded without counting any
+        
+        usage maps resources to amounts ({"seo_analyses": 1}). The counters are
+        read once; checking and counting then happen without yielding, so
+        concurrent requests in this process cannot both take the last unit.
+        Raises UnknownUser for user ids without an account, whose counters
+        could never be written.
+        """
+        await cls._require_user(db, user_id)
+        plan = await cls.get_user_plan(db, user_id)
+        periods = {}
+        for resource in usage:
+            limit_key = cls.usage_limit_key(plan.limits, resource)
+            if limit_key is None:
+                raise ValueError(f"Unknown usage resource: {resource}")
+            periods[resource] = (limit_key, limit_period(limit_key)[1])
+        
+        metered = {resource: period for resource, (limit_key, period) in periods.items() if plan.limits[limit_key] != -1}
+        current = await get_usage_counts(db, user_id, metered.items()) if metered else {}
+        for resource, amount in usage.items():
+            limit_key, period = periods[resource]
+            limit = plan.limits[limit_key]
+            if resource in current and current[resource] + amount > limit:
+                raise UsageLimitExceeded(resource, limit, plan.plan_id, period)
+        
+        record_usage(user_id, {resource: (periods[resource][1], amount) for resource, amount in usage.items()})
+        return dict(usage)
+    
+    _known_users = set()  # user ids already found by _require_user
+    
+    @classmethod
+    async def _require_user(cls, db: AsyncSession, user_id: int):
+        if user_id in cls._known_users:
+            return
+        q = await db.execute(select(User.id).where(User.id == user_id))
+        if q.scalar() is None:
+            raise UnknownUser(user_id)
+        if len(cls._known_users) >= settings.LICENSE_CACHE_MAX_ENTRIES:
+            cls._known_users.clear()
+        cls._known_users.add(user_id)
+    
+    @classmethod
+    def release_usage(cls, user_id: int, usage: Dict[str, int]):
+        """Give back usage reserved for work that did not happen"""
+        record_usage(user_id, {resource: (cls.resource_period(resource), -amount) for resource, amount in usage.items()})
+    
+    @classmethod
+    async def increment_usage(cls, db: AsyncSession, user_id: int, resource_type: str, amount: int = 1):
+        """Increment usage counter for a resource (written behind, in batches)"""
+        record_usage(user_id, {resource_type: (cls.resource_period(resource_type), amount)})
+    
+    @classmethod
+    def resource_period(cls, resource_type: str) -> str:
+        """Counter period of a resource ('month', 'day' or 'total'), as every plan meters it"""
+        limit_key = cls.usage_limit_key(cls.PLANS["free"].limits, resource_type)
+        return limit_period(limit_key)[1] if limit_key else "total"
     
     @classmethod
     async def deactivate_user_licenses(cls, db: AsyncSession, user_id: int):
@@ -258,30 +356,14 @@ class SubscriptionManager:
             license.is_active = False
         
         await db.commit()
+        license_cache.put(user_id, None)  # write-through
     
     @classmethod
-    async def _get_usage_stats(cls, db: AsyncSession, user_id: int) -> Dict[str, int]:
+    async def _get_usage_stats(cls, db: AsyncSession, user_id: int, limits: Optional[Dict[str, int]] = None) -> Dict[str, int]:
         """Get current usage statistics for a user"""
-        # In a production system, you'd query a usage tracking table
-        # For now, we'll return simulated data
-        current_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        # Count SEO analyses for current month
-        from app.models.seodata import SeoData
-        seo_count_q = await db.execute(
-            select(SeoData).where(
-                SeoData.user_id == user_id,
-                SeoData.created_at >= current_month
-            )
-        )
-        seo_analyses = len(seo_count_q.scalars().all())
-        
-        return {
-            "seo_analyses": seo_analyses,
-            "keyword_research": 5,  # Simulated
-            "competitor_analyses": 2,  # Simulated
-            "api_calls": 45  # Simulated
-        }
+        limits = limits or cls.PLANS["free"].limits
+        resources = [limit_period(limit_key) for limit_key in limits]
+        return await get_usage_counts(db, user_id, [(resource, period) for resource, period in resources if period != "request"])
 
 # Service functions
 async def get_subscription_plans() -> List[SubscriptionPlan]:
@@ -298,8 +380,8 @@ async def get_license_status(db: AsyncSession, user_id: int) -> LicenseStatus:
 
 async def check_feature_access(db: AsyncSession, user_id: int, feature: str) -> bool:
     """Check if user has access to a specific feature"""
-    license_status = await SubscriptionManager.get_user_license_status(db, user_id)
-    return feature in license_status.features_available
+    plan = await SubscriptionManager.get_user_plan(db, user_id)
+    return feature in plan.features
 
 async def validate_usage_limit(db: AsyncSession, user_id: int, resource_type: str) -> bool:
     """Validate if user can use a resource (hasn't exceeded limits)"""
@@ -0,0 +1,194 @@
+# Usage Counters - per-user plan usage, counted in memory and written to the database in batches
+
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import async_session, upsert_increments
+from app.models.usage import UsageCounter
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Plan limit key suffix -> counter period
+LIMIT_PERIODS = {"_per_month": "month", "_per_day": "day", "_per_request": "request"}
+
+CounterKey = Tuple[int, str, str]  # (user_id, resource, period key)
+
+def limit_period(limit_key: str) -> Tuple[str, str]:
+    """(resource, period) for a plan limit key: 'api_calls_per_day' -> ('api_calls', 'day'), 'websites' -> ('websites', 'total')"""
+    for suffix, period in LIMIT_PERIODS.items():
+        if limit_key.endswith(suffix):
+            return limit_key[:-len(suffix)], period
+    return limit_key, "total"
+
+def period_key(period: str, now: Optional[datetime] = None) -> str:
+    """Counter row for the current period: '2026-10' (month), '2026-10-19' (day) or 'all'"""
+    now = now or datetime.utcnow()
+    if period == "month":
+        return now.strftime("%Y-%m")
+    if period == "day":
+        return now.strftime("%Y-%m-%d")
+    return "all"
+
+class UsageCounterBuffer:
+    """
+    Write-behind buffer for usage counter increments
+
+    Increments are summed per (user, resource, period) in memory and upserted
+    in batches every flush_interval seconds (or as soon as max_pending counters
+    are waiting), so a metered request costs no write of its own. Reads add
+    the increments not yet written, so this process always sees its own usage;
+    other processes see it after their next read of a flushed row.
+    """
+
+    def __init__(self, flush_interval: float = 5.0, batch_size: int = 500, max_pending: int = 2000,
+                 session_factory=async_session):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.session_factory = session_factory
+        self._pending: Counter = Counter()
+        self._flushing: Counter = Counter()  # taken by a flush still in progress
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._early_flush: Optional[asyncio.Task] = None
+        self.counters = Counter()
+
+    def add(self, user_id: int, resource: str, period: str, amount: int = 1):
+        key = (user_id, resource, period)
+        self._pending[key] += amount
+        if self._pending[key] == 0:
+            del self._pending[key]
+        if len(self._pending) >= self.max_pending and (self._early_flush is None or self._early_flush.done()):
+            try:
+                self._early_flush = asyncio.get_running_loop().create_task(self._flush_logged())
+            except RuntimeError:
+                pass  # no event loop: the next flush() picks these up
+
+    def pending(self, key: CounterKey) -> int:
+        return self._pending.get(key, 0) + self._flushing.get(key, 0)
+
+    async def flush(self) -> int:
+        """Write every pending increment; returns the number of counter rows upserted"""
+        async with self._lock:
+            if not self._pending:
+                return 0
+            self._flushing, self._pending = self._pending, Counter()
+            rows = [
+                {"user_id": user_id, "resource": resource, "period": period, "count": amount}
+                for (user_id, resource, period), amount in sorted(self._flushing.items())
+            ]
+            written = 0
+            try:
+                async with self.session_factory() as db:
+                    for start in range(0, len(rows), self.batch_size):
+                        batch = rows[start:start + self.batch_size]
+                        written += await self._write_batch(db, batch)
+                        for row in batch:
+                            del self._flushing[(row["user_id"], row["resource"], row["period"])]
+            except Exception:
+                self.counters["failed_flushes"] += 1
+                self._pending.update(self._flushing)  # batches not written yet are kept for the next attempt
+                raise
+            finally:
+                self._flushing = Counter()
+            self.counters["flushes"] += 1
+            self.counters["rows_written"] += written
+            return written
+
+    async def _write_batch(self, db: AsyncSession, batch) -> int:
+        """
+        Upsert one batch in its own transaction
+
+        When the database rejects the batch (a counter for a user that does not
+        exist), its rows are retried one by one and the rejected ones dropped,
+        so they cannot hold back everyone else's usage.
+        """
+        try:
+            await self._upsert(db, batch)
+            return len(batch)
+        except IntegrityError:
+            await db.rollback()
+        written = 0
+        for row in batch:
+            try:
+                await self._upsert(db, [row])
+                written += 1
+            except IntegrityError as e:
+                await db.rollback()
+                self.counters["dropped_rows"] += 1
+                logger.warning("Dropped usage counter increment %s: %s", row, e.orig)
+        return written
+
+    async def _upsert(self, db: AsyncSession, rows):
+        await db.run_sync(lambda session: upsert_increments(
+            session.connection(), UsageCounter.__table__, ("user_id", "resource", "period"), rows
+        ))
+        await db.commit()
+
+    async def _flush_logged(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.warning("Usage counter flush failed: %s", e)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush_logged()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the periodic flush and write whatever is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict:
+        return {
+            "pending_counters": len(self._pending),
+            "flush_interval_seconds": self.flush_interval,
+            **{name: self.counters[name] for name in ("flushes", "rows_written", "failed_flushes", "dropped_rows")}
+        }
+
+async def get_usage_counts(db: AsyncSession, user_id: int, resources: Iterable[Tuple[str, str]],
+                           now: Optional[datetime] = None) -> Dict[str, int]:
+    """Current-period usage for each (resource, period), flushed plus pending, from one primary-key range read"""
+    keys = {resource: period_key(period, now) for resource, period in resources}
+    rows = (await db.execute(
+        select(UsageCounter.resource, UsageCounter.period, UsageCounter.count).where(
+            UsageCounter.user_id == user_id,
+            UsageCounter.resource.in_(list(keys)),
+            UsageCounter.period.in_(set(keys.values()))
+        )
+    )).all()
+    stored = {(row.resource, row.period): row.count for row in rows}
+    return {
+        resource: stored.get((resource, key), 0) + usage_buffer.pending((user_id, resource, key))
+        for resource, key in keys.items()
+    }
+
+def record_usage(user_id: int, usage: Dict[str, Tuple[str, int]], now: Optional[datetime] = None):
+    """Add usage ({resource: (period, amount)}) to the current periods' counters"""
+    for resource, (period, amount) in usage.items():
+        usage_buffer.add(user_id, resource, period_key(period, now), amount)
+
+# Global instance
+usage_buffer = UsageCounterBuffer(
+    flush_interval=settings.USAGE_FLUSH_INTERVAL_SECONDS,
+    batch_size=settings.USAGE_FLUSH_BATCH_SIZE,
+    max_pending=settings.USAGE_MAX_PENDING
+)
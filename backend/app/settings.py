@@ -13,6 +13,21 @@ class Settings:
         "DATABASE_URL", "sqlite+aiosqlite:///./app.db"
     )
     
+    # Database Configuration
+    DATABASE_ECHO = os.getenv("DATABASE_ECHO", "false").lower() == "true"  # logs every statement
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+    DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))  # asyncpg prepared statements
+    DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+    DB_REPEATED_QUERY_THRESHOLD = int(os.getenv("DB_REPEATED_QUERY_THRESHOLD", "10"))  # same statement per request
+    DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+    DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "10"))  # laggier replicas are skipped
+    DB_REPLICA_CHECK_INTERVAL_SECONDS = float(os.getenv("DB_REPLICA_CHECK_INTERVAL_SECONDS", "5"))
+    DB_READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "10")))  # reads stay on the primary after a write
+    
     # Email Configuration
     SMTP_HOST = os.getenv("SMTP_HOST", "smtp.zoho.in")
     SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
@@ -25,9 +40,58 @@ class Settings:
     
     # OpenAI Configuration
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-    
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # point at an OpenAI-compatible stub for tests
+
+    # LLM Gateway Configuration
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")  # "openai" or "static"
+    LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+    LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+    LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+    LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "20"))
+    LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+    LLM_CIRCUIT_RESET_SECONDS = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+
+    # Keyword Research Configuration
+    KEYWORD_CORPUS_PATH = os.getenv("KEYWORD_CORPUS_PATH")  # optional .txt/.csv keyword list for the local index
+    KEYWORD_METRICS_DIR = os.getenv("KEYWORD_METRICS_DIR", "./data/keyword_metrics")
+    KEYWORD_RANKINGS_DIR = os.getenv("KEYWORD_RANKINGS_DIR", "./data/keyword_rankings")  # per-domain ranking exports
+    KEYWORD_TRENDS_DIR = os.getenv("KEYWORD_TRENDS_DIR", "./data/keyword_trends")  # volume and rank history
+    KEYWORD_AUTOCOMPLETE_SNAPSHOT = os.getenv("KEYWORD_AUTOCOMPLETE_SNAPSHOT", "./data/keyword_autocomplete.npz")
+    KEYWORD_AI_ENRICHMENT = os.getenv("KEYWORD_AI_ENRICHMENT", "true").lower() == "true"
+    KEYWORD_CACHE_TTL_SECONDS = float(os.getenv("KEYWORD_CACHE_TTL_SECONDS", "900"))
+    KEYWORD_CACHE_STALE_SECONDS = float(os.getenv("KEYWORD_CACHE_STALE_SECONDS", "3600"))
+    KEYWORD_CACHE_MAX_ENTRIES = int(os.getenv("KEYWORD_CACHE_MAX_ENTRIES", "2000"))
+    KEYWORD_CACHE_WARMUP_SEEDS = [s.strip() for s in os.getenv("KEYWORD_CACHE_WARMUP_SEEDS", "").split(",") if s.strip()]
+
+    # Usage Metering Configuration
+    USAGE_FLUSH_INTERVAL_SECONDS = float(os.getenv("USAGE_FLUSH_INTERVAL_SECONDS", "5"))  # write-behind delay
+    USAGE_FLUSH_BATCH_SIZE = int(os.getenv("USAGE_FLUSH_BATCH_SIZE", "500"))  # counter rows per upsert
+    USAGE_MAX_PENDING = int(os.getenv("USAGE_MAX_PENDING", "2000"))  # flush early past this many pending counters
+
+    # License Cache Configuration
+    LICENSE_CACHE_TTL_SECONDS = float(os.getenv("LICENSE_CACHE_TTL_SECONDS", "60"))  # also capped at valid_until
+    LICENSE_CACHE_MAX_ENTRIES = int(os.getenv("LICENSE_CACHE_MAX_ENTRIES", "10000"))
+
+    # SEO Data Retention Configuration
+    SEODATA_HOT_MONTHS = int(os.getenv("SEODATA_HOT_MONTHS", "12"))  # older months are moved to archive files
+    SEODATA_ARCHIVE_DIR = os.getenv("SEODATA_ARCHIVE_DIR", "./data/seodata_archive")
+    SEODATA_ARCHIVE_CACHE_MONTHS = int(os.getenv("SEODATA_ARCHIVE_CACHE_MONTHS", "3"))  # archive months kept loaded
+    SEODATA_PARTITION_MONTHS_AHEAD = int(os.getenv("SEODATA_PARTITION_MONTHS_AHEAD", "3"))  # PostgreSQL partitions
+
+    # Rate Limit Configuration
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_BACKEND_URL = os.getenv("RATE_LIMIT_BACKEND_URL", "")  # redis://... to share limits across workers
+    RATE_LIMIT_MAX_USER_IDS_PER_ADDRESS = int(os.getenv("RATE_LIMIT_MAX_USER_IDS_PER_ADDRESS", "5"))  # per window
+    RATE_LIMIT_TRUSTED_PROXIES = [p.strip() for p in os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "").split(",") if p.strip()]  # reverse proxies whose X-Forwarded-For is used
+    RATE_LIMIT_EXEMPT_PATHS = [p.strip() for p in os.getenv("RATE_LIMIT_EXEMPT_PATHS", "/,/health,/docs,/redoc,/openapi.json").split(",") if p.strip()]
+
     # Admin Configuration
     ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "admin@astranetix.in")
     ADMIN_USERNAME = os.getenv("ADMIN_USERNAME", "admin")
+    ADMIN_OVERVIEW_TTL_SECONDS = float(os.getenv("ADMIN_OVERVIEW_TTL_SECONDS", "30"))
+    ADMIN_OVERVIEW_MAX_STALE_SECONDS = float(os.getenv("ADMIN_OVERVIEW_MAX_STALE_SECONDS", "300"))  # served while refreshing
 
-settings = Settings()
+settings = Settings()
@@ -0,0 +1,113 @@
+import json
+from typing import Any, Dict, List, Optional
+
+class IncrementalJSONArrayParser:
+    """
+    Extract complete objects from a JSON array while the document is still streaming in
+
+    feed() the text chunks as they arrive; every object of the array stored under `key`
+    (or of a bare top-level array) is returned as soon as its closing brace is seen.
+    The parser is tolerant: text around the JSON (prose, markdown fences) is ignored and
+    objects that fail to decode are skipped instead of aborting the stream.
+    """
+
+    def __init__(self, key: Optional[str] = None):
+        self.key = key
+        self.skipped = 0
+        self._buffer = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start: Optional[int] = None
+        self._last_string: Optional[str] = None
+        self._pending_key: Optional[str] = None
+        self._array_depth: Optional[int] = None
+        self._object_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a chunk of text and return the objects completed by it"""
+        self._buffer += chunk
+        completed = []
+        buffer = self._buffer
+
+        for i in range(self._pos, len(buffer)):
+            char = buffer[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = self._decode_string(buffer[self._string_start:i + 1])
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char == ":":
+                self._pending_key = self._last_string
+            elif char == ",":
+                self._pending_key = None
+            elif char == "[":
+                self._stack.append(char)
+                if self._array_depth is None and (
+                    (self.key is not None and self._pending_key == self.key)
+                    or len(self._stack) == 1
+                ):
+                    self._array_depth = len(self._stack)
+                self._pending_key = None
+            elif char == "{":
+                self._stack.append(char)
+                if self._array_depth is not None and len(self._stack) == self._array_depth + 1:
+                    self._object_start = i
+                self._pending_key = None
+            elif char == "}":
+                if self._object_start is not None and len(self._stack) == self._array_depth + 1:
+                    item = self._decode_object(buffer[self._object_start:i + 1])
+                    if item is not None:
+                        completed.append(item)
+                    self._object_start = None
+                if self._stack:
+                    self._stack.pop()
+            elif char == "]":
+                if self._array_depth is not None and len(self._stack) == self._array_depth:
+                    self._array_depth = None
+                if self._stack:
+                    self._stack.pop()
+
+        self._pos = len(buffer)
+        self._compact()
+        return completed
+
+    def _compact(self):
+        """Drop text that can no longer be part of a pending string or object"""
+        keep_from = self._pos
+        if self._object_start is not None:
+            keep_from = self._object_start
+        elif self._in_string and self._string_start is not None:
+            keep_from = self._string_start
+
+        if keep_from:
+            self._buffer = self._buffer[keep_from:]
+            self._pos -= keep_from
+            if self._object_start is not None:
+                self._object_start -= keep_from
+            if self._string_start is not None:
+                self._string_start = max(0, self._string_start - keep_from)
+
+    def _decode_string(self, raw: str) -> Optional[str]:
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    def _decode_object(self, raw: str) -> Optional[Dict[str, Any]]:
+        try:
+            item = json.loads(raw)
+        except ValueError:
+            self.skipped += 1
+            return None
+        return item if isinstance(item, dict) else None
@@ -0,0 +1,52 @@
+"""
+Measure MinHash/LSH keyword clustering time and peak memory as the list grows
+
+    python -m benchmarks.bench_keyword_clustering --sizes 10000 25000 50000 100000
+
+Keywords are synthetic topic variations (modifiers around n/20 two-word head
+terms), so the expected cluster count is about the number of heads.
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from app.services.keyword_clustering import KeywordClusterer
+
+MODIFIERS = ["best", "free", "cheap", "top", "how to", "guide", "for beginners", "near me", "review",
+             "2024", "online", "vs", "tips", "course", "tools", "software", "service", "ideas"]
+
+def make_keywords(n: int):
+    rng = random.Random(7)
+    syllables = ["ka", "lo", "mi", "ran", "tek", "su", "vo", "nel", "pra", "dor", "bi", "zen"]
+    vocabulary = list({"".join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(20000)})
+    heads = [" ".join(rng.sample(vocabulary, 2)) for _ in range(max(10, n // 20))]
+    keywords = set()
+    while len(keywords) < n:
+        head = rng.choice(heads)
+        modifiers = rng.sample(MODIFIERS, rng.randint(0, 2))
+        keywords.add(" ".join(modifiers[:1] + [head] + modifiers[1:]))
+    return list(keywords), len(heads)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 25000, 50000, 100000])
+    parser.add_argument("--threshold", type=float, default=0.5)
+    args = parser.parse_args()
+
+    clusterer = KeywordClusterer(threshold=args.threshold, use_concepts=False)
+    for size in args.sizes:
+        keywords, heads = make_keywords(size)
+        started = time.perf_counter()
+        clusters = clusterer.cluster(keywords)
+        elapsed = time.perf_counter() - started
+
+        # Separate run for memory: tracing allocations slows Python code down
+        tracemalloc.start()
+        clusterer.cluster(keywords)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{size:7} keywords  {elapsed * 1000:9.1f} ms  {size / elapsed:10,.0f} kw/s  "
+              f"peak {peak / 1e6:7.1f} MB  {len(clusters):6} clusters ({heads} heads)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Measure bulk keyword difficulty throughput (keywords per second)
+
+    python -m benchmarks.bench_keyword_difficulty --keywords 50000
+
+"per-keyword" is the pre-vectorization loop: one heuristic call per metric and one
+KeywordDifficulty model per keyword. "vectorized" scores the whole batch as NumPy
+arrays; "vectorized+rows" also serializes every row to a dict as the API does.
+"""
+import argparse
+import random
+import time
+from app.schemas.keyword import KeywordDifficulty
+from app.services.keyword_service import KeywordAnalyzer
+from app.services.keyword_scoring import score_keywords
+
+WORDS = (
+    "seo marketing content keyword research tools backlink audit rank tracker local business "
+    "agency software free best guide tips ecommerce price buy service cost plugin speed mobile"
+).split()
+
+def make_keywords(n: int):
+    rng = random.Random(42)
+    return [" ".join(rng.sample(WORDS, rng.randint(1, 5))) for _ in range(n)]
+
+def per_keyword(keywords):
+    analyzer = KeywordAnalyzer()
+    results = []
+    for keyword in keywords:
+        results.append(KeywordDifficulty(
+            keyword=keyword,
+            difficulty_score=analyzer._calculate_difficulty(keyword),
+            search_volume=analyzer._estimate_search_volume(keyword),
+            cpc=analyzer._estimate_cpc(keyword),
+            competition=analyzer._get_competition_level(analyzer._calculate_difficulty(keyword)),
+            trend=analyzer._generate_trend_data()
+        ))
+    return results
+
+def vectorized(keywords):
+    return score_keywords(keywords)
+
+def vectorized_rows(keywords):
+    return score_keywords(keywords).rows()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keywords", type=int, default=50000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    keywords = make_keywords(args.keywords)
+    for name, fn in (("per-keyword", per_keyword), ("vectorized", vectorized), ("vectorized+rows", vectorized_rows)):
+        best = float("inf")
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            fn(keywords)
+            best = min(best, time.perf_counter() - started)
+        print(f"{name:16} {len(keywords) / best:12,.0f} keywords/s   ({best * 1000:8.1f} ms for {len(keywords)})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Measure keyword gap comparisons across several large competitor keyword sets
+
+    python -m benchmarks.bench_keyword_gap --keywords 50000 --competitors 4
+
+Each domain ranks for a random share of a common keyword pool, so the sets
+overlap the way real competitors in one niche do.
+"""
+import argparse
+import random
+import statistics
+import time
+import numpy as np
+from app.services.keyword_gap import DomainKeywordSets
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keywords", type=int, default=50000, help="keywords per domain")
+    parser.add_argument("--competitors", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    pool = [f"keyword {i} {rng.choice(['tool', 'guide', 'price', 'review'])}" for i in range(args.keywords * 3)]
+    domains = ["mysite.com"] + [f"competitor{i}.com" for i in range(args.competitors)]
+
+    sets = DomainKeywordSets()
+    started = time.perf_counter()
+    for domain in domains:
+        sample = rng.sample(pool, args.keywords)
+        sets.set_domain(domain, ((k, rng.randint(1, 100), rng.randint(10, 100000), None) for k in sample))
+    print(f"load      {len(domains)} domains x {args.keywords} keywords  "
+          f"{(time.perf_counter() - started) * 1000:8.1f} ms  {sets.stats()['memory_bytes'] / 1e6:.1f} MB")
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        result = sets.compare(domains[0], domains[1:], limit=100)
+        timings.append((time.perf_counter() - started) * 1000)
+    counts = result["counts"]
+    print(f"compare   median {statistics.median(timings):6.1f} ms  p95 {np.percentile(timings, 95):6.1f} ms  "
+          f"gaps {counts['gaps']}  missing {counts['missing']}  overlap {counts['overlap']}")
+
+if __name__ == "__main__":
+    main()
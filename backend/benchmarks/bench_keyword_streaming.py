@@ -0,0 +1,58 @@
+"""
+Compare time-to-first-keyword for buffered and streamed keyword generation
+
+    python -m benchmarks.bench_keyword_streaming --runs 5 --chunk-ms 20
+    python -m benchmarks.bench_keyword_streaming --base-url http://localhost:8089/v1
+
+Buffered mode is the pre-streaming behaviour: the first keyword reaches the client
+only after the whole completion has been generated and parsed.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from app.services.ai_service import RealTimeKeywordAnalyzer
+from app.services.llm_gateway import LLMGateway, StaticBackend, OpenAIBackend
+from benchmarks.llm_stub_server import canned_reply
+
+async def measure_buffered(analyzer: RealTimeKeywordAnalyzer):
+    started = time.perf_counter()
+    keywords = await analyzer.generate_smart_keywords("seo tools")
+    elapsed = (time.perf_counter() - started) * 1000
+    return elapsed, elapsed, len(keywords)
+
+async def measure_streamed(analyzer: RealTimeKeywordAnalyzer):
+    started = time.perf_counter()
+    first = None
+    count = 0
+    async for _ in analyzer.stream_smart_keywords("seo tools"):
+        if first is None:
+            first = (time.perf_counter() - started) * 1000
+        count += 1
+    return first, (time.perf_counter() - started) * 1000, count
+
+async def run(args):
+    if args.base_url:
+        backend = OpenAIBackend(api_key="stub", base_url=args.base_url)
+    else:
+        backend = StaticBackend(reply=canned_reply, chunk_size=16, chunk_latency=args.chunk_ms / 1000)
+    analyzer = RealTimeKeywordAnalyzer(gateway=LLMGateway(backend))
+
+    for name, measure in (("buffered", measure_buffered), ("streamed", measure_streamed)):
+        firsts, totals = [], []
+        for _ in range(args.runs):
+            first, total, count = await measure(analyzer)
+            firsts.append(first)
+            totals.append(total)
+        print(f"{name:9} first keyword p50 {statistics.median(firsts):8.1f} ms   "
+              f"all {count} keywords p50 {statistics.median(totals):8.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--chunk-ms", type=float, default=20)
+    parser.add_argument("--base-url", default=None)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
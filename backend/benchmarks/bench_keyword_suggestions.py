@@ -0,0 +1,76 @@
+"""
+Compare building keyword suggestions as pydantic models vs slotted candidates
+
+    python -m benchmarks.bench_keyword_suggestions --candidates 20 200 2000
+
+One research call is modelled as N related-keyword candidates plus 8 long-tail
+ones, keeping the top 15 related by relevance. "models" validates a
+KeywordSuggestion for every candidate, then sorts and slices (the old
+pipeline); "records" uses KeywordCandidate with RankedSuggestions and only
+builds models for what is returned.
+"""
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+from app.schemas.keyword import KeywordSuggestion
+from app.services.keyword_service import KeywordCandidate, RankedSuggestions, RELATED_KEYWORD_LIMIT
+
+LONG_TAIL = 8
+
+def candidate_fields(n: int, seed: int = 5):
+    rng = random.Random(seed)
+    return [
+        (f"keyword {i} {rng.choice(['tool', 'guide', 'price', 'review'])}", rng.randint(10, 5000),
+         rng.uniform(5, 90), rng.uniform(0.3, 0.99), round(rng.uniform(0.2, 4.0), 2))
+        for i in range(n + LONG_TAIL)
+    ]
+
+def with_models(fields):
+    models = [
+        KeywordSuggestion(keyword=k, search_volume=v, difficulty=d, relevance_score=r, cpc=c)
+        for k, v, d, r, c in fields
+    ]
+    related = sorted(models[:-LONG_TAIL], key=lambda s: s.relevance_score, reverse=True)
+    return related[:RELATED_KEYWORD_LIMIT] + models[-LONG_TAIL:]
+
+def with_records(fields):
+    candidates = [KeywordCandidate(*f) for f in fields]
+    related = RankedSuggestions(RELATED_KEYWORD_LIMIT)
+    for candidate in candidates[:-LONG_TAIL]:
+        related.add(candidate)
+    return related.suggestions() + [c.to_suggestion() for c in candidates[-LONG_TAIL:]]
+
+def measure(build, fields, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        build(fields)
+        timings.append((time.perf_counter() - started) * 1e6)
+    tracemalloc.start()
+    build(fields)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[20, 200, 2000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    assert [s.keyword for s in with_models(candidate_fields(50))] == \
+        [s.keyword for s in with_records(candidate_fields(50))]
+
+    print(f"{'candidates':>10}  {'models us':>10}  {'records us':>10}  {'speedup':>7}  "
+          f"{'models KB':>9}  {'records KB':>10}")
+    for n in args.candidates:
+        fields = candidate_fields(n)
+        models_us, models_peak = measure(with_models, fields, args.repeat)
+        records_us, records_peak = measure(with_records, fields, args.repeat)
+        print(f"{n:>10}  {models_us:>10.1f}  {records_us:>10.1f}  {models_us / records_us:>6.1f}x  "
+              f"{models_peak / 1024:>9.1f}  {records_peak / 1024:>10.1f}")
+
+if __name__ == "__main__":
+    main()
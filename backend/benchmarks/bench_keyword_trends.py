@@ -0,0 +1,65 @@
+"""
+Measure trend store ingestion, compaction, storage size and range queries
+
+    python -m benchmarks.bench_keyword_trends --series 200000 --weeks 104
+
+Every series gets one point per week (appended one week at a time, like a
+weekly rank tracker); queries fetch many random series at once.
+"""
+import argparse
+import statistics
+import tempfile
+import time
+import numpy as np
+from app.services.keyword_trends import KeywordTrendStore, to_day
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--series", type=int, default=200000)
+    parser.add_argument("--weeks", type=int, default=104)
+    parser.add_argument("--batch", type=int, default=1000, help="series per query")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(5)
+    series = rng.integers(1, 2 ** 63, size=args.series, dtype=np.uint64)
+    first_day = to_day("2023-01-02")
+
+    with tempfile.TemporaryDirectory() as path:
+        store = KeywordTrendStore(path, compact_after=10 ** 9)
+        started = time.perf_counter()
+        for week in range(args.weeks):
+            store.append(
+                series,
+                np.full(args.series, first_day + week * 7, dtype=np.uint16),
+                volumes=rng.integers(10, 100000, size=args.series),
+                ranks=rng.integers(1, 101, size=args.series)
+            )
+        ingest = time.perf_counter() - started
+        points = args.series * args.weeks
+        print(f"ingest    {points:,} points  {ingest:7.2f} s  {points / ingest:12,.0f} points/s")
+
+        started = time.perf_counter()
+        store.compact()
+        stats = store.stats()
+        print(f"compact   {time.perf_counter() - started:7.2f} s  {stats['bytes_per_point']} bytes/point  "
+              f"{stats['disk_bytes'] / 1e6:.1f} MB")
+
+        for resolution in ("day", "week", "month"):
+            timings = []
+            for _ in range(20):
+                wanted = rng.choice(series, size=args.batch, replace=False).tolist()
+                started = time.perf_counter()
+                store.query(wanted, start=first_day + 7 * 13, resolution=resolution)
+                timings.append((time.perf_counter() - started) * 1000)
+            print(f"query     {args.batch} series by {resolution:5}  median {statistics.median(timings):7.1f} ms")
+
+        timings = []
+        for _ in range(20):
+            wanted = rng.choice(series, size=args.batch, replace=False).tolist()
+            started = time.perf_counter()
+            store.monthly_volumes(wanted)
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"monthly   {args.batch} series x 12 months  median {statistics.median(timings):7.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark the shared LLM gateway under a burst of concurrent calls
+
+    python -m benchmarks.bench_llm_gateway --calls 200 --rpm 600
+    python -m benchmarks.bench_llm_gateway --base-url http://localhost:8089/v1
+
+Without --base-url an in-process StaticBackend is used; --failures makes the first
+N calls fail with a retryable 429 so the retry path is exercised.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from app.services.llm_gateway import (
+    LLMGateway, StaticBackend, OpenAIBackend, CircuitBreaker, LLMGatewayError
+)
+from benchmarks.llm_stub_server import canned_reply
+
+async def run(args):
+    if args.base_url:
+        backend = OpenAIBackend(api_key="stub", base_url=args.base_url)
+    else:
+        backend = StaticBackend(reply=canned_reply, latency=args.latency_ms / 1000, failures=args.failures)
+
+    gateway = LLMGateway(
+        backend=backend,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+        max_concurrency=args.concurrency,
+        max_retries=3,
+        backoff_base=0.05,
+        backoff_max=1.0,
+        breaker=CircuitBreaker(failure_threshold=args.failures + 10, reset_timeout=1.0)
+    )
+    messages = [{"role": "user", "content": 'Generate 10 high-value SEO keyword suggestions for the seed keyword: "seo"'}]
+    latencies = []
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            await gateway.chat(messages, max_tokens=300, priority="high" if i % 10 == 0 else "normal")
+            latencies.append(time.perf_counter() - start)
+        except LLMGatewayError:
+            errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.calls)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"calls:        {args.calls} ({errors} failed)")
+    print(f"wall time:    {elapsed:.2f}s  ({args.calls / elapsed:.1f} calls/s)")
+    if latencies:
+        print(f"latency p50:  {statistics.median(latencies) * 1000:.1f} ms")
+        print(f"latency p95:  {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms")
+    print(f"gateway:      {gateway.stats()}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rpm", type=int, default=6000)
+    parser.add_argument("--tpm", type=int, default=1000000)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--failures", type=int, default=0)
+    parser.add_argument("--base-url", default=None)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
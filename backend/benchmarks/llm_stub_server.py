@@ -0,0 +1,123 @@
+"""
+OpenAI-compatible stub server for tests and benchmarks
+
+Serves POST /v1/chat/completions with canned JSON for every AstraPilot prompt type.
+Latency and failure injection are controlled through environment variables:
+
+    STUB_LATENCY_MS   fixed latency per completion (default 200)
+    STUB_ERROR_RATE   fraction of calls answered with 429 + Retry-After (default 0)
+    STUB_CHUNK_MS     delay between streamed chunks when "stream": true (default 20)
+
+Run it and point the backend at it:
+
+    uvicorn benchmarks.llm_stub_server:app --port 8089
+    OPENAI_BASE_URL=http://localhost:8089/v1 uvicorn app.main:app
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "200"))
+ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))
+CHUNK_MS = float(os.getenv("STUB_CHUNK_MS", "20"))
+CHUNK_SIZE = 16
+
+app = FastAPI(title="AstraPilot LLM Stub")
+
+def canned_reply(messages: list) -> str:
+    """Return a plausible completion for the prompt type found in the messages"""
+    prompt = " ".join(m.get("content") or "" for m in messages).lower()
+
+    if "keyword suggestions for the seed keyword" in prompt:
+        return json.dumps({
+            "keywords": [
+                {
+                    "keyword": f"stub keyword {i}",
+                    "search_volume": 1000 - i * 50,
+                    "difficulty": 20 + i * 3,
+                    "relevance_score": round(0.95 - i * 0.03, 2),
+                    "intent": "commercial",
+                    "cpc": round(1.5 + i * 0.1, 2)
+                }
+                for i in range(10)
+            ]
+        })
+    if "score adjustment" in prompt:
+        return "2"
+    if "recommendations in json" in prompt:
+        return json.dumps({
+            "recommendations": [
+                {
+                    "category": "content",
+                    "priority": "high",
+                    "issue": "Thin content on key landing pages",
+                    "recommendation": "Expand the main sections with original examples",
+                    "impact": "Better topical coverage",
+                    "effort": "medium",
+                    "ai_confidence": 0.8
+                }
+            ]
+        })
+    if "competitive insights" in prompt:
+        return json.dumps({"industry_analysis": "stub", "recommended_keywords": ["stub seo"]})
+    if "content optimization" in prompt:
+        return json.dumps({"content_quality_score": 70, "semantic_keywords": ["stub content"]})
+    if "predict" in prompt:
+        return json.dumps({"trending_keywords": ["stub trend"], "algorithm_impact": "low"})
+    return "{}"
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        return JSONResponse(
+            status_code=429,
+            headers={"retry-after": "1"},
+            content={"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_error"}}
+        )
+
+    await asyncio.sleep(LATENCY_MS / 1000)
+    messages = body.get("messages", [])
+    content = canned_reply(messages)
+    if body.get("stream"):
+        return StreamingResponse(stream_chunks(body.get("model", "stub"), content), media_type="text/event-stream")
+
+    # A buffered completion is only ready once every chunk has been generated
+    await asyncio.sleep(CHUNK_MS / 1000 * -(-len(content) // CHUNK_SIZE))
+    prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": prompt_tokens + len(content) // 4
+        }
+    }
+
+async def stream_chunks(model: str, content: str):
+    """Emit the completion as server-sent chat.completion.chunk events"""
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    for start in range(0, len(content), CHUNK_SIZE):
+        await asyncio.sleep(CHUNK_MS / 1000)
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": content[start:start + CHUNK_SIZE]}, "finish_reason": None}]
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
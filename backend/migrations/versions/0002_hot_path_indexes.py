@@ -0,0 +1,48 @@
+"""indexes for hot query paths
+
+Composite indexes for the per-user history, payment status/date and license
+lookups, plus a partial index on active licenses for expiry sweeps.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_seodata_user_id_created_at", "seodata", ["user_id", "created_at"])
+    op.create_index("ix_seodata_created_at", "seodata", ["created_at"])
+    op.create_index("ix_payments_status_created_at", "payments", ["status", "created_at"])
+    op.create_index("ix_payments_user_id_created_at", "payments", ["user_id", "created_at"])
+    op.create_index("ix_payments_created_at", "payments", ["created_at"])
+    op.create_index("ix_licenses_user_id_is_active", "licenses", ["user_id", "is_active", "created_at"])
+    op.create_index(
+        "ix_licenses_active_valid_until", "licenses", ["valid_until"],
+        postgresql_where=sa.text("is_active = true"), sqlite_where=sa.text("is_active = 1")
+    )
+    op.create_index("ix_social_user_id", "social", ["user_id"])
+    op.create_index("ix_users_created_at", "users", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_created_at", table_name="users")
+    op.drop_index("ix_social_user_id", table_name="social")
+    op.drop_index("ix_licenses_active_valid_until", table_name="licenses")
+    op.drop_index("ix_licenses_user_id_is_active", table_name="licenses")
+    op.drop_index("ix_payments_created_at", table_name="payments")
+    op.drop_index("ix_payments_user_id_created_at", table_name="payments")
+    op.drop_index("ix_payments_status_created_at", table_name="payments")
+    op.drop_index("ix_seodata_created_at", table_name="seodata")
+    op.drop_index("ix_seodata_user_id_created_at", table_name="seodata")
@@ -0,0 +1,44 @@
+"""indexes for keyset pagination
+
+Extend the created_at indexes behind the admin user/payment lists and the SEO
+history with the id tie-breaker, so (created_at, id) cursor pages are a single
+index seek on every database.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_users_created_at_id", "users", ["created_at", "id"])
+    op.drop_index("ix_users_created_at", table_name="users")
+    op.create_index("ix_payments_created_at_id", "payments", ["created_at", "id"])
+    op.drop_index("ix_payments_created_at", table_name="payments")
+    op.create_index("ix_payments_status_created_at_id", "payments", ["status", "created_at", "id"])
+    op.drop_index("ix_payments_status_created_at", table_name="payments")
+    op.create_index("ix_seodata_user_id_created_at_id", "seodata", ["user_id", "created_at", "id"])
+    op.drop_index("ix_seodata_user_id_created_at", table_name="seodata")
+
+
+def downgrade() -> None:
+    op.create_index("ix_seodata_user_id_created_at", "seodata", ["user_id", "created_at"])
+    op.drop_index("ix_seodata_user_id_created_at_id", table_name="seodata")
+    op.create_index("ix_payments_status_created_at", "payments", ["status", "created_at"])
+    op.drop_index("ix_payments_status_created_at_id", table_name="payments")
+    op.create_index("ix_payments_created_at", "payments", ["created_at"])
+    op.drop_index("ix_payments_created_at_id", table_name="payments")
+    op.create_index("ix_users_created_at", "users", ["created_at"])
+    op.drop_index("ix_users_created_at_id", table_name="users")
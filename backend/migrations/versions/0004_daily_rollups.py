@@ -0,0 +1,62 @@
+"""daily revenue and usage rollups
+
+Tables maintained by app.services.analytics_rollups as payments, analyses and
+users are written, backfilled here from the existing rows.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "daily_payment_stats",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("status", sa.String(length=32), nullable=False),
+        sa.Column("payments", sa.Integer(), nullable=False),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "status")
+    )
+    op.create_table(
+        "daily_usage_stats",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("new_users", sa.Integer(), nullable=False),
+        sa.Column("analyses", sa.Integer(), nullable=False),
+        sa.Column("scored_analyses", sa.Integer(), nullable=False),
+        sa.Column("score_total", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("day")
+    )
+    op.execute(
+        "INSERT INTO daily_payment_stats (day, status, payments, amount) "
+        "SELECT date(created_at), COALESCE(status, 'pending'), COUNT(*), COALESCE(SUM(amount), 0) "
+        "FROM payments WHERE created_at IS NOT NULL "
+        "GROUP BY date(created_at), COALESCE(status, 'pending')"
+    )
+    op.execute(
+        "INSERT INTO daily_usage_stats (day, new_users, analyses, scored_analyses, score_total) "
+        "SELECT day, SUM(new_users), SUM(analyses), SUM(scored_analyses), SUM(score_total) FROM ("
+        "SELECT date(created_at) AS day, COUNT(*) AS new_users, 0 AS analyses, 0 AS scored_analyses, "
+        "0.0 AS score_total FROM users WHERE created_at IS NOT NULL GROUP BY date(created_at) "
+        "UNION ALL "
+        "SELECT date(created_at), 0, COUNT(*), COUNT(score), COALESCE(SUM(score), 0) "
+        "FROM seodata WHERE created_at IS NOT NULL GROUP BY date(created_at)"
+        ") AS daily GROUP BY day"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("daily_usage_stats")
+    op.drop_table("daily_payment_stats")
@@ -0,0 +1,37 @@
+"""usage counters
+
+Per-user, per-period counters behind plan limit enforcement, written in
+batches by app.services.usage_counters.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "usage_counters",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("resource", sa.String(length=64), nullable=False),
+        sa.Column("period", sa.String(length=16), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id", "resource", "period")
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("usage_counters")
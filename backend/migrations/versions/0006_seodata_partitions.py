@@ -0,0 +1,126 @@
+"""monthly seodata partitions and the archive manifest
+
+seodata.created_at becomes NOT NULL: it is the partition key on PostgreSQL and
+decides which month a row is archived with. On PostgreSQL seodata is rebuilt
+as a table partitioned by month of created_at (primary key (id, created_at)),
+with a partition per month from the oldest row to three months ahead and a
+default partition for anything outside them; app.services.seodata_archive
+creates later months. SQLite has no partitioning and keeps the single table,
+bounded by the archive retention instead.
+
+seodata_archives records the months moved out to compressed archive files.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEODATA_INDEXES = (
+    ("ix_seodata_id", ["id"]),
+    ("ix_seodata_user_id_created_at_id", ["user_id", "created_at", "id"]),
+    ("ix_seodata_created_at", ["created_at"]),
+)
+
+# One partition per month (UTC) from the oldest row to three months from now
+CREATE_MONTH_PARTITIONS = """
+DO $$
+DECLARE
+    month_start timestamp := date_trunc('month', COALESCE(
+        (SELECT min(created_at) FROM seodata_unpartitioned), now()) AT TIME ZONE 'UTC');
+    last_month timestamp := date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months';
+BEGIN
+    WHILE month_start <= last_month LOOP
+        EXECUTE format('CREATE TABLE %I PARTITION OF seodata FOR VALUES FROM (%L) TO (%L)',
+                       'seodata_p' || to_char(month_start, 'YYYY_MM'),
+                       month_start AT TIME ZONE 'UTC', (month_start + interval '1 month') AT TIME ZONE 'UTC');
+        month_start := month_start + interval '1 month';
+    END LOOP;
+END $$
+"""
+
+
+def _seodata_columns(created_at_nullable: bool):
+    return [
+        sa.Column("id", sa.Integer(), server_default=sa.text("nextval('seodata_id_seq')"), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("url", sa.String(length=255), nullable=False),
+        sa.Column("analysis_result", sa.JSON(), nullable=True),
+        sa.Column("score", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(),
+                  nullable=created_at_nullable),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+    ]
+
+
+def _set_aside_seodata() -> None:
+    # The old table keeps its rows and the id sequence until they are copied into the new one
+    for name, _ in SEODATA_INDEXES:
+        op.drop_index(name, table_name="seodata")
+    op.rename_table("seodata", "seodata_unpartitioned")
+    op.execute("ALTER TABLE seodata_unpartitioned RENAME CONSTRAINT seodata_pkey TO seodata_unpartitioned_pkey")
+    op.execute("ALTER TABLE seodata_unpartitioned RENAME CONSTRAINT seodata_user_id_fkey "
+               "TO seodata_unpartitioned_user_id_fkey")
+
+
+def _replace_seodata() -> None:
+    op.execute("ALTER SEQUENCE seodata_id_seq OWNED BY seodata.id")
+    op.drop_table("seodata_unpartitioned")
+    for name, columns in SEODATA_INDEXES:
+        op.create_index(name, "seodata", columns)
+
+
+def upgrade() -> None:
+    op.execute("UPDATE seodata SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+    if op.get_context().dialect.name == "postgresql":
+        _set_aside_seodata()
+        op.create_table(
+            "seodata",
+            *_seodata_columns(created_at_nullable=False),
+            sa.PrimaryKeyConstraint("id", "created_at"),
+            postgresql_partition_by="RANGE (created_at)"
+        )
+        op.execute(CREATE_MONTH_PARTITIONS)
+        op.execute("CREATE TABLE seodata_default PARTITION OF seodata DEFAULT")
+        op.execute("INSERT INTO seodata (id, user_id, url, analysis_result, score, created_at) "
+                   "SELECT id, user_id, url, analysis_result, score, created_at FROM seodata_unpartitioned")
+        _replace_seodata()
+    else:
+        with op.batch_alter_table("seodata") as batch_op:
+            batch_op.alter_column("created_at", existing_type=sa.DateTime(timezone=True), nullable=False,
+                                  existing_server_default=sa.func.now())
+
+    op.create_table(
+        "seodata_archives",
+        sa.Column("month", sa.String(length=7), nullable=False),
+        sa.Column("path", sa.String(length=512), nullable=False),
+        sa.Column("rows", sa.Integer(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint("month")
+    )
+
+
+def downgrade() -> None:
+    # Archived months stay in their files: restore them (seodata_archive.restore_month) before downgrading
+    op.drop_table("seodata_archives")
+    if op.get_context().dialect.name == "postgresql":
+        _set_aside_seodata()
+        op.create_table("seodata", *_seodata_columns(created_at_nullable=True), sa.PrimaryKeyConstraint("id"))
+        op.execute("INSERT INTO seodata (id, user_id, url, analysis_result, score, created_at) "
+                   "SELECT id, user_id, url, analysis_result, score, created_at FROM seodata_unpartitioned")
+        _replace_seodata()  # the partitions go with the partitioned table
+    else:
+        with op.batch_alter_table("seodata") as batch_op:
+            batch_op.alter_column("created_at", existing_type=sa.DateTime(timezone=True), nullable=True,
+                                  existing_server_default=sa.func.now())
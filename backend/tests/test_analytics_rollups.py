@@ -0,0 +1,71 @@
+import asyncio
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.database import migrate_database
+from app.models import DailyPaymentStats, DailyUsageStats, Payment, SeoData, User
+from app.services.analytics_rollups import get_revenue_rollup, get_rollup_totals, rebuild_rollups
+
+async def rollup_rows(db):
+    payments = (await db.execute(select(DailyPaymentStats).order_by(DailyPaymentStats.day, DailyPaymentStats.status))).scalars()
+    usage = (await db.execute(select(DailyUsageStats).order_by(DailyUsageStats.day))).scalars()
+    return ([(str(p.day), p.status, p.payments, p.amount) for p in payments if p.payments],
+            [(str(u.day), u.new_users, u.analyses, u.scored_analyses, u.score_total) for u in usage
+             if u.new_users or u.analyses])
+
+def test_rollups_follow_writes_and_match_a_rebuild(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    day = datetime(2026, 3, 1, 12)
+
+    async def run():
+        await migrate_database(bind=engine)
+        async with AsyncSession(engine) as db:
+            db.add(User(id=1, username="a", email="a@x.com", hashed_password="x", created_at=day))
+            db.add_all([Payment(id=i, user_id=1, provider="stripe", amount=10.0 * i, created_at=day) for i in (1, 2, 3)])
+            db.add_all([SeoData(id=i, user_id=1, url="https://example.com/", score=score, created_at=day)
+                        for i, score in ((1, 80), (2, None), (3, 60))])
+            await db.commit()
+
+            # Expired after the commit: the previous status is read back from the database
+            payment = await db.get(Payment, 1)
+            db.expire(payment)
+            payment.status = "paid"
+            (await db.get(Payment, 2)).status = "failed"
+            await db.delete(await db.get(SeoData, 3))
+            await db.commit()
+
+            maintained = await rollup_rows(db)
+            await rebuild_rollups(db)
+            rebuilt = await rollup_rows(db)
+            totals = await get_rollup_totals(db)
+            revenue = await get_revenue_rollup(db, days=100000)
+        await engine.dispose()
+        return maintained, rebuilt, totals, revenue
+
+    maintained, rebuilt, totals, revenue = asyncio.run(run())
+    assert maintained == rebuilt
+    assert maintained[0] == [("2026-03-01", "failed", 1, 20.0), ("2026-03-01", "paid", 1, 10.0),
+                             ("2026-03-01", "pending", 1, 30.0)]
+    assert maintained[1] == [("2026-03-01", 1, 2, 1, 80.0)]
+    assert totals["users"] == 1 and totals["analyses"] == 2 and totals["avg_score"] == 80
+    assert revenue["daily_revenue"] == [{"date": "2026-03-01", "revenue": 10.0}]
+    assert revenue["payments_by_status"] == {"failed": 1, "paid": 1, "pending": 1}
+
+def test_rebuild_replaces_only_the_requested_days(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+
+    async def run():
+        await migrate_database(bind=engine)
+        async with AsyncSession(engine) as db:
+            db.add(User(id=1, username="a", email="a@x.com", hashed_password="x", created_at=datetime(2026, 3, 1)))
+            db.add_all([SeoData(user_id=1, url="https://example.com/", score=50, created_at=datetime(2026, 3, d))
+                        for d in (1, 2, 3)])
+            await db.commit()
+            await db.execute(DailyUsageStats.__table__.update().values(analyses=99))
+            await rebuild_rollups(db, datetime(2026, 3, 2).date(), datetime(2026, 3, 2).date())
+            rows = await rollup_rows(db)
+        await engine.dispose()
+        return rows
+
+    _, usage = asyncio.run(run())
+    assert [row[:3] for row in usage] == [("2026-03-01", 1, 99), ("2026-03-02", 0, 1), ("2026-03-03", 0, 99)]
@@ -11,3 +11,13 @@ def test_health():
 def test_docs():
     response = client.get("/docs")
     assert response.status_code == 200
+
+def test_lookups_are_not_metered(monkeypatch):
+    from app.services.subscription_service import SubscriptionManager
+
+    async def reserve_usage(db, user_id, usage):
+        raise AssertionError("lookups must not count against the plan")
+
+    monkeypatch.setattr(SubscriptionManager, "reserve_usage", reserve_usage)
+    assert client.get("/api/v1/keywords/autocomplete?q=seo").status_code == 200
+    assert client.get("/api/v1/keywords/bulk/missing-job").status_code == 404  # no job, but not a usage error
@@ -0,0 +1,76 @@
+import asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.database import Base
+from app.models import License, Payment, SeoData, User
+from app.services.dashboard_snapshot import SnapshotCache, compute_admin_overview
+
+def test_concurrent_loads_share_one_computation_and_stale_values_refresh_in_background():
+    now = [0.0]
+    cache = SnapshotCache(ttl_seconds=10, max_stale_seconds=60, clock=lambda: now[0])
+    calls = []
+
+    async def loader():
+        calls.append(now[0])
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def run():
+        first = await asyncio.gather(*(cache.get("overview", loader) for _ in range(5)))
+        now[0] = 30  # stale: served at once, refreshed behind the caller
+        stale_value, stale_meta = await cache.get("overview", loader)
+        await asyncio.sleep(0.05)
+        fresh_value, fresh_meta = await cache.get("overview", loader)
+        return first, stale_value, stale_meta, fresh_value, fresh_meta
+
+    first, stale_value, stale_meta, fresh_value, fresh_meta = asyncio.run(run())
+    assert [value for value, _ in first] == [1] * 5
+    assert stale_value == 1 and stale_meta["stale"]
+    assert fresh_value == 2 and not fresh_meta["stale"]
+    assert len(calls) == 2
+
+def test_overview_counts_come_from_one_query(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+
+    async def run():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSession(engine) as db:
+            db.add_all([
+                User(id=1, username="a", email="a@x.com", hashed_password="x", email_verified=True, is_active=True),
+                User(id=2, username="b", email="b@x.com", hashed_password="x", email_verified=False, is_active=True),
+                Payment(user_id=1, provider="stripe", amount=29.0, status="paid"),
+                Payment(user_id=2, provider="stripe", amount=9.0, status="failed"),
+                License(user_id=1, plan="pro", is_active=True),
+                SeoData(user_id=1, url="https://example.com/", score=80),
+            ])
+            await db.commit()
+            overview = await compute_admin_overview(db)
+        await engine.dispose()
+        return overview
+
+    overview = asyncio.run(run())
+    assert overview["user_stats"]["total_users"] == 2 and overview["user_stats"]["verification_rate"] == 50
+    assert overview["payment_stats"]["total_revenue"] == 29.0 and overview["payment_stats"]["success_rate"] == 50
+    assert overview["license_stats"]["active_licenses"] == 1
+    assert overview["analysis_stats"]["recent_analyses"] == 1
+    assert overview["social_stats"]["total_connections"] == 0
+
+def test_waiters_recompute_when_the_first_caller_is_cancelled():
+    cache = SnapshotCache(clock=lambda: 0.0)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def run():
+        first = asyncio.create_task(cache.get("overview", loader))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get("overview", loader))
+        await asyncio.sleep(0)
+        first.cancel()  # admin closed the page mid-computation
+        value, _ = await asyncio.wait_for(waiter, timeout=1)
+        return value
+
+    assert asyncio.run(run()) == 2 and len(calls) == 2
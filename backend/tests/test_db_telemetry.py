@@ -0,0 +1,52 @@
+import asyncio
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.database import InstrumentedQueuePool, engine_options
+from app.services.db_telemetry import DatabaseTelemetry, QueryCountMiddleware
+
+def test_queries_are_counted_per_request_and_repeats_flagged():
+    telemetry = DatabaseTelemetry(slow_query_ms=0, n_plus_one_threshold=3)
+    engine = telemetry.instrument(create_async_engine("sqlite+aiosqlite://"))
+
+    async def run():
+        token = telemetry.start_request()
+        async with engine.connect() as conn:
+            for i in range(4):
+                await conn.execute(text("SELECT :i"), {"i": i})
+        request = telemetry.finish_request("GET /items", token)
+        await engine.dispose()
+        return request
+
+    request = asyncio.run(run())
+    assert request.count == 4
+    summary = telemetry.summary()
+    assert summary["queries"] == 4 and summary["query_latency_ms"]["count"] == 4
+    assert len(summary["slow_queries"]) == 4
+    assert summary["repeated_queries"][0]["executions"] == 4
+    assert summary["routes"][0] == {**summary["routes"][0], "route": "GET /items", "requests": 1, "max_queries": 4}
+
+def test_middleware_reports_query_count_header():
+    telemetry = DatabaseTelemetry()
+    engine = telemetry.instrument(create_async_engine("sqlite+aiosqlite://"))
+    app = FastAPI()
+    app.add_middleware(QueryCountMiddleware, telemetry=telemetry)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await conn.execute(text("SELECT 2"))
+        return {"id": item_id}
+
+    response = TestClient(app).get("/items/7")
+    assert response.headers["x-db-queries"] == "2"
+    assert telemetry.summary()["routes"][0]["route"] == "GET /items/{item_id}"
+
+def test_engine_options_configure_pool_for_server_databases():
+    url, options = engine_options("postgresql+asyncpg://user:secret@db/app")
+    assert options["poolclass"] is InstrumentedQueuePool and options["echo"] is False
+    assert url.query["prepared_statement_cache_size"] == "100"
+    _, sqlite_options = engine_options("sqlite+aiosqlite:///./app.db")
+    assert "poolclass" not in sqlite_options
@@ -0,0 +1,43 @@
+import asyncio
+from app.services.keyword_autocomplete import PrefixIndex, keyword_score
+
+ENTRIES = [
+    ("seo tools", keyword_score(12000), 12000),
+    ("seo audit", keyword_score(5000), 5000),
+    ("seoul travel", keyword_score(90000), 90000),
+    ("keyword research", keyword_score(8000), 8000),
+]
+
+def test_top_k_by_score_and_trailing_space():
+    index = PrefixIndex(precompute_above=1).build(ENTRIES)
+    assert [c["keyword"] for c in index.complete("SEO", k=2)] == ["seoul travel", "seo tools"]
+    assert [c["keyword"] for c in index.complete("seo ", k=5)] == ["seo tools", "seo audit"]
+    assert index.complete("xyz") == []
+
+def test_incremental_inserts_and_snapshot(tmp_path):
+    index = PrefixIndex().build(ENTRIES)
+    index.add("seo agency", 20000, "research")
+    index.add("seo audit", 100, "research")  # lower score than stored, ignored
+    assert index.complete("seo a", k=1)[0]["keyword"] == "seo agency"
+    assert len(index) == 5
+
+    path = str(tmp_path / "autocomplete.npz")
+    index.save(path)
+    loaded = PrefixIndex.load(path)
+    assert loaded.complete("seo a", k=2) == index.complete("seo a", k=2)
+
+def test_full_delta_is_merged_off_the_event_loop():
+    index = PrefixIndex(delta_limit=2).build(ENTRIES)
+
+    async def run():
+        index.add("seo agency", 20000)
+        index.add("seo agency near me", 300)  # fills the delta: the merge starts in a worker thread
+        await asyncio.sleep(0)
+        index.add("seo checker", 700)  # arrives while the merge runs
+        assert index.stats()["delta"] == 3 and index.complete("seo ag", k=1)[0]["keyword"] == "seo agency"
+        await index._compaction
+        return index.stats()
+
+    stats = asyncio.run(run())
+    assert stats["base"] == 6 and stats["delta"] == 1
+    assert [c["keyword"] for c in index.complete("seo c")] == ["seo checker"]
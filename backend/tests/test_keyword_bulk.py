@@ -0,0 +1,69 @@
+import asyncio
+import csv
+import io
+import json
+import threading
+from app.services.keyword_bulk import BulkJob, ResultSpool, iter_csv_records, score_csv_upload
+from app.services.keyword_service import score_keyword_batch
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+def run_upload(data: bytes, job: BulkJob, size: int = 7, batch_rows: int = 3, score=score_keyword_batch):
+    async def collect():
+        return [row async for batch in score_csv_upload(chunked(data, size), score, job, batch_rows) for row in batch]
+    return asyncio.run(collect())
+
+def test_records_split_across_chunks_and_quoted_newlines():
+    data = '﻿keyword,volume\r\n"seo, tools",10\n"multi\nline",5\nlast,1'.encode("utf-8")
+
+    async def collect():
+        return [row async for row in iter_csv_records(chunked(data, 3))]
+
+    assert asyncio.run(collect()) == [["keyword", "volume"], ["seo, tools", "10"], ["multi\nline", "5"], ["last", "1"]]
+
+def test_upload_scores_in_batches_and_reports_bad_rows():
+    data = ("Volume\tKeyword\n10\tseo tools\n5\t\n1\t" + "x" * 300 + "\n\n7\tkeyword  research\n").encode("utf-8")
+    job = BulkJob()
+    rows = run_upload(data, job)
+
+    assert [r["row"] for r in rows] == [2, 3, 4, 6]
+    assert rows[0]["keyword"] == "seo tools" and rows[0]["error"] is None
+    assert rows[1]["error"] == "missing keyword" and rows[2]["error"] == "keyword too long"
+    assert rows[3]["keyword"] == "keyword research"
+    assert (job.rows_read, job.rows_scored, job.rows_failed) == (4, 2, 2)
+
+def test_failing_batch_is_retried_row_by_row_off_the_event_loop():
+    def score(keywords):
+        assert threading.current_thread() is not threading.main_thread()
+        if "boom" in keywords:
+            raise ValueError("bad keyword")
+        return score_keyword_batch(keywords)
+
+    job = BulkJob()
+    rows = run_upload(b"seo\nboom\naudit\n", job, score=score)
+    assert [r["error"] for r in rows] == [None, "scoring failed: bad keyword", None]
+
+def test_plan_limit_truncates_and_spool_streams_csv():
+    job = BulkJob(max_rows=2)
+    rows = run_upload(b"a\nb\nc\nd\n", job)
+    assert len(rows) == 2 and job.truncated
+
+    spool = ResultSpool("csv")
+    spool.write(rows)
+    spool.write_summary(job)
+    output = list(csv.DictReader(io.StringIO(b"".join(spool.iter_chunks(8)).decode("utf-8"))))
+    assert [r["keyword"] for r in output] == ["a", "b", ""]
+    assert "plan limit" in output[-1]["error"]
+
+def test_ndjson_spool_ends_with_summary():
+    job = BulkJob()
+    rows = run_upload(b"keyword,volume\nseo,10\n,5\n", job)
+    job.finish()
+    spool = ResultSpool("ndjson")
+    spool.write(rows)
+    spool.write_summary(job)
+    lines = [json.loads(line) for line in b"".join(spool.iter_chunks()).splitlines()]
+    assert [line["type"] for line in lines] == ["result", "error", "summary"]
+    assert lines[-1]["status"] == "completed" and lines[-1]["rows_failed"] == 1
@@ -0,0 +1,24 @@
+import numpy as np
+from app.services.keyword_clustering import KeywordClusterer, band_layout
+
+KEYWORDS = [
+    "seo tools", "best seo tools", "seo tool", "free seo tools",
+    "keyword research", "keyword research tool", "keyword researching",
+    "coffee beans", "buy coffee beans", "organic coffee beans",
+]
+
+def test_similar_keywords_share_a_cluster():
+    volumes = np.array([12000, 3000, 800, 2500, 8000, 1500, 90, 6000, 700, 400])
+    clusters = KeywordClusterer(use_concepts=False).cluster(KEYWORDS, volumes)
+    by_head = {c["head"]: c for c in clusters}
+
+    assert set(by_head["seo tools"]["keywords"]) >= {"seo tools", "best seo tools", "seo tool"}
+    assert "keyword research tool" in by_head["keyword research"]["keywords"]
+    assert "buy coffee beans" in by_head["coffee beans"]["keywords"]
+    assert clusters[0]["head"] == "seo tools"  # largest aggregate volume first
+    assert sum(c["size"] for c in clusters) == len(KEYWORDS)
+
+def test_empty_input_and_band_layout():
+    assert KeywordClusterer().cluster([]) == []
+    bands, rows = band_layout(0.5)
+    assert bands * rows == 64
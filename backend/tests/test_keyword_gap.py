@@ -0,0 +1,44 @@
+import asyncio
+from app.services.keyword_gap import DomainKeywordSets, import_ranking_export, read_ranking_exports
+from app.services.keyword_service import KeywordAnalyzer
+from app.services.keyword_trends import KeywordTrendStore
+
+POSITIONS = """Keyword,Position,Search Volume,URL
+seo tools,3,12000,https://rival.com/tools
+keyword research,1,8000,https://rival.com/research
+backlink checker,7,3000,https://rival.com/backlinks
+"""
+
+def build_sets():
+    sets = DomainKeywordSets()
+    sets.set_domain("https://www.mysite.com/", [("seo tools", 5, 12000, None), ("seo audit", 2, 900, None)])
+    sets.set_domain("rival.com", [("SEO Tools", 3, 12000, None), ("keyword research", 1, 8000, None),
+                                  ("backlink checker", 7, 3000, None)])
+    sets.set_domain("other.com", [("keyword research", 4, 8000, None), ("rank tracker", 2, 5000, None)])
+    return sets
+
+def test_gap_overlap_and_unique_ranked_by_volume():
+    result = build_sets().compare("mysite.com", ["rival.com", "other.com"])
+    assert [r["keyword"] for r in result["gaps"]] == ["keyword research", "rank tracker", "backlink checker"]
+    assert [r["keyword"] for r in result["missing"]] == ["keyword research"]
+    assert [r["keyword"] for r in result["overlap"]] == ["seo tools"]
+    assert result["overlap"][0]["positions"] == {"mysite.com": 5, "rival.com": 3, "other.com": None}
+    assert [r["keyword"] for r in result["unique"]["rival.com"]] == ["backlink checker"]
+    assert result["counts"]["keywords"] == {"mysite.com": 2, "rival.com": 3, "other.com": 2}
+
+def test_ranking_export_feeds_competitor_analysis(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.keyword_trends._trend_store", KeywordTrendStore())
+    export = tmp_path / "positions.csv"
+    export.write_text(POSITIONS)
+    assert import_ranking_export(str(export), "www.rival.com", rankings_dir=str(tmp_path)) == 3
+
+    sets = DomainKeywordSets()
+    for domain, rows in read_ranking_exports(str(tmp_path)):
+        sets.set_domain(domain, rows)
+    monkeypatch.setattr("app.services.keyword_service.get_domain_keywords", lambda: sets)
+
+    analysis = asyncio.run(KeywordAnalyzer().analyze_competitor_keywords("rival.com", ["seo tools"]))
+    assert analysis.organic_keywords == 3
+    assert analysis.top_organic_keywords[0].keyword == "keyword research"
+    assert analysis.top_organic_keywords[0].url == "https://rival.com/research"
+    assert [g.keyword for g in analysis.keyword_gaps] == ["keyword research", "backlink checker"]
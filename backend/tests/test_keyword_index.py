@@ -0,0 +1,25 @@
+from app.services.keyword_index import KeywordIndex, extract_texts
+
+DOCUMENTS = [
+    "Add the target keyword to the title tag and meta description",
+    "Write a unique meta description for every page",
+    "Improve page speed by compressing images",
+    "Compress images and lazy load images below the fold",
+    "Use the title tag to describe the page topic",
+    "Internal links help search engines crawl the page",
+]
+
+def test_nearest_prefers_related_phrases():
+    index = KeywordIndex().build(DOCUMENTS, corpus_keywords=["image compression", "meta tags"])
+    related = [phrase for phrase, _ in index.nearest("compress images", k=5)]
+    assert "compressing images" in related or "images" in related
+    assert "compress images" not in related
+
+def test_unknown_query_and_empty_index():
+    assert KeywordIndex().nearest("anything") == []
+    index = KeywordIndex().build(DOCUMENTS)
+    assert index.nearest("meta descriptions", k=3)
+
+def test_extract_texts_walks_analysis_results():
+    result = {"url": "https://example.com", "recommendations": [{"issue": "Missing title tag"}]}
+    assert list(extract_texts(result)) == ["Missing title tag"]
@@ -0,0 +1,63 @@
+import asyncio
+from app.schemas.keyword import KeywordRequest
+from app.services import keyword_metrics
+from app.services.keyword_metrics import import_keyword_exports, open_store, read_keyword_export, write_store
+from app.services.keyword_service import KeywordAnalyzer
+
+SEMRUSH = """Keyword,Volume,Keyword Difficulty,CPC,Trend
+seo tools,12100,78,4.25,"0.5,0.5,0.5,0.5,0.5,0.5,0.5,0.5,0.5,0.5,0.5,1.0"
+Keyword Research,6600,65,3.10,
+"""
+
+PLANNER = ("Keyword Stats 2024\nAll locations\n"
+           "Keyword\tAvg. monthly searches\tCompetition (indexed value)\tTop of page bid (low range)\t"
+           "Top of page bid (high range)\tSearches: Jan 2024\tSearches: Feb 2024\n"
+           "seo audit\t1K – 10K\t40\t1.00\t3.00\t4000\t6000\n")
+
+def write_exports(tmp_path):
+    semrush = tmp_path / "semrush.csv"
+    semrush.write_text(SEMRUSH)
+    planner = tmp_path / "planner.csv"
+    planner.write_text(PLANNER, encoding="utf-16")
+    return str(semrush), str(planner)
+
+def test_import_and_lookup(tmp_path):
+    semrush, planner = write_exports(tmp_path)
+    store_dir = str(tmp_path / "store")
+    import_keyword_exports([semrush, planner], "United States", "en", store_dir=store_dir)
+    import_keyword_exports([semrush], "United Kingdom", "en", store_dir=store_dir)
+
+    store = open_store(store_dir)
+    assert len(store) == 5
+    assert store.lookup("SEO  Tools", "United States", "en")["search_volume"] == 12100
+    audit = store.lookup("seo audit", "united states", "EN")
+    assert audit["search_volume"] == 5500 and audit["cpc"] == 2.0 and audit["trend"][1] == 6000
+    assert store.lookup("seo audit", "United Kingdom", "en") is None
+    assert list(store.find_rows(["seo tools", "unknown"], "United Kingdom", "en") >= 0) == [True, False]
+
+def test_research_uses_stored_metrics(tmp_path):
+    semrush, _ = write_exports(tmp_path)
+    store_dir = str(tmp_path / "store")
+    import_keyword_exports([semrush], "United States", "en", store_dir=store_dir)
+    analyzer = KeywordAnalyzer(metrics_store=open_store(store_dir))
+
+    research = asyncio.run(analyzer.research_keyword(KeywordRequest(keyword="seo tools")))
+    assert research.search_volume == 12100 and research.difficulty_score == 78
+    assert len(research.seasonal_trends) == 12
+
+    batch = asyncio.run(analyzer.batch_keyword_difficulty(["keyword research", "other"], "United States", "en"))
+    assert batch[0].search_volume == 6600 and batch[0].cpc == 3.1
+
+def test_store_is_reopened_when_another_process_publishes(tmp_path, monkeypatch):
+    semrush, planner = write_exports(tmp_path)
+    store_dir = str(tmp_path / "store")
+    monkeypatch.setattr(keyword_metrics.settings, "KEYWORD_METRICS_DIR", store_dir)
+    monkeypatch.setattr(keyword_metrics, "_store", None)
+    assert len(keyword_metrics.get_keyword_metrics_store()) == 0
+
+    records = list(read_keyword_export(semrush))
+    write_store(store_dir, [{**record, "locale": "us"} for record in records])  # the CLI import, elsewhere
+    store = keyword_metrics.get_keyword_metrics_store()
+    assert len(store) == 2 and keyword_metrics.get_keyword_metrics_store() is store
+    write_store(store_dir, [{**record, "locale": "us"} for record in read_keyword_export(planner)])
+    assert len(keyword_metrics.get_keyword_metrics_store()) == 1
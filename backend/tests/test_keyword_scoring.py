@@ -0,0 +1,21 @@
+import numpy as np
+from app.services.keyword_scoring import score_keywords
+
+def test_scores_are_stable_and_bounded():
+    keywords = ["seo tools", "buy seo software online", "marketing"]
+    first = score_keywords(keywords).rows()
+    assert first == score_keywords(keywords).rows()
+    for row in first:
+        assert 1 <= row["difficulty_score"] <= 100
+        assert row["competition"] in ("low", "medium", "high")
+        assert len(row["trend"]) == 12
+
+def test_known_metrics_override_estimates():
+    scores = score_keywords(["a", "b"], search_volume=np.array([1234, np.nan]), cpc=np.array([np.nan, 9.5]))
+    assert scores.search_volume[0] == 1234
+    assert scores.cpc[1] == 9.5
+
+def test_batches_cover_every_keyword():
+    scores = score_keywords([f"keyword {i}" for i in range(2500)])
+    assert sum(len(batch) for batch in scores.iter_batches(1000)) == 2500
+    assert len(score_keywords([])) == 0
@@ -0,0 +1,70 @@
+import os
+from datetime import date
+import numpy as np
+from app.services.keyword_metrics import import_keyword_exports, open_store, read_keyword_export
+from app.services.keyword_service import KeywordAnalyzer
+from app.services.keyword_trends import KeywordTrendStore, history_points, series_key, to_day
+
+PLANNER = ("Keyword\tAvg. monthly searches\tSearches: Jan 2024\tSearches: Feb 2024\tSearches: Mar 2024\n"
+           "seo audit\t5000\t4000\t6000\t5000\n")
+
+def test_append_downsample_and_compact(tmp_path):
+    store = KeywordTrendStore(str(tmp_path))
+    tools, audit = series_key("seo tools"), series_key("seo audit")
+    days = [to_day(d) for d in ("2024-01-01", "2024-01-03", "2024-01-10", "2024-02-01")]
+    store.append(np.array([tools] * 4, dtype=np.uint64), np.array(days), volumes=[100, 200, 300, 400], ranks=[4, 2, np.nan, 1])
+    store.append(np.array([tools], dtype=np.uint64), np.array([days[0]]), volumes=[150])  # replaces Jan 1
+
+    weekly = store.query([tools], resolution="week")[0]
+    assert weekly["dates"].tolist() == [date(2024, 1, 1), date(2024, 1, 8), date(2024, 1, 29)]
+    assert weekly["volume"].tolist() == [175, 300, 400]
+    assert weekly["rank"][1] != weekly["rank"][1]  # NaN: no rank that week
+
+    store.compact()
+    store.append(np.array([audit], dtype=np.uint64), np.array([days[3]]), volumes=[50])
+    reopened = KeywordTrendStore(str(tmp_path))
+    monthly = reopened.query([tools, audit], start=days[2], resolution="month")
+    assert monthly[0]["volume"].tolist() == [300, 400] and monthly[1]["volume"].tolist() == [50]
+    assert reopened.stats()["points"] == 4 and reopened.stats()["log_points"] == 1
+
+def test_difficulty_trend_served_from_history(tmp_path):
+    path = tmp_path / "planner.csv"
+    path.write_text(PLANNER, encoding="utf-16")
+    import_keyword_exports([str(path)], "United States", "en", store_dir=str(tmp_path / "metrics"))
+
+    trends = KeywordTrendStore()
+    trends.append(*history_points(read_keyword_export(str(path)), "United States", "en"))
+    trends.append(np.array([series_key("seo audit", "United States", "en")], dtype=np.uint64),
+                  np.array([to_day(date.today().replace(day=1))]), volumes=[7000])
+
+    analyzer = KeywordAnalyzer(metrics_store=open_store(str(tmp_path / "metrics")), trend_store=trends)
+    trend = analyzer._score_keywords(["seo audit"], "United States", "en").trend[0]
+    assert trend[date.today().month - 1] == 7000
+    # 2024 history is outside the trailing year, so the imported February figure remains
+    assert trend[1] == (7000 if date.today().month == 2 else 6000)
+
+def test_processes_sharing_a_directory_see_each_other_and_keep_newer_versions(tmp_path):
+    worker, cli = KeywordTrendStore(str(tmp_path)), KeywordTrendStore(str(tmp_path))  # each with its own view
+    tools, audit = series_key("seo tools"), series_key("seo audit")
+    day = to_day("2024-03-01")
+    worker.append(np.array([tools], dtype=np.uint64), np.array([day]), volumes=[10])
+    worker.compact()
+
+    cli.refresh()
+    cli.append(np.array([audit], dtype=np.uint64), np.array([day]), volumes=[20])
+    cli.compact()  # the CLI import publishes a newer version
+    worker.append(np.array([tools], dtype=np.uint64), np.array([day + 1]), volumes=[30])
+    worker.compact()  # must fold the CLI's version, not delete it
+
+    versions = [name for name in os.listdir(tmp_path) if name.startswith("v")]
+    assert len(versions) == 1 and (tmp_path / "CURRENT").read_text() == versions[0]
+    cli.refresh()
+    history = cli.query([tools, audit])
+    assert history[0]["volume"].tolist() == [10, 30] and history[1]["volume"].tolist() == [20]
+
+def test_appends_past_the_threshold_compact_in_the_background(tmp_path):
+    store = KeywordTrendStore(str(tmp_path), compact_after=2)
+    tools = series_key("seo tools")
+    store.append(np.array([tools, tools], dtype=np.uint64), np.array([1, 2]), volumes=[1, 2])
+    store.wait_for_compaction()
+    assert store.stats()["points"] == 2 and store.stats()["log_points"] == 0
@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.database import migrate_database
+from app.models import License, User
+from app.services import subscription_service
+from app.services.license_cache import LicenseCache
+from app.services.subscription_service import SubscriptionManager, check_feature_access
+
+def test_entries_expire_with_the_license_and_stale_loads_are_dropped():
+    now, clock = datetime(2026, 1, 1), [0.0]
+    cache = LicenseCache(ttl_seconds=60, clock=lambda: clock[0], utcnow=lambda: now)
+    expiring = License(plan="pro", is_active=True, valid_until=now + timedelta(seconds=10))
+    cache.put(1, expiring, version=cache.load_version(1))
+    clock[0] = 11
+    assert cache.get(1) == (False, None)  # capped at valid_until, not the 60 s TTL
+
+    version = cache.load_version(2)
+    cache.put(2, None)  # a license change lands while the load was running
+    cache.put(2, License(plan="basic", is_active=True, valid_until=None), version=version)
+    assert cache.get(2) == (True, None)
+
+    version = cache.load_version(3)
+    cache.invalidate()
+    cache.put(3, expiring, version=version)
+    assert cache.get(3) == (False, None)
+
+def test_entitlement_checks_hit_the_database_only_on_a_miss(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setattr(subscription_service, "license_cache", LicenseCache(ttl_seconds=60))
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    async def queries(call):
+        statements.clear()
+        result = await call
+        return result, len(statements)
+
+    async def run():
+        await migrate_database(bind=engine)
+        async with AsyncSession(engine) as db:
+            db.add(User(id=1, username="a", email="a@x.com", hashed_password="x"))
+            db.add(License(user_id=1, plan="pro", is_active=True, valid_until=datetime.utcnow() + timedelta(days=30)))
+            await db.commit()
+
+            first = await queries(SubscriptionManager.get_user_plan(db, 1))
+            cached = await queries(SubscriptionManager.get_user_plan(db, 1))
+            feature = await queries(check_feature_access(db, 1, "API access"))
+            usage = await queries(SubscriptionManager.check_usage_limit(db, 1, "seo_analyses"))
+            await SubscriptionManager.create_subscription(db, 1, "basic")
+            changed = await queries(SubscriptionManager.get_user_plan(db, 1))
+        await engine.dispose()
+        return first, cached, feature, usage, changed
+
+    first, cached, feature, usage, changed = asyncio.run(run())
+    assert first[0].plan_id == "pro" and first[1] == 1
+    assert cached == (first[0], 0)
+    assert feature == (True, 0)
+    assert usage[0]["limit"] == 500 and usage[1] == 1  # only the usage counter lookup
+    assert changed[0].plan_id == "basic" and changed[1] == 0
@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+from app.services.llm_telemetry import LLMTelemetry
+from app.services.llm_gateway import (
+    LLMGateway, StaticBackend, CircuitBreaker, CircuitOpenError, LLMBackendError, TokenBucket
+)
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+def test_retries_transient_failures():
+    backend = StaticBackend(reply='{"ok": true}', failures=2)
+    gateway = LLMGateway(backend, max_retries=3, backoff_base=0.001, backoff_max=0.01)
+    response = asyncio.run(gateway.chat(MESSAGES))
+    assert response.content == '{"ok": true}'
+    assert response.retries == 2
+    assert backend.calls == 3
+
+def test_circuit_opens_and_fails_fast():
+    backend = StaticBackend(failures=100)
+    gateway = LLMGateway(
+        backend, max_retries=0,
+        breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    )
+    for _ in range(2):
+        with pytest.raises(LLMBackendError):
+            asyncio.run(gateway.chat(MESSAGES))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(gateway.chat(MESSAGES))
+    assert backend.calls == 2
+    assert gateway.stats()["circuit_state"] == "open"
+
+def test_token_bucket_reports_wait_time():
+    bucket = TokenBucket(rate_per_minute=60)
+    assert bucket.try_acquire(60) == 0
+    assert bucket.try_acquire(1) > 0
+
+def test_calls_are_recorded_per_prompt_type():
+    telemetry = LLMTelemetry()
+    gateway = LLMGateway(StaticBackend(reply="{}"), telemetry=telemetry)
+    with telemetry.trace() as calls:
+        asyncio.run(gateway.chat(MESSAGES, prompt_type="keyword_suggestions"))
+    summary = telemetry.summary()["prompt_types"]["keyword_suggestions"]
+    assert summary["calls"] == 1
+    assert summary["latency_ms"]["count"] == 1
+    assert len(calls) == 1 and calls[0].prompt_tokens > 0
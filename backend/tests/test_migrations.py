@@ -0,0 +1,55 @@
+import asyncio
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.database import Base, migrate_database, unversioned_revision
+import app.models  # registers every table with Base
+
+def indexes_and_revision(engine):
+    async def read():
+        async with engine.connect() as conn:
+            names = await conn.run_sync(lambda c: {i["name"] for i in inspect(c).get_indexes("licenses")})
+            revision = (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+            return names, revision
+    return asyncio.run(read())
+
+def test_migrations_add_hot_path_indexes(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    asyncio.run(migrate_database(bind=engine))
+    names, revision = indexes_and_revision(engine)
+    assert {"ix_licenses_user_id_is_active", "ix_licenses_active_valid_until"} <= names
+    assert revision == "0006"
+    asyncio.run(engine.dispose())
+
+def test_databases_from_create_tables_are_stamped_then_upgraded(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+
+    async def legacy_schema():
+        await migrate_database("0001", bind=engine)
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP TABLE alembic_version"))
+
+    asyncio.run(legacy_schema())
+    asyncio.run(migrate_database(bind=engine))
+    names, revision = indexes_and_revision(engine)
+    assert "ix_licenses_user_id_is_active" in names and revision == "0006"
+    asyncio.run(engine.dispose())
+
+def test_databases_from_create_tables_are_stamped_at_the_revision_they_match(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+
+    async def run():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)  # what create_tables() builds today
+            assert await conn.run_sync(unversioned_revision) == "0006"
+        await migrate_database(bind=engine)
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP TABLE alembic_version"))
+            await conn.execute(text("DROP TABLE seodata_archives"))
+            await conn.execute(text("DROP TABLE usage_counters"))
+            assert await conn.run_sync(unversioned_revision) == "0004"
+        await migrate_database(bind=engine)
+
+    asyncio.run(run())
+    names, revision = indexes_and_revision(engine)
+    assert "ix_licenses_user_id_is_active" in names and revision == "0006"
+    asyncio.run(engine.dispose())
@@ -0,0 +1,55 @@
+import asyncio
+from datetime import datetime
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.database import migrate_database
+from app.models import Payment, SeoData, User
+from app.services.pagination import decode_cursor, encode_cursor, estimate_count, keyset_page
+from app.services.seo_service import get_recent_seo_results
+
+def test_cursors_are_opaque_and_validated():
+    cursor = encode_cursor(datetime(2026, 1, 2, 3, 4, 5), 42)
+    assert "2026" not in cursor and decode_cursor(cursor) == ("2026-01-02T03:04:05", 42)
+    for bad in ("not a cursor", encode_cursor("x", 1)[:-2], "WzEsMl0"):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+def test_keyset_pages_cover_every_row_once_with_tied_timestamps(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+
+    async def run():
+        await migrate_database(bind=engine)
+        async with AsyncSession(engine) as db:
+            db.add(User(id=1, username="a", email="a@x.com", hashed_password="x"))
+            # server-default timestamps ("YYYY-MM-DD HH:MM:SS") mixed with ones bound by SQLAlchemy
+            db.add_all([Payment(user_id=1, provider="stripe", amount=i, status="paid") for i in range(3)])
+            db.add_all([Payment(user_id=1, provider="stripe", amount=i, status="failed" if i % 2 else "paid",
+                                created_at=datetime(2026, 1, 1 + i // 2)) for i in range(5)])
+            db.add_all([SeoData(user_id=1, url=f"https://site{i}.com/", score=i, analysis_result={"i": i},
+                                created_at=datetime(2026, 2, 1)) for i in range(3)])
+            await db.commit()
+
+            pages, cursor = [], None
+            while True:
+                rows, cursor = await keyset_page(db, select(Payment), Payment.created_at, Payment.id, 3, cursor)
+                pages.append([payment.id for payment, *_ in rows])
+                if cursor is None:
+                    break
+            failed, _ = await keyset_page(
+                db, select(Payment).where(Payment.status == "failed"), Payment.created_at, Payment.id, 10
+            )
+            history, history_cursor = await get_recent_seo_results(db, 1, limit=2)
+            older, _ = await get_recent_seo_results(db, 1, limit=2, cursor=history_cursor, include_results=True)
+            total = await estimate_count(db, Payment.__table__)
+            await db.execute(text("ANALYZE"))
+            analyzed_total = await estimate_count(db, Payment.__table__)
+        await engine.dispose()
+        return pages, failed, history, older, total, analyzed_total
+
+    pages, failed, history, older, total, analyzed_total = asyncio.run(run())
+    assert pages == [[3, 2, 1], [8, 7, 6], [5, 4]]
+    assert [payment.id for payment, *_ in failed] == [7, 5]
+    assert [a["id"] for a in history] == [3, 2] and "analysis_result" not in history[0]
+    assert [a["id"] for a in older] == [1] and older[0]["analysis_result"] == {"i": 0}
+    assert total == analyzed_total == 8
@@ -0,0 +1,115 @@
+import asyncio
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.services.rate_limit import LocalRateLimitBackend, RateLimitMiddleware, RateLimitRule
+
+def test_burst_then_refill_then_sliding_window():
+    clock = [600.0]
+    backend = LocalRateLimitBackend(clock=lambda: clock[0])
+    rule = RateLimitRule(10, window_seconds=60, burst=3, refill_per_second=1)
+
+    async def hits(count, key="user:1", rule=rule):
+        return [await backend.hit(key, rule) for _ in range(count)]
+
+    burst = asyncio.run(hits(4))
+    assert [d.allowed for d in burst] == [True, True, True, False]
+    assert burst[2].remaining == 0 and burst[3].retry_after == 1
+
+    for _ in range(7):  # one token a second, until the 10-per-window limit
+        clock[0] += 1
+        assert asyncio.run(hits(1))[0].allowed
+    clock[0] += 5
+    denied = asyncio.run(hits(1))[0]
+    assert not denied.allowed and denied.retry_after == 48  # window rolls over at 660
+
+    no_burst = RateLimitRule(10, window_seconds=60, burst=100, refill_per_second=100)
+    clock[0] = 650
+    assert [d.allowed for d in asyncio.run(hits(11, "user:2", no_burst))] == [True] * 10 + [False]
+    clock[0] = 690  # half of the previous window's 10 requests still count
+    assert [d.allowed for d in asyncio.run(hits(6, "user:2", no_burst))] == [True] * 5 + [False]
+
+def test_middleware_limits_each_caller_by_plan():
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    async def plan_for_user(user_id):
+        return "pro" if user_id == 2 else "free"
+
+    rules = {"free": RateLimitRule(2, burst=2), "pro": RateLimitRule(5, burst=5), "anonymous": RateLimitRule(1, burst=1)}
+    app.add_middleware(RateLimitMiddleware, backend=LocalRateLimitBackend(), rules=rules,
+                       plan_for_user=plan_for_user, exempt_paths=["/health"])
+    client = TestClient(app)
+
+    first = client.get("/ping?user_id=1")
+    assert first.status_code == 200
+    assert first.headers["ratelimit-limit"] == "2" and first.headers["ratelimit-remaining"] == "1"
+    assert client.get("/ping?user_id=1").status_code == 200
+    limited = client.get("/ping?user_id=1")
+    assert limited.status_code == 429 and int(limited.headers["retry-after"]) >= 1
+    assert "free plan" in limited.json()["detail"]
+
+    assert [client.get("/ping?user_id=2").status_code for _ in range(5)] == [200] * 5
+    assert client.get("/ping").status_code == 200  # anonymous callers are limited by address
+    assert client.get("/ping").status_code == 429
+    assert client.get("/health").status_code == 404  # exempt paths skip the limiter
+
+def test_rotating_user_ids_from_one_address_do_not_get_fresh_buckets():
+    app = FastAPI()
+
+    @app.get("/seo/analyze")
+    async def analyze():
+        return {"ok": True}
+
+    lookups = []
+
+    async def plan_for_user(user_id):
+        lookups.append(user_id)
+        return "free"
+
+    rules = {"free": RateLimitRule(2, burst=2), "anonymous": RateLimitRule(1, burst=1), "address": RateLimitRule(4, burst=4)}
+    app.add_middleware(RateLimitMiddleware, backend=LocalRateLimitBackend(), rules=rules,
+                       plan_for_user=plan_for_user, max_user_ids_per_address=3)
+    client = TestClient(app)
+
+    statuses = [client.get(f"/seo/analyze?user_id={i}").status_code for i in range(1, 11)]
+    assert statuses == [200] * 4 + [429] * 6  # 3 own buckets, then the address's anonymous one
+    assert lookups == [1, 2, 3]
+    limited = client.get("/seo/analyze?user_id=1")  # its own bucket has room, the address total does not
+    assert limited.status_code == 429 and "this address" in limited.json()["detail"]
+
+def test_clients_behind_a_trusted_proxy_and_type_ahead_rule():
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/keywords/autocomplete")
+    async def autocomplete():
+        return {"completions": []}
+
+    async def plan_for_user(user_id):
+        raise AssertionError("autocomplete does not look up plans")
+
+    rules = {"anonymous": RateLimitRule(1, burst=1), "autocomplete": RateLimitRule(20, burst=20)}
+    app.add_middleware(RateLimitMiddleware, backend=LocalRateLimitBackend(), rules=rules,
+                       plan_for_user=plan_for_user, trusted_proxies=["10.0.0.0/8"])
+
+    async def via_proxy(scope, receive, send):
+        await app(scope if scope["type"] != "http" else {**scope, "client": ("10.0.0.2", 40000)}, receive, send)
+
+    client = TestClient(via_proxy)
+
+    def ping(forwarded):
+        return client.get("/ping", headers={"X-Forwarded-For": forwarded}).status_code
+
+    assert ping("203.0.113.5") == 200 and ping("203.0.113.5") == 429
+    assert ping("198.51.100.7") == 200  # another client behind the same proxy has its own bucket
+    assert ping("203.0.113.9, 198.51.100.8, 10.1.2.3") == 200  # trusted hops are skipped, spoofed ones ignored
+    assert ping("203.0.113.10, 198.51.100.8") == 429
+
+    typing = [client.get(f"/keywords/autocomplete?q={'seo tools'[:n]}").status_code for n in range(1, 10)]
+    assert typing == [200] * 9
@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app import database
+from app.database import ReplicaRouter, ReplicaState, migrate_database, read_session
+from app.models import User
+
+def test_reads_use_fresh_replicas_and_fall_back_to_the_primary(tmp_path, monkeypatch):
+    # Two SQLite files stand in for a primary and its replica; each holds one marker user
+    primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    clock, lag = [0.0], {"seconds": 0.0}
+
+    async def probe(connection):
+        if lag["seconds"] is None:
+            raise ConnectionError("replica down")
+        return lag["seconds"]
+
+    primary_factory = async_sessionmaker(primary, expire_on_commit=False)
+    router = ReplicaRouter(primary_factory, [ReplicaState("replica", replica)], max_lag_seconds=10,
+                           check_interval=5, sticky_seconds=10, lag_probe=probe, clock=lambda: clock[0])
+    monkeypatch.setattr(database, "read_router", router)
+
+    async def reader(caller=None):
+        async with read_session(caller) as db:
+            return (await db.execute(select(User.username))).scalar_one()
+
+    async def run():
+        for engine, name in ((primary, "primary"), (replica, "replica")):
+            await migrate_database(bind=engine)
+            async with AsyncSession(engine) as db:
+                db.add(User(id=1, username=name, email=f"{name}@x.com", hashed_password="x"))
+                await db.commit()
+
+        assert await reader("user:1") == "replica"
+        async with read_session() as db:
+            db.add(User(username="b", email="b@x.com", hashed_password="x"))
+            with pytest.raises(RuntimeError):
+                await db.flush()
+
+        # A commit on the primary keeps that caller's reads there until the sticky window ends
+        async with primary_factory() as db:
+            db.info["caller"] = "user:1"
+            (await db.get(User, 1)).full_name = "Primary"
+            await db.commit()
+        assert [await reader("user:1"), await reader("user:2")] == ["primary", "replica"]
+        clock[0] = 11
+        assert await reader("user:1") == "replica"
+
+        lag["seconds"] = 30  # seen at the next check, check_interval after the last one
+        assert await reader() == "replica"
+        clock[0] = 16
+        assert await reader() == "primary"
+        lag["seconds"] = None
+        clock[0] = 30
+        assert await reader() == "primary"
+        lag["seconds"] = 1
+        clock[0] = 40
+        assert await reader() == "replica"
+
+        stats = router.stats()
+        assert stats["replicas"][0]["healthy"] and stats["primary_fallbacks"] == 2
+        assert stats["read_your_writes"] == 1 and stats["checks"] == 5
+
+    asyncio.run(run())
@@ -0,0 +1,83 @@
+import asyncio
+from app.schemas.keyword import KeywordRequest, KeywordResearch
+from app.services.keyword_service import ResearchCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+def make_loader(calls):
+    async def loader(request):
+        calls.append(request.keyword)
+        await asyncio.sleep(0.01)
+        return KeywordResearch(
+            main_keyword=request.keyword, search_volume=len(calls), difficulty_score=10,
+            competition_level="low", seasonal_trends=[], related_keywords=[],
+            long_tail_keywords=[], questions=[], suggested_content_topics=[]
+        )
+    return loader
+
+def test_hits_share_normalized_key_and_single_flight():
+    calls = []
+    cache = ResearchCache(clock=FakeClock())
+    loader = make_loader(calls)
+
+    async def run():
+        first, second = await asyncio.gather(
+            cache.get(KeywordRequest(keyword="SEO Tools"), loader),
+            cache.get(KeywordRequest(keyword=" seo  tools "), loader)
+        )
+        third = await cache.get(KeywordRequest(keyword="seo tools"), loader)
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert calls == ["SEO Tools"]
+    assert first is second is third
+
+def test_stale_entries_are_served_while_refreshing():
+    calls = []
+    clock = FakeClock()
+    cache = ResearchCache(ttl_seconds=10, stale_seconds=100, clock=clock)
+    loader = make_loader(calls)
+    request = KeywordRequest(keyword="seo")
+
+    async def run():
+        await cache.get(request, loader)
+        clock.now = 50
+        stale = await cache.get(request, loader)
+        await asyncio.sleep(0.05)
+        fresh = await cache.get(request, loader)
+        return stale, fresh
+
+    stale, fresh = asyncio.run(run())
+    assert stale.search_volume == 1 and fresh.search_volume == 2
+    assert cache.stats()["refreshes"] == 1
+
+def test_lru_bound_and_warm_up():
+    calls = []
+    cache = ResearchCache(max_entries=2, clock=FakeClock())
+    loader = make_loader(calls)
+    seeds = [KeywordRequest(keyword=k) for k in ("a", "b", "c")]
+    assert asyncio.run(cache.warm_up(loader, seeds)) == 3
+    assert cache.stats()["entries"] == 2 and cache.stats()["evictions"] == 1
+
+def test_waiters_take_over_when_the_first_caller_is_cancelled():
+    calls = []
+    cache = ResearchCache(clock=FakeClock())
+    loader = make_loader(calls)
+    request = KeywordRequest(keyword="seo")
+
+    async def run():
+        leader = asyncio.create_task(cache.get(request, loader))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get(request, loader))
+        await asyncio.sleep(0)
+        leader.cancel()  # client disconnected mid-research
+        result = await asyncio.wait_for(waiter, timeout=1)
+        return leader.cancelled(), result
+
+    leader_cancelled, result = asyncio.run(run())
+    assert leader_cancelled and result.main_keyword == "seo"
+    assert calls == ["seo", "seo"]
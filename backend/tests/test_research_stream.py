@@ -0,0 +1,96 @@
+import asyncio
+import json
+from app.api import routes_keywords
+from app.schemas.keyword import KeywordRequest, KeywordSuggestion
+from app.services import keyword_service
+from app.services.ai_service import RealTimeKeywordAnalyzer
+from app.services.keyword_service import (
+    KeywordAnalyzer, KeywordCandidate, RankedSuggestions, ResearchCache, stream_keyword_research
+)
+from app.services.llm_gateway import LLMGateway, StaticBackend
+from app.services.subscription_service import SubscriptionManager
+
+AI_REPLY = json.dumps({"keywords": [
+    {"keyword": "ai seo tools", "search_volume": 900, "difficulty": 40, "relevance_score": 0.99, "cpc": 2.0},
+    {"keyword": "seo tools", "search_volume": 900, "difficulty": 40, "relevance_score": 0.95, "cpc": 2.0},
+]})
+
+def suggestion(keyword, relevance):
+    return KeywordSuggestion(keyword=keyword, search_volume=100, difficulty=30, relevance_score=relevance)
+
+def test_ranked_suggestions_insert_in_order():
+    ranked = RankedSuggestions(limit=3)
+    assert ranked.add(suggestion("a", 0.5)) == 0
+    assert ranked.add(suggestion("b", 0.9)) == 0
+    assert ranked.add(suggestion("c", 0.5)) == 2  # ties keep arrival order
+    assert ranked.add(suggestion("d", 0.1)) is None
+    assert ranked.add(suggestion("B", 0.99)) is None  # already listed
+    assert ranked.add(suggestion("e", 0.7)) == 1
+    assert [s.keyword for s in ranked.items()] == ["b", "e", "a"]
+
+def test_candidates_become_models_only_when_kept():
+    ranked = RankedSuggestions(limit=2)
+    for i, relevance in enumerate([0.2, 0.9, 0.5, 0.1]):
+        ranked.add(KeywordCandidate(f"kw {i}", 100, 30.0, relevance))
+    suggestions = ranked.suggestions()
+    assert [s.keyword for s in suggestions] == ["kw 1", "kw 2"]
+    assert all(isinstance(s, KeywordSuggestion) for s in suggestions)
+
+def test_research_returns_top_related_keywords():
+    research = asyncio.run(KeywordAnalyzer().research_keyword(KeywordRequest(keyword="zebra grooming")))
+    scores = [s.relevance_score for s in research.related_keywords]
+    assert 0 < len(scores) <= keyword_service.RELATED_KEYWORD_LIMIT and scores == sorted(scores, reverse=True)
+    assert all(isinstance(s, KeywordSuggestion) for s in research.long_tail_keywords)
+
+def test_stream_sends_sections_then_merges_ai(monkeypatch):
+    gateway = LLMGateway(StaticBackend(reply=AI_REPLY, chunk_size=16))
+    monkeypatch.setattr("app.services.ai_service.keyword_analyzer", RealTimeKeywordAnalyzer(gateway=gateway))
+    monkeypatch.setattr(keyword_service, "research_cache", ResearchCache())
+    monkeypatch.setattr(keyword_service.settings, "KEYWORD_AI_ENRICHMENT", True)
+    request = KeywordRequest(keyword="SEO tools")
+
+    async def collect():
+        return [event async for event in stream_keyword_research(request)]
+
+    events = asyncio.run(collect())
+    assert events[0]["type"] == "summary" and events[-1]["type"] == "complete"
+    sections = {e["section"] for e in events if e["type"] == "section"}
+    assert sections == {"related_keywords", "long_tail_keywords", "questions", "suggested_content_topics"}
+    merged = [e for e in events if e["type"] == "related_keyword"]
+    assert [(e["data"]["keyword"], e["position"]) for e in merged] == [("ai seo tools", 0)]
+
+    research = events[-1]["data"]
+    assert research["related_keywords"][0]["keyword"] == "ai seo tools"
+    assert keyword_service.research_cache.peek(request).main_keyword == "seo tools"
+    cached = asyncio.run(collect())
+    assert cached[-1]["cached"] and cached[-1]["data"] == research
+
+def test_stream_gives_back_reserved_research_unless_completed(monkeypatch):
+    released = []
+
+    async def reserve(db, user_id, usage):
+        return dict(usage)
+
+    monkeypatch.setattr(SubscriptionManager, "reserve_usage", staticmethod(reserve))
+    monkeypatch.setattr(SubscriptionManager, "release_usage", staticmethod(lambda user_id, usage: released.append(usage)))
+
+    async def research(request, business_context, fail=False):
+        yield {"type": "summary", "data": {}}
+        if fail:
+            raise RuntimeError("upstream down")
+        yield {"type": "complete", "data": {}}
+
+    async def run(fail, disconnect=False):
+        monkeypatch.setattr(routes_keywords, "stream_keyword_research", lambda r, c: research(r, c, fail))
+        response = await routes_keywords.keyword_research_stream(KeywordRequest(keyword="seo"), "ndjson", "", 1, None)
+        chunks = []
+        async for chunk in response.body_iterator:
+            chunks.append(chunk)
+            if disconnect:
+                await response.body_iterator.aclose()
+                break
+        return [json.loads(chunk)["type"] for chunk in chunks]
+
+    assert asyncio.run(run(fail=False)) == ["summary", "complete"] and released == []
+    assert asyncio.run(run(fail=True)) == ["summary", "error"] and released == [{"keyword_research": 1}]
+    assert asyncio.run(run(fail=False, disconnect=True)) == ["summary"] and len(released) == 2
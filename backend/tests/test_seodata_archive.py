@@ -0,0 +1,72 @@
+import asyncio
+import gzip
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.database import migrate_database
+from app.models import SeoData, SeoDataArchive, User
+from app.services import seodata_archive
+from app.services.analytics_rollups import get_rollup_totals, rebuild_rollups
+from app.services.seo_service import get_recent_seo_results
+from app.settings import settings
+
+def test_old_months_move_to_archive_files_and_stay_queryable(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setattr(settings, "SEODATA_ARCHIVE_DIR", str(tmp_path / "archive"))
+    monkeypatch.setattr(seodata_archive, "archive_reader", seodata_archive.ArchiveReader(max_months=2))
+    created = [datetime(2025, 1, 5), datetime(2025, 1, 31, 23, 59), datetime(2025, 2, 1), datetime(2026, 10, 1)]
+
+    async def history(db, cursor=None):
+        return await get_recent_seo_results(db, 1, 2, cursor, include_results=True, include_archived=True)
+
+    async def run():
+        await migrate_database(bind=engine)
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            db.add(User(id=1, username="a", email="a@x.com", hashed_password="x"))
+            db.add_all([SeoData(user_id=1, url=f"https://site{i}.com/", score=50 + i, analysis_result={"i": i},
+                                created_at=when) for i, when in enumerate(created)])
+            await db.commit()
+            totals = await get_rollup_totals(db)
+
+            result = await seodata_archive.apply_retention(db, hot_months=12, batch_size=1, today=date(2026, 10, 19))
+            assert result["archived"] == {"2025-01": 2, "2025-02": 1}
+            assert (await db.execute(select(func.count()).select_from(SeoData))).scalar() == 1
+            assert sorted(os.listdir(tmp_path / "archive")) == ["seodata-2025-01.jsonl.gz", "seodata-2025-02.jsonl.gz"]
+            await rebuild_rollups(db)
+            assert await get_rollup_totals(db) == totals  # archived days keep their usage rollups
+
+            pages, cursor = [], None
+            while True:
+                analyses, cursor = await history(db, cursor)
+                pages.append([(a["url"], a.get("archived", False)) for a in analyses])
+                if cursor is None:
+                    break
+            assert pages == [[("https://site3.com/", False), ("https://site2.com/", True)],
+                             [("https://site1.com/", True), ("https://site0.com/", True)]]
+            assert seodata_archive.archive_reader.loads == 2
+
+            assert await seodata_archive.restore_month(db, "2025-01") == 2
+            restored = (await db.execute(select(SeoData).where(SeoData.id == 2))).scalar_one()
+            assert restored.analysis_result == {"i": 1} and restored.created_at == created[1]
+            assert [a.month for a in (await db.execute(select(SeoDataArchive))).scalars()] == ["2025-02"]
+            assert not os.path.exists(tmp_path / "archive" / "seodata-2025-01.jsonl.gz")
+
+    asyncio.run(run())
+
+def test_archive_reader_is_safe_across_worker_threads(tmp_path):
+    reader = seodata_archive.ArchiveReader(max_months=1)
+    paths = []
+    for month in range(1, 5):
+        path = tmp_path / f"seodata-2025-{month:02d}.jsonl.gz"
+        with gzip.open(path, "wt") as f:
+            f.write(json.dumps({"id": month, "user_id": 1, "url": "https://x.com/", "analysis_result": None,
+                                "score": 1.0, "created_at": f"2025-{month:02d}-02T00:00:00"}) + "\n")
+        paths.append(str(path))
+
+    with ThreadPoolExecutor(8) as pool:  # months evicting each other while being read
+        rows = list(pool.map(lambda i: reader.user_rows(paths[i % 4], 1)[0]["id"], range(400)))
+    assert rows == [i % 4 + 1 for i in range(400)]
+    assert reader.stats()["loaded_months"] == 1
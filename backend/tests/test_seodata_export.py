@@ -0,0 +1,71 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import date, datetime
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app import database
+from app.api import routes_seo
+from app.database import ReplicaRouter, migrate_database
+from app.models import SeoData, User
+from app.services import seodata_archive
+from app.services.seodata_export import SUMMARY_COLUMNS, create_encoder, export_batches, stream_export
+from app.settings import settings
+
+RESULT = {
+    "technical_seo": {"ssl_enabled": True, "images_without_alt": 3, "broken_links": ["https://x.com/404"]},
+    "content_analysis": {"word_count": 800, "readability_score": 61.5},
+    "recommendations": [{"priority": "high"}, {"priority": "low"}],
+}
+
+def test_exports_stream_in_batches_with_filters(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setattr(database, "read_router", ReplicaRouter(async_sessionmaker(engine, expire_on_commit=False)))
+    monkeypatch.setattr(settings, "SEODATA_ARCHIVE_DIR", str(tmp_path / "archive"))
+    urls = ["https://shop_1.com/a", "https://shop_1.com/b", "https://shopx1.com/", "https://blog.com/", "https://shop_1.com/c"]
+
+    async def collect(encoder, **filters):
+        return b"".join([chunk async for chunk in stream_export(encoder, export_batches(batch_size=2, **filters))])
+
+    async def run():
+        await migrate_database(bind=engine)
+        async with AsyncSession(engine) as db:
+            db.add_all([User(id=i, username=f"u{i}", email=f"u{i}@x.com", hashed_password="x") for i in (1, 2)])
+            db.add_all([SeoData(user_id=1 if i != 3 else 2, url=url, score=70 + i, analysis_result=RESULT,
+                                created_at=datetime(2026, 9, 1 + i, 12)) for i, url in enumerate(urls)])
+            db.add(SeoData(user_id=1, url="https://shop_1.com/old", score=10, analysis_result=RESULT,
+                           created_at=datetime(2024, 5, 5)))
+            await db.commit()
+            await seodata_archive.archive_month(db, "2024-05")
+
+        sizes = [len(batch) async for batch in export_batches(user_id=1, batch_size=2)]
+        assert sizes == [2, 2]  # one server-side cursor batch at a time
+
+        ndjson = await collect(create_encoder("ndjson", include_results=False), user_id=1, url_prefix="https://shop_1.com/",
+                               end=date(2026, 9, 2))
+        assert [json.loads(line)["url"] for line in ndjson.splitlines()] == urls[:2]
+        assert "analysis_result" not in json.loads(ndjson.splitlines()[0])
+
+        rows = list(csv.DictReader(io.StringIO((await collect(create_encoder("csv"), start=date(2026, 9, 3))).decode())))
+        assert [row["url"] for row in rows] == urls[2:]
+        assert list(rows[0]) == list(SUMMARY_COLUMNS)
+        assert (rows[0]["word_count"], rows[0]["broken_links"], rows[0]["high_priority_recommendations"]) == ("800", "1", "1")
+
+        archived = await collect(create_encoder("ndjson"), user_id=1, include_archived=True)
+        exported = [json.loads(line) for line in archived.splitlines()]
+        assert exported[0]["url"] == "https://shop_1.com/old" and exported[0]["analysis_result"] == RESULT
+        assert len(exported) == 5
+
+    asyncio.run(run())
+
+    app = FastAPI()
+    app.include_router(routes_seo.router)
+    client = TestClient(app)
+    response = client.get("/seo/export?format=csv&user_id=2")
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/csv")
+    assert "content-length" not in response.headers  # chunked
+    assert response.text.splitlines()[1].split(",")[2] == "https://blog.com/"
+    assert client.get("/seo/export?format=xml").status_code == 400
+    assert client.get("/seo/export?start=2026-09-05&end=2026-09-01").status_code == 400
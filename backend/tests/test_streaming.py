@@ -0,0 +1,36 @@
+import asyncio
+import json
+from app.services.ai_service import RealTimeKeywordAnalyzer
+from app.services.llm_gateway import LLMGateway, StaticBackend
+from app.utils.json_stream import IncrementalJSONArrayParser
+
+KEYWORDS_REPLY = json.dumps({
+    "keywords": [
+        {"keyword": f"seo {i}", "search_volume": 100, "difficulty": 30, "relevance_score": 0.9, "cpc": 1.2}
+        for i in range(3)
+    ]
+})
+
+def test_parser_emits_objects_across_chunks():
+    parser = IncrementalJSONArrayParser("keywords")
+    items = []
+    text = "```json\n" + KEYWORDS_REPLY + "\n```"
+    for start in range(0, len(text), 5):
+        items.extend(parser.feed(text[start:start + 5]))
+    assert [item["keyword"] for item in items] == ["seo 0", "seo 1", "seo 2"]
+
+def test_parser_skips_malformed_items():
+    parser = IncrementalJSONArrayParser("keywords")
+    items = parser.feed('{"keywords": [{"keyword": "a"}, {"keyword": oops}, {"keyword": "b"}]}')
+    assert [item["keyword"] for item in items] == ["a", "b"]
+    assert parser.skipped == 1
+
+def test_stream_smart_keywords():
+    gateway = LLMGateway(StaticBackend(reply=KEYWORDS_REPLY, chunk_size=7))
+    analyzer = RealTimeKeywordAnalyzer(gateway=gateway)
+
+    async def collect():
+        return [kw async for kw in analyzer.stream_smart_keywords("seo")]
+
+    keywords = asyncio.run(collect())
+    assert [kw.keyword for kw in keywords] == ["seo 0", "seo 1", "seo 2"]
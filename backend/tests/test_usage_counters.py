@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.database import migrate_database
+from app.models import UsageCounter, User
+from app.services import subscription_service, usage_counters
+from app.services.license_cache import LicenseCache
+from app.services.subscription_service import SubscriptionManager, UnknownUser, UsageLimitExceeded
+from app.services.usage_counters import UsageCounterBuffer, limit_period, period_key
+
+def test_limit_keys_map_to_counter_periods():
+    assert limit_period("seo_analyses_per_month") == ("seo_analyses", "month")
+    assert limit_period("api_calls_per_day") == ("api_calls", "day")
+    assert limit_period("bulk_keywords_per_request") == ("bulk_keywords", "request")
+    assert limit_period("websites") == ("websites", "total")
+
+def test_buffered_increments_are_upserted_in_batches(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    buffer = UsageCounterBuffer(batch_size=2, session_factory=async_sessionmaker(engine))
+
+    async def run():
+        await migrate_database(bind=engine)
+        for resource in ("api_calls", "api_calls", "seo_analyses", "websites"):
+            buffer.add(1, resource, "2026-10")
+        pending = buffer.pending((1, "api_calls", "2026-10"))
+        first = await buffer.flush()
+        buffer.add(1, "api_calls", "2026-10", 3)
+        await buffer.stop()
+        async with AsyncSession(engine) as db:
+            rows = (await db.execute(select(UsageCounter.resource, UsageCounter.count).order_by(UsageCounter.resource))).all()
+        await engine.dispose()
+        return pending, first, rows
+
+    pending, first, rows = asyncio.run(run())
+    assert pending == 2 and first == 3
+    assert [tuple(row) for row in rows] == [("api_calls", 5), ("seo_analyses", 1), ("websites", 1)]
+    assert buffer.stats()["flushes"] == 2 and buffer.stats()["pending_counters"] == 0
+
+def test_plan_limits_are_enforced_across_concurrent_requests(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setattr(usage_counters, "usage_buffer", UsageCounterBuffer(session_factory=async_sessionmaker(engine)))
+    monkeypatch.setattr(subscription_service, "license_cache", LicenseCache())
+
+    async def reserve():
+        async with AsyncSession(engine) as db:  # a session per request
+            try:
+                await SubscriptionManager.reserve_usage(db, 1, {"seo_analyses": 1})
+                return True
+            except UsageLimitExceeded:
+                return False
+
+    async def run():
+        await migrate_database(bind=engine)
+        async with AsyncSession(engine) as db:
+            db.add(User(id=1, username="a", email="a@x.com", hashed_password="x"))
+            await db.commit()
+            granted = await asyncio.gather(*(reserve() for _ in range(4)))
+            await usage_counters.usage_buffer.flush()
+            granted += await asyncio.gather(*(reserve() for _ in range(10)))
+            full = await SubscriptionManager.check_usage_limit(db, 1, "seo_analyses")
+            SubscriptionManager.release_usage(1, {"seo_analyses": 1})
+            after_release = await SubscriptionManager.check_usage_limit(db, 1, "seo_analyses")
+            with pytest.raises(UsageLimitExceeded):
+                await SubscriptionManager.reserve_usage(db, 1, {"competitor_analyses": 1})  # 0 on the free plan
+            status = await SubscriptionManager.get_user_license_status(db, 1)
+        await usage_counters.usage_buffer.flush()
+        async with AsyncSession(engine) as db:
+            stored = await db.get(UsageCounter, (1, "seo_analyses", period_key("month")))
+        await engine.dispose()
+        return granted, full, after_release, status, stored
+
+    granted, full, after_release, status, stored = asyncio.run(run())
+    assert granted.count(True) == 10
+    assert full["allowed"] is False and full["current_usage"] == 10 and full["period"] == "month"
+    assert after_release["allowed"] is True and after_release["remaining"] == 1
+    assert status.usage_stats["seo_analyses"] == 9 and status.usage_stats["competitor_analyses"] == 0
+    assert stored.count == 9
+
+def test_rejected_counter_rows_do_not_block_later_flushes(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    event.listen(engine.sync_engine, "connect", lambda connection, _: connection.execute("PRAGMA foreign_keys=ON"))
+    buffer = UsageCounterBuffer(batch_size=10, session_factory=async_sessionmaker(engine))
+
+    async def run():
+        await migrate_database(bind=engine)
+        async with AsyncSession(engine) as db:
+            db.add(User(id=1, username="a", email="a@x.com", hashed_password="x"))
+            await db.commit()
+            with pytest.raises(UnknownUser):
+                await SubscriptionManager.reserve_usage(db, 999, {"api_calls": 1})
+        buffer.add(1, "api_calls", "2026-10-19")
+        buffer.add(999, "api_calls", "2026-10-19")  # user deleted after the increment was recorded
+        written = await buffer.flush()
+        buffer.add(1, "api_calls", "2026-10-19")
+        await buffer.flush()
+        async with AsyncSession(engine) as db:
+            rows = (await db.execute(select(UsageCounter.user_id, UsageCounter.count))).all()
+        await engine.dispose()
+        return written, rows
+
+    written, rows = asyncio.run(run())
+    assert written == 1 and [tuple(row) for row in rows] == [(1, 2)]
+    assert buffer.stats()["dropped_rows"] == 1 and buffer.stats()["failed_flushes"] == 0
+    assert buffer.stats()["pending_counters"] == 0
@@ -0,0 +1,237 @@
+-- AstraPilot PostgreSQL schema at the latest migration.
+-- Generated from backend/migrations; do not edit by hand. Regenerate with:
+--   cd backend && DATABASE_URL=postgresql+asyncpg://localhost/astrapilot alembic upgrade head --sql > ../database/schema.sql
+-- The API applies the same migrations at startup (app.database.migrate_database).
+
+BEGIN;
+
+CREATE TABLE alembic_version (
+    version_num VARCHAR(32) NOT NULL, 
+    CONSTRAINT alembic_version_pkc PRIMARY KEY (version_num)
+);
+
+-- Running upgrade  -> 0001
+
+CREATE TABLE users (
+    id SERIAL NOT NULL, 
+    username VARCHAR(64) NOT NULL, 
+    email VARCHAR(256) NOT NULL, 
+    hashed_password VARCHAR(256) NOT NULL, 
+    is_active BOOLEAN, 
+    is_superuser BOOLEAN, 
+    email_verified BOOLEAN, 
+    otp_code VARCHAR(6), 
+    otp_expires TIMESTAMP WITH TIME ZONE, 
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(), 
+    PRIMARY KEY (id)
+);
+
+CREATE INDEX ix_users_id ON users (id);
+
+CREATE UNIQUE INDEX ix_users_username ON users (username);
+
+CREATE UNIQUE INDEX ix_users_email ON users (email);
+
+CREATE TABLE payments (
+    id SERIAL NOT NULL, 
+    user_id INTEGER, 
+    provider VARCHAR(32) NOT NULL, 
+    amount FLOAT NOT NULL, 
+    currency VARCHAR(8), 
+    status VARCHAR(32), 
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(), 
+    PRIMARY KEY (id), 
+    FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE INDEX ix_payments_id ON payments (id);
+
+CREATE TABLE licenses (
+    id SERIAL NOT NULL, 
+    user_id INTEGER, 
+    plan VARCHAR(64) NOT NULL, 
+    is_active BOOLEAN, 
+    valid_until TIMESTAMP WITHOUT TIME ZONE, 
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(), 
+    PRIMARY KEY (id), 
+    FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE INDEX ix_licenses_id ON licenses (id);
+
+CREATE TABLE seodata (
+    id SERIAL NOT NULL, 
+    user_id INTEGER, 
+    url VARCHAR(255) NOT NULL, 
+    analysis_result JSON, 
+    score FLOAT, 
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(), 
+    PRIMARY KEY (id), 
+    FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE INDEX ix_seodata_id ON seodata (id);
+
+CREATE TABLE social (
+    id SERIAL NOT NULL, 
+    user_id INTEGER, 
+    platform VARCHAR(64) NOT NULL, 
+    profile_url VARCHAR(256), 
+    social_data JSON, 
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(), 
+    PRIMARY KEY (id), 
+    FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE INDEX ix_social_id ON social (id);
+
+INSERT INTO alembic_version (version_num) VALUES ('0001') RETURNING alembic_version.version_num;
+
+-- Running upgrade 0001 -> 0002
+
+CREATE INDEX ix_seodata_user_id_created_at ON seodata (user_id, created_at);
+
+CREATE INDEX ix_seodata_created_at ON seodata (created_at);
+
+CREATE INDEX ix_payments_status_created_at ON payments (status, created_at);
+
+CREATE INDEX ix_payments_user_id_created_at ON payments (user_id, created_at);
+
+CREATE INDEX ix_payments_created_at ON payments (created_at);
+
+CREATE INDEX ix_licenses_user_id_is_active ON licenses (user_id, is_active, created_at);
+
+CREATE INDEX ix_licenses_active_valid_until ON licenses (valid_until) WHERE is_active = true;
+
+CREATE INDEX ix_social_user_id ON social (user_id);
+
+CREATE INDEX ix_users_created_at ON users (created_at);
+
+UPDATE alembic_version SET version_num='0002' WHERE alembic_version.version_num = '0001';
+
+-- Running upgrade 0002 -> 0003
+
+CREATE INDEX ix_users_created_at_id ON users (created_at, id);
+
+DROP INDEX ix_users_created_at;
+
+CREATE INDEX ix_payments_created_at_id ON payments (created_at, id);
+
+DROP INDEX ix_payments_created_at;
+
+CREATE INDEX ix_payments_status_created_at_id ON payments (status, created_at, id);
+
+DROP INDEX ix_payments_status_created_at;
+
+CREATE INDEX ix_seodata_user_id_created_at_id ON seodata (user_id, created_at, id);
+
+DROP INDEX ix_seodata_user_id_created_at;
+
+UPDATE alembic_version SET version_num='0003' WHERE alembic_version.version_num = '0002';
+
+-- Running upgrade 0003 -> 0004
+
+CREATE TABLE daily_payment_stats (
+    day DATE NOT NULL, 
+    status VARCHAR(32) NOT NULL, 
+    payments INTEGER NOT NULL, 
+    amount FLOAT NOT NULL, 
+    PRIMARY KEY (day, status)
+);
+
+CREATE TABLE daily_usage_stats (
+    day DATE NOT NULL, 
+    new_users INTEGER NOT NULL, 
+    analyses INTEGER NOT NULL, 
+    scored_analyses INTEGER NOT NULL, 
+    score_total FLOAT NOT NULL, 
+    PRIMARY KEY (day)
+);
+
+INSERT INTO daily_payment_stats (day, status, payments, amount) SELECT date(created_at), COALESCE(status, 'pending'), COUNT(*), COALESCE(SUM(amount), 0) FROM payments WHERE created_at IS NOT NULL GROUP BY date(created_at), COALESCE(status, 'pending');
+
+INSERT INTO daily_usage_stats (day, new_users, analyses, scored_analyses, score_total) SELECT day, SUM(new_users), SUM(analyses), SUM(scored_analyses), SUM(score_total) FROM (SELECT date(created_at) AS day, COUNT(*) AS new_users, 0 AS analyses, 0 AS scored_analyses, 0.0 AS score_total FROM users WHERE created_at IS NOT NULL GROUP BY date(created_at) UNION ALL SELECT date(created_at), 0, COUNT(*), COUNT(score), COALESCE(SUM(score), 0) FROM seodata WHERE created_at IS NOT NULL GROUP BY date(created_at)) AS daily GROUP BY day;
+
+UPDATE alembic_version SET version_num='0004' WHERE alembic_version.version_num = '0003';
+
+-- Running upgrade 0004 -> 0005
+
+CREATE TABLE usage_counters (
+    user_id INTEGER NOT NULL, 
+    resource VARCHAR(64) NOT NULL, 
+    period VARCHAR(16) NOT NULL, 
+    count INTEGER NOT NULL, 
+    PRIMARY KEY (user_id, resource, period), 
+    FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+UPDATE alembic_version SET version_num='0005' WHERE alembic_version.version_num = '0004';
+
+-- Running upgrade 0005 -> 0006
+
+UPDATE seodata SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL;
+
+DROP INDEX ix_seodata_id;
+
+DROP INDEX ix_seodata_user_id_created_at_id;
+
+DROP INDEX ix_seodata_created_at;
+
+ALTER TABLE seodata RENAME TO seodata_unpartitioned;
+
+ALTER TABLE seodata_unpartitioned RENAME CONSTRAINT seodata_pkey TO seodata_unpartitioned_pkey;
+
+ALTER TABLE seodata_unpartitioned RENAME CONSTRAINT seodata_user_id_fkey TO seodata_unpartitioned_user_id_fkey;
+
+CREATE TABLE seodata (
+    id INTEGER DEFAULT nextval('seodata_id_seq') NOT NULL, 
+    user_id INTEGER, 
+    url VARCHAR(255) NOT NULL, 
+    analysis_result JSON, 
+    score FLOAT, 
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL, 
+    PRIMARY KEY (id, created_at), 
+    FOREIGN KEY(user_id) REFERENCES users (id)
+)
+ PARTITION BY RANGE (created_at);
+
+DO $$
+DECLARE
+    month_start timestamp := date_trunc('month', COALESCE(
+        (SELECT min(created_at) FROM seodata_unpartitioned), now()) AT TIME ZONE 'UTC');
+    last_month timestamp := date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months';
+BEGIN
+    WHILE month_start <= last_month LOOP
+        EXECUTE format('CREATE TABLE %I PARTITION OF seodata FOR VALUES FROM (%L) TO (%L)',
+                       'seodata_p' || to_char(month_start, 'YYYY_MM'),
+                       month_start AT TIME ZONE 'UTC', (month_start + interval '1 month') AT TIME ZONE 'UTC');
+        month_start := month_start + interval '1 month';
+    END LOOP;
+END $$;
+
+CREATE TABLE seodata_default PARTITION OF seodata DEFAULT;
+
+INSERT INTO seodata (id, user_id, url, analysis_result, score, created_at) SELECT id, user_id, url, analysis_result, score, created_at FROM seodata_unpartitioned;
+
+ALTER SEQUENCE seodata_id_seq OWNED BY seodata.id;
+
+DROP TABLE seodata_unpartitioned;
+
+CREATE INDEX ix_seodata_id ON seodata (id);
+
+CREATE INDEX ix_seodata_user_id_created_at_id ON seodata (user_id, created_at, id);
+
+CREATE INDEX ix_seodata_created_at ON seodata (created_at);
+
+CREATE TABLE seodata_archives (
+    month VARCHAR(7) NOT NULL, 
+    path VARCHAR(512) NOT NULL, 
+    rows INTEGER NOT NULL, 
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT now(), 
+    PRIMARY KEY (month)
+);
+
+UPDATE alembic_version SET version_num='0006' WHERE alembic_version.version_num = '0005';
+
+COMMIT;
+
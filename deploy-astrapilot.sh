@@ -224,10 +224,10 @@ sleep 10
 newgrp docker << EONG
 docker-compose -f docker-compose.production.yml exec -T backend python -c "
 import asyncio
-from app.database import create_tables
+from app.database import migrate_database
 try:
-    asyncio.run(create_tables())
-    print('✅ Database tables created successfully!')
+    asyncio.run(migrate_database())
+    print('✅ Database schema migrated successfully!')
 except Exception as e:
     print(f'⚠️ Database initialization error: {e}')
 "